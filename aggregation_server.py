@@ -0,0 +1,319 @@
+"""Long-running aggregation server (--serve): ingest lines from sockets and files, answer report queries by HTTP."""
+
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Awaitable, Callable
+from urllib.parse import parse_qs, urlsplit
+
+from async_ingestion import parse_tcp_address
+from bad_lines import BadLines
+from config import (
+    AVERAGE_REPORT_NAME,
+    DEFAULT_RESPONSE_FORMAT,
+    FOLLOW_POLL_INTERVAL,
+    GROUPBY_REPORT_NAME,
+    IO_CHUNK_SIZE,
+    JSON_FORMAT_NAME,
+    PERCENTILES_REPORT_NAME,
+    RESPONSE_FORMATS,
+    SERVER_REPORT_PATH,
+    SERVER_SNAPSHOT_INTERVAL,
+    SERVER_STATUS_PATH,
+    SPREAD_REPORT_NAME,
+    TCP_SOURCE_PREFIX,
+    TIMESERIES_REPORT_NAME,
+    UNIX_SOURCE_PREFIX,
+)
+from follow_mode import FileFollower
+from log_aggregator import LogAggregator
+
+REPORT_NAMES = (
+    AVERAGE_REPORT_NAME,
+    PERCENTILES_REPORT_NAME,
+    SPREAD_REPORT_NAME,
+    TIMESERIES_REPORT_NAME,
+    GROUPBY_REPORT_NAME,
+)
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed'}
+CONTENT_TYPES = {JSON_FORMAT_NAME: 'application/json'}  # Other formats are plain text.
+
+
+def parse_server_address(value: str) -> str:
+    """Return address of a server socket: unix:PATH or tcp:HOST:PORT."""
+    if value.startswith(TCP_SOURCE_PREFIX):
+        parse_tcp_address(value)
+    elif not value.startswith(UNIX_SOURCE_PREFIX) or value == UNIX_SOURCE_PREFIX:
+        raise ValueError(f'Invalid address "{value}", use {UNIX_SOURCE_PREFIX}PATH or {TCP_SOURCE_PREFIX}HOST:PORT.')
+    return value
+
+
+async def start_server(
+    handle_connection: Callable[[asyncio.StreamReader, asyncio.StreamWriter], Awaitable[None]], address: str
+) -> asyncio.Server:
+    """Start listening on unix:PATH or tcp:HOST:PORT address."""
+    if address.startswith(UNIX_SOURCE_PREFIX):
+        return await asyncio.start_unix_server(handle_connection, address.removeprefix(UNIX_SOURCE_PREFIX))
+    return await asyncio.start_server(handle_connection, *parse_tcp_address(address))
+
+
+class ReportSnapshot:
+    """
+    Copy of aggregated statistics published for queries, it is never changed after publication.
+
+    Rendered reports are cached by (type report, format), so repeated queries of one snapshot
+    only send ready bytes.
+    """
+
+    def __init__(self, aggregator: LogAggregator, version: int):
+        """
+        Set up initial values.
+
+        self.aggregator - statistics of the snapshot
+        self.version - number of ingested batches of lines in the snapshot
+        self.created - time of publication (epoch seconds)
+        self.responses - (type report, format): rendered report
+        """
+        self.aggregator = aggregator
+        self.version = version
+        self.created = time.time()
+        self.responses: dict[tuple[str, str], bytes] = {}
+
+    def render(self, type_report: str, response_format: str) -> bytes:
+        """Return the report as tabulate text or JSON object of headers and rows."""
+        key = (type_report, response_format)
+        response = self.responses.get(key)
+        if response is None:
+            if response_format == JSON_FORMAT_NAME:
+                headers, rows = self.aggregator.get_report_data(type_report)
+                data = {'report': type_report, 'version': self.version, 'headers': headers, 'rows': rows}
+                response = json.dumps(data).encode()
+            else:
+                response = (self.aggregator.report(type_report) + '\n').encode()
+            self.responses[key] = response
+        return response
+
+
+class AggregationServer:
+    """
+    Server which keeps statistics in memory and answers report queries.
+
+    Lines are pushed to the ingest sockets (one JSON record per line, the connection may be kept open)
+    or appended to the followed files. Only the ingest thread changes the live aggregator, every
+    snapshot_interval seconds it publishes a full copy of the statistics if they are changed (ReportSnapshot).
+    Bad lines are skipped by bad_lines if it is given, otherwise a bad line drops the rest of its batch.
+    Queries (HTTP/1.1 GET on the query socket) read the current snapshot and render reports in a query
+    thread: readers never wait for ingestion and see a consistent state. Query paths:
+    SERVER_REPORT_PATH + type report (?format=text|json) and SERVER_STATUS_PATH.
+    """
+
+    def __init__(
+        self,
+        aggregator: LogAggregator,
+        query_address: str,
+        ingest_addresses: list[str] | None = None,
+        files: list[str] | None = None,
+        snapshot_interval: float = SERVER_SNAPSHOT_INTERVAL,
+        poll_interval: float = FOLLOW_POLL_INTERVAL,
+        bad_lines: BadLines | None = None,
+    ):
+        """
+        Set up initial values.
+
+        self.aggregator - live statistics, changed only in the ingest thread
+        self.version - number of ingested batches of lines
+        self.snapshot - the last published snapshot
+        self.servers - listening query and ingest servers (while running)
+        """
+        self.aggregator = aggregator
+        self.query_address = query_address
+        self.ingest_addresses = ingest_addresses or []
+        self.files = files or []
+        self.snapshot_interval = snapshot_interval
+        self.poll_interval = poll_interval
+        self.bad_lines = bad_lines
+        self.version = 0
+        self.snapshot = ReportSnapshot(aggregator.copy_settings(), 0)
+        self.servers: list[asyncio.Server] = []
+        self._ingest_executor = ThreadPoolExecutor(max_workers=1)
+        self._query_executor = ThreadPoolExecutor(max_workers=1)
+
+    def ingest(self, lines: list[bytes], source: str = '') -> None:
+        """
+        Add lines of the source to the live statistics (ingest thread).
+
+        Without bad_lines the first bad line raises and the lines after it are not added. The version
+        is changed even then, since the lines before the bad one may be added already.
+        """
+        try:
+            if self.bad_lines is None:
+                self.aggregator.feed_lines(lines)
+            else:
+                self.bad_lines.feed_lines(self.aggregator, lines, source)
+        finally:
+            self.version += 1
+
+    def ingest_file(self, follower: FileFollower) -> None:
+        """Add lines appended to the followed file (ingest thread)."""
+        for lines in follower.iter_new_line_batches():
+            self.ingest(lines, follower.file)
+
+    def publish_snapshot(self) -> None:
+        """
+        Publish a copy of the live statistics if they are changed, write quarantined lines (ingest thread).
+
+        The whole aggregator is copied by merge(), so the time of publication grows with the number of endpoints.
+        """
+        if self.bad_lines is not None:
+            self.bad_lines.flush()
+        if self.snapshot.version == self.version:
+            return
+        snapshot_aggregator = self.aggregator.copy_settings()
+        snapshot_aggregator.merge(self.aggregator.get_result())
+        self.snapshot = ReportSnapshot(snapshot_aggregator, self.version)
+
+    async def run_in_ingest_thread(self, function: Callable, *args: object) -> None:
+        """Run function in the ingest thread."""
+        await asyncio.get_running_loop().run_in_executor(self._ingest_executor, function, *args)
+
+    async def handle_ingest_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, source: str = ''
+    ) -> None:
+        """Ingest lines of the connection up to EOF, without bad_lines a connection with an invalid line is closed."""
+        try:
+            tail = b''
+            while chunk := await reader.read(IO_CHUNK_SIZE):
+                lines = (tail + chunk).split(b'\n')
+                tail = lines.pop()
+                if lines:
+                    await self.run_in_ingest_thread(self.ingest, lines, source)  # The next read waits (backpressure).
+            if tail:
+                await self.run_in_ingest_thread(self.ingest, [tail], source)
+        except Exception as error:
+            print(f'Invalid line is received, connection is closed: {error!r}.', file=sys.stderr)
+        finally:
+            writer.close()
+
+    async def answer(self, method: str, target: str) -> tuple[int, str, bytes]:
+        """Return status, format and body of the response to the query."""
+        if method != 'GET':
+            return 405, DEFAULT_RESPONSE_FORMAT, b'Only GET queries are supported.\n'
+        url = urlsplit(target)
+        snapshot = self.snapshot
+        if url.path == SERVER_STATUS_PATH:
+            status = {
+                'version': self.version,
+                'snapshot_version': snapshot.version,
+                'snapshot_created': snapshot.created,
+                'endpoints': len(snapshot.aggregator.endpoint_requests),
+                'bad_lines': 0 if self.bad_lines is None else sum(self.bad_lines.counts.values()),
+            }
+            return 200, JSON_FORMAT_NAME, json.dumps(status).encode()
+
+        type_report = url.path.removeprefix(SERVER_REPORT_PATH)
+        if not url.path.startswith(SERVER_REPORT_PATH) or type_report not in REPORT_NAMES:
+            return 404, DEFAULT_RESPONSE_FORMAT, f'Unknown path "{url.path}".\n'.encode()
+        response_format = parse_qs(url.query).get('format', [DEFAULT_RESPONSE_FORMAT])[-1]
+        if response_format not in RESPONSE_FORMATS:
+            return 400, DEFAULT_RESPONSE_FORMAT, f'Unknown format "{response_format}".\n'.encode()
+
+        body = snapshot.responses.get((type_report, response_format))
+        if body is None:
+            body = await asyncio.get_running_loop().run_in_executor(
+                self._query_executor, snapshot.render, type_report, response_format
+            )
+        return 200, response_format, body
+
+    async def handle_query_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Answer HTTP/1.1 queries of the connection (kept alive unless 'Connection: close' is sent)."""
+        try:
+            while request_line := await reader.readline():
+                keep_alive = True
+                while (header := await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    keep_alive &= header.lower().replace(b' ', b'').rstrip() != b'connection:close'
+                try:
+                    method, target, _ = request_line.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    status, response_format, body = 400, DEFAULT_RESPONSE_FORMAT, b'Invalid request line.\n'
+                    keep_alive = False
+                else:
+                    status, response_format, body = await self.answer(method, target)
+                header_lines = [
+                    f'HTTP/1.1 {status} {HTTP_REASONS[status]}',
+                    f'Content-Type: {CONTENT_TYPES.get(response_format, "text/plain; charset=utf-8")}',
+                    f'Content-Length: {len(body)}',
+                    *([] if keep_alive else ['Connection: close']),
+                ]
+                writer.write('\r\n'.join([*header_lines, '', '']).encode() + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def follow_file(self, file: str) -> None:
+        """Ingest lines appended to file every poll_interval seconds."""
+        follower = FileFollower(file)
+        try:
+            while True:
+                try:
+                    await self.run_in_ingest_thread(self.ingest_file, follower)
+                except Exception as error:
+                    print(f'Invalid line in "{file}", the rest of its batch is dropped: {error!r}.', file=sys.stderr)
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            follower.close()
+
+    async def publish_snapshots(self) -> None:
+        """Publish snapshots every snapshot_interval seconds."""
+        while True:
+            await self.run_in_ingest_thread(self.publish_snapshot)
+            await asyncio.sleep(self.snapshot_interval)
+
+    async def run(self, stop: asyncio.Event | None = None) -> None:
+        """Listen and follow files until stop is set (forever if it is not given)."""
+        stop = stop or asyncio.Event()
+        tasks = []
+        try:
+            self.servers.append(await start_server(self.handle_query_connection, self.query_address))
+            for address in self.ingest_addresses:
+                self.servers.append(await start_server(partial(self.handle_ingest_connection, source=address), address))
+            tasks = [asyncio.create_task(self.follow_file(file)) for file in self.files]
+            tasks.append(asyncio.create_task(self.publish_snapshots()))
+            await stop.wait()
+        finally:
+            for server in self.servers:
+                server.close()
+            for address in [self.query_address, *self.ingest_addresses]:
+                if address.startswith(UNIX_SOURCE_PREFIX) and os.path.exists(address.removeprefix(UNIX_SOURCE_PREFIX)):
+                    os.unlink(address.removeprefix(UNIX_SOURCE_PREFIX))
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.servers = []
+            self._ingest_executor.shutdown()
+            self._query_executor.shutdown()
+
+
+def serve(
+    aggregator: LogAggregator,
+    query_address: str,
+    ingest_addresses: list[str] | None = None,
+    files: list[str] | None = None,
+    snapshot_interval: float = SERVER_SNAPSHOT_INTERVAL,
+    bad_lines: BadLines | None = None,
+) -> None:
+    """Run the aggregation server until interrupted (Ctrl+C), bad lines are skipped by bad_lines if it is given."""
+    server = AggregationServer(
+        aggregator, query_address, ingest_addresses, files, snapshot_interval, bad_lines=bad_lines
+    )
+    try:
+        asyncio.run(server.run())
+    except KeyboardInterrupt:
+        pass
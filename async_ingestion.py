@@ -0,0 +1,137 @@
+"""Concurrent ingestion of files, stdin and sockets with asyncio (--concurrency)."""
+
+import asyncio
+import sys
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import Iterator
+
+from bad_lines import BadLines
+from config import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_IO_MODE,
+    INGEST_BATCH_SIZE,
+    INGEST_QUEUE_SIZE,
+    IO_CHUNK_SIZE,
+    STDIN_SOURCE,
+    TCP_SOURCE_PREFIX,
+    UNIX_SOURCE_PREFIX,
+)
+from line_readers import iter_lines, split_chunks
+from log_aggregator import LogAggregator
+
+LineBatch = list[str] | list[bytes]
+
+
+def is_stream_source(source: str) -> bool:
+    """Return True for stdin and sockets (sources which are not files)."""
+    return source == STDIN_SOURCE or source.startswith((UNIX_SOURCE_PREFIX, TCP_SOURCE_PREFIX))
+
+
+def parse_tcp_address(source: str) -> tuple[str, int]:
+    """Return host and port of 'tcp:HOST:PORT' source ('tcp:[::1]:PORT' for IPv6)."""
+    host, _, port = source.removeprefix(TCP_SOURCE_PREFIX).rpartition(':')
+    if not host or not port.isdigit():
+        raise ValueError(f'Invalid source "{source}", use {TCP_SOURCE_PREFIX}HOST:PORT.')
+    return host.removeprefix('[').removesuffix(']'), int(port)
+
+
+def iter_file_line_batches(
+    file: str, io_mode: str = DEFAULT_IO_MODE, batch_size: int = INGEST_BATCH_SIZE
+) -> Iterator[LineBatch]:
+    """Open file and yield batches of its lines (see line_readers.iter_lines)."""
+    with open(file, 'rb') as opened_file:
+        lines = iter_lines(opened_file, io_mode)
+        while batch := list(islice(lines, batch_size)):
+            yield batch  # type: ignore[misc]
+
+
+def iter_stdin_line_batches(chunk_size: int = IO_CHUNK_SIZE) -> Iterator[list[bytes]]:
+    """Read stdin (a pipe or a redirected file) by chunks and split them into batches of lines."""
+    return split_chunks(iter(partial(sys.stdin.buffer.read1, chunk_size), b''))  # type: ignore[union-attr]
+
+
+async def produce_batches(
+    batches: Iterator[LineBatch], queue: asyncio.Queue, executor: Executor, source: str = ''
+) -> None:
+    """Put batches with their source into the queue, every batch is read by a blocking call in the executor."""
+    loop = asyncio.get_running_loop()
+    while (batch := await loop.run_in_executor(executor, next, batches, None)) is not None:
+        await queue.put((source, batch))
+
+
+async def produce_socket_batches(source: str, queue: asyncio.Queue, chunk_size: int = IO_CHUNK_SIZE) -> None:
+    """Connect to 'unix:PATH' or 'tcp:HOST:PORT' source and put batches of its lines into the queue up to EOF."""
+    if source.startswith(UNIX_SOURCE_PREFIX):
+        reader, writer = await asyncio.open_unix_connection(source.removeprefix(UNIX_SOURCE_PREFIX))
+    else:
+        reader, writer = await asyncio.open_connection(*parse_tcp_address(source))
+    try:
+        tail = b''
+        while chunk := await reader.read(chunk_size):
+            lines = (tail + chunk).split(b'\n')
+            tail = lines.pop()
+            if lines:
+                await queue.put((source, lines))  # Reading stops while the queue is full (TCP backpressure).
+        if tail:
+            await queue.put((source, [tail]))
+    finally:
+        writer.close()
+
+
+async def ingest_sources(
+    sources: list[str],
+    aggregator: LogAggregator,
+    io_mode: str = DEFAULT_IO_MODE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    queue_size: int = INGEST_QUEUE_SIZE,
+    bad_lines: BadLines | None = None,
+) -> None:
+    """
+    Read sources concurrently and feed their lines to the aggregator.
+
+    Sources: files (compressed too, lines are read according to io_mode), STDIN_SOURCE, 'unix:PATH'
+    and 'tcp:HOST:PORT' sockets. At most concurrency sources are read at once, blocking reads of files
+    and stdin run in a thread pool, so a slow source (NFS mount, pipe) does not stall the others.
+    Batches of lines go through a bounded queue drained by the aggregator: a full queue suspends
+    the sources (backpressure). An exception of a source is raised here, the other sources are cancelled.
+    Batches of sources are interleaved, so endpoints of equal totals may be ordered unlike read_files().
+    Bad lines are skipped by bad_lines if it is given (counted by sources).
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    semaphore = asyncio.Semaphore(concurrency)
+    done = object()
+
+    async def read_source(source: str) -> None:
+        try:
+            async with semaphore:
+                if source == STDIN_SOURCE:
+                    await produce_batches(iter_stdin_line_batches(), queue, executor, source)
+                elif is_stream_source(source):
+                    await produce_socket_batches(source, queue)
+                else:
+                    await produce_batches(iter_file_line_batches(source, io_mode), queue, executor, source)
+        except Exception as error:
+            await queue.put(error)
+        else:
+            await queue.put(done)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        tasks = [asyncio.create_task(read_source(source)) for source in sources]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = await queue.get()
+                if item is done:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                elif bad_lines is None:
+                    aggregator.feed_lines(item[1])
+                else:
+                    bad_lines.feed_lines(aggregator, item[1], item[0])
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
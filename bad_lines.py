@@ -0,0 +1,134 @@
+"""Handling of bad log lines (--on-error): lines are added by batches, only a failed batch is checked line by line."""
+
+import os
+from itertools import islice
+from typing import BinaryIO, Iterable
+
+from compressed_input import detect_compression
+from config import (
+    DEFAULT_ON_ERROR,
+    DEFAULT_QUARANTINE_FILE,
+    ERROR_BATCH_SIZE,
+    ON_ERROR_FAIL_NAME,
+    ON_ERROR_QUARANTINE_NAME,
+    QUARANTINE_BATCH_SIZE,
+)
+from line_decoder import LINE_ERRORS
+from log_aggregator import LogAggregator
+
+
+def has_incomplete_tail(opened_file: BinaryIO, end: int | None = None) -> bool:
+    """
+    Return True if byte range [..., end) reaches the end of the file and its last line has no line ending.
+
+    Such a line of a live file may be not written completely yet. Compressed files are read as a whole.
+    """
+    file_size = os.fstat(opened_file.fileno()).st_size
+    if file_size == 0 or (end is not None and end < file_size) or detect_compression(opened_file) is not None:
+        return False
+    position = opened_file.tell()
+    opened_file.seek(file_size - 1)
+    last_byte = opened_file.read(1)
+    opened_file.seek(position)
+    return last_byte != b'\n'
+
+
+class BadLines:
+    """
+    Lines which can not be added to statistics: invalid JSON, missing fields, values of wrong types.
+
+    Lines are added to the aggregator by batches in one try block, so the loop over lines has no
+    exception handling of its own. Only a batch raising one of LINE_ERRORS is checked line by line
+    (see LogAggregator.is_valid_line): the valid lines of the batch not added yet are added again.
+    Bad lines are counted by sources, in ON_ERROR_QUARANTINE_NAME mode they are also appended to
+    the quarantine file by batches. A bad last line of a source without line ending (a live file
+    being written) is counted as truncated and is not quarantined, it is parsed when complete.
+    In ON_ERROR_FAIL_NAME mode lines are added as they are, the first bad line raises.
+    """
+
+    def __init__(
+        self,
+        mode: str = DEFAULT_ON_ERROR,
+        quarantine_file: str = DEFAULT_QUARANTINE_FILE,
+        batch_size: int = ERROR_BATCH_SIZE,
+    ):
+        """
+        Set up initial values.
+
+        self.mode - ON_ERROR_FAIL_NAME, ON_ERROR_SKIP_NAME or ON_ERROR_QUARANTINE_NAME
+        self.counts - source: number of skipped (quarantined) bad lines
+        self.truncated_counts - source: number of bad last lines without line ending
+        self.quarantined_lines - bad lines not written to the quarantine file yet
+        """
+        self.mode = mode
+        self.quarantine_file = quarantine_file
+        self.batch_size = batch_size
+        self.counts: dict[str, int] = {}
+        self.truncated_counts: dict[str, int] = {}
+        self.quarantined_lines: list[bytes] = []
+
+    def feed_lines(
+        self, aggregator: LogAggregator, lines: Iterable[str | bytes], source: str, incomplete_tail: bool = False
+    ) -> None:
+        """Add lines of the source to the aggregator, incomplete_tail - the last line has no line ending."""
+        if self.mode == ON_ERROR_FAIL_NAME:
+            aggregator.feed_lines(lines)
+            return
+
+        iterator = iter(lines)
+        batch = list(islice(iterator, self.batch_size))
+        while batch:
+            next_batch = list(islice(iterator, self.batch_size))
+            self.feed_batch(aggregator, batch, source, incomplete_tail and not next_batch)
+            batch = next_batch
+
+    def feed_batch(
+        self, aggregator: LogAggregator, batch: list[str | bytes], source: str, incomplete_tail: bool = False
+    ) -> None:
+        """
+        Add a batch of lines, bad lines are counted (see feed_lines()).
+
+        Lines before the first bad one are already added by a failed batch, unless the aggregator
+        adds batches atomically. An exception which is not caused by a bad line is raised.
+        """
+        try:
+            aggregator.feed_lines(batch)
+            return
+        except LINE_ERRORS:
+            valid = [aggregator.is_valid_line(line) for line in batch]
+            if all(valid):
+                raise
+
+        start = 0 if aggregator.adds_batches_atomically() else valid.index(False)
+        aggregator.feed_lines([line for line, is_valid in zip(batch[start:], valid[start:]) if is_valid])
+        bad_lines = [line for line, is_valid in zip(batch, valid) if not is_valid]
+        if incomplete_tail and not valid[-1]:
+            self.truncated_counts[source] = self.truncated_counts.get(source, 0) + 1
+            bad_lines.pop()
+        if not bad_lines:
+            return
+        self.counts[source] = self.counts.get(source, 0) + len(bad_lines)
+        if self.mode == ON_ERROR_QUARANTINE_NAME:
+            for line in bad_lines:
+                self.quarantined_lines.append((line.encode() if isinstance(line, str) else line).rstrip(b'\n'))
+            if len(self.quarantined_lines) >= QUARANTINE_BATCH_SIZE:
+                self.flush()
+
+    def flush(self) -> None:
+        """Append buffered bad lines to the quarantine file."""
+        if not self.quarantined_lines:
+            return
+        with open(self.quarantine_file, 'ab') as opened_file:
+            opened_file.write(b''.join(line + b'\n' for line in self.quarantined_lines))
+        self.quarantined_lines = []
+
+    def get_summary(self) -> str:
+        """Return numbers of bad lines by sources, empty string if there are none."""
+        action = 'quarantined to ' + self.quarantine_file if self.mode == ON_ERROR_QUARANTINE_NAME else 'skipped'
+        rows = []
+        for source in {**self.counts, **self.truncated_counts}:
+            row = f'{source}: {self.counts.get(source, 0)} bad lines {action}'
+            if source in self.truncated_counts:
+                row += f', {self.truncated_counts[source]} truncated last line (not parsed)'
+            rows.append(row)
+        return '\n'.join(rows)
@@ -0,0 +1 @@
+"""Pack initialization file."""
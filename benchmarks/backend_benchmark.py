@@ -0,0 +1,64 @@
+"""
+Compare line by line aggregation with the NumPy batch backend on a synthetic log file.
+
+Run: python -m benchmarks.backend_benchmark --lines 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.log_generator import write_synthetic_log
+from config import IO_CHUNKED_NAME, NUMPY_BACKEND_NAME, PYTHON_BACKEND_NAME
+from line_readers import iter_lines
+from log_aggregator import LogAggregator
+
+
+def run_backend(file: str, backend: str, url_rules: list[str] | None) -> LogAggregator:
+    """Parse file (bytes lines of the chunked reader) with the given backend."""
+    aggregator = LogAggregator(url_rules=url_rules, backend=backend)
+    with open(file, 'rb') as opened_file:
+        aggregator.feed_lines(iter_lines(opened_file, IO_CHUNKED_NAME))
+    return aggregator
+
+
+def measure(file: str, backend: str, url_rules: list[str] | None, repeat: int) -> tuple[float, LogAggregator]:
+    """Return the best wall time of 'repeat' runs and the last result."""
+    best_time = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        aggregator = run_backend(file, backend, url_rules)
+        best_time = min(best_time, time.perf_counter() - start_time)
+    return best_time, aggregator
+
+
+def main() -> None:
+    """Generate the file, run every backend (without and with url rules) and print lines/sec and speedup."""
+    parser = argparse.ArgumentParser(description='Aggregation backend benchmark.')
+    parser.add_argument('--lines', type=int, default=1_000_000, help='Number of lines (default: 1000000).')
+    parser.add_argument('--endpoints', type=int, default=100, help='Number of distinct urls (default: 100).')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of runs of every backend (default: 3).')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file = os.path.join(directory, 'synthetic.log')
+        write_synthetic_log(file, args.lines, args.endpoints)
+        print(f'File: {args.lines} lines, {os.path.getsize(file) / 2**20:.1f} MB, {args.endpoints} endpoints.')
+
+        for url_rules in (None, ['/api/{group}/{id}/...']):
+            base_time, base_aggregator = 0.0, None
+            for backend in (PYTHON_BACKEND_NAME, NUMPY_BACKEND_NAME):
+                run_time, aggregator = measure(file, backend, url_rules, args.repeat)
+                if base_aggregator is None:
+                    base_time, base_aggregator = run_time, aggregator
+                elif aggregator.endpoint_requests != base_aggregator.endpoint_requests:
+                    raise Exception(f'Result of "{backend}" backend differs from "{PYTHON_BACKEND_NAME}" backend.')
+                name = f'{backend}{" (url rules)" if url_rules else ""}'
+                print(
+                    f'{name:<22} {run_time:8.3f} s {args.lines / run_time:12,.0f} lines/s  x{base_time / run_time:.2f}'
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Compare the baseline json.loads parsing with the LineDecoder fast path on a synthetic log file.
+
+Run: python -m benchmarks.decoder_benchmark --lines 1000000
+"""
+
+import argparse
+import json
+import math
+import os
+import tempfile
+import time
+from typing import Any, Callable
+
+from benchmarks.log_generator import write_synthetic_log
+from config import PYTHON_BACKEND_NAME
+from line_decoder import LineDecoder
+from log_aggregator import LogAggregator
+
+
+def run_baseline_path(file: str) -> dict[str, list[Any]]:
+    """
+    Parse file as parsing_file() did before the fast path: every line decoded by json.loads to a full dict.
+
+    Statistics are a plain url: [requests, float sum of response times] dict (no exact sums or sketches),
+    so the baseline is not slower than it was.
+    """
+    endpoint_requests: dict[str, list[Any]] = {}
+    with open(file, 'r') as opened_file:
+        line = opened_file.readline()
+        while line != '':
+            request_data = json.loads(line)
+            endpoint_stats = endpoint_requests.get(request_data['url'])
+            if endpoint_stats is None:
+                endpoint_stats = endpoint_requests[request_data['url']] = [0, 0.0]
+            endpoint_stats[0] += 1
+            endpoint_stats[1] += request_data['response_time']
+            line = opened_file.readline()
+    return endpoint_requests
+
+
+def run_fast_path_text(file: str) -> LogAggregator:
+    """Parse file: text lines decoded by LineDecoder."""
+    aggregator = LogAggregator(backend=PYTHON_BACKEND_NAME)
+    with open(file, 'r') as opened_file:
+        aggregator.feed_lines(opened_file)
+    return aggregator
+
+
+def run_fast_path_bytes(file: str) -> LogAggregator:
+    """Parse file: bytes lines decoded by LineDecoder."""
+    aggregator = LogAggregator(backend=PYTHON_BACKEND_NAME)
+    with open(file, 'rb') as opened_file:
+        aggregator.feed_lines(opened_file)
+    return aggregator
+
+
+def check_result(aggregator: LogAggregator, baseline: dict[str, list[Any]]) -> bool:
+    """Return True if requests and average response times of aggregator match the baseline."""
+    if list(aggregator.endpoint_requests) != list(baseline):
+        return False
+    for url, (total_requests, total_response_time) in baseline.items():
+        endpoint_stats = aggregator.endpoint_requests[url]
+        if endpoint_stats.total_requests != total_requests or not math.isclose(
+            endpoint_stats.total_response_time, total_response_time
+        ):
+            return False
+    return True
+
+
+def measure(run: Callable[[], Any], repeat: int) -> tuple[float, Any]:
+    """Return the best wall time of 'repeat' runs and the last result."""
+    best_time = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        result = run()
+        best_time = min(best_time, time.perf_counter() - start_time)
+    return best_time, result
+
+
+def main() -> None:
+    """Generate the file, run every path (whole parsing, then decoding only) and print lines/sec and speedup."""
+    parser = argparse.ArgumentParser(description='LineDecoder benchmark.')
+    parser.add_argument('--lines', type=int, default=1_000_000, help='Number of lines (default: 1000000).')
+    parser.add_argument('--endpoints', type=int, default=100, help='Number of distinct urls (default: 100).')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of runs of every path (default: 3).')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file = os.path.join(directory, 'synthetic.log')
+        write_synthetic_log(file, args.lines, args.endpoints)
+        print(f'File: {args.lines} lines, {os.path.getsize(file) / 2**20:.1f} MB, {args.endpoints} endpoints.')
+
+        print('Parsing (reading, decoding and aggregation):')
+        base_time, baseline = measure(lambda: run_baseline_path(file), args.repeat)
+        print(f'{"baseline json.loads":<22} {base_time:8.3f} s {args.lines / base_time:12,.0f} lines/s  x1.00')
+        for name, run in (('LineDecoder (text)', run_fast_path_text), ('LineDecoder (bytes)', run_fast_path_bytes)):
+            run_time, aggregator = measure(lambda: run(file), args.repeat)
+            if not check_result(aggregator, baseline):
+                raise Exception(f'Result of "{name}" differs from the baseline json.loads path.')
+            print(f'{name:<22} {run_time:8.3f} s {args.lines / run_time:12,.0f} lines/s  x{base_time / run_time:.2f}')
+
+        print('Decoding only (lines in memory, url and response_time of every line):')
+        with open(file, 'r') as opened_file:
+            text_lines = opened_file.readlines()
+        bytes_lines = [line.encode() for line in text_lines]
+        decoder = LineDecoder({'url': str, 'response_time': float})
+        base_time, _ = measure(
+            lambda: [
+                (request_data['url'], request_data['response_time']) for request_data in map(json.loads, text_lines)
+            ],
+            args.repeat,
+        )
+        print(f'{"json.loads (text)":<22} {base_time:8.3f} s {args.lines / base_time:12,.0f} lines/s  x1.00')
+        for name, lines in (('LineDecoder (text)', text_lines), ('LineDecoder (bytes)', bytes_lines)):
+            run_time, _ = measure(lambda: list(map(decoder.decode, lines)), args.repeat)
+            print(f'{name:<22} {run_time:8.3f} s {args.lines / run_time:12,.0f} lines/s  x{base_time / run_time:.2f}')
+
+
+if __name__ == '__main__':
+    main()
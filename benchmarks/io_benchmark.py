@@ -0,0 +1,52 @@
+"""
+Compare ways of reading files (--io) on a synthetic log file.
+
+Run: python -m benchmarks.io_benchmark --lines 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from benchmarks.log_generator import write_synthetic_log
+from config import IO_MODES
+from line_readers import iter_lines
+from log_aggregator import LogAggregator
+
+
+def main() -> None:
+    """Generate the file, read it with every io mode (only reading and with parsing) and print lines/sec."""
+    parser = argparse.ArgumentParser(description='Benchmark of ways of reading files.')
+    parser.add_argument('--lines', type=int, default=1_000_000, help='Number of lines (default: 1000000).')
+    parser.add_argument('--repeat', type=int, default=3, help='Number of runs of every mode (default: 3).')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        file = os.path.join(directory, 'synthetic.log')
+        write_synthetic_log(file, args.lines, 100)
+        print(f'File: {args.lines} lines, {os.path.getsize(file) / 2**20:.1f} MB.')
+
+        for io_mode in IO_MODES:
+            read_time = parse_time = float('inf')
+            for _ in range(args.repeat):
+                start_time = time.perf_counter()
+                with open(file, 'rb') as opened_file:
+                    for _ in iter_lines(opened_file, io_mode):
+                        pass
+                read_time = min(read_time, time.perf_counter() - start_time)
+
+                start_time = time.perf_counter()
+                aggregator = LogAggregator()
+                with open(file, 'rb') as opened_file:
+                    aggregator.feed_lines(iter_lines(opened_file, io_mode))
+                parse_time = min(parse_time, time.perf_counter() - start_time)
+
+            print(
+                f'{io_mode:<8} read: {read_time:7.3f} s {args.lines / read_time:12,.0f} lines/s   '
+                f'read + parse: {parse_time:7.3f} s {args.lines / parse_time:12,.0f} lines/s'
+            )
+
+
+if __name__ == '__main__':
+    main()
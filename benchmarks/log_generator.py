@@ -0,0 +1,114 @@
+"""
+Deterministic generator of realistic synthetic log files.
+
+Run: python -m benchmarks.log_generator --output synthetic.log --size-mb 100 --endpoints 1000 --malformed-rate 0.001
+"""
+
+import argparse
+import itertools
+import json
+import random
+from typing import Iterator
+
+USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0 Safari/537.36',
+    'Mozilla/5.0 (X11; Linux x86_64; rv:127.0) Gecko/20100101 Firefox/127.0',
+    'python-requests/2.32.3',
+)
+STATUSES = (200, 200, 200, 200, 201, 204, 301, 400, 404, 500)
+REQUEST_METHODS = ('GET', 'GET', 'GET', 'POST', 'PUT', 'DELETE')
+# Kinds of malformed lines: cut JSON object, not JSON, no 'response_time', empty line.
+MALFORMED_KINDS = ('truncated', 'not_json', 'missing_field', 'empty')
+
+
+def get_endpoint_urls(endpoints: int) -> list[str]:
+    """Return 'endpoints' distinct urls of several resource groups."""
+    groups = ('context', 'homeworks', 'specializations', 'users', 'endpoint')
+    return [f'/api/{groups[i % len(groups)]}/{i}/...' for i in range(endpoints)]
+
+
+def generate_log_lines(endpoints: int = 100, malformed_rate: float = 0.0, seed: int = 0) -> Iterator[str]:
+    """
+    Yield endless log lines (with line endings), the same lines for the same arguments.
+
+    Endpoint popularity follows Zipf's law, every endpoint has its own typical response time.
+    Every line is malformed (see MALFORMED_KINDS) with probability malformed_rate.
+    """
+    generator = random.Random(seed)
+    urls = get_endpoint_urls(endpoints)
+    cumulative_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(endpoints)))
+    typical_response_times = [generator.lognormvariate(-3.5, 0.8) for _ in range(endpoints)]
+
+    for i in itertools.count():
+        endpoint = generator.choices(range(endpoints), cum_weights=cumulative_weights)[0]
+        request_data = {
+            '@timestamp': f'2025-06-22T{i // 3600000 % 24:02d}:{i // 60000 % 60:02d}:{i // 1000 % 60:02d}+00:00',
+            'status': generator.choice(STATUSES),
+            'url': urls[endpoint],
+            'request_method': generator.choice(REQUEST_METHODS),
+            'response_time': round(typical_response_times[endpoint] * generator.lognormvariate(0, 0.5), 3),
+            'http_user_agent': generator.choice(USER_AGENTS),
+        }
+
+        if malformed_rate and generator.random() < malformed_rate:
+            kind = generator.choice(MALFORMED_KINDS)
+            if kind == 'truncated':
+                line = json.dumps(request_data)
+                yield line[: generator.randrange(1, len(line))] + '\n'
+            elif kind == 'not_json':
+                yield f'{request_data["@timestamp"]} {request_data["request_method"]} {request_data["url"]}\n'
+            elif kind == 'missing_field':
+                del request_data['response_time']
+                yield json.dumps(request_data) + '\n'
+            else:
+                yield '\n'
+        else:
+            yield json.dumps(request_data) + '\n'
+
+
+def write_synthetic_log(
+    file: str,
+    lines: int | None = None,
+    endpoints: int = 100,
+    seed: int = 0,
+    size: int | None = None,
+    malformed_rate: float = 0.0,
+) -> int:
+    """
+    Write log lines to file until 'lines' lines or 'size' bytes are written, return number of lines.
+
+    The file content depends only on the arguments.
+    """
+    if (lines is None) == (size is None):
+        raise Exception('Specify exactly one of "lines" and "size".')
+
+    written_lines = written_bytes = 0
+    with open(file, 'w') as opened_file:
+        for line in generate_log_lines(endpoints, malformed_rate, seed):
+            if written_lines == lines or (size is not None and written_bytes >= size):
+                break
+            opened_file.write(line)
+            written_lines += 1
+            written_bytes += len(line)
+    return written_lines
+
+
+def main() -> None:
+    """Write a synthetic log file."""
+    parser = argparse.ArgumentParser(description='Synthetic log generator.')
+    parser.add_argument('--output', type=str, required=True, help='File to write.')
+    size_group = parser.add_mutually_exclusive_group(required=True)
+    size_group.add_argument('--lines', type=int, help='Number of lines.')
+    size_group.add_argument('--size-mb', type=float, help='Approximate file size in MB.')
+    parser.add_argument('--endpoints', type=int, default=100, help='Number of distinct urls (default: 100).')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='Share of malformed lines (default: 0).')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the generator (default: 0).')
+    args = parser.parse_args()
+
+    size = None if args.size_mb is None else int(args.size_mb * 2**20)
+    lines = write_synthetic_log(args.output, args.lines, args.endpoints, args.seed, size, args.malformed_rate)
+    print(f'{args.output}: {lines} lines.')
+
+
+if __name__ == '__main__':
+    main()
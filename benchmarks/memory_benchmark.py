@@ -0,0 +1,130 @@
+"""
+Peak memory of endpoint statistics with many distinct urls (long tail of rare endpoints).
+
+Run: python -m benchmarks.memory_benchmark --endpoints 1000000 --output results.json
+Compare with a saved run: python -m benchmarks.memory_benchmark --endpoints 1000000 --baseline results.json
+"""
+
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Iterator
+
+from benchmarks.pipeline_benchmark import get_version
+from config import AVERAGE_REPORT_NAME, NUMPY_BACKEND_NAME, PYTHON_BACKEND_NAME
+from log_aggregator import LogAggregator
+from run_stats import get_peak_rss_mb
+
+RESULTS_VERSION = 1
+BATCH_SIZE = 100_000  # Lines decoded at once (lines are generated, there is no file).
+
+
+def generate_lines(endpoints: int, requests_per_endpoint: int, seed: int) -> Iterator[bytes]:
+    """Yield lines of 'endpoints' distinct urls, every url 'requests_per_endpoint' times in random order."""
+    generator = random.Random(seed)
+    for _ in range(requests_per_endpoint):
+        for endpoint in generator.sample(range(endpoints), endpoints):
+            response_time = round(generator.lognormvariate(-3.5, 0.8), 3)
+            yield b'{"url": "/api/items/%d/details", "response_time": %r}' % (endpoint, response_time)
+
+
+def run_aggregation(endpoints: int, requests_per_endpoint: int, seed: int, backend: str) -> dict[str, Any]:
+    """
+    Aggregate generated lines once (in a fresh process, see measure()).
+
+    Return wall time, peak traced memory of the statistics (with the report of all endpoints) and peak RSS.
+    """
+    aggregator = LogAggregator(backend=backend)
+    lines = generate_lines(endpoints, requests_per_endpoint, seed)
+    gc.collect()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    while batch := [line for _, line in zip(range(BATCH_SIZE), lines)]:
+        aggregator.feed_lines(batch)
+    del batch
+    statistics_bytes = tracemalloc.get_traced_memory()[0]
+    aggregator.get_report_data(AVERAGE_REPORT_NAME, aggregator.endpoint_requests)  # Every endpoint is read.
+    seconds = time.perf_counter() - start_time
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'seconds': seconds,
+        'statistics_bytes': statistics_bytes,
+        'peak_bytes': peak_bytes,
+        'peak_rss_mb': get_peak_rss_mb(0),
+    }
+
+
+def measure(endpoints: int, requests_per_endpoint: int, seed: int, backend: str) -> dict[str, Any]:
+    """Run the aggregation in a new interpreter, add memory per million endpoints."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+        run = executor.submit(run_aggregation, endpoints, requests_per_endpoint, seed, backend).result()
+    run['statistics_mb_per_million'] = run['statistics_bytes'] / endpoints * 1_000_000 / 2**20
+    run['peak_mb_per_million'] = run['peak_bytes'] / endpoints * 1_000_000 / 2**20
+    return run
+
+
+def compare_with_baseline(results: dict[str, Any], baseline: dict[str, Any]) -> None:
+    """Print changes of memory per million endpoints against the baseline results."""
+    if results['parameters'] != baseline['parameters']:
+        print('Warning: parameters differ from the baseline.')
+    for backend, run in results['results'].items():
+        if backend not in baseline['results']:
+            continue
+        base_run = baseline['results'][backend]
+        print(
+            f'{backend:<8} against {baseline["version"]}: statistics '
+            f'x{run["statistics_mb_per_million"] / base_run["statistics_mb_per_million"]:.2f}, '
+            f'peak x{run["peak_mb_per_million"] / base_run["peak_mb_per_million"]:.2f}, '
+            f'time x{run["seconds"] / base_run["seconds"]:.2f}'
+        )
+
+
+def main() -> None:
+    """Measure every backend, print and save results, compare with a baseline."""
+    parser = argparse.ArgumentParser(description='Benchmark of memory per endpoint.')
+    parser.add_argument('--endpoints', type=int, default=1_000_000, help='Number of distinct urls (default: 1000000).')
+    parser.add_argument('--requests', type=int, default=2, help='Requests of every url (default: 2).')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the generator (default: 0).')
+    parser.add_argument(
+        '--backend',
+        type=str,
+        nargs='+',
+        choices=[PYTHON_BACKEND_NAME, NUMPY_BACKEND_NAME],
+        default=[PYTHON_BACKEND_NAME, NUMPY_BACKEND_NAME],
+    )
+    parser.add_argument('--output', type=str, help='Save results to this JSON file.')
+    parser.add_argument('--baseline', type=str, help='JSON file of a previous run to compare with.')
+    args = parser.parse_args()
+
+    results: dict[str, Any] = {
+        'results_version': RESULTS_VERSION,
+        'version': get_version(),
+        'parameters': {'endpoints': args.endpoints, 'requests': args.requests, 'seed': args.seed},
+        'results': {},
+    }
+    print(f'{args.endpoints} endpoints, {args.requests} requests of every endpoint.')
+    for backend in args.backend:
+        run = results['results'][backend] = measure(args.endpoints, args.requests, args.seed, backend)
+        print(
+            f'{backend:<8} {run["seconds"]:8.2f} s  statistics {run["statistics_mb_per_million"]:8.1f} MB, '
+            f'peak {run["peak_mb_per_million"]:8.1f} MB per million endpoints  peak RSS {run["peak_rss_mb"]:.1f} MB'
+        )
+
+    if args.output:
+        with open(args.output, 'w') as opened_file:
+            json.dump(results, opened_file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as opened_file:
+            compare_with_baseline(results, json.load(opened_file))
+    sys.exit(0)
+
+
+if __name__ == '__main__':
+    main()
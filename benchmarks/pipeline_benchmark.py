@@ -0,0 +1,187 @@
+"""
+Throughput and memory of the parsing pipeline (read_files + create_table) on a synthetic log file.
+
+Run: python -m benchmarks.pipeline_benchmark --size-mb 200 --endpoints 1000 --output results.json
+Compare with a saved run: python -m benchmarks.pipeline_benchmark --size-mb 200 --baseline results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any
+
+from bad_lines import BadLines
+from benchmarks.log_generator import write_synthetic_log
+from config import (
+    AVERAGE_REPORT_NAME,
+    DEFAULT_IO_MODE,
+    DEFAULT_WORKERS,
+    IO_MODES,
+    ON_ERROR_SKIP_NAME,
+    PERCENTILES_REPORT_NAME,
+)
+from log_aggregator import LogAggregator
+from main import create_table, read_files
+from run_stats import get_peak_rss_mb
+
+RESULTS_VERSION = 1
+DEFAULT_TOLERANCE = 0.1  # Allowed slowdown against the baseline (share of lines/sec).
+
+
+def run_pipeline(file: str, report: str, workers: int, io_mode: str, malformed_rate: float = 0.0) -> dict[str, Any]:
+    """
+    Run read_files + create_table once (in a fresh process, see measure()).
+
+    Malformed lines of a file generated with malformed_rate are skipped (--on-error skip, serial parsing only).
+    Return wall time, peak RSS of this process and of worker processes, number of skipped lines
+    or the error of the pipeline.
+    """
+    start_time = time.perf_counter()
+    try:
+        aggregator = LogAggregator()
+        bad_lines = BadLines(ON_ERROR_SKIP_NAME) if malformed_rate > 0 else None
+        read_files([file], aggregator, workers, io_mode, bad_lines=bad_lines)
+        create_table(report, aggregator)
+    except Exception as error:
+        return {'error': f'{type(error).__name__}: {error}'}
+    return {
+        'seconds': time.perf_counter() - start_time,
+        'peak_rss_mb': get_peak_rss_mb(resource.RUSAGE_SELF),
+        'workers_peak_rss_mb': get_peak_rss_mb(resource.RUSAGE_CHILDREN),
+        'bad_lines': 0 if bad_lines is None else sum(bad_lines.counts.values()),
+    }
+
+
+def measure(
+    file: str, report: str, workers: int, io_mode: str, repeat: int, malformed_rate: float = 0.0
+) -> dict[str, Any]:
+    """Run the pipeline 'repeat' times, every run in a new interpreter, return the best time and the peak memory."""
+    runs = []
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+            run = executor.submit(run_pipeline, file, report, workers, io_mode, malformed_rate).result()
+        if 'error' in run:
+            return run
+        runs.append(run)
+    return {
+        'seconds': min(run['seconds'] for run in runs),
+        'peak_rss_mb': max(run['peak_rss_mb'] for run in runs),
+        'workers_peak_rss_mb': max(run['workers_peak_rss_mb'] for run in runs),
+        'bad_lines': runs[-1]['bad_lines'],
+    }
+
+
+def get_version() -> str:
+    """Return 'git describe' of the working tree, 'unknown' outside a git repository."""
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare_with_baseline(results: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> bool:
+    """Print changes against the baseline results, return False if throughput dropped more than tolerance."""
+    if results['parameters'] != baseline['parameters']:
+        print('Warning: parameters differ from the baseline.')
+    if 'error' in results['results'] or 'error' in baseline['results']:
+        print('Can not compare: a run failed.')
+        return 'error' not in results['results']
+
+    ratio = results['results']['lines_per_second'] / baseline['results']['lines_per_second']
+    rss_change = results['results']['peak_rss_mb'] - baseline['results']['peak_rss_mb']
+    print(f'Against {baseline["version"]}: throughput x{ratio:.3f}, peak RSS {rss_change:+.1f} MB.')
+    if ratio < 1 - tolerance:
+        print(f'Regression: throughput dropped more than {tolerance:.0%}.')
+        return False
+    return True
+
+
+def main() -> None:
+    """Generate the file, measure the pipeline, print and save results, compare with a baseline."""
+    parser = argparse.ArgumentParser(description='Benchmark of read_files + create_table.')
+    size_group = parser.add_mutually_exclusive_group()
+    size_group.add_argument('--lines', type=int, help='Number of lines.')
+    size_group.add_argument('--size-mb', type=float, default=100, help='Approximate file size in MB (default: 100).')
+    parser.add_argument('--endpoints', type=int, default=100, help='Number of distinct urls (default: 100).')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='Share of malformed lines (default: 0).')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the generator (default: 0).')
+    parser.add_argument(
+        '--report', type=str, choices=[AVERAGE_REPORT_NAME, PERCENTILES_REPORT_NAME], default=AVERAGE_REPORT_NAME
+    )
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('--io', type=str, choices=IO_MODES, default=DEFAULT_IO_MODE)
+    parser.add_argument('--repeat', type=int, default=3, help='Number of runs (default: 3).')
+    parser.add_argument('--output', type=str, help='Save results to this JSON file.')
+    parser.add_argument('--baseline', type=str, help='JSON file of a previous run to compare with.')
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help=f'Allowed throughput drop against the baseline (default: {DEFAULT_TOLERANCE}).',
+    )
+    args = parser.parse_args()
+    if args.malformed_rate > 0 and args.workers > 1:
+        parser.error('--malformed-rate can not be used with --workers, bad lines are skipped only by serial parsing.')
+
+    with tempfile.TemporaryDirectory() as directory:
+        file = os.path.join(directory, 'synthetic.log')
+        size = None if args.lines is not None else int(args.size_mb * 2**20)
+        lines = write_synthetic_log(file, args.lines, args.endpoints, args.seed, size, args.malformed_rate)
+        file_size = os.path.getsize(file)
+        run = measure(file, args.report, args.workers, args.io, args.repeat, args.malformed_rate)
+
+    if 'error' not in run:
+        run['lines_per_second'] = lines / run['seconds']
+        run['mb_per_second'] = file_size / 2**20 / run['seconds']
+    results = {
+        'results_version': RESULTS_VERSION,
+        'version': get_version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'parameters': {
+            'lines': lines,
+            'size_bytes': file_size,
+            'endpoints': args.endpoints,
+            'malformed_rate': args.malformed_rate,
+            'seed': args.seed,
+            'report': args.report,
+            'workers': args.workers,
+            'io': args.io,
+        },
+        'results': run,
+    }
+
+    print(f'File: {lines} lines, {file_size / 2**20:.1f} MB, {args.endpoints} endpoints.')
+    if 'error' in run:
+        print(f'Pipeline failed: {run["error"]}')
+    else:
+        print(
+            f'{run["seconds"]:.3f} s  {run["lines_per_second"]:,.0f} lines/s  {run["mb_per_second"]:.1f} MB/s  '
+            f'peak RSS {run["peak_rss_mb"]:.1f} MB (workers {run["workers_peak_rss_mb"]:.1f} MB)  '
+            f'bad lines skipped {run["bad_lines"]}'
+        )
+
+    if args.output:
+        with open(args.output, 'w') as opened_file:
+            json.dump(results, opened_file, indent=2)
+
+    passed = 'error' not in run
+    if args.baseline:
+        with open(args.baseline) as opened_file:
+            passed = compare_with_baseline(results, json.load(opened_file), args.tolerance) and passed
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""Reading of compressed log files (gzip, bz2, xz, zstd) detected by magic bytes."""
+
+import bz2
+import gzip
+import lzma
+import queue
+import threading
+from typing import BinaryIO, Iterable, Iterator, TypeVar
+
+from config import BZIP2_NAME, DECOMPRESSION_QUEUE_SIZE, GZIP_NAME, IO_CHUNK_SIZE, XZ_NAME, ZSTD_NAME
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency, needed only for zstd files.
+    zstandard = None  # type: ignore[assignment]
+
+T = TypeVar('T')
+
+# Magic bytes at the beginning of a file: compression name.
+COMPRESSION_MAGIC_BYTES = {
+    b'\x1f\x8b': GZIP_NAME,
+    b'BZh': BZIP2_NAME,
+    b'\xfd7zXZ\x00': XZ_NAME,
+    b'\x28\xb5\x2f\xfd': ZSTD_NAME,
+}
+MAGIC_BYTES_SIZE = max(len(magic_bytes) for magic_bytes in COMPRESSION_MAGIC_BYTES)
+
+
+def detect_compression(opened_file: BinaryIO) -> str | None:
+    """Return compression name of the file opened in binary mode, None for an uncompressed file."""
+    position = opened_file.tell()
+    opened_file.seek(0)
+    header = opened_file.read(MAGIC_BYTES_SIZE)
+    opened_file.seek(position)
+    for magic_bytes, compression in COMPRESSION_MAGIC_BYTES.items():
+        if header.startswith(magic_bytes):
+            return compression
+    return None
+
+
+def is_compressed(file: str) -> bool:
+    """Return True if file is compressed (such a file can not be split into byte ranges)."""
+    with open(file, 'rb') as opened_file:
+        return detect_compression(opened_file) is not None
+
+
+def open_decompressed(opened_file: BinaryIO, compression: str) -> BinaryIO:
+    """Return file object with decompressed data of the file opened in binary mode."""
+    opened_file.seek(0)
+    if compression == GZIP_NAME:
+        return gzip.GzipFile(fileobj=opened_file, mode='rb')  # type: ignore[return-value]
+    elif compression == BZIP2_NAME:
+        return bz2.BZ2File(opened_file, 'rb')  # type: ignore[return-value]
+    elif compression == XZ_NAME:
+        return lzma.LZMAFile(opened_file, 'rb')  # type: ignore[return-value]
+    elif compression == ZSTD_NAME:
+        if zstandard is None:
+            raise Exception('Install "zstandard" package to read zstd compressed files.')
+        return zstandard.ZstdDecompressor().stream_reader(opened_file, read_across_frames=True)
+    raise Exception(f'No action specified for compression "{compression}" in "open_decompressed(...)".')
+
+
+def iter_prefetched(items: Iterable[T], queue_size: int = DECOMPRESSION_QUEUE_SIZE) -> Iterator[T]:
+    """
+    Produce items in a background thread, at most queue_size items ahead of the consumer.
+
+    Decompressors release the GIL, so decompression of next chunks overlaps with parsing.
+    An exception of the producer is raised in the consumer.
+    """
+    item_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    done = object()
+    stop = threading.Event()
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if stop.is_set():
+                    return
+                item_queue.put(item)
+        except BaseException as error:
+            item_queue.put(error)
+        else:
+            item_queue.put(done)
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while (item := item_queue.get()) is not done:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        while producer.is_alive():  # Unblock the producer waiting for free space.
+            try:
+                item_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        producer.join()
+
+
+def iter_decompressed_chunks(
+    opened_file: BinaryIO, compression: str, chunk_size: int = IO_CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Read decompressed data of the file by chunks."""
+    with open_decompressed(opened_file, compression) as decompressed_file:
+        while chunk := decompressed_file.read(chunk_size):
+            yield chunk
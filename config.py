@@ -1,10 +1,199 @@
 """Script configuration."""
 
 AVERAGE_REPORT_NAME: str = 'average'
+PERCENTILES_REPORT_NAME: str = 'percentiles'
+SPREAD_REPORT_NAME: str = 'spread'
 
 URL_COLUMN_NAME: str = 'handler'
 REQUESTS_TOTAL_COLUMN_NAME: str = 'total'
 AVG_RESPONSE_TIME_COLUMN_NAME: str = 'avg_response_time'
+MIN_RESPONSE_TIME_COLUMN_NAME: str = 'min_response_time'
+MAX_RESPONSE_TIME_COLUMN_NAME: str = 'max_response_time'
+STDDEV_RESPONSE_TIME_COLUMN_NAME: str = 'stddev_response_time'
+
+P50_COLUMN_NAME: str = 'p50'
+P90_COLUMN_NAME: str = 'p90'
+P95_COLUMN_NAME: str = 'p95'
+P99_COLUMN_NAME: str = 'p99'
 
 # Also defines a subsequence.
 AVERAGE_HEADERS: list[str] = [URL_COLUMN_NAME, REQUESTS_TOTAL_COLUMN_NAME, AVG_RESPONSE_TIME_COLUMN_NAME]
+PERCENTILES_HEADERS: list[str] = [
+    URL_COLUMN_NAME,
+    REQUESTS_TOTAL_COLUMN_NAME,
+    P50_COLUMN_NAME,
+    P90_COLUMN_NAME,
+    P95_COLUMN_NAME,
+    P99_COLUMN_NAME,
+]
+SPREAD_HEADERS: list[str] = [
+    URL_COLUMN_NAME,
+    REQUESTS_TOTAL_COLUMN_NAME,
+    AVG_RESPONSE_TIME_COLUMN_NAME,
+    MIN_RESPONSE_TIME_COLUMN_NAME,
+    MAX_RESPONSE_TIME_COLUMN_NAME,
+    STDDEV_RESPONSE_TIME_COLUMN_NAME,
+]
+# Quantile of response time for every percentile column.
+PERCENTILE_COLUMNS: dict[str, float] = {
+    P50_COLUMN_NAME: 0.5,
+    P90_COLUMN_NAME: 0.9,
+    P95_COLUMN_NAME: 0.95,
+    P99_COLUMN_NAME: 0.99,
+}
+
+# Quantile sketch of response times (percentiles report): relative error of values and memory bound.
+QUANTILE_SKETCH_RELATIVE_ACCURACY: float = 0.01
+QUANTILE_SKETCH_MAX_BUCKETS: int = 2048
+
+# Response times are buffered and folded into exact (order independent) sums, min and max by chunks.
+RESPONSE_TIMES_BUFFER_SIZE: int = 1024
+# Bound of all buffered response times of endpoint statistics (about 32 bytes each). A long tail of rare endpoints
+# is compacted by it, so it is large enough for a rare endpoint to be folded once for many of its response times.
+RESPONSE_TIMES_BUFFER_LIMIT: int = 262144
+
+# Parallel parsing (--workers).
+DEFAULT_WORKERS: int = 1
+MIN_SHARD_SIZE: int = 1024 * 1024  # Bytes. Smaller files are not split into several ranges.
+
+# Reading of files (--io).
+IO_TEXT_NAME: str = 'text'
+IO_CHUNKED_NAME: str = 'chunked'
+IO_MMAP_NAME: str = 'mmap'
+IO_MODES: list[str] = [IO_TEXT_NAME, IO_CHUNKED_NAME, IO_MMAP_NAME]
+DEFAULT_IO_MODE: str = IO_CHUNKED_NAME
+IO_CHUNK_SIZE: int = 4 * 1024 * 1024  # Bytes per read() call or per memory-mapped window.
+
+# Concurrent ingestion of files, stdin and sockets (--concurrency).
+DEFAULT_CONCURRENCY: int = 1  # Sources read at once, files are read one by one by default.
+STDIN_SOURCE: str = '-'
+UNIX_SOURCE_PREFIX: str = 'unix:'  # unix:PATH - Unix socket read until the peer closes the connection.
+TCP_SOURCE_PREFIX: str = 'tcp:'  # tcp:HOST:PORT - TCP socket read until the peer closes the connection.
+INGEST_QUEUE_SIZE: int = 16  # Line batches read ahead of the aggregator, a full queue suspends the sources.
+INGEST_BATCH_SIZE: int = 4096  # Lines of a file per batch.
+
+# Incremental runs (--state).
+STATE_FINGERPRINT_SIZE: int = 1024  # Bytes from the beginning of a file used to detect its replacement.
+
+# Distributed runs: partial dumps of hosts (--partial FILE) combined by one run (--merge DUMP...).
+PARTIAL_STDOUT: str = '-'  # --partial - writes the dump to stdout (e.g. over ssh).
+
+# Sidecar indexes of files (--build-index): partial statistics by segments and timestamps by blocks.
+INDEX_SUFFIX: str = '.idx'  # Index of 'app.log' is 'app.log.idx'.
+INDEX_SEGMENT_SIZE: int = 64 * 1024 * 1024  # Bytes of a file with own partial statistics in the index.
+INDEX_BLOCK_SIZE: int = 1024 * 1024  # Bytes of a file with own range of timestamps in the index.
+INDEX_FINGERPRINT_SIZE: int = 1024  # Bytes at the beginning and before the end of indexed lines to detect changes.
+
+# Live follow mode (--follow).
+FOLLOW_REFRESH_INTERVAL: float = 2.0  # Seconds between table refreshes (default --interval).
+FOLLOW_POLL_INTERVAL: float = 0.25  # Seconds between checks of files for appended lines.
+
+# Compressed input (detected by magic bytes).
+GZIP_NAME: str = 'gzip'
+BZIP2_NAME: str = 'bz2'
+XZ_NAME: str = 'xz'
+ZSTD_NAME: str = 'zstd'
+DECOMPRESSION_QUEUE_SIZE: int = 4  # Decompressed chunks (IO_CHUNK_SIZE) prepared ahead of parsing.
+
+# Time-bucketed report (--report timeseries).
+TIMESERIES_REPORT_NAME: str = 'timeseries'
+BUCKET_COLUMN_NAME: str = 'bucket'
+# Also defines a subsequence.
+TIMESERIES_HEADERS: list[str] = [
+    BUCKET_COLUMN_NAME,
+    URL_COLUMN_NAME,
+    REQUESTS_TOTAL_COLUMN_NAME,
+    AVG_RESPONSE_TIME_COLUMN_NAME,
+    P50_COLUMN_NAME,
+    P90_COLUMN_NAME,
+    P95_COLUMN_NAME,
+    P99_COLUMN_NAME,
+]
+DEFAULT_TIME_BUCKET: str = '1m'  # Default --bucket.
+TIMESTAMP_CACHE_SIZE: int = 4096  # Cached timestamps (and minute prefixes), the cache is cleared when full.
+
+# Url normalization (--url-rule, --url-rules).
+URL_CACHE_SIZE: int = 65536  # Raw urls with their handler names in the LRU cache.
+URL_ID_PLACEHOLDER: str = '{id}'  # Replaces id-like path segments of urls not matched by rules.
+
+# Filters of lines (--since, --until, --status, --method, --url-prefix).
+STATUS_WILDCARD: str = 'x'  # Any digit of --status patterns: 5xx, 40x.
+STATUS_PATTERN_LENGTH: int = 3
+
+# Report grouped by dimensions (--report groupby --group-by url,status --metrics count,mean).
+GROUPBY_REPORT_NAME: str = 'groupby'
+DEFAULT_GROUP_BY: str = 'url'  # Default --group-by.
+DEFAULT_METRICS: str = 'count,mean'  # Default --metrics.
+GROUP_BY_FIELD_TYPES: dict[str, type] = {'status': int}  # Other fields are strings.
+ERROR_STATUS_MIN: int = 500  # Requests with status from this one are errors (error_rate metric).
+
+# Aggregation backends (numpy is used automatically if it is installed).
+PYTHON_BACKEND_NAME: str = 'python'
+NUMPY_BACKEND_NAME: str = 'numpy'
+NUMPY_BATCH_SIZE: int = 4096  # Lines decoded and aggregated by one batch of array operations.
+NUMPY_MAX_VALUE_SIZE: int = 512  # Longer urls and response times are decoded by LineDecoder.
+NUMPY_SEARCH_WINDOW: int = 32  # Bytes after a value start compared at once to find the end of the value.
+
+# Top endpoints in bounded memory (--top K --top-by count|time).
+TOP_BY_COUNT_NAME: str = 'count'
+TOP_BY_TIME_NAME: str = 'time'
+TOP_BY_NAMES: list[str] = [TOP_BY_COUNT_NAME, TOP_BY_TIME_NAME]
+DEFAULT_TOP_BY: str = TOP_BY_COUNT_NAME  # Default --top-by.
+TOP_CAPACITY_FACTOR: int = 10  # Monitored urls per reported one.
+TOP_MIN_CAPACITY: int = 1000  # Monitored urls for small --top.
+RESPONSE_TIME_TOTAL_COLUMN_NAME: str = 'time_total'
+MAX_ERROR_COLUMN_NAME: str = 'max_error'
+# Also defines a subsequence (see HeavyHitters.get_format_for_tabulate()).
+TOP_BY_COUNT_HEADERS: list[str] = [
+    URL_COLUMN_NAME,
+    REQUESTS_TOTAL_COLUMN_NAME,
+    MAX_ERROR_COLUMN_NAME,
+    AVG_RESPONSE_TIME_COLUMN_NAME,
+]
+TOP_BY_TIME_HEADERS: list[str] = [
+    URL_COLUMN_NAME,
+    RESPONSE_TIME_TOTAL_COLUMN_NAME,
+    MAX_ERROR_COLUMN_NAME,
+    AVG_RESPONSE_TIME_COLUMN_NAME,
+]
+
+# Aggregation server (--serve ADDRESS --listen ADDRESS): addresses are unix:PATH or tcp:HOST:PORT.
+SERVER_SNAPSHOT_INTERVAL: float = 0.5  # Seconds between snapshots of statistics published for queries.
+SERVER_REPORT_PATH: str = '/report/'  # GET /report/<type report>?format=text|json
+SERVER_STATUS_PATH: str = '/status'
+TEXT_FORMAT_NAME: str = 'text'
+JSON_FORMAT_NAME: str = 'json'
+RESPONSE_FORMATS: list[str] = [TEXT_FORMAT_NAME, JSON_FORMAT_NAME]
+DEFAULT_RESPONSE_FORMAT: str = TEXT_FORMAT_NAME
+
+# Output of reports (--format, --limit N): tabulate text or rows streamed in machine-readable formats.
+CSV_FORMAT_NAME: str = 'csv'
+JSONL_FORMAT_NAME: str = 'jsonl'  # A JSON object (header: value) per row.
+BINARY_FORMAT_NAME: str = 'binary'  # Tagged values, see report_renderer.
+OUTPUT_FORMATS: list[str] = [TEXT_FORMAT_NAME, CSV_FORMAT_NAME, JSONL_FORMAT_NAME, BINARY_FORMAT_NAME]
+DEFAULT_OUTPUT_FORMAT: str = TEXT_FORMAT_NAME
+
+# Handling of bad lines (--on-error skip|quarantine|fail --quarantine-file FILE).
+ON_ERROR_FAIL_NAME: str = 'fail'  # The first bad line stops the run.
+ON_ERROR_SKIP_NAME: str = 'skip'  # Bad lines are counted by files.
+ON_ERROR_QUARANTINE_NAME: str = 'quarantine'  # Bad lines are counted and appended to the quarantine file.
+ON_ERROR_NAMES: list[str] = [ON_ERROR_FAIL_NAME, ON_ERROR_SKIP_NAME, ON_ERROR_QUARANTINE_NAME]
+DEFAULT_ON_ERROR: str = ON_ERROR_FAIL_NAME  # Default --on-error.
+DEFAULT_QUARANTINE_FILE: str = 'quarantine.log'  # Default --quarantine-file.
+ERROR_BATCH_SIZE: int = 4096  # Lines added at once, only a failed batch is checked line by line.
+QUARANTINE_BATCH_SIZE: int = 1024  # Bad lines buffered before a write to the quarantine file.
+
+# Statistics of a run (--stats, printed to stderr) and profiling (--profile FILE).
+STATS_BATCH_SIZE: int = 4096  # Lines read, decoded and aggregated between readings of the timer.
+INPUT_STAGE_NAME: str = 'input'  # All reading: also worker processes, indexes, state, partial dumps, sockets.
+READ_STAGE_NAME: str = 'read'  # Lines of files parsed in this process: I/O, decompression, splitting.
+DECODE_STAGE_NAME: str = 'decode'  # Line filter, fields, timestamps, url rules, group keys.
+AGGREGATE_STAGE_NAME: str = 'aggregate'  # Adding decoded lines to statistics.
+RENDER_STAGE_NAME: str = 'render'  # Table, rows or partial dump.
+STATS_STAGES: list[str] = [
+    INPUT_STAGE_NAME,
+    READ_STAGE_NAME,
+    DECODE_STAGE_NAME,
+    AGGREGATE_STAGE_NAME,
+    RENDER_STAGE_NAME,
+]
@@ -1,49 +1,783 @@
 """Module with EndpointStats."""
 
-from config import AVERAGE_HEADERS, AVG_RESPONSE_TIME_COLUMN_NAME, REQUESTS_TOTAL_COLUMN_NAME, URL_COLUMN_NAME
+import math
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from fractions import Fraction
+from itertools import chain
+from typing import Callable, Iterable, Iterator, Self
+
+from config import (
+    AVERAGE_HEADERS,
+    AVG_RESPONSE_TIME_COLUMN_NAME,
+    BUCKET_COLUMN_NAME,
+    MAX_RESPONSE_TIME_COLUMN_NAME,
+    MIN_RESPONSE_TIME_COLUMN_NAME,
+    PERCENTILE_COLUMNS,
+    REQUESTS_TOTAL_COLUMN_NAME,
+    RESPONSE_TIMES_BUFFER_LIMIT,
+    RESPONSE_TIMES_BUFFER_SIZE,
+    STDDEV_RESPONSE_TIME_COLUMN_NAME,
+    TIMESERIES_HEADERS,
+    URL_COLUMN_NAME,
+)
+from quantile_sketch import MIN_INDEXABLE_VALUE, QuantileSketch
+from time_series import TimeSeries, format_bucket_start
+
+try:
+    import numpy
+except ImportError:  # Optional dependency, squares are split by the pure Python loop without it.
+    numpy = None  # type: ignore[assignment]
+
+# Binary format of EndpointStats: url length, total requests, number of response time parts,
+# number of squared response time parts, min and max response time (float64), then url (utf-8),
+# response time parts and squared response time parts (float64), quantile sketch,
+# time series flag (uint8) and time series if the flag is set, little-endian.
+ENDPOINT_STATS_HEADER = struct.Struct('<IqBBdd')
+TIME_SERIES_FLAG = struct.Struct('<B')
+# Binary format of EndpointStatsMap: magic, format version, number of endpoints, then EndpointStats one by one.
+ENDPOINT_STATS_MAP_HEADER = struct.Struct('<4sBI')
+ENDPOINT_STATS_MAP_MAGIC = b'LFPS'
+ENDPOINT_STATS_MAP_VERSION = 4
+SPLIT_FACTOR = 2.0**27 + 1  # Splits a float64 into two halves of 26 bits (Dekker's product).
+# Sketch of a rare endpoint (up to this number of buckets) is updated in its packed array, without dict and collapse.
+SMALL_SKETCH_BUCKETS = 8
+NUMPY_MIN_VALUES = 64  # Array operations do not pay off for fewer values (a rare endpoint has one or two).
+EMPTY_SKETCH_BUCKETS = array('q')  # Shared by endpoints without response times, never changed in place.
+
+
+def get_fraction_sum_parts(values: Iterable[float]) -> list[float]:
+    """
+    Return the same parts as get_exact_sum_parts() by rational arithmetic (math.fsum fails on intermediate overflow).
+
+    A sum out of float range is the only part, infinity of its sign.
+    """
+    total = sum(map(Fraction, values), Fraction(0))
+    parts = []
+    while total:
+        try:
+            part = float(total)  # Correctly rounded, as math.fsum.
+        except OverflowError:
+            return [math.inf if total > 0 else -math.inf]
+        parts.append(part)
+        total -= Fraction(part)
+    return parts
+
+
+def get_float_sum(values: Iterable[float]) -> float:
+    """Return correctly rounded sum of values (math.fsum), nan or infinity if the sum is out of float range."""
+    values = list(values)
+    try:
+        return math.fsum(values)
+    except OverflowError:  # Intermediate overflow of finite values.
+        return (get_fraction_sum_parts(values) or [0.0])[0]
+    except ValueError:  # inf + -inf.
+        return math.nan
+
+
+def get_exact_sum_parts(values: Iterable[float]) -> list[float]:
+    """
+    Return non-overlapping floats whose exact sum equals the exact sum of values.
+
+    Every part is the correctly rounded remainder of the previous ones (math.fsum),
+    so the result does not depend on the order of values.
+    A sum out of float range (of nan, infinite values or beyond the largest float) is the only part.
+    """
+    values = list(values)
+    if len(values) == 2:  # Rounded sum and its exact error (TwoSum), the same parts as the loop gives.
+        first, second = values
+        total = first + second
+        if math.isfinite(total):
+            second_rounded = total - first
+            error = (first - (total - second_rounded)) + (second - second_rounded)
+            return [total, error] if error else [total] if total else []
+    parts: list[float] = []
+    while True:
+        try:
+            remainder = math.fsum(values)  # Of values and negated parts found so far.
+        except OverflowError:  # Intermediate overflow of finite values.
+            return get_fraction_sum_parts(values)
+        except ValueError:  # inf + -inf.
+            return [math.nan]
+        if not math.isfinite(remainder):  # nan or infinity never leaves a zero remainder.
+            return [remainder]
+        if remainder == 0.0:
+            return parts
+        parts.append(remainder)
+        values.append(-remainder)
+
+
+def get_integer_sum(values: Iterable[float]) -> tuple[int, int]:
+    """
+    Return exact sum of finite values as an integer numerator and a power of two exponent (numerator / 2**exponent).
+
+    Same value as a sum of Fraction objects, without reducing every intermediate sum by gcd.
+    """
+    ratios = [value.as_integer_ratio() for value in values]
+    exponent = max((denominator.bit_length() - 1 for _, denominator in ratios), default=0)
+    numerator = sum(numerator << (exponent - denominator.bit_length() + 1) for numerator, denominator in ratios)
+    return numerator, exponent
+
+
+def get_exact_squares(values: list[float]) -> list[float]:
+    """
+    Return floats whose exact sum equals the exact sum of squares of values.
+
+    Every square is the rounded square and its rounding error (Dekker's product), both exact floats.
+    A square out of float range (or of nan) has no error part (zero).
+    The same floats are calculated by array operations if numpy is installed (for NUMPY_MIN_VALUES and more).
+    """
+    if numpy is not None and len(values) >= NUMPY_MIN_VALUES:
+        value_array = numpy.asarray(values, dtype=numpy.float64)
+        with numpy.errstate(invalid='ignore', over='ignore'):  # Out of float range, errors are zeroed below.
+            square_array = value_array * value_array
+            scaled_array = SPLIT_FACTOR * value_array
+            high_array = scaled_array - (scaled_array - value_array)
+            low_array = value_array - high_array
+            error_array = (
+                (high_array * high_array - square_array) + 2.0 * high_array * low_array
+            ) + low_array * low_array
+        error_array[~numpy.isfinite(square_array)] = 0.0
+        return numpy.concatenate((square_array, error_array)).tolist()
+
+    squares = []
+    errors = []
+    for value in values:
+        square = value * value
+        scaled = SPLIT_FACTOR * value
+        high = scaled - (scaled - value)
+        low = value - high
+        squares.append(square)
+        errors.append(((high * high - square) + 2.0 * high * low) + low * low if math.isfinite(square) else 0.0)
+    return squares + errors
+
+
+class ExactSumColumns:
+    """
+    Exact sums (see get_exact_sum_parts) by slot.
+
+    A sum of a few values has at most two parts, they are kept in arrays,
+    the other parts of rare long sums are kept in a mapping by slot.
+    """
+
+    __slots__ = ('first_parts', 'second_parts', 'other_parts')
+
+    def __init__(self) -> None:
+        """Set up initial values."""
+        self.first_parts = array('d')
+        self.second_parts = array('d')
+        self.other_parts: dict[int, list[float]] = {}
+
+    def append(self) -> None:
+        """Add a slot with zero sum."""
+        self.first_parts.append(0.0)
+        self.second_parts.append(0.0)
+
+    def get(self, slot: int) -> list[float]:
+        """Return parts of the sum of slot (none for zero sum)."""
+        first_part = self.first_parts[slot]
+        if first_part == 0.0:
+            return []
+        second_part = self.second_parts[slot]
+        if second_part == 0.0:
+            return [first_part]
+        return [first_part, second_part, *self.other_parts.get(slot, ())]
+
+    def add(self, slot: int, values: list[float]) -> None:
+        """Add values to the sum of slot."""
+        if len(values) == 1 and self.first_parts[slot] == 0.0:  # The first value of a rare endpoint.
+            self.first_parts[slot] = values[0]
+            return
+        self.set(slot, get_exact_sum_parts(self.get(slot) + values))
+
+    def set(self, slot: int, parts: list[float]) -> None:
+        """Replace parts of the sum of slot."""
+        self.first_parts[slot] = parts[0] if parts else 0.0
+        self.second_parts[slot] = parts[1] if len(parts) > 1 else 0.0
+        if len(parts) > 2:
+            self.other_parts[slot] = parts[2:]
+        else:
+            self.other_parts.pop(slot, None)
+
+
+class EndpointStatsMap(Mapping[str, 'EndpointStats']):
+    """
+    Statistics for all endpoints.
+
+    Structure:
+    key - endpoint name
+    value - EndpointStats (a view of the endpoint slot)
+
+    Urls are interned and mapped to integer slots in order of first occurrence, statistics are columns
+    indexed by slot: counts, exact sums, min and max in typed arrays, sketch buckets packed in a small
+    array per slot, so an endpoint costs a few array items instead of several objects.
+    Response times are buffered by slots and folded into the columns by chunks: a chunk of an endpoint
+    reaches RESPONSE_TIMES_BUFFER_SIZE or all buffered response times reach RESPONSE_TIMES_BUFFER_LIMIT.
+    """
+
+    def __init__(self, endpoint_requests: Mapping[str, 'EndpointStats'] | None = None):
+        """
+        Set up initial values (statistics of endpoint_requests are copied).
+
+        self.slots - url: slot (index in the columns)
+        self.urls - url by slot
+        self.total_requests - number of requests by slot
+        self.response_time_sums, self.square_sums - exact sums of compacted response times and of their squares
+        self.min_response_times, self.max_response_times - extreme compacted response times by slot
+        self.sketch_buckets - quantile sketch buckets (key, count, key, count...) by slot
+        self.zero_counts - sketch counts of response times not greater than MIN_INDEXABLE_VALUE by slot
+        self.time_series - slot: statistics by time buckets (only for the timeseries report)
+        """
+        self.slots: dict[str, int] = {}
+        self.urls: list[str] = []
+        self.total_requests = array('q')
+        self.response_time_sums = ExactSumColumns()
+        self.square_sums = ExactSumColumns()
+        self.min_response_times = array('d')
+        self.max_response_times = array('d')
+        self.sketch_buckets: list[array[int]] = []
+        self.zero_counts = array('q')
+        self.time_series: dict[int, TimeSeries] = {}
+        self._new_response_times: dict[int, list[float]] = {}  # Not compacted yet, by slot.
+        self._new_count = 0
+        self._sketch = QuantileSketch()  # Parameters of all sketches.
+        if endpoint_requests is not None:
+            for url, endpoint_stats in endpoint_requests.items():
+                self[url] = endpoint_stats
+
+    def __getitem__(self, url: str) -> 'EndpointStats':
+        """Return statistics of url."""
+        return EndpointStats(url, self, self.slots[url])
+
+    def __setitem__(self, url: str, endpoint_stats: 'EndpointStats') -> None:
+        """Replace statistics of url by a copy of endpoint_stats."""
+        slot = self.get_slot(url)
+        if endpoint_stats.endpoint_stats_map is self and endpoint_stats.slot == slot:
+            return
+        self.compact(slot)
+        self.total_requests[slot] = 0
+        self.response_time_sums.set(slot, [])
+        self.square_sums.set(slot, [])
+        self.min_response_times[slot] = math.inf
+        self.max_response_times[slot] = -math.inf
+        self.sketch_buckets[slot] = EMPTY_SKETCH_BUCKETS
+        self.zero_counts[slot] = 0
+        self.time_series.pop(slot, None)
+        self.merge_slot(slot, endpoint_stats.endpoint_stats_map, endpoint_stats.slot)
+
+    def __contains__(self, url: object) -> bool:
+        """Return True if there are statistics of url."""
+        return url in self.slots
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over urls in order of first occurrence."""
+        return iter(self.urls)
+
+    def __len__(self) -> int:
+        """Return number of endpoints."""
+        return len(self.urls)
+
+    def __add__(self, other: 'EndpointStatsMap') -> 'EndpointStatsMap':
+        """Return new EndpointStatsMap with statistics of both maps."""
+        endpoint_stats_map = EndpointStatsMap()
+        endpoint_stats_map.merge(self)
+        endpoint_stats_map.merge(other)
+        return endpoint_stats_map
+
+    def setdefault(self, url: str, default: 'EndpointStats') -> 'EndpointStats':
+        """Return statistics of url, add a copy of default if there are none."""
+        if url not in self.slots:
+            self[url] = default
+        return self[url]
+
+    def get_slot(self, url: str) -> int:
+        """Return slot of url, add the endpoint if it is new."""
+        slot = self.slots.get(url)
+        if slot is None:
+            url = sys.intern(url)
+            slot = self.slots[url] = len(self.urls)
+            self.urls.append(url)
+            self.total_requests.append(0)
+            self.response_time_sums.append()
+            self.square_sums.append()
+            self.min_response_times.append(math.inf)
+            self.max_response_times.append(-math.inf)
+            self.sketch_buckets.append(EMPTY_SKETCH_BUCKETS)
+            self.zero_counts.append(0)
+        return slot
+
+    def add(self, url: str, response_time: float) -> int:
+        """Add request of url, return its slot."""
+        slot = self.slots.get(url)
+        if slot is None:
+            slot = self.get_slot(url)
+        self.total_requests[slot] += 1
+        new_response_times = self._new_response_times.get(slot)
+        if new_response_times is None:
+            new_response_times = self._new_response_times[slot] = []
+        new_response_times.append(response_time)
+        self._new_count += 1
+        if len(new_response_times) >= RESPONSE_TIMES_BUFFER_SIZE:
+            self.compact(slot)
+        elif self._new_count >= RESPONSE_TIMES_BUFFER_LIMIT:
+            self.compact()
+        return slot
+
+    def add_many(self, url: str, count: int, response_times: list[float]) -> None:
+        """Add count requests of url with their response times."""
+        slot = self.slots.get(url)
+        if slot is None:
+            slot = self.get_slot(url)
+        self.total_requests[slot] += count
+        self.add_response_times(slot, response_times)
+
+    def add_response_times(self, slot: int, response_times: Iterable[float]) -> None:
+        """Add response times of slot (without requests)."""
+        new_response_times = self._new_response_times.get(slot)
+        if new_response_times is None:
+            new_response_times = self._new_response_times[slot] = []
+        count = len(new_response_times)
+        new_response_times.extend(response_times)
+        self._new_count += len(new_response_times) - count
+        if len(new_response_times) >= RESPONSE_TIMES_BUFFER_SIZE:
+            self.compact(slot)
+        elif self._new_count >= RESPONSE_TIMES_BUFFER_LIMIT:
+            self.compact()
+
+    def get_new_response_times(self, slot: int) -> list[float]:
+        """Return response times of slot not compacted yet."""
+        return self._new_response_times.get(slot, [])
+
+    def get_time_series(self, slot: int, bucket_size: int) -> TimeSeries:
+        """Return time series of slot, add empty ones of bucket_size if there are none."""
+        time_series = self.time_series.get(slot)
+        if time_series is None:
+            time_series = self.time_series[slot] = TimeSeries(bucket_size)
+        return time_series
+
+    def load_sketch(self, slot: int) -> QuantileSketch:
+        """Return quantile sketch of compacted response times of slot (a copy)."""
+        sketch = QuantileSketch()
+        buckets = self.sketch_buckets[slot]
+        if buckets:
+            sketch.buckets = dict(zip(buckets[::2], buckets[1::2]))
+        sketch.zero_count = self.zero_counts[slot]
+        return sketch
+
+    def store_sketch(self, slot: int, sketch: QuantileSketch) -> None:
+        """Replace quantile sketch of slot."""
+        self.sketch_buckets[slot] = array('q', chain.from_iterable(sketch.buckets.items()))
+        self.zero_counts[slot] = sketch.zero_count
+
+    def add_to_sketch(self, slot: int, values: list[float]) -> None:
+        """
+        Add values to quantile sketch of slot.
+
+        A few values of a small sketch are counted without QuantileSketch, the counts are kept
+        if the buckets need no collapse (same buckets as QuantileSketch.add_many gives).
+        """
+        buckets = self.sketch_buckets[slot]
+        if not buckets and len(values) == 1 and values[0] > MIN_INDEXABLE_VALUE:  # The first value of a rare endpoint.
+            self.sketch_buckets[slot] = array('q', (self._sketch.get_key(values[0]), 1))
+            return
+        if len(buckets) <= 2 * SMALL_SKETCH_BUCKETS and len(values) <= SMALL_SKETCH_BUCKETS:
+            counts = dict(zip(buckets[::2], buckets[1::2])) if buckets else {}
+            get_key = self._sketch.get_key
+            zero_count = 0
+            for value in values:
+                if value <= MIN_INDEXABLE_VALUE:
+                    zero_count += 1
+                else:
+                    key = get_key(value)
+                    counts[key] = counts.get(key, 0) + 1
+            if not counts or max(counts) - min(counts) < self._sketch.max_buckets:
+                self.sketch_buckets[slot] = array('q', chain.from_iterable(counts.items()))
+                self.zero_counts[slot] += zero_count
+                return
+
+        sketch = self.load_sketch(slot)
+        sketch.add_many(values)
+        self.store_sketch(slot, sketch)
+
+    def compact(self, slot: int | None = None) -> None:
+        """Fold buffered response times of slot (of all slots by default) into the columns."""
+        if slot is None:
+            for buffered_slot in list(self._new_response_times):
+                self.compact(buffered_slot)
+            return
+
+        new_response_times = self._new_response_times.pop(slot, None)
+        if not new_response_times:
+            return
+        self._new_count -= len(new_response_times)
+        self.response_time_sums.add(slot, new_response_times)
+        self.square_sums.add(slot, get_exact_squares(new_response_times))
+        self.min_response_times[slot] = min(self.min_response_times[slot], min(new_response_times))
+        self.max_response_times[slot] = max(self.max_response_times[slot], max(new_response_times))
+        if math.isfinite(self.response_time_sums.first_parts[slot]):
+            self.add_to_sketch(slot, new_response_times)
+        else:  # nan or infinite response times (the sum of finite ones may overflow) can not be sketched.
+            self.add_to_sketch(slot, [value for value in new_response_times if math.isfinite(value)])
+
+    def merge_slot(self, slot: int, other: 'EndpointStatsMap', other_slot: int) -> None:
+        """Add statistics of other_slot of other map to slot (other statistics are not changed)."""
+        other.compact(other_slot)
+        self.compact(slot)
+        self.total_requests[slot] += other.total_requests[other_slot]
+        for columns, other_columns in (
+            (self.response_time_sums, other.response_time_sums),
+            (self.square_sums, other.square_sums),
+        ):
+            columns.set(slot, get_exact_sum_parts(chain(columns.get(slot), other_columns.get(other_slot))))
+        self.min_response_times[slot] = min(self.min_response_times[slot], other.min_response_times[other_slot])
+        self.max_response_times[slot] = max(self.max_response_times[slot], other.max_response_times[other_slot])
+        sketch = self.load_sketch(slot)
+        sketch.merge(other.load_sketch(other_slot))
+        self.store_sketch(slot, sketch)
+        other_time_series = other.time_series.get(other_slot)
+        if other_time_series is not None:
+            self.get_time_series(slot, other_time_series.bucket_size).merge(other_time_series)
+
+    def merge(self, other: Mapping[str, 'EndpointStats'], normalize_url: Callable[[str], str] | None = None) -> None:
+        """
+        Add statistics of other map (order of first occurrence of endpoints is kept).
+
+        Urls of other map are normalized if normalize_url is given (statistics of the same handler are merged).
+        """
+        for url, endpoint_stats in other.items():
+            slot = self.get_slot(url if normalize_url is None else normalize_url(url))
+            self.merge_slot(slot, endpoint_stats.endpoint_stats_map, endpoint_stats.slot)
+
+    def pack_slot(self, slot: int) -> bytes:
+        """Serialize statistics of slot to compact binary form (see ENDPOINT_STATS_HEADER)."""
+        self.compact(slot)
+        url = self.urls[slot].encode()
+        parts = self.response_time_sums.get(slot)
+        square_parts = self.square_sums.get(slot)
+        time_series = self.time_series.get(slot)
+        return b''.join(
+            (
+                ENDPOINT_STATS_HEADER.pack(
+                    len(url),
+                    self.total_requests[slot],
+                    len(parts),
+                    len(square_parts),
+                    self.min_response_times[slot],
+                    self.max_response_times[slot],
+                ),
+                url,
+                struct.pack(f'<{len(parts) + len(square_parts)}d', *parts, *square_parts),
+                self.load_sketch(slot).to_bytes(),
+                TIME_SERIES_FLAG.pack(time_series is not None),
+                b'' if time_series is None else time_series.to_bytes(),
+            )
+        )
+
+    def unpack_slot(self, data: bytes, offset: int = 0) -> tuple[int, int]:
+        """
+        Deserialize statistics of an endpoint starting at offset (they replace existing ones).
+
+        Return slot of the endpoint and offset of the next byte.
+        """
+        url_length, total_requests, parts_count, square_parts_count, min_response_time, max_response_time = (
+            ENDPOINT_STATS_HEADER.unpack_from(data, offset)
+        )
+        offset += ENDPOINT_STATS_HEADER.size
+        url_end = offset + url_length
+        slot = self.get_slot(bytes(data[offset:url_end]).decode())
+        offset = url_end
+        self._new_count -= len(self._new_response_times.pop(slot, []))
+        self.total_requests[slot] = total_requests
+        self.min_response_times[slot] = min_response_time
+        self.max_response_times[slot] = max_response_time
+        self.response_time_sums.set(slot, list(struct.unpack_from(f'<{parts_count}d', data, offset)))
+        offset += 8 * parts_count
+        self.square_sums.set(slot, list(struct.unpack_from(f'<{square_parts_count}d', data, offset)))
+        offset += 8 * square_parts_count
+        sketch, offset = QuantileSketch.unpack_from(data, offset)
+        self.store_sketch(slot, sketch)
+        (has_time_series,) = TIME_SERIES_FLAG.unpack_from(data, offset)
+        offset += TIME_SERIES_FLAG.size
+        if has_time_series:
+            self.time_series[slot], offset = TimeSeries.unpack_from(data, offset)
+        else:
+            self.time_series.pop(slot, None)
+        return slot, offset
+
+    def to_bytes(self) -> bytes:
+        """Serialize all statistics to compact binary form (see ENDPOINT_STATS_MAP_HEADER)."""
+        header = ENDPOINT_STATS_MAP_HEADER.pack(ENDPOINT_STATS_MAP_MAGIC, ENDPOINT_STATS_MAP_VERSION, len(self))
+        return b''.join(chain((header,), (self.pack_slot(slot) for slot in range(len(self.urls)))))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Self:
+        """Deserialize statistics created by to_bytes()."""
+        magic, version, count = ENDPOINT_STATS_MAP_HEADER.unpack_from(data)
+        if magic != ENDPOINT_STATS_MAP_MAGIC or version != ENDPOINT_STATS_MAP_VERSION:
+            raise Exception('Unknown format of serialized EndpointStatsMap.')
+
+        endpoint_stats_map = cls()
+        offset = ENDPOINT_STATS_MAP_HEADER.size
+        for _ in range(count):
+            _, offset = endpoint_stats_map.unpack_slot(data, offset)
+        if offset != len(data):
+            raise Exception('Unexpected data after serialized EndpointStatsMap.')
+        return endpoint_stats_map
 
 
 class EndpointStats:
-    """Collecting statistics for a single endpoint."""
+    """
+    Collecting statistics for a single endpoint.
+
+    A lightweight view of the endpoint slot in EndpointStatsMap: statistics are kept only in the map columns.
+    """
+
+    __slots__ = ('endpoint_stats_map', 'slot')
 
-    def __init__(self, url: str):
+    def __init__(self, url: str, endpoint_stats_map: EndpointStatsMap | None = None, slot: int | None = None):
         """
         Set up initial values.
 
-        self.url - endpoint name
-        self.total_response_time - total time of all responses
-        self.total_requests - total number of requests
+        self.endpoint_stats_map - map with the statistics (a new map of this endpoint by default)
+        self.slot - slot of the endpoint in the map (added if url is new)
         """
-        self.url = url
-        self.total_response_time = 0.0
-        self.total_requests = 0
+        self.endpoint_stats_map = EndpointStatsMap() if endpoint_stats_map is None else endpoint_stats_map
+        self.slot = self.endpoint_stats_map.get_slot(url) if slot is None else slot
+
+    @property
+    def url(self) -> str:
+        """Endpoint name."""
+        return self.endpoint_stats_map.urls[self.slot]
+
+    @property
+    def total_requests(self) -> int:
+        """Total number of requests."""
+        return self.endpoint_stats_map.total_requests[self.slot]
+
+    @total_requests.setter
+    def total_requests(self, value: int) -> None:
+        """Replace total number of requests."""
+        self.endpoint_stats_map.total_requests[self.slot] = value
+
+    @property
+    def total_response_time(self) -> float:
+        """
+        Total time of all responses.
+
+        The sum is exact and correctly rounded, so it does not depend on the order
+        in which response times were added (serial, per range or per file).
+        """
+        endpoint_stats_map = self.endpoint_stats_map
+        return get_float_sum(
+            chain(
+                endpoint_stats_map.response_time_sums.get(self.slot),
+                endpoint_stats_map.get_new_response_times(self.slot),
+            )
+        )
+
+    @total_response_time.setter
+    def total_response_time(self, value: float) -> None:
+        """Replace total time of all responses."""
+        self.endpoint_stats_map.compact(self.slot)
+        self.endpoint_stats_map.response_time_sums.set(self.slot, get_exact_sum_parts([float(value)]))
+
+    @property
+    def min_response_time(self) -> float:
+        """Minimum response time (inf without response times)."""
+        self.endpoint_stats_map.compact(self.slot)
+        return self.endpoint_stats_map.min_response_times[self.slot]
+
+    @property
+    def max_response_time(self) -> float:
+        """Maximum response time (-inf without response times)."""
+        self.endpoint_stats_map.compact(self.slot)
+        return self.endpoint_stats_map.max_response_times[self.slot]
+
+    @property
+    def response_time_sketch(self) -> QuantileSketch:
+        """Quantile sketch of response times (percentiles), a copy."""
+        self.endpoint_stats_map.compact(self.slot)
+        return self.endpoint_stats_map.load_sketch(self.slot)
+
+    @property
+    def time_series(self) -> TimeSeries | None:
+        """Statistics by time buckets (only for the timeseries report)."""
+        return self.endpoint_stats_map.time_series.get(self.slot)
+
+    @time_series.setter
+    def time_series(self, value: TimeSeries | None) -> None:
+        """Replace statistics by time buckets."""
+        if value is None:
+            self.endpoint_stats_map.time_series.pop(self.slot, None)
+        else:
+            self.endpoint_stats_map.time_series[self.slot] = value
+
+    def __eq__(self, other: object) -> bool:
+        """Compare endpoint name and collected statistics."""
+        if not isinstance(other, EndpointStats):
+            return NotImplemented
+        return (
+            self.url == other.url
+            and self.total_requests == other.total_requests
+            and self.get_response_time_parts() == other.get_response_time_parts()
+            and self.get_square_parts() == other.get_square_parts()
+            and self.min_response_time == other.min_response_time
+            and self.max_response_time == other.max_response_time
+            and self.response_time_sketch == other.response_time_sketch
+            and self.time_series == other.time_series
+        )
+
+    def __add__(self, other: 'EndpointStats') -> 'EndpointStats':
+        """Return new EndpointStats with statistics of both objects."""
+        endpoint_stats = EndpointStats(self.url)
+        endpoint_stats.merge(self)
+        endpoint_stats.merge(other)
+        return endpoint_stats
+
+    def merge(self, other: 'EndpointStats') -> None:
+        """
+        Add statistics of other EndpointStats (same endpoint) to this one.
+
+        Merge is associative and commutative, so partial results may be combined in any order.
+        """
+        if other.url != self.url:
+            raise Exception(f'Can not merge statistics of different endpoints: "{self.url}" and "{other.url}".')
+        self.endpoint_stats_map.merge_slot(self.slot, other.endpoint_stats_map, other.slot)
+
+    def to_bytes(self) -> bytes:
+        """Serialize statistics to compact binary form (see ENDPOINT_STATS_HEADER)."""
+        return self.endpoint_stats_map.pack_slot(self.slot)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Self:
+        """Deserialize statistics created by to_bytes()."""
+        endpoint_stats, offset = cls.unpack_from(data)
+        if offset != len(data):
+            raise Exception('Unexpected data after serialized EndpointStats.')
+        return endpoint_stats
+
+    @classmethod
+    def unpack_from(cls, data: bytes, offset: int = 0) -> tuple[Self, int]:
+        """Deserialize statistics starting at offset (to a new map), return them and offset of the next byte."""
+        endpoint_stats_map = EndpointStatsMap()
+        slot, offset = endpoint_stats_map.unpack_slot(data, offset)
+        return cls(endpoint_stats_map.urls[slot], endpoint_stats_map, slot), offset
 
     def get_avg_response_time(self) -> float:
         """Calculate average response time."""
         avg_response_time = self.total_response_time / self.total_requests
         return round(avg_response_time, 3)
 
-    def get_correct_format_for_tabulate(self) -> list[str | int | float]:
+    def get_min_response_time(self) -> float:
+        """Return minimum response time."""
+        return round(self.min_response_time, 3)
+
+    def get_max_response_time(self) -> float:
+        """Return maximum response time."""
+        return round(self.max_response_time, 3)
+
+    def get_stddev_response_time(self) -> float:
+        """
+        Calculate standard deviation of response times (population).
+
+        The variance is calculated once from the exact sums of response times and of their squares
+        in integer arithmetic (see get_integer_sum), so there is no cancellation of float sums and the result
+        does not depend on the order of response times (serial, per range or per file).
+        """
+        if not self.total_requests:
+            return 0.0
+        if not all(map(math.isfinite, chain(self.get_response_time_parts(), self.get_square_parts()))):
+            return math.nan  # Sums out of float range (nan or infinite response times, overflow of squares).
+        total, exponent = get_integer_sum(self.get_response_time_parts())
+        squares_total, squares_exponent = get_integer_sum(self.get_square_parts())
+        # variance = (squares_total / 2**squares_exponent - (total / 2**exponent)**2 / count) / count
+        count = self.total_requests
+        numerator = (squares_total * count << 2 * exponent) - (total * total << squares_exponent)
+        if numerator <= 0:
+            return 0.0
+        return round(math.sqrt(numerator / (count * count << squares_exponent + 2 * exponent)), 3)
+
+    def get_percentile_response_time(self, quantile: float) -> float:
+        """Calculate estimated quantile of response time (e.g. 0.99 for p99)."""
+        return round(self.response_time_sketch.get_quantile(quantile), 3)
+
+    def get_correct_format_for_tabulate(self, headers: list[str] = AVERAGE_HEADERS) -> list[str | int | float]:
         """Return the correct format with data for use in forming a table."""
         endpoint_data: list[str | int | float] = []
+        sketch = None
 
-        for column in AVERAGE_HEADERS:  # Defines a subsequence.
+        for column in headers:  # Defines a subsequence.
             if column == URL_COLUMN_NAME:
                 endpoint_data.append(self.url)
             elif column == REQUESTS_TOTAL_COLUMN_NAME:
                 endpoint_data.append(self.total_requests)
             elif column == AVG_RESPONSE_TIME_COLUMN_NAME:
                 endpoint_data.append(self.get_avg_response_time())
+            elif column == MIN_RESPONSE_TIME_COLUMN_NAME:
+                endpoint_data.append(self.get_min_response_time())
+            elif column == MAX_RESPONSE_TIME_COLUMN_NAME:
+                endpoint_data.append(self.get_max_response_time())
+            elif column == STDDEV_RESPONSE_TIME_COLUMN_NAME:
+                endpoint_data.append(self.get_stddev_response_time())
+            elif column in PERCENTILE_COLUMNS:
+                if sketch is None:  # Unpacked once for all percentiles.
+                    sketch = self.response_time_sketch
+                endpoint_data.append(round(sketch.get_quantile(PERCENTILE_COLUMNS[column]), 3))
 
             else:
-                raise Exception('Unknown column in AVERAGE_HEADERS. Add new functionality to EndpointStats.')
+                raise Exception('Unknown column in headers. Add new functionality to EndpointStats.')
 
         return endpoint_data
 
+    def get_time_series_format_for_tabulate(
+        self, headers: list[str] = TIMESERIES_HEADERS
+    ) -> list[list[str | int | float]]:
+        """Return rows with data of every time bucket (in time order) for use in forming a table."""
+        time_series = self.time_series
+        if time_series is None:
+            return []
+        sketches = time_series.get_sketches()
+
+        rows = []
+        for bucket_start, count, response_time_sum in time_series.iter_buckets():
+            bucket_data: list[str | int | float] = []
+            for column in headers:  # Defines a subsequence.
+                if column == BUCKET_COLUMN_NAME:
+                    bucket_data.append(format_bucket_start(bucket_start))
+                elif column == URL_COLUMN_NAME:
+                    bucket_data.append(self.url)
+                elif column == REQUESTS_TOTAL_COLUMN_NAME:
+                    bucket_data.append(count)
+                elif column == AVG_RESPONSE_TIME_COLUMN_NAME:
+                    bucket_data.append(round(response_time_sum / count / 1_000_000, 3))
+                elif column in PERCENTILE_COLUMNS:
+                    bucket_data.append(round(sketches[bucket_start].get_quantile(PERCENTILE_COLUMNS[column]), 3))
+
+                else:
+                    raise Exception('Unknown column in headers. Add new functionality to EndpointStats.')
+            rows.append(bucket_data)
+        return rows
+
     def add_request(self) -> None:
         """Add new request."""
-        self.total_requests += 1
+        self.endpoint_stats_map.total_requests[self.slot] += 1
 
     def add_response_time(self, new_response_time: float) -> None:
-        """Add new response time in sum times."""
-        self.total_response_time += new_response_time
+        """Add new response time in sum times and the quantile sketch."""
+        self.endpoint_stats_map.add_response_times(self.slot, (new_response_time,))
+
+    def add_response_times(self, new_response_times: Iterable[float]) -> None:
+        """Add several response times in sum times and the quantile sketch."""
+        self.endpoint_stats_map.add_response_times(self.slot, new_response_times)
+
+    def get_response_time_parts(self) -> list[float]:
+        """Return exact sum of response times as non-overlapping floats (see get_exact_sum_parts)."""
+        self.endpoint_stats_map.compact(self.slot)
+        return self.endpoint_stats_map.response_time_sums.get(self.slot)
+
+    def get_square_parts(self) -> list[float]:
+        """Return exact sum of squares of response times as non-overlapping floats."""
+        self.endpoint_stats_map.compact(self.slot)
+        return self.endpoint_stats_map.square_sums.get(self.slot)
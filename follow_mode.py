@@ -0,0 +1,169 @@
+"""Live follow mode (--follow): parse lines appended to files and refresh the report table."""
+
+import os
+import sys
+import time
+from bisect import bisect_left, insort
+from typing import Iterable, Iterator
+
+from bad_lines import BadLines
+from config import FOLLOW_POLL_INTERVAL, FOLLOW_REFRESH_INTERVAL, IO_CHUNK_SIZE
+from endpoint_stats import EndpointStatsMap
+from log_aggregator import LogAggregator
+
+# ANSI sequence: move the cursor home and clear the screen (used only for terminals).
+CLEAR_SCREEN = '\033[H\033[J'
+
+
+class FileFollower:
+    """
+    Open file which is read as it grows (like 'tail -F').
+
+    Lines are returned only when complete, the cut tail waits for the next read.
+    A truncated file is read again from the beginning. When the path points to a new file
+    (rotation), the rest of the old file is read, its last line without line ending is returned
+    as complete (the old file is not written any more) and the new file is opened.
+    Compressed files can not be followed (see main.get_command_line_options).
+    """
+
+    def __init__(self, file: str, chunk_size: int = IO_CHUNK_SIZE):
+        """
+        Set up initial values.
+
+        self.opened_file - file opened in binary mode
+        self.tail - incomplete last line
+        """
+        self.file = file
+        self.chunk_size = chunk_size
+        self.opened_file = open(file, 'rb')
+        self.tail = b''
+
+    def close(self) -> None:
+        """Close the file."""
+        self.opened_file.close()
+
+    def iter_new_line_batches(self) -> Iterator[list[bytes]]:
+        """Yield batches of complete lines appended since the previous call (one batch per read() call)."""
+        if os.fstat(self.opened_file.fileno()).st_size < self.opened_file.tell():  # Truncated.
+            self.opened_file.seek(0)
+            self.tail = b''
+
+        yield from self._read_to_end()
+
+        if self._is_rotated():
+            if self.tail:
+                yield [self.tail]
+            self.close()
+            self.opened_file = open(self.file, 'rb')
+            self.tail = b''
+            yield from self._read_to_end()
+
+    def _read_to_end(self) -> Iterator[list[bytes]]:
+        """Read the file up to its current end by large chunks."""
+        while chunk := self.opened_file.read(self.chunk_size):
+            lines = (self.tail + chunk).split(b'\n')
+            self.tail = lines.pop()
+            if lines:
+                yield lines
+
+    def _is_rotated(self) -> bool:
+        """Return True if the path points to another file now."""
+        try:
+            file_stat = os.stat(self.file)
+        except FileNotFoundError:  # Old file is renamed, new one is not created yet.
+            return False
+        opened_file_stat = os.fstat(self.opened_file.fileno())
+        return (file_stat.st_dev, file_stat.st_ino) != (opened_file_stat.st_dev, opened_file_stat.st_ino)
+
+
+class EndpointRanking:
+    """
+    Endpoint urls ordered by '-total' (ties in order of first occurrence), as LogAggregator sorts rows.
+
+    Only changed endpoints are moved on update(), the whole table is not sorted again.
+    """
+
+    def __init__(self) -> None:
+        """
+        Set up initial values.
+
+        self._keys - sorted (-total requests, first occurrence index, url)
+        self._key_by_url - url: its key in self._keys
+        """
+        self._keys: list[tuple[int, int, str]] = []
+        self._key_by_url: dict[str, tuple[int, int, str]] = {}
+
+    @property
+    def urls(self) -> list[str]:
+        """Urls in table order."""
+        return [url for _, _, url in self._keys]
+
+    def update(self, endpoint_requests: EndpointStatsMap, urls: Iterable[str]) -> None:
+        """Move changed endpoints (urls in order of first occurrence) to their new positions."""
+        for url in urls:
+            old_key = self._key_by_url.get(url)
+            if old_key is None:
+                index = len(self._key_by_url)
+            else:
+                index = old_key[1]
+                del self._keys[bisect_left(self._keys, old_key)]
+            new_key = (-endpoint_requests[url].total_requests, index, url)
+            insort(self._keys, new_key)
+            self._key_by_url[url] = new_key
+
+
+def print_table(table: str) -> None:
+    """Print table over the previous one on a terminal, one after another otherwise."""
+    if sys.stdout.isatty():
+        print(CLEAR_SCREEN, end='')
+    print(table, flush=True)
+
+
+def follow_files(
+    files: list[str],
+    aggregator: LogAggregator,
+    type_report: str,
+    refresh_interval: float = FOLLOW_REFRESH_INTERVAL,
+    poll_interval: float = FOLLOW_POLL_INTERVAL,
+    max_refreshes: int | None = None,
+    bad_lines: BadLines | None = None,
+) -> None:
+    """
+    Parse files and lines appended to them, print the report every refresh_interval seconds.
+
+    Works until interrupted (Ctrl+C) or until the table is printed max_refreshes times.
+    Every batch of lines is parsed into a partial map which is merged into the aggregator,
+    so only endpoints of the batch are moved in the ranking. The batch aggregator is created once
+    and cleared after every batch (its decoder, url rules and timestamp cache are kept).
+    Files are checked every poll_interval seconds, the process sleeps between checks.
+    Bad lines are skipped by bad_lines if it is given (lines are complete, see FileFollower).
+    """
+    followers = [FileFollower(file) for file in files]
+    batch_aggregator = aggregator.copy_settings()
+    ranking = EndpointRanking()
+    refreshes = 0
+    next_refresh = time.monotonic()
+    try:
+        while max_refreshes is None or refreshes < max_refreshes:
+            for follower in followers:
+                for lines in follower.iter_new_line_batches():
+                    if bad_lines is None:
+                        batch_aggregator.feed_lines(lines)
+                    else:
+                        bad_lines.feed_lines(batch_aggregator, lines, follower.file)
+                    aggregator.merge(batch_aggregator.get_result())
+                    ranking.update(aggregator.endpoint_requests, batch_aggregator.endpoint_requests)
+                    batch_aggregator.clear()
+
+            now = time.monotonic()
+            if now >= next_refresh:
+                print_table(aggregator.report(type_report, ranking.urls))
+                refreshes += 1
+                next_refresh = now + refresh_interval
+            else:
+                time.sleep(min(poll_interval, next_refresh - now))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for follower in followers:
+            follower.close()
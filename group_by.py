@@ -0,0 +1,181 @@
+"""Statistics grouped by arbitrary dimensions of log records (--report groupby)."""
+
+import math
+from array import array
+from typing import Any, Callable, Iterator
+
+from config import ERROR_STATUS_MIN, GROUP_BY_FIELD_TYPES
+from line_decoder import microsecond_float
+
+# Key of a group: values of the dimensions in their order.
+GroupKey = tuple[Any, ...]
+
+
+def parse_group_by(value: str) -> list[str]:
+    """Return dimensions of comma-separated field names: 'url,status,request_method'."""
+    dimensions = [name.strip() for name in value.split(',')]
+    if not all(dimensions) or len(set(dimensions)) != len(dimensions):
+        raise ValueError(f'Invalid group by "{value}", use e.g. url,status,request_method.')
+    return dimensions
+
+
+def parse_metrics(value: str) -> list[str]:
+    """Return metric names of comma-separated value: 'count,mean,max' (see METRICS)."""
+    metrics = [name.strip() for name in value.split(',')]
+    if not metrics or any(name not in METRICS for name in metrics):
+        raise ValueError(f'Invalid metrics "{value}", use some of {", ".join(METRICS)}.')
+    return metrics
+
+
+def get_field_types(dimensions: list[str]) -> dict[str, Callable[[bytes], Any]]:
+    """Return decoded fields of grouped records: response_time, status, then dimensions (field name: type)."""
+    field_types: dict[str, Callable[[bytes], Any]] = {'response_time': microsecond_float, 'status': int}
+    for name in dimensions:
+        field_types[name] = GROUP_BY_FIELD_TYPES.get(name, str)
+    return field_types
+
+
+class GroupTable:
+    """
+    Request statistics for every combination of dimension values (group).
+
+    Keys are interned to integer ids in order of first occurrence, statistics are columns
+    of typed arrays indexed by id, so a group costs a few array items instead of an object.
+    Sums are integer microseconds, so merged partial tables are equal to a serial one.
+    """
+
+    def __init__(self, dimensions: list[str]):
+        """
+        Set up initial values.
+
+        self.dimensions - names of grouping fields
+        self.key_ids - group key: id
+        self.keys - group keys by id
+        self.counts - number of requests by id
+        self.response_time_sums - sum of response times in microseconds by id
+        self.min_response_times, self.max_response_times - extreme response times by id
+        self.error_counts - number of requests with status not less than ERROR_STATUS_MIN by id
+        """
+        self.dimensions = dimensions
+        self.key_ids: dict[GroupKey, int] = {}
+        self.keys: list[GroupKey] = []
+        self.counts = array('q')
+        self.response_time_sums = array('q')
+        self.min_response_times = array('d')
+        self.max_response_times = array('d')
+        self.error_counts = array('q')
+
+    def __len__(self) -> int:
+        """Return number of groups."""
+        return len(self.keys)
+
+    def __eq__(self, other: object) -> bool:
+        """Compare groups (with their order) and statistics."""
+        if not isinstance(other, GroupTable):
+            return NotImplemented
+        return (
+            self.dimensions == other.dimensions
+            and self.keys == other.keys
+            and self.counts == other.counts
+            and self.response_time_sums == other.response_time_sums
+            and self.min_response_times == other.min_response_times
+            and self.max_response_times == other.max_response_times
+            and self.error_counts == other.error_counts
+        )
+
+    def get_id(self, key: GroupKey) -> int:
+        """Return id of group key, add the group if it is new."""
+        key_id = self.key_ids.get(key)
+        if key_id is None:
+            key_id = self.key_ids[key] = len(self.keys)
+            self.keys.append(key)
+            self.counts.append(0)
+            self.response_time_sums.append(0)
+            self.min_response_times.append(math.inf)
+            self.max_response_times.append(-math.inf)
+            self.error_counts.append(0)
+        return key_id
+
+    def add(self, key: GroupKey, response_time: float, status: int) -> None:
+        """Add request of group key."""
+        key_id = self.key_ids.get(key)
+        if key_id is None:
+            key_id = self.get_id(key)
+        self.counts[key_id] += 1
+        self.response_time_sums[key_id] += round(response_time * 1_000_000)
+        if response_time < self.min_response_times[key_id]:
+            self.min_response_times[key_id] = response_time
+        if response_time > self.max_response_times[key_id]:
+            self.max_response_times[key_id] = response_time
+        if status >= ERROR_STATUS_MIN:
+            self.error_counts[key_id] += 1
+
+    def merge(self, other: 'GroupTable') -> None:
+        """Add statistics of other table, new groups keep their order after the existing ones."""
+        if other.dimensions != self.dimensions:
+            raise Exception('Can not merge group tables with different dimensions.')
+        for other_id, key in enumerate(other.keys):
+            key_id = self.get_id(key)
+            self.counts[key_id] += other.counts[other_id]
+            self.response_time_sums[key_id] += other.response_time_sums[other_id]
+            self.min_response_times[key_id] = min(self.min_response_times[key_id], other.min_response_times[other_id])
+            self.max_response_times[key_id] = max(self.max_response_times[key_id], other.max_response_times[other_id])
+            self.error_counts[key_id] += other.error_counts[other_id]
+
+    def iter_ids_by_count(self) -> Iterator[int]:
+        """Yield group ids ordered by '-count' (ties in order of first occurrence)."""
+        counts = self.counts
+        yield from sorted(range(len(self.keys)), key=lambda key_id: -counts[key_id])
+
+    def get_format_for_tabulate(self, metrics: list[str]) -> list[list[Any]]:
+        """
+        Generate data format: [[...], [...]].
+
+        Row of every group: dimension values, then values of metrics (see METRICS). Order by '-count'.
+        """
+        metric_functions = [METRICS[name] for name in metrics]
+        return [
+            [*self.keys[key_id], *(function(self, key_id) for function in metric_functions)]
+            for key_id in self.iter_ids_by_count()
+        ]
+
+
+def get_count(table: GroupTable, key_id: int) -> int:
+    """Return number of requests."""
+    return table.counts[key_id]
+
+
+def get_sum(table: GroupTable, key_id: int) -> float:
+    """Return total response time."""
+    return round(table.response_time_sums[key_id] / 1_000_000, 3)
+
+
+def get_mean(table: GroupTable, key_id: int) -> float:
+    """Return average response time."""
+    return round(table.response_time_sums[key_id] / table.counts[key_id] / 1_000_000, 3)
+
+
+def get_min(table: GroupTable, key_id: int) -> float:
+    """Return minimal response time."""
+    return table.min_response_times[key_id]
+
+
+def get_max(table: GroupTable, key_id: int) -> float:
+    """Return maximal response time."""
+    return table.max_response_times[key_id]
+
+
+def get_error_rate(table: GroupTable, key_id: int) -> float:
+    """Return share of requests with status not less than ERROR_STATUS_MIN."""
+    return round(table.error_counts[key_id] / table.counts[key_id], 4)
+
+
+# Metric name (report column): function of the table and group id. New metrics are added here.
+METRICS: dict[str, Callable[[GroupTable, int], int | float]] = {
+    'count': get_count,
+    'sum': get_sum,
+    'mean': get_mean,
+    'min': get_min,
+    'max': get_max,
+    'error_rate': get_error_rate,
+}
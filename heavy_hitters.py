@@ -0,0 +1,179 @@
+"""Top endpoints in bounded memory for logs with huge numbers of distinct urls (--top)."""
+
+from array import array
+from heapq import heapify, heappush, heapreplace
+
+from config import TOP_BY_COUNT_NAME, TOP_CAPACITY_FACTOR, TOP_MIN_CAPACITY
+
+
+def parse_top(value: str) -> int:
+    """Return number of reported endpoints (a positive integer)."""
+    if not value.strip().isdigit() or int(value) == 0:
+        raise ValueError(f'Invalid top "{value}", use a positive number of endpoints.')
+    return int(value)
+
+
+def get_top_capacity(top: int) -> int:
+    """Return number of monitored urls for top endpoints (see HeavyHitters)."""
+    return max(TOP_MIN_CAPACITY, top * TOP_CAPACITY_FACTOR)
+
+
+class HeavyHitters:
+    """
+    Endpoints with the largest weight: number of requests or total response time (Space-Saving algorithm).
+
+    At most capacity urls are monitored, a new url replaces the monitored url of the minimal weight
+    and takes over its weight as the error of its own weight: weight - error <= true weight <= weight,
+    the error is not greater than total weight / capacity, every url with a larger true weight is monitored.
+    The minimal weight is found by a heap of (weight, slot): weights only grow, so entries of increased weights
+    are refreshed only when they come to the top. Weights are integer (microseconds of response time),
+    so partial tables are merged exactly. Requests and response time of a url are counted from the moment
+    it is monitored (for the average response time).
+    """
+
+    def __init__(self, capacity: int, top_by: str = TOP_BY_COUNT_NAME):
+        """
+        Set up initial values.
+
+        self.capacity - maximal number of monitored urls
+        self.top_by - weight of urls: TOP_BY_COUNT_NAME (requests) or TOP_BY_TIME_NAME (response time)
+        self.total_weight - weight of all added requests
+        self.slots - monitored url: slot (index in the columns)
+        self.urls - url by slot
+        self.weights, self.errors - estimated weight and its maximal overestimation by slot
+        self.counts, self.response_time_sums - requests and their response time in microseconds since monitored
+        """
+        self.capacity = capacity
+        self.top_by = top_by
+        self.total_weight = 0
+        self.slots: dict[str, int] = {}
+        self.urls: list[str] = []
+        self.weights = array('q')
+        self.errors = array('q')
+        self.counts = array('q')
+        self.response_time_sums = array('q')
+        self._heap: list[tuple[int, int]] = []
+
+    def __len__(self) -> int:
+        """Return number of monitored urls."""
+        return len(self.urls)
+
+    def __eq__(self, other: object) -> bool:
+        """Compare monitored urls (with their slots) and statistics."""
+        if not isinstance(other, HeavyHitters):
+            return NotImplemented
+        return (
+            self.capacity == other.capacity
+            and self.top_by == other.top_by
+            and self.total_weight == other.total_weight
+            and self.urls == other.urls
+            and self.weights == other.weights
+            and self.errors == other.errors
+            and self.counts == other.counts
+            and self.response_time_sums == other.response_time_sums
+        )
+
+    def add(self, url: str, response_time: float) -> None:
+        """Add request of url."""
+        response_time_micro = round(response_time * 1_000_000)
+        weight = 1 if self.top_by == TOP_BY_COUNT_NAME else response_time_micro
+        self.total_weight += weight
+        slot = self.slots.get(url)
+        if slot is None:
+            slot = self._monitor(url)
+        self.weights[slot] += weight
+        self.counts[slot] += 1
+        self.response_time_sums[slot] += response_time_micro
+
+    def _monitor(self, url: str) -> int:
+        """Return slot for a new url: a free one or the slot of the url with the minimal weight."""
+        if len(self.urls) < self.capacity:
+            slot = len(self.urls)
+            self.urls.append(url)
+            for column in (self.weights, self.errors, self.counts, self.response_time_sums):
+                column.append(0)
+            heappush(self._heap, (0, slot))
+        else:
+            weight, slot = self._heap[0]
+            while weight != self.weights[slot]:  # Refresh the increased weight.
+                heapreplace(self._heap, (self.weights[slot], slot))
+                weight, slot = self._heap[0]
+            del self.slots[self.urls[slot]]
+            self.urls[slot] = url
+            self.errors[slot] = weight
+            self.counts[slot] = 0
+            self.response_time_sums[slot] = 0
+        self.slots[url] = slot
+        return slot
+
+    def get_min_weight(self) -> int:
+        """Return the maximal true weight of not monitored urls (0 until all slots are used)."""
+        return min(self.weights) if len(self.urls) == self.capacity else 0
+
+    def merge(self, other: 'HeavyHitters') -> None:
+        """
+        Add statistics of other table (e.g. of another part of the log), the same bounds hold for the result.
+
+        A url not monitored by a table gets the minimal weight of that table as both weight and error.
+        The urls of the largest weights are kept (ties in order of first occurrence).
+        """
+        if other.top_by != self.top_by:
+            raise Exception('Can not merge heavy hitters of different weights.')
+        min_weight = self.get_min_weight()
+        other_min_weight = other.get_min_weight()
+        merged: dict[str, list[int]] = {}
+        for slot, url in enumerate(self.urls):
+            merged[url] = [
+                self.weights[slot] + other_min_weight,
+                self.errors[slot] + other_min_weight,
+                self.counts[slot],
+                self.response_time_sums[slot],
+            ]
+        for slot, url in enumerate(other.urls):
+            values = merged.get(url)
+            if values is None:
+                merged[url] = [
+                    min_weight + other.weights[slot],
+                    min_weight + other.errors[slot],
+                    other.counts[slot],
+                    other.response_time_sums[slot],
+                ]
+            else:
+                values[0] += other.weights[slot] - other_min_weight
+                values[1] += other.errors[slot] - other_min_weight
+                values[2] += other.counts[slot]
+                values[3] += other.response_time_sums[slot]
+
+        kept = sorted(merged.items(), key=lambda item: -item[1][0])[: self.capacity]
+        kept.sort(key=lambda item: self.slots.get(item[0], self.capacity + other.slots.get(item[0], 0)))
+        self.total_weight += other.total_weight
+        self.urls = [url for url, _ in kept]
+        self.slots = {url: slot for slot, url in enumerate(self.urls)}
+        self.weights, self.errors, self.counts, self.response_time_sums = (
+            array('q', [values[index] for _, values in kept]) for index in range(4)
+        )
+        self._heap = [(weight, slot) for slot, weight in enumerate(self.weights)]
+        heapify(self._heap)
+
+    def get_top_slots(self, top: int) -> list[int]:
+        """Return slots of top urls ordered by '-weight' (ties by slot)."""
+        weights = self.weights
+        return sorted(range(len(self.urls)), key=lambda slot: -weights[slot])[:top]
+
+    def get_format_for_tabulate(self, top: int) -> list[list[str | int | float]]:
+        """
+        Generate data format: [[...], [...]].
+
+        Row of every top url: url, weight, its maximal error (seconds for response time),
+        average response time since monitored. Order by '-weight'.
+        """
+        rows: list[list[str | int | float]] = []
+        for slot in self.get_top_slots(top):
+            weight: int | float = self.weights[slot]
+            error: int | float = self.errors[slot]
+            if self.top_by != TOP_BY_COUNT_NAME:
+                weight, error = round(weight / 1_000_000, 3), round(error / 1_000_000, 3)
+            count = self.counts[slot]
+            average = round(self.response_time_sums[slot] / count / 1_000_000, 3) if count else 0.0
+            rows.append([self.urls[slot], weight, error, average])
+        return rows
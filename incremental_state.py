@@ -0,0 +1,146 @@
+"""Persisted state of incremental runs (--state)."""
+
+import base64
+import hashlib
+import json
+import os
+from typing import Any, BinaryIO, Self
+
+from compressed_input import detect_compression
+from config import STATE_FINGERPRINT_SIZE
+from endpoint_stats import EndpointStatsMap
+
+STATE_VERSION = 2
+# Block size for searching the last line ending from the end of a file.
+LINE_END_SEARCH_BLOCK_SIZE = 64 * 1024
+
+
+def get_complete_lines_end(opened_file: BinaryIO, start: int, end: int) -> int:
+    """Return position after the last line ending in byte range [start, end), start if there is no one."""
+    position = end
+    while position > start:
+        block_start = max(start, position - LINE_END_SEARCH_BLOCK_SIZE)
+        opened_file.seek(block_start)
+        line_end = opened_file.read(position - block_start).rfind(b'\n')
+        if line_end != -1:
+            return block_start + line_end + 1
+        position = block_start
+    return start
+
+
+def get_fingerprint(opened_file: BinaryIO, size: int) -> str:
+    """Return hash of the first size bytes of file."""
+    opened_file.seek(0)
+    return hashlib.blake2b(opened_file.read(size), digest_size=16).hexdigest()
+
+
+def get_resume_offset(opened_file: BinaryIO, file_state: dict[str, Any] | None, size: int) -> int:
+    """Return saved offset of file, 0 if it is a new, truncated or replaced file."""
+    if file_state is None or size < file_state['offset']:
+        return 0
+    if get_fingerprint(opened_file, file_state['fingerprint_size']) != file_state['fingerprint']:
+        return 0
+    return file_state['offset']
+
+
+class IncrementalState:
+    """
+    Endpoint statistics of already parsed lines and positions of parsed files.
+
+    Files are identified by device and inode, so a rotated (renamed) file given in --file under its new
+    name is resumed from its saved offset. A file is parsed from the beginning when its inode is unknown,
+    it became smaller than the saved offset (truncation) or its first bytes changed (replaced file with
+    a reused inode). A line without line ending is not parsed until it is completed.
+    Statistics are kept by normalized urls and time buckets, so the state is resumed only with the same
+    url rules and time bucket (see load()).
+    """
+
+    def __init__(self) -> None:
+        """
+        Set up initial values.
+
+        self.endpoint_requests - statistics of all parsed lines (EndpointStatsMap)
+        self.files - file id ('device:inode'): {'path', 'offset', 'size', 'fingerprint_size', 'fingerprint'}
+        self.url_rules - url rules of the statistics (see LogAggregator), None without them
+        self.time_bucket - seconds of time series buckets of the statistics, None without time series
+        """
+        self.endpoint_requests = EndpointStatsMap()
+        self.files: dict[str, dict[str, Any]] = {}
+        self.url_rules: list[str] | None = None
+        self.time_bucket: int | None = None
+
+    @classmethod
+    def load(cls, state_file: str, url_rules: list[str] | None = None, time_bucket: int | None = None) -> Self:
+        """
+        Load state saved by save(), empty state with the given settings if state_file does not exist.
+
+        A state saved with other url rules or time bucket raises: its statistics can not be continued.
+        """
+        state = cls()
+        state.url_rules, state.time_bucket = url_rules, time_bucket
+        if not os.path.exists(state_file):
+            return state
+
+        with open(state_file) as opened_file:
+            data = json.load(opened_file)
+        if data.get('version') != STATE_VERSION:
+            raise Exception(f'Unknown format of state file "{state_file}".')
+        if data['url_rules'] != url_rules or data['time_bucket'] != time_bucket:
+            raise Exception(
+                f'State file "{state_file}" is saved with url rules {data["url_rules"]} and time bucket '
+                f'{data["time_bucket"]}, not {url_rules} and {time_bucket}: use the same ones or another state file.'
+            )
+        state.files = data['files']
+        state.endpoint_requests = EndpointStatsMap.from_bytes(base64.b64decode(data['endpoint_requests']))
+        return state
+
+    def save(self, state_file: str) -> None:
+        """Save state atomically (a crash leaves the previous state file)."""
+        data = {
+            'version': STATE_VERSION,
+            'files': self.files,
+            'url_rules': self.url_rules,
+            'time_bucket': self.time_bucket,
+            'endpoint_requests': base64.b64encode(self.endpoint_requests.to_bytes()).decode(),
+        }
+        temporary_file = f'{state_file}.tmp'
+        with open(temporary_file, 'w') as opened_file:
+            json.dump(data, opened_file)
+        os.replace(temporary_file, state_file)
+
+    def get_new_ranges(self, files: list[str]) -> list[tuple[str, int, int | None]]:
+        """
+        Return byte ranges (file, start, end) of complete lines added since the last run.
+
+        A compressed file is returned as a whole (file, 0, None) once: rotated compressed logs are not appended.
+        Positions of files are updated (see self.files), files not given are forgotten.
+        """
+        file_ranges: list[tuple[str, int, int | None]] = []
+        files_states: dict[str, dict[str, Any]] = {}
+        for file in files:
+            with open(file, 'rb') as opened_file:
+                file_stat = os.fstat(opened_file.fileno())
+                file_id = f'{file_stat.st_dev}:{file_stat.st_ino}'
+                if file_id in files_states:  # The same file given twice.
+                    continue
+
+                start = get_resume_offset(opened_file, self.files.get(file_id), file_stat.st_size)
+                compressed = detect_compression(opened_file) is not None
+                if compressed:
+                    end = file_stat.st_size if start == 0 else start
+                else:
+                    end = get_complete_lines_end(opened_file, start, file_stat.st_size)
+                fingerprint_size = min(end, STATE_FINGERPRINT_SIZE)
+                files_states[file_id] = {
+                    'path': file,
+                    'offset': end,
+                    'size': file_stat.st_size,
+                    'fingerprint_size': fingerprint_size,
+                    'fingerprint': get_fingerprint(opened_file, fingerprint_size),
+                }
+
+            if start < end:
+                file_ranges.append((file, 0, None) if compressed else (file, start, end))
+
+        self.files = files_states
+        return file_ranges
@@ -0,0 +1,121 @@
+"""Module with LineDecoder."""
+
+import json
+import math
+import re
+from typing import Any, Callable
+
+# Fast path is used only for complete objects (a truncated line goes to json.loads and fails there).
+LINE_ENDINGS = (b'}\n', b'}', b'}\r\n', b'}\r')
+# Exceptions of a bad line: invalid JSON or encoding, missing field, value of a wrong type or out of range.
+LINE_ERRORS = (ValueError, KeyError, TypeError, OverflowError)
+# Number of JSON (int(bytes) and float(bytes) also take '1_0', '+1', ' 1', 'nan', 'inf'...).
+JSON_NUMBER = re.compile(rb'-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][+-]?[0-9]+)?')
+# Response times in integer microseconds must fit int64 columns of groups, top endpoints and time series.
+MAX_MICROSECOND_RESPONSE_TIME = (2**63 - 1) // 1_000_000
+
+
+def microsecond_float(value: Any) -> float:
+    """Return value as float (type of response times summed in int64 microseconds), OverflowError if out of range."""
+    number = float(value)
+    if not -MAX_MICROSECOND_RESPONSE_TIME <= number <= MAX_MICROSECOND_RESPONSE_TIME:
+        raise OverflowError(f'Response time {number!r} is out of range of microsecond sums.')
+    return number
+
+
+def convert_value(value: Any, value_type: Callable[[Any], Any]) -> Any:
+    """
+    Return value decoded by json.loads as the field type.
+
+    Strings must be strings (not numbers or null, TypeError otherwise), numbers must be finite numbers
+    (not null or strings, TypeError otherwise; not NaN, Infinity or out of float range, ValueError otherwise),
+    so a bad value fails at decoding and not later in buffered statistics.
+    """
+    if value_type is str or value_type is bytes:
+        if not isinstance(value, str):
+            raise TypeError(f'String is expected, got {value!r}.')
+        return value
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise TypeError(f'Number is expected, got {value!r}.')
+    if not math.isfinite(value):
+        raise ValueError(f'Finite number is expected, got {value!r}.')
+    return value_type(value)
+
+
+class LineDecoder:
+    """
+    Decode only the needed fields of a JSON log line.
+
+    Fast path: every field is found by its key in the raw bytes and only its value is converted
+    (the known log schema is a flat object written by json.dumps).
+    Lines which can not be handled by the fast path (escaped strings, missing fields, unexpected
+    value formats, not a complete object) are decoded by json.loads. A bad line raises one of LINE_ERRORS.
+    """
+
+    def __init__(self, fields: dict[str, Callable[[bytes], Any]]):
+        """
+        Set up initial values.
+
+        fields - field name: type of value (str, int or float; bytes - raw string value without decoding,
+        but json.loads fallback gives str)
+        self.field_names - names of decoded fields (order of decode() result)
+        """
+        self.field_names = tuple(fields)
+        keys = [f'"{name}":'.encode() for name in fields]
+        self._fields = tuple((key, len(key), value_type) for key, value_type in zip(keys, fields.values()))
+
+    def decode(self, line: bytes | str) -> tuple[Any, ...]:
+        """Return values of the fields (see self.field_names) from line."""
+        if isinstance(line, str):
+            line = line.encode()
+        values = self.scan(line)
+        if values is None:
+            request_data = json.loads(line)
+            values = tuple(
+                convert_value(request_data[name], value_type)
+                for name, (_, _, value_type) in zip(self.field_names, self._fields)
+            )
+        return values
+
+    def scan(self, line: bytes) -> tuple[Any, ...] | None:
+        """
+        Return values of the fields found by key scanning, None if the line needs json.loads.
+
+        Without escapes every '"' in a valid line is a string boundary, so '"url":' can only be the key.
+        The last occurrence of a key is used, as json.loads keeps the last duplicate key.
+        """
+        if 92 in line or line[:1] != b'{' or not line.endswith(LINE_ENDINGS):  # 92 - '\\'
+            return None
+
+        values = []
+        for key, key_length, value_type in self._fields:
+            start = line.rfind(key)
+            if start == -1:
+                return None
+            start += key_length
+            if line[start] == 32:  # ' ' (json.dumps separator).
+                start += 1
+
+            if value_type is str or value_type is bytes:
+                if line[start] != 34:  # '"'
+                    return None
+                start += 1
+                end = line.find(b'"', start)
+                if end == -1:
+                    return None
+                values.append(line[start:end] if value_type is bytes else line[start:end].decode())
+            else:
+                end = line.find(b',', start)
+                if end == -1:
+                    end = line.find(b'}', start)
+                if JSON_NUMBER.fullmatch(line, start, end) is None:
+                    return None
+                try:
+                    value = value_type(line[start:end])
+                except ValueError:  # int of a fraction or exponent.
+                    return None
+                if not math.isfinite(value):  # Out of float range, e.g. 1e400.
+                    return None
+                values.append(value)
+
+        return tuple(values)
@@ -0,0 +1,193 @@
+"""Filters of log lines (--since, --until, --status, --method, --url-prefix) with cheap checks before decoding."""
+
+import os
+from datetime import datetime, timezone
+from itertools import product
+from typing import Any, BinaryIO, Callable, Iterable, Iterator
+
+from compressed_input import detect_compression
+from config import STATUS_PATTERN_LENGTH, STATUS_WILDCARD
+from line_decoder import LINE_ERRORS, LineDecoder
+from timestamp_parser import TimestampParser
+
+
+def parse_time(value: str) -> int:
+    """Return epoch seconds of ISO 8601 date or time: 2024-01-01, 2024-01-01T10:00:00+03:00 (UTC by default)."""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f'Invalid time "{value}", use ISO 8601 e.g. 2024-01-01T10:00:00+00:00.') from None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() // 1)
+
+
+def parse_statuses(value: str) -> list[str]:
+    """Return status patterns of comma-separated value: '500,502', '5xx', '40x'."""
+    patterns = [pattern.strip().lower() for pattern in value.split(',')]
+    if not all(
+        len(pattern) == STATUS_PATTERN_LENGTH and all(char.isdigit() or char == STATUS_WILDCARD for char in pattern)
+        for pattern in patterns
+    ):
+        raise ValueError(f'Invalid status "{value}", use e.g. 500,502 or 5xx.')
+    return patterns
+
+
+def parse_methods(value: str) -> list[str]:
+    """Return request methods of comma-separated value: 'GET,POST'."""
+    methods = [method.strip().upper() for method in value.split(',')]
+    if not all(method.isalpha() for method in methods):
+        raise ValueError(f'Invalid method "{value}", use e.g. GET,POST.')
+    return methods
+
+
+def expand_status_patterns(patterns: list[str]) -> frozenset[int]:
+    """Return all statuses matched by patterns (STATUS_WILDCARD matches any digit)."""
+    return frozenset(
+        int(''.join(digits))
+        for pattern in patterns
+        for digits in product(*('0123456789' if char == STATUS_WILDCARD else char for char in pattern))
+    )
+
+
+class LineFilter:
+    """
+    Predicates over log lines: time range [since, until) by '@timestamp', statuses, request methods, url prefixes.
+
+    Predicates are checked from the cheapest one. A line without escapes which does not contain
+    any of the wanted raw values ('"GET"', '"/api/...') is rejected without decoding, then only
+    the filtered fields are decoded (see LineDecoder). A line without a filtered field does not match.
+    Url prefixes are matched against raw urls (before url rules).
+    With sorted_by_time (lines of files are ordered by '@timestamp') the time range is also found
+    in files by binary search over byte offsets (see find_byte_range()), so regions outside it are not read.
+    """
+
+    def __init__(
+        self,
+        since: int | None = None,
+        until: int | None = None,
+        statuses: list[str] | None = None,
+        methods: list[str] | None = None,
+        url_prefixes: list[str] | None = None,
+        sorted_by_time: bool = False,
+    ):
+        """
+        Set up initial values.
+
+        since, until - epoch seconds of the time range [since, until), None if it is not limited
+        statuses - status patterns (see parse_statuses), methods - request methods, url_prefixes - prefixes of urls
+        self.status_values - statuses matched by the patterns
+        self.needles - for every predicate on strings: raw values one of which a matching line contains
+        self.decoder - decoder of the filtered fields
+        """
+        self.since = since
+        self.until = until
+        self.statuses = statuses
+        self.methods = methods
+        self.url_prefixes = url_prefixes
+        self.sorted_by_time = sorted_by_time
+        self.status_values = None if statuses is None else expand_status_patterns(statuses)
+        self.needles: list[tuple[bytes, ...]] = []
+        fields: dict[str, Callable[[bytes], Any]] = {}
+        if self.has_time_range():
+            fields['@timestamp'] = bytes
+        if statuses is not None:
+            fields['status'] = int
+        if methods is not None:
+            fields['request_method'] = str
+            self.needles.append(tuple(f'"{method}"'.encode() for method in methods))
+        if url_prefixes is not None:
+            fields['url'] = str
+            self.needles.append(tuple(f'"{prefix}'.encode() for prefix in url_prefixes))
+        self.decoder = LineDecoder(fields)
+        self.timestamp_parser = TimestampParser()
+
+    def has_time_range(self) -> bool:
+        """Return True if the time range is limited."""
+        return self.since is not None or self.until is not None
+
+    def has_only_time_range(self) -> bool:
+        """Return True if only the time range is filtered (statistics of an index can be used, see SegmentIndex)."""
+        return self.statuses is None and self.methods is None and self.url_prefixes is None
+
+    def is_in_time_range(self, seconds: int) -> bool:
+        """Return True if epoch seconds are in the time range."""
+        return (self.since is None or seconds >= self.since) and (self.until is None or seconds < self.until)
+
+    def matches(self, line: bytes | str) -> bool:
+        """Return True if the line matches all predicates."""
+        if isinstance(line, str):
+            line = line.encode()
+        if 92 not in line:  # 92 - '\\', values of a line with escapes may differ from raw bytes.
+            for needles in self.needles:
+                if not any(needle in line for needle in needles):
+                    return False
+        try:
+            values = iter(self.decoder.decode(line))
+        except (KeyError, TypeError):  # A filtered field is missing or is not a number (see LineDecoder).
+            return False
+
+        if self.has_time_range() and not self.is_in_time_range(self.timestamp_parser.parse(next(values))):
+            return False
+        if self.status_values is not None and next(values) not in self.status_values:
+            return False
+        if self.methods is not None and next(values) not in self.methods:
+            return False
+        if self.url_prefixes is not None and not next(values).startswith(tuple(self.url_prefixes)):
+            return False
+        return True
+
+    def filter_lines(self, lines: Iterable[str | bytes]) -> Iterator[str | bytes]:
+        """Yield lines matching all predicates."""
+        matches = self.matches
+        return (line for line in lines if matches(line))
+
+    def get_line_time(self, line: bytes) -> int | None:
+        """Return epoch seconds of the line, None if it has no valid '@timestamp'."""
+        try:
+            return self.timestamp_parser.parse(self.decoder.decode(line)[0])
+        except LINE_ERRORS:
+            return None
+
+    def find_time_offset(
+        self, opened_file: BinaryIO, seconds: int, start: int, end: int, unknown_is_earlier: bool
+    ) -> int:
+        """
+        Return offset of the first line in [start, end) with time not less than seconds, end if there is none.
+
+        Lines must be sorted by time, start must be the beginning of a line. A line without timestamp
+        is taken as earlier or later than seconds (unknown_is_earlier) so that such lines stay in the range.
+        """
+        low, high = start, end  # Lines before low are earlier, lines from high are not.
+        while low < high:
+            middle = (low + high) // 2
+            if middle > start:
+                opened_file.seek(middle - 1)
+                opened_file.readline()  # Move to the beginning of the next line.
+            else:
+                opened_file.seek(middle)
+            position = opened_file.tell()
+            if position >= high:  # No line starts in [middle, high).
+                high = middle
+                continue
+            line = opened_file.readline()
+            line_time = self.get_line_time(line.rstrip(b'\r\n'))
+            if unknown_is_earlier if line_time is None else line_time < seconds:
+                low = position + len(line)
+            else:
+                high = position
+        return low
+
+    def find_byte_range(self, opened_file: BinaryIO, start: int = 0, end: int | None = None) -> tuple[int, int]:
+        """Return byte range of lines in the time range within [start, end) of the file sorted by time."""
+        if end is None:
+            end = os.fstat(opened_file.fileno()).st_size
+        if self.since is not None:
+            start = self.find_time_offset(opened_file, self.since, start, end, unknown_is_earlier=False)
+        if self.until is not None:
+            end = self.find_time_offset(opened_file, self.until, start, end, unknown_is_earlier=True)
+        return start, end
+
+    def can_skip_ranges(self, opened_file: BinaryIO) -> bool:
+        """Return True if regions of the file outside the time range can be skipped (see find_byte_range())."""
+        return self.sorted_by_time and self.has_time_range() and detect_compression(opened_file) is None
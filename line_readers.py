@@ -0,0 +1,115 @@
+"""Readers of log lines from binary files (--io)."""
+
+import mmap
+import os
+from itertools import chain
+from typing import BinaryIO, Iterable, Iterator
+
+from compressed_input import detect_compression, iter_decompressed_chunks, iter_prefetched
+from config import DEFAULT_IO_MODE, IO_CHUNK_SIZE, IO_CHUNKED_NAME, IO_MMAP_NAME, IO_TEXT_NAME
+
+
+def split_chunks(chunks: Iterable[bytes]) -> Iterator[list[bytes]]:
+    """
+    Split consecutive chunks of a file into batches of lines (without line endings).
+
+    A line cut by the end of a chunk is completed by the next chunk.
+    """
+    tail = b''
+    for chunk in chunks:
+        lines = chunk.split(b'\n')
+        lines[0] = tail + lines[0]
+        tail = lines.pop()
+        if lines:
+            yield lines
+    if tail:
+        yield [tail]
+
+
+def get_range_end(opened_file: BinaryIO, end: int | None) -> int:
+    """Return end of the byte range limited by the file size."""
+    file_size = os.fstat(opened_file.fileno()).st_size
+    return file_size if end is None else min(end, file_size)
+
+
+def iter_text_lines(opened_file: BinaryIO, start: int = 0, end: int | None = None) -> Iterator[str]:
+    """Read lines one by one with readline() and decode them to str (as a file opened in text mode)."""
+    opened_file.seek(start)
+    remaining = get_range_end(opened_file, end) - start
+    while remaining > 0:
+        line = opened_file.readline()
+        if line == b'':
+            break
+        remaining -= len(line)
+        yield line.decode()
+
+
+def iter_chunked_line_batches(
+    opened_file: BinaryIO, start: int = 0, end: int | None = None, chunk_size: int = IO_CHUNK_SIZE
+) -> Iterator[list[bytes]]:
+    """Read byte range [start, end) by large chunks and split them into batches of lines."""
+    opened_file.seek(start)
+    remaining = get_range_end(opened_file, end) - start
+
+    def iter_chunks() -> Iterator[bytes]:
+        nonlocal remaining
+        while remaining > 0:
+            chunk = opened_file.read(min(chunk_size, remaining))
+            if chunk == b'':
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    return split_chunks(iter_chunks())
+
+
+def iter_mmap_line_batches(
+    opened_file: BinaryIO, start: int = 0, end: int | None = None, chunk_size: int = IO_CHUNK_SIZE
+) -> Iterator[list[bytes]]:
+    """Map the file into memory and split byte range [start, end) into batches of lines by windows."""
+    end = get_range_end(opened_file, end)
+    if start >= end:  # Empty file can not be mapped.
+        return
+
+    with mmap.mmap(opened_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        if hasattr(mapped_file, 'madvise'):
+            mapped_file.madvise(mmap.MADV_SEQUENTIAL)
+
+        def iter_windows() -> Iterator[bytes]:
+            for position in range(start, end, chunk_size):
+                window_end = min(position + chunk_size, end)
+                yield mapped_file[position:window_end]
+
+        yield from split_chunks(iter_windows())
+
+
+def iter_decompressed_line_batches(opened_file: BinaryIO, compression: str) -> Iterator[list[bytes]]:
+    """Decompress the file in a background thread and split decompressed chunks into batches of lines."""
+    return split_chunks(iter_prefetched(iter_decompressed_chunks(opened_file, compression)))
+
+
+def iter_lines(
+    opened_file: BinaryIO, io_mode: str = DEFAULT_IO_MODE, start: int = 0, end: int | None = None
+) -> Iterator[str] | Iterator[bytes]:
+    """
+    Return lines of byte range [start, end) of the file opened in binary mode.
+
+    io_mode:
+    IO_TEXT_NAME - readline() per line, lines decoded to str
+    IO_CHUNKED_NAME - large read() calls, bytes lines split in one pass over every chunk
+    IO_MMAP_NAME - memory-mapped file, bytes lines split in one pass over every window
+    A compressed file (read as a whole: start=0, end=None) is decompressed in a background thread
+    whatever io_mode is, bytes lines are split as for IO_CHUNKED_NAME.
+    """
+    if start == 0 and end is None:
+        compression = detect_compression(opened_file)
+        if compression is not None:
+            return chain.from_iterable(iter_decompressed_line_batches(opened_file, compression))
+
+    if io_mode == IO_TEXT_NAME:
+        return iter_text_lines(opened_file, start, end)
+    elif io_mode == IO_CHUNKED_NAME:
+        return chain.from_iterable(iter_chunked_line_batches(opened_file, start, end))
+    elif io_mode == IO_MMAP_NAME:
+        return chain.from_iterable(iter_mmap_line_batches(opened_file, start, end))
+    raise Exception(f'No action specified for parameter "--io {io_mode}" in "iter_lines(opened_file, io_mode)".')
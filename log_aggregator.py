@@ -0,0 +1,481 @@
+"""Module with LogAggregator."""
+
+import heapq
+import json
+from itertools import islice
+from operator import itemgetter
+from typing import Any, Callable, Iterable, Iterator
+
+from config import (
+    AVERAGE_HEADERS,
+    AVERAGE_REPORT_NAME,
+    BUCKET_COLUMN_NAME,
+    DEFAULT_METRICS,
+    GROUPBY_REPORT_NAME,
+    NUMPY_BACKEND_NAME,
+    PERCENTILES_HEADERS,
+    PERCENTILES_REPORT_NAME,
+    PYTHON_BACKEND_NAME,
+    REQUESTS_TOTAL_COLUMN_NAME,
+    SPREAD_HEADERS,
+    SPREAD_REPORT_NAME,
+    TIMESERIES_HEADERS,
+    TIMESERIES_REPORT_NAME,
+    TOP_BY_COUNT_HEADERS,
+    TOP_BY_COUNT_NAME,
+    TOP_BY_TIME_HEADERS,
+)
+from endpoint_stats import EndpointStatsMap
+from group_by import GroupKey, GroupTable, get_field_types, parse_metrics
+from heavy_hitters import HeavyHitters, get_top_capacity
+from line_decoder import LINE_ERRORS, LineDecoder, microsecond_float
+from line_filter import LineFilter
+from numpy_backend import aggregate_batch, decode_batch, feed_lines_batched, numpy
+from tabulate import tabulate
+from timestamp_parser import TimestampParser
+from url_normalizer import UrlNormalizer
+
+# Reports with a row of every endpoint (see LogAggregator.iter_format_for_table()).
+ENDPOINT_REPORT_HEADERS = {
+    AVERAGE_REPORT_NAME: AVERAGE_HEADERS,
+    PERCENTILES_REPORT_NAME: PERCENTILES_HEADERS,
+    SPREAD_REPORT_NAME: SPREAD_HEADERS,
+}
+
+
+class LogAggregator:
+    """
+    Aggregate log records into endpoint statistics and build reports.
+
+    Every object owns its endpoint table, so several aggregations may run in one process.
+    """
+
+    def __init__(
+        self,
+        time_bucket: int | None = None,
+        url_rules: list[str] | None = None,
+        group_by: list[str] | None = None,
+        metrics: list[str] | None = None,
+        backend: str | None = None,
+        top: int | None = None,
+        top_by: str = TOP_BY_COUNT_NAME,
+        line_filter: LineFilter | None = None,
+    ) -> None:
+        """
+        Set up initial values.
+
+        self.endpoint_requests - statistics for all endpoints (EndpointStatsMap)
+        self.time_bucket - size of time bucket in seconds, None if statistics by time are not collected
+        self.url_rules - rules of url normalization (see UrlNormalizer), None if raw urls are handlers
+        self.group_by - dimensions of the groupby report, None if records are not grouped
+        self.metrics - columns of the groupby report (see group_by.METRICS)
+        self.backend - aggregation of lines by feed_lines(): NUMPY_BACKEND_NAME (batches of array operations,
+        default if numpy is installed) or PYTHON_BACKEND_NAME (line by line), results are the same
+        self.top - number of reported endpoints, None if all endpoints are collected
+        self.top_by - weight of top endpoints: TOP_BY_COUNT_NAME or TOP_BY_TIME_NAME
+        self.line_filter - predicates of lines added by feed_lines(), None if all lines are added
+        self.heavy_hitters - top endpoints in bounded memory (records go only there if top is given)
+        self.group_table - statistics by groups (records go only there if group_by is given)
+        self.decoder - decoder of the fields used by feed_lines()
+        self.timestamp_parser - converter of '@timestamp' values to epoch seconds
+        self.normalize_url - raw url to handler name function, None without url rules
+        """
+        self.endpoint_requests = EndpointStatsMap()
+        self.time_bucket = time_bucket
+        self.url_rules = url_rules
+        self.group_by = group_by
+        self.metrics = metrics if metrics is not None else parse_metrics(DEFAULT_METRICS)
+        self.group_table = None if group_by is None else GroupTable(group_by)
+        if backend is None:
+            backend = PYTHON_BACKEND_NAME if numpy is None else NUMPY_BACKEND_NAME
+        elif backend not in (PYTHON_BACKEND_NAME, NUMPY_BACKEND_NAME):
+            raise Exception(f'Unknown aggregation backend "{backend}".')
+        elif backend == NUMPY_BACKEND_NAME and numpy is None:
+            raise Exception('Install "numpy" package to use numpy aggregation backend.')
+        self.backend = backend
+        self.top = top
+        self.top_by = top_by
+        self.line_filter = line_filter
+        self.heavy_hitters = None if top is None else HeavyHitters(get_top_capacity(top), top_by)
+        if group_by is not None:
+            self.decoder = LineDecoder(get_field_types(group_by))
+        elif time_bucket is None:
+            # Top endpoints sum response times in integer microseconds (see microsecond_float).
+            self.decoder = LineDecoder({'url': str, 'response_time': float if top is None else microsecond_float})
+        else:
+            self.decoder = LineDecoder({'url': str, 'response_time': microsecond_float, '@timestamp': bytes})
+        self.timestamp_parser = TimestampParser()
+        self.normalize_url = None if url_rules is None else UrlNormalizer(url_rules).normalize
+        self.get_group_key = self._create_group_key_getter()
+
+    def _create_group_key_getter(self) -> Callable[[tuple[Any, ...]], GroupKey]:
+        """Return function of decoded values (see self.decoder) to group key (normalized url if any)."""
+        if self.group_by is None:
+            return tuple
+        indices = [self.decoder.field_names.index(name) for name in self.group_by]
+        normalize_url = self.normalize_url
+        if normalize_url is not None and 'url' in self.group_by:
+            url_index = self.decoder.field_names.index('url')
+            return lambda values: tuple(normalize_url(values[i]) if i == url_index else values[i] for i in indices)
+        if len(indices) == 1:
+            index = indices[0]
+            return lambda values: (values[index],)
+        return itemgetter(*indices)
+
+    def get_result(self) -> EndpointStatsMap | GroupTable | HeavyHitters:
+        """Return collected statistics: the group table, top endpoints (if they are collected) or the endpoint map."""
+        if self.group_table is not None:
+            return self.group_table
+        if self.heavy_hitters is not None:
+            return self.heavy_hitters
+        return self.endpoint_requests
+
+    def copy_settings(self) -> 'LogAggregator':
+        """Return a new empty aggregator with the same settings (e.g. for a partial result or a snapshot)."""
+        return LogAggregator(
+            self.time_bucket,
+            self.url_rules,
+            self.group_by,
+            self.metrics,
+            self.backend,
+            self.top,
+            self.top_by,
+            self.line_filter,
+        )
+
+    def clear(self) -> None:
+        """Drop collected statistics, settings and caches (decoder, url rules, timestamps) are kept."""
+        self.endpoint_requests = EndpointStatsMap()
+        if self.group_by is not None:
+            self.group_table = GroupTable(self.group_by)
+        if self.top is not None:
+            self.heavy_hitters = HeavyHitters(get_top_capacity(self.top), self.top_by)
+
+    def iter_records(self, lines: Iterable[str | bytes]) -> Iterator[dict[str, Any]]:
+        """Decode log lines (an opened file or any iterable of lines) into records."""
+        for line in lines:
+            yield json.loads(line)
+
+    def add_record(self, request_data: dict[str, Any]) -> None:
+        """Add/create endpoint info in self.endpoint_requests (or add the record to group table or top endpoints)."""
+        if self.group_table is not None:
+            values = tuple(request_data[name] for name in self.decoder.field_names)
+            self.group_table.add(self.get_group_key(values), values[0], values[1])
+            return
+
+        url = request_data['url'] if self.normalize_url is None else self.normalize_url(request_data['url'])
+        if self.heavy_hitters is not None:
+            self.heavy_hitters.add(url, request_data['response_time'])
+            return
+        if self.time_bucket is None:
+            self.endpoint_requests.add(url, request_data['response_time'])
+            return
+
+        seconds = self.timestamp_parser.parse(request_data['@timestamp'])
+        slot = self.endpoint_requests.add(url, request_data['response_time'])
+        self.endpoint_requests.get_time_series(slot, self.time_bucket).add(seconds, request_data['response_time'])
+
+    def feed(self, records: Iterable[dict[str, Any]]) -> None:
+        """Add all records."""
+        for request_data in records:
+            self.add_record(request_data)
+
+    def feed_lines(self, lines: Iterable[str | bytes]) -> None:
+        """
+        Add all log lines (an opened file or any iterable of lines).
+
+        Same result as feed(iter_records(lines)), but only 'url' and 'response_time'
+        (and '@timestamp' for time series) are decoded. Urls are normalized if there are url rules.
+        Endpoint statistics without time series are aggregated by batches with the numpy backend.
+        Lines not matching self.line_filter are skipped.
+        """
+        if self.line_filter is not None:
+            lines = self.line_filter.filter_lines(lines)
+        if self.group_table is not None:
+            self._feed_lines_grouped(lines)
+            return
+        if self.time_bucket is not None:
+            self._feed_lines_with_time(lines)
+            return
+        if self.heavy_hitters is not None:
+            self._feed_lines_top(lines)
+            return
+        if self.backend == NUMPY_BACKEND_NAME:
+            feed_lines_batched(self.endpoint_requests, lines, self.decoder, self.normalize_url)
+            return
+
+        decode = self.decoder.decode
+        normalize_url = self.normalize_url
+        add = self.endpoint_requests.add
+        for line in lines:
+            url, response_time = decode(line)
+            if normalize_url is not None:
+                url = normalize_url(url)
+            add(url, response_time)
+
+    def _feed_lines_with_time(self, lines: Iterable[str | bytes]) -> None:
+        """Add all log lines with their time series (see feed_lines())."""
+        decode = self.decoder.decode
+        parse_timestamp = self.timestamp_parser.parse
+        normalize_url = self.normalize_url
+        add = self.endpoint_requests.add
+        get_time_series = self.endpoint_requests.get_time_series
+        time_bucket: int = self.time_bucket  # type: ignore[assignment]
+        for line in lines:
+            url, response_time, timestamp = decode(line)
+            seconds = parse_timestamp(timestamp)  # Before any change, so a bad line is not added in part.
+            if normalize_url is not None:
+                url = normalize_url(url)
+            get_time_series(add(url, response_time), time_bucket).add(seconds, response_time)
+
+    def _feed_lines_top(self, lines: Iterable[str | bytes]) -> None:
+        """Add all log lines to top endpoints (see feed_lines())."""
+        decode = self.decoder.decode
+        normalize_url = self.normalize_url
+        add = self.heavy_hitters.add  # type: ignore[union-attr]
+        for line in lines:
+            url, response_time = decode(line)
+            add(url if normalize_url is None else normalize_url(url), response_time)
+
+    def _feed_lines_grouped(self, lines: Iterable[str | bytes]) -> None:
+        """Add all log lines to the group table (see feed_lines())."""
+        decode = self.decoder.decode
+        get_group_key = self.get_group_key
+        add = self.group_table.add  # type: ignore[union-attr]
+        for line in lines:
+            values = decode(line)
+            add(get_group_key(values), values[0], values[1])
+
+    def decode_lines(self, lines: list[str | bytes]) -> Any:
+        """
+        Decode a batch of lines for add_decoded(), statistics are not changed.
+
+        feed_lines() split in two steps (e.g. to time decoding and aggregation apart, see RunStats).
+        Everything failing on a bad line (the line filter, fields, timestamps, url rules, group keys)
+        is done here, so add_decoded() adds the whole batch.
+        """
+        if self.line_filter is not None:
+            lines = list(self.line_filter.filter_lines(lines))
+        decode = self.decoder.decode
+        normalize_url = self.normalize_url
+        decoded: list[tuple[Any, ...]] = []
+        if self.group_table is not None:
+            get_group_key = self.get_group_key
+            for line in lines:
+                values = decode(line)
+                key = get_group_key(values)
+                hash(key)
+                decoded.append((key, values[0], values[1]))
+            return decoded
+        if self.time_bucket is not None:
+            parse_timestamp = self.timestamp_parser.parse
+            for line in lines:
+                url, response_time, timestamp = decode(line)
+                seconds = parse_timestamp(timestamp)
+                decoded.append((url if normalize_url is None else normalize_url(url), response_time, seconds))
+            return decoded
+        if self.heavy_hitters is None and self.backend == NUMPY_BACKEND_NAME:
+            if not lines:
+                return None
+            encoded = [line.encode() if isinstance(line, str) else line for line in lines]
+            urls, ids, response_times = decode_batch(encoded, self.decoder)
+            if normalize_url is not None:
+                urls = [normalize_url(url) for url in urls]
+            return urls, ids, response_times
+        for line in lines:
+            url, response_time = decode(line)
+            url = url if normalize_url is None else normalize_url(url)
+            hash(url)
+            decoded.append((url, response_time))
+        return decoded
+
+    def add_decoded(self, decoded: Any) -> None:
+        """Add a batch of lines decoded by decode_lines(), same result as feed_lines() of the lines."""
+        if self.group_table is not None:
+            add_to_group = self.group_table.add
+            for key, response_time, status in decoded:
+                add_to_group(key, response_time, status)
+            return
+        if self.heavy_hitters is not None:
+            add_to_top = self.heavy_hitters.add
+            for url, response_time in decoded:
+                add_to_top(url, response_time)
+            return
+        add = self.endpoint_requests.add
+        if self.time_bucket is not None:
+            get_time_series = self.endpoint_requests.get_time_series
+            time_bucket = self.time_bucket
+            for url, response_time, seconds in decoded:
+                get_time_series(add(url, response_time), time_bucket).add(seconds, response_time)
+            return
+        if self.backend == NUMPY_BACKEND_NAME:
+            if decoded is not None:
+                aggregate_batch(self.endpoint_requests, *decoded)
+            return
+        for url, response_time in decoded:
+            add(url, response_time)
+
+    def is_valid_line(self, line: str | bytes) -> bool:
+        """
+        Return True if feed_lines() adds the line (or skips it by the line filter) without an exception.
+
+        The line is decoded and checked as by feed_lines(), statistics are not changed. Values which
+        adding could not store (strings of other types, response times out of range of microsecond
+        sums) are rejected by the decoder, so a decoded line is added without an exception.
+        """
+        try:
+            if self.line_filter is not None and not self.line_filter.matches(line):
+                return True
+            values = self.decoder.decode(line)
+            if self.group_table is not None:
+                hash(self.get_group_key(values))
+                return True
+            hash(values[0] if self.normalize_url is None else self.normalize_url(values[0]))
+            if self.time_bucket is not None:
+                self.timestamp_parser.parse(values[2])
+        except LINE_ERRORS:
+            return False
+        return True
+
+    def adds_batches_atomically(self) -> bool:
+        """
+        Return True if feed_lines() adds no line of a batch which raises an exception.
+
+        Lines of the numpy backend are decoded before any change (a batch up to NUMPY_BATCH_SIZE lines),
+        the other ways add lines one by one: the lines before a bad one are added.
+        """
+        return (
+            self.backend == NUMPY_BACKEND_NAME
+            and self.group_table is None
+            and self.time_bucket is None
+            and self.heavy_hitters is None
+        )
+
+    def merge(self, partial: EndpointStatsMap | GroupTable | HeavyHitters) -> None:
+        """Add partial statistics (e.g. from another process, file or host), see get_result()."""
+        if isinstance(partial, GroupTable):
+            self.group_table.merge(partial)  # type: ignore[union-attr]
+        elif isinstance(partial, HeavyHitters):
+            self.heavy_hitters.merge(partial)  # type: ignore[union-attr]
+        else:
+            self.endpoint_requests.merge(partial)
+
+    def generate_format_for_table(
+        self, headers: list[str], urls: Iterable[str] | None = None, limit: int | None = None
+    ) -> list[list[str | int | float]]:
+        """
+        Generate data format: [[...], [...]] of endpoint reports (see ENDPOINT_REPORT_HEADERS).
+
+        Determine subsequence in the given headers, the first limit rows if limit is given.
+        Order by '-total', rows are not sorted when the order of urls is given (see EndpointRanking).
+        """
+        return list(self.iter_format_for_table(headers, urls, limit))
+
+    def iter_format_for_table(
+        self, headers: list[str], urls: Iterable[str] | None = None, limit: int | None = None
+    ) -> Iterator[list[str | int | float]]:
+        """Yield rows of generate_format_for_table() one by one (only the urls are ordered beforehand)."""
+        if urls is None:
+            urls = self.get_sorted_urls(limit)
+        elif limit is not None:
+            urls = islice(urls, limit)
+        endpoint_requests = self.endpoint_requests
+        for url in urls:
+            yield endpoint_requests[url].get_correct_format_for_tabulate(headers)
+
+    def get_sorted_urls(self, limit: int | None = None) -> list[str]:
+        """
+        Return urls ordered by '-total' (equal totals in order of first occurrence), the first limit ones if given.
+
+        Slots are ordered by the integer column of totals: partial selection (heapq.nlargest) of limit slots
+        or a stable sort of all of them, both keep the order of equal totals.
+        """
+        endpoint_requests = self.endpoint_requests
+        slots = range(len(endpoint_requests))
+        get_total = endpoint_requests.total_requests.__getitem__
+        if limit is None:
+            ordered_slots = sorted(slots, key=get_total, reverse=True)
+        else:
+            ordered_slots = heapq.nlargest(limit, slots, key=get_total)
+        urls = endpoint_requests.urls
+        return [urls[slot] for slot in ordered_slots]
+
+    def generate_timeseries_format_for_table(self) -> list[list[str | int | float]]:
+        """
+        Generate data format: [[...], [...]].
+
+        Determine subsequence in TIMESERIES_HEADERS, a row for every endpoint and time bucket.
+        Order by time bucket, then by '-total'.
+        """
+        table_data = [
+            row
+            for value in self.endpoint_requests.values()
+            for row in value.get_time_series_format_for_tabulate(TIMESERIES_HEADERS)
+        ]
+        bucket_index = TIMESERIES_HEADERS.index(BUCKET_COLUMN_NAME)
+        total_index = TIMESERIES_HEADERS.index(REQUESTS_TOTAL_COLUMN_NAME)
+        table_data.sort(key=lambda x: (x[bucket_index], -int(x[total_index])))  # int() for mypy.
+        return table_data
+
+    def generate_groupby_format_for_table(self) -> list[list[Any]]:
+        """
+        Generate data format: [[...], [...]].
+
+        Row of every group: values of self.group_by, then of self.metrics. Order by '-count'.
+        """
+        if self.group_table is None:
+            return []
+        return self.group_table.get_format_for_tabulate(self.metrics)
+
+    def generate_top_format_for_table(self) -> list[list[str | int | float]]:
+        """
+        Generate data format: [[...], [...]].
+
+        Determine subsequence in TOP_BY_COUNT_HEADERS (TOP_BY_TIME_HEADERS), self.top rows.
+        Order by '-total' ('-time_total').
+        """
+        if self.heavy_hitters is None or self.top is None:
+            return []
+        return self.heavy_hitters.get_format_for_tabulate(self.top)
+
+    def get_report_data(
+        self, type_report: str, urls: Iterable[str] | None = None, limit: int | None = None
+    ) -> tuple[list[str], list[list[str | int | float]]]:
+        """
+        Return headers and rows of the given type report, rows in the given order of urls if any (not grouped).
+
+        Only the first limit rows are returned if limit is given.
+        With top endpoints the average report is the table of top endpoints.
+        """
+        if type_report == AVERAGE_REPORT_NAME and self.heavy_hitters is not None:
+            headers = TOP_BY_COUNT_HEADERS if self.top_by == TOP_BY_COUNT_NAME else TOP_BY_TIME_HEADERS
+            return headers, self.generate_top_format_for_table()[:limit]
+        elif type_report in ENDPOINT_REPORT_HEADERS:
+            headers = ENDPOINT_REPORT_HEADERS[type_report]
+            return headers, self.generate_format_for_table(headers, urls, limit)
+        elif type_report == TIMESERIES_REPORT_NAME:
+            return TIMESERIES_HEADERS, self.generate_timeseries_format_for_table()[:limit]
+        elif type_report == GROUPBY_REPORT_NAME:
+            return [*(self.group_by or []), *self.metrics], self.generate_groupby_format_for_table()[:limit]
+        raise Exception(
+            f'No action specified for parameter "--report {type_report}" in "LogAggregator.report(type_report)".'
+        )
+
+    def iter_report_data(
+        self, type_report: str, limit: int | None = None
+    ) -> tuple[list[str], Iterable[list[str | int | float]]]:
+        """
+        Return headers and rows of get_report_data() for streamed output (see report_renderer).
+
+        Rows of endpoint reports are formatted one by one while they are written,
+        so the table of all endpoints is never built as a whole.
+        """
+        headers = ENDPOINT_REPORT_HEADERS.get(type_report)
+        if headers is None or self.heavy_hitters is not None:
+            return self.get_report_data(type_report, limit=limit)
+        return headers, self.iter_format_for_table(headers, limit=limit)
+
+    def report(self, type_report: str, urls: Iterable[str] | None = None, limit: int | None = None) -> str:
+        """Create table according to the given type report: headers and rows of get_report_data() by tabulate."""
+        headers, table_data = self.get_report_data(type_report, urls, limit)
+        return tabulate(table_data, headers=headers, showindex='always')
@@ -1,23 +1,72 @@
 """Parse a file with logs."""
 
 import argparse
-import json
-from io import TextIOWrapper
-from typing import Any
+import asyncio
+import os
+import sys
+from typing import BinaryIO, Iterable
 
-from tabulate import tabulate
-
-from config import AVERAGE_HEADERS, AVERAGE_REPORT_NAME, REQUESTS_TOTAL_COLUMN_NAME
-from endpoint_stats import EndpointStats
-
-ALL_ENDPOINT_REQUESTS = {}
+from aggregation_server import parse_server_address, serve
+from async_ingestion import ingest_sources, is_stream_source, parse_tcp_address
+from bad_lines import BadLines, has_incomplete_tail
+from compressed_input import is_compressed
+from config import (
+    AVERAGE_REPORT_NAME,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_GROUP_BY,
+    DEFAULT_IO_MODE,
+    DEFAULT_METRICS,
+    DEFAULT_ON_ERROR,
+    DEFAULT_OUTPUT_FORMAT,
+    DEFAULT_QUARANTINE_FILE,
+    DEFAULT_TIME_BUCKET,
+    DEFAULT_TOP_BY,
+    DEFAULT_WORKERS,
+    FOLLOW_REFRESH_INTERVAL,
+    GROUPBY_REPORT_NAME,
+    INPUT_STAGE_NAME,
+    IO_MODES,
+    ON_ERROR_FAIL_NAME,
+    ON_ERROR_NAMES,
+    OUTPUT_FORMATS,
+    PARTIAL_STDOUT,
+    PERCENTILES_REPORT_NAME,
+    RENDER_STAGE_NAME,
+    SERVER_REPORT_PATH,
+    SERVER_SNAPSHOT_INTERVAL,
+    SPREAD_REPORT_NAME,
+    TCP_SOURCE_PREFIX,
+    TEXT_FORMAT_NAME,
+    TIMESERIES_REPORT_NAME,
+    TOP_BY_NAMES,
+)
+from follow_mode import follow_files
+from group_by import parse_group_by, parse_metrics
+from heavy_hitters import parse_top
+from incremental_state import IncrementalState
+from line_filter import LineFilter, parse_methods, parse_statuses, parse_time
+from line_readers import iter_lines
+from log_aggregator import LogAggregator
+from parallel_parsing import parse_file_ranges_parallel, parse_files_parallel
+from partial_dump import merge_partials, save_partial
+from report_renderer import parse_limit, write_report
+from run_stats import RunStats, measure_stage, run_profiled
+from segment_index import SegmentIndex, can_use_index, get_index_file, load_file_index
+from time_series import parse_bucket_size
+from url_normalizer import load_url_rules
 
 
 def get_command_line_options() -> argparse.Namespace:
     """Return command line options."""
     parser = argparse.ArgumentParser(description='Log file parser.')
     parser.add_argument(
-        '-f', '--file', type=str, nargs='+', required=True, help='File to parse (possibly multiple values).'
+        '-f',
+        '--file',
+        type=str,
+        nargs='+',
+        default=None,
+        help='File to parse (possibly multiple values), also "-" (stdin), unix:PATH and tcp:HOST:PORT sockets. '
+        'Required unless --serve is given.',
     )
     parser.add_argument(
         '-r',
@@ -25,74 +74,566 @@ def get_command_line_options() -> argparse.Namespace:
         type=str,
         choices=[
             AVERAGE_REPORT_NAME,
+            PERCENTILES_REPORT_NAME,
+            SPREAD_REPORT_NAME,
+            TIMESERIES_REPORT_NAME,
+            GROUPBY_REPORT_NAME,
         ],
         default=AVERAGE_REPORT_NAME,
         help=f'Type report (default: {AVERAGE_REPORT_NAME}).',
     )
+    parser.add_argument(
+        '--bucket',
+        type=parse_bucket_size,
+        default=DEFAULT_TIME_BUCKET,
+        help=f'Time bucket of the {TIMESERIES_REPORT_NAME} report: 30s, 1m, 1h, 1d (default: {DEFAULT_TIME_BUCKET}).',
+    )
+    parser.add_argument(
+        '--group-by',
+        type=parse_group_by,
+        default=DEFAULT_GROUP_BY,
+        help=f'Fields of the {GROUPBY_REPORT_NAME} report, e.g. url,status (default: {DEFAULT_GROUP_BY}).',
+    )
+    parser.add_argument(
+        '--metrics',
+        type=parse_metrics,
+        default=DEFAULT_METRICS,
+        help=f'Columns of the {GROUPBY_REPORT_NAME} report: count, sum, mean, min, max, error_rate '
+        f'(default: {DEFAULT_METRICS}).',
+    )
+    parser.add_argument(
+        '--top',
+        type=parse_top,
+        default=None,
+        help=f'Report only K top endpoints of the {AVERAGE_REPORT_NAME} report in bounded memory, with error bounds.',
+    )
+    parser.add_argument(
+        '--top-by',
+        type=str,
+        choices=TOP_BY_NAMES,
+        default=DEFAULT_TOP_BY,
+        help=f'Weight of top endpoints: requests or total response time (default: {DEFAULT_TOP_BY}).',
+    )
+    parser.add_argument(
+        '--format',
+        type=str,
+        choices=OUTPUT_FORMATS,
+        default=DEFAULT_OUTPUT_FORMAT,
+        help=f'Output of the report: tabulate table or rows streamed as CSV, JSON lines or tagged binary values '
+        f'(default: {DEFAULT_OUTPUT_FORMAT}).',
+    )
+    parser.add_argument(
+        '--limit',
+        type=parse_limit,
+        default=None,
+        help='Report only the first N rows (endpoints are selected without sorting all of them).',
+    )
+    parser.add_argument(
+        '--url-rule',
+        type=str,
+        action='append',
+        default=None,
+        help='Rule mapping urls to a handler: template "/api/users/{id}" or "regex => handler" (possibly repeated).',
+    )
+    parser.add_argument(
+        '--url-rules',
+        type=str,
+        default=None,
+        help='File with url rules, one per line. With any rule query strings are dropped and ids in urls collapsed.',
+    )
+    parser.add_argument(
+        '--since',
+        type=parse_time,
+        default=None,
+        help='Parse only lines with @timestamp from this time: 2024-01-01 or 2024-01-01T10:00:00+03:00 '
+        '(UTC by default).',
+    )
+    parser.add_argument(
+        '--until',
+        type=parse_time,
+        default=None,
+        help='Parse only lines with @timestamp before this time (same format as --since).',
+    )
+    parser.add_argument(
+        '--sorted',
+        action='store_true',
+        help='Lines of files are ordered by @timestamp: regions outside --since/--until are skipped by binary search.',
+    )
+    parser.add_argument(
+        '--status',
+        type=parse_statuses,
+        default=None,
+        help='Parse only lines with these statuses, e.g. 5xx or 500,502.',
+    )
+    parser.add_argument(
+        '--method',
+        type=parse_methods,
+        default=None,
+        help='Parse only lines with these request methods, e.g. GET,POST.',
+    )
+    parser.add_argument(
+        '--url-prefix',
+        type=str,
+        action='append',
+        default=None,
+        help='Parse only lines with urls starting with this prefix (possibly repeated), raw urls are matched.',
+    )
+    parser.add_argument(
+        '--on-error',
+        type=str,
+        choices=ON_ERROR_NAMES,
+        default=DEFAULT_ON_ERROR,
+        help='Bad lines (invalid JSON, missing fields): stop, skip or quarantine them, numbers of bad lines '
+        f'by files are printed to stderr (default: {DEFAULT_ON_ERROR}).',
+    )
+    parser.add_argument(
+        '--quarantine-file',
+        type=str,
+        default=DEFAULT_QUARANTINE_FILE,
+        help=f'File to which bad lines are appended with --on-error quarantine (default: {DEFAULT_QUARANTINE_FILE}).',
+    )
+    parser.add_argument(
+        '-w',
+        '--workers',
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f'Number of processes for parsing files by byte ranges (default: {DEFAULT_WORKERS}).',
+    )
+    parser.add_argument(
+        '--concurrency',
+        type=int,
+        default=DEFAULT_CONCURRENCY,
+        help=f'Number of sources read at once by the asyncio pipeline (default: {DEFAULT_CONCURRENCY}).',
+    )
+    parser.add_argument(
+        '--io',
+        type=str,
+        choices=IO_MODES,
+        default=DEFAULT_IO_MODE,
+        help=f'Way of reading files (default: {DEFAULT_IO_MODE}).',
+    )
+    parser.add_argument(
+        '--state',
+        type=str,
+        default=None,
+        help='File with saved offsets and statistics: parse only lines appended since the previous run.',
+    )
+    parser.add_argument(
+        '--build-index',
+        action='store_true',
+        help='Build sidecar indexes of files (partial statistics by segments, timestamps by blocks) and exit. '
+        'Indexed files are reported without parsing their indexed lines.',
+    )
+    parser.add_argument(
+        '--follow',
+        action='store_true',
+        help='Keep files open, parse appended lines and print the table every --interval seconds (Ctrl+C to stop).',
+    )
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=FOLLOW_REFRESH_INTERVAL,
+        help=f'Seconds between table refreshes in --follow mode (default: {FOLLOW_REFRESH_INTERVAL}).',
+    )
+    parser.add_argument(
+        '--serve',
+        type=parse_server_address,
+        default=None,
+        help=f'Run the aggregation server answering HTTP queries "GET {SERVER_REPORT_PATH}<report>?format=text|json" '
+        'on unix:PATH or tcp:HOST:PORT, files are followed (Ctrl+C to stop).',
+    )
+    parser.add_argument(
+        '--listen',
+        type=parse_server_address,
+        action='append',
+        default=None,
+        help='Socket unix:PATH or tcp:HOST:PORT accepting pushed log lines in --serve mode (possibly repeated).',
+    )
+    parser.add_argument(
+        '--snapshot-interval',
+        type=float,
+        default=SERVER_SNAPSHOT_INTERVAL,
+        help=f'Seconds between snapshots of statistics answering queries in --serve mode '
+        f'(default: {SERVER_SNAPSHOT_INTERVAL}).',
+    )
+    parser.add_argument(
+        '--partial',
+        type=str,
+        default=None,
+        help=f'Write a compact dump of endpoint statistics to this file ("{PARTIAL_STDOUT}" is stdout) '
+        'instead of the report, e.g. on every host.',
+    )
+    parser.add_argument(
+        '--merge',
+        type=str,
+        nargs='+',
+        default=None,
+        help='Report statistics of partial dumps of hosts (--partial) instead of parsing files, '
+        'dumps in order of their files give the report of a single run.',
+    )
+    parser.add_argument(
+        '--stats',
+        action='store_true',
+        help='Print time of stages (input: read, decode, aggregate; render), numbers of lines and bytes read '
+        'and peak RSS to stderr.',
+    )
+    parser.add_argument(
+        '--profile',
+        type=str,
+        default=None,
+        help='Run under cProfile and save the profile to this file (see "python -m pstats FILE").',
+    )
     args = parser.parse_args()
+    if args.file is None and args.serve is None and args.merge is None:
+        parser.error('the following arguments are required: -f/--file')
+    if args.workers < 1:
+        parser.error('--workers must be a positive number.')
+    if args.partial is not None or args.merge is not None:
+        if args.top is not None or args.report == GROUPBY_REPORT_NAME:
+            parser.error(f'--partial and --merge can not be used with --top and --report {GROUPBY_REPORT_NAME}.')
+        if args.serve is not None or args.follow or args.build_index:
+            parser.error('--partial and --merge can not be used with --serve, --follow and --build-index.')
+    if args.merge is not None and (args.file is not None or args.partial is not None or args.state is not None):
+        parser.error('--merge can not be used with --file, --partial and --state.')
+    if args.follow and (args.limit is not None or args.format != TEXT_FORMAT_NAME):
+        parser.error(
+            '--follow prints the whole table, it can not be used with --limit and --format other than '
+            f'{TEXT_FORMAT_NAME}.'
+        )
+    if args.stats and (args.serve is not None or args.follow or args.build_index):
+        parser.error('--stats can not be used with --serve, --follow and --build-index.')
+    if args.listen is not None and args.serve is None:
+        parser.error('--listen can be used only with --serve.')
+    if args.serve is not None:
+        if args.workers > 1 or args.state is not None or args.follow or args.concurrency > 1:
+            parser.error('--serve can not be used with --workers, --state, --follow and --concurrency.')
+        if any(is_stream_source(source) for source in args.file or []):
+            parser.error('--serve follows only files, use --listen for sockets.')
+    args.file = args.file or []
+    if args.follow or args.serve is not None:
+        compressed_files = [file for file in args.file if os.path.isfile(file) and is_compressed(file)]
+        if compressed_files:
+            parser.error(f'--follow and --serve can not follow compressed files: {", ".join(compressed_files)}.')
+    if args.report == GROUPBY_REPORT_NAME and args.state is not None:
+        parser.error(f'--state can not be used with --report {GROUPBY_REPORT_NAME}.')
+    if args.top is not None and args.report != AVERAGE_REPORT_NAME:
+        parser.error(f'--top can be used only with --report {AVERAGE_REPORT_NAME}.')
+    if args.top is not None and args.state is not None:
+        parser.error('--state can not be used with --top.')
+    if args.concurrency < 1:
+        parser.error('--concurrency must be a positive number.')
+    if args.concurrency > 1 or any(is_stream_source(source) for source in args.file):
+        if args.workers > 1 or args.state is not None or args.follow:
+            parser.error('--concurrency, stdin and sockets can not be used with --workers, --state and --follow.')
+    filters = [args.since, args.until, args.status, args.method, args.url_prefix]
+    if args.sorted and args.since is None and args.until is None:
+        parser.error('--sorted can be used only with --since or --until.')
+    if args.merge is not None and any(value is not None for value in filters):
+        parser.error('--merge can not be used with --since, --until, --status, --method and --url-prefix.')
+    if args.state is not None and any(value is not None for value in filters):
+        parser.error('--state can not be used with --since, --until, --status, --method and --url-prefix.')
+    if args.on_error != ON_ERROR_FAIL_NAME and args.workers > 1:
+        parser.error('--on-error skip and quarantine can not be used with --workers.')
+    if args.build_index:
+        if args.serve is not None or args.state is not None or args.follow or args.concurrency > 1:
+            parser.error('--build-index can not be used with --serve, --state, --follow and --concurrency.')
+        if any(is_stream_source(source) for source in args.file):
+            parser.error('--build-index indexes only files.')
+    for source in args.file:
+        if source.startswith(TCP_SOURCE_PREFIX):
+            try:
+                parse_tcp_address(source)
+            except ValueError as error:
+                parser.error(str(error))
     return args
 
 
-def accounting_endpoint_request(request_data: dict[str, Any]) -> None:
+def get_line_filter(args: argparse.Namespace) -> LineFilter | None:
+    """Return filter of lines of '--since', '--until', '--status', '--method' and '--url-prefix', None without them."""
+    filters = [args.since, args.until, args.status, args.method, args.url_prefix]
+    if all(value is None for value in filters):
+        return None
+    return LineFilter(args.since, args.until, args.status, args.method, args.url_prefix, args.sorted)
+
+
+def find_file_range(file: str, line_filter: LineFilter | None) -> tuple[int, int | None]:
+    """Return byte range of file to parse: regions outside the time range are skipped in a file sorted by time."""
+    if line_filter is not None:
+        with open(file, 'rb') as opened_file:
+            if line_filter.can_skip_ranges(opened_file):
+                return line_filter.find_byte_range(opened_file)
+    return 0, None
+
+
+def read_lines(
+    opened_file: BinaryIO,
+    io_mode: str = DEFAULT_IO_MODE,
+    start: int = 0,
+    end: int | None = None,
+    stats: RunStats | None = None,
+) -> Iterable[str | bytes]:
+    """Return lines of byte range [start, end) of the file (see iter_lines), bytes of the range are counted by stats."""
+    if stats is not None:
+        stats.count_bytes(opened_file, start, end)
+    return iter_lines(opened_file, io_mode, start, end)
+
+
+def parsing_file(
+    lines: Iterable[str | bytes],
+    aggregator: LogAggregator,
+    bad_lines: BadLines | None = None,
+    source: str = '',
+    incomplete_tail: bool = False,
+    stats: RunStats | None = None,
+) -> None:
     """
-    Add/create endpoint info in ALL_ENDPOINT_REQUESTS.
+    Extract data, bad lines of the source are skipped by bad_lines if it is given (see BadLines).
 
-    Structure ALL_ENDPOINT_REQUESTS:
-    key - endpoint name
-    value - EndpointStats object
+    With stats lines are parsed by batches with time of reading, decoding and aggregation measured.
     """
-    if not request_data['url'] in ALL_ENDPOINT_REQUESTS:
-        endpoint_stats_class = EndpointStats(request_data['url'])
-        ALL_ENDPOINT_REQUESTS[endpoint_stats_class.url] = endpoint_stats_class
+    if stats is not None:
+        stats.feed_lines(aggregator, lines, bad_lines, source, incomplete_tail)
+    elif bad_lines is None:
+        aggregator.feed_lines(lines)
+    else:
+        bad_lines.feed_lines(aggregator, lines, source, incomplete_tail)
 
-    ALL_ENDPOINT_REQUESTS[request_data['url']].add_request()
-    ALL_ENDPOINT_REQUESTS[request_data['url']].add_response_time(request_data['response_time'])
 
+def read_files(
+    files: list[str],
+    aggregator: LogAggregator,
+    workers: int = DEFAULT_WORKERS,
+    io_mode: str = DEFAULT_IO_MODE,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    bad_lines: BadLines | None = None,
+    stats: RunStats | None = None,
+) -> None:
+    """
+    Open all files one by one.
 
-def parsing_file(opened_file: TextIOWrapper) -> None:
-    """Extract data."""
-    line = opened_file.readline()
-    while line != '':
-        request_data = json.loads(line)
-        accounting_endpoint_request(request_data)
-        line = opened_file.readline()
+    Lines are read according to io_mode (see line_readers.iter_lines).
+    With workers > 1 files are split into byte ranges and parsed in a process pool,
+    partial results are merged into the aggregator in file order.
+    With concurrency > 1 or stdin and sockets among files all sources are read concurrently
+    by the asyncio pipeline (see async_ingestion.ingest_sources).
+    Files with a valid sidecar index are read by read_indexed_files().
+    Lines not matching aggregator.line_filter are skipped, in files sorted by time
+    only the byte range of the time range is read (see LineFilter.find_byte_range).
+    Bad lines are skipped by bad_lines if it is given (serial parsing only).
+    Lines parsed in this process are measured by stats if it is given (see RunStats).
+    """
+    if concurrency > 1 or any(is_stream_source(file) for file in files):
+        asyncio.run(ingest_sources(files, aggregator, io_mode, concurrency, bad_lines=bad_lines))
+        return
 
+    if can_use_index(aggregator):
+        indexes = [load_file_index(file) for file in files]
+        if any(index is not None for index in indexes):
+            read_indexed_files(files, indexes, aggregator, workers, io_mode, bad_lines, stats)
+            return
+
+    line_filter = aggregator.line_filter
+    if workers > 1:
+        settings = (
+            aggregator.time_bucket,
+            aggregator.url_rules,
+            aggregator.group_by,
+            aggregator.top,
+            aggregator.top_by,
+        )
+        if line_filter is not None and line_filter.sorted_by_time and line_filter.has_time_range():
+            file_ranges = [(file, *find_file_range(file, line_filter)) for file in files]
+            partials = parse_file_ranges_parallel(file_ranges, workers, io_mode, *settings, line_filter)
+        else:
+            partials = parse_files_parallel(files, workers, io_mode, *settings, line_filter)
+        for partial in partials:
+            aggregator.merge(partial)
+        return
 
-def read_files(files: list[str]) -> None:
-    """Open all files one by one."""
     for file in files:
-        with open(file, 'r') as opened_file:
-            parsing_file(opened_file)
+        with open(file, 'rb') as opened_file:
+            end = None
+            if line_filter is not None and line_filter.can_skip_ranges(opened_file):
+                start, end = line_filter.find_byte_range(opened_file)
+                lines = read_lines(opened_file, io_mode, start, end, stats)
+            else:
+                lines = read_lines(opened_file, io_mode, stats=stats)
+            incomplete_tail = bad_lines is not None and has_incomplete_tail(opened_file, end)
+            parsing_file(lines, aggregator, bad_lines, file, incomplete_tail, stats)
+
+
+def read_indexed_files(
+    files: list[str],
+    indexes: list[SegmentIndex | None],
+    aggregator: LogAggregator,
+    workers: int = DEFAULT_WORKERS,
+    io_mode: str = DEFAULT_IO_MODE,
+    bad_lines: BadLines | None = None,
+    stats: RunStats | None = None,
+) -> None:
+    """
+    Add statistics of indexed lines from the indexes and parse only the other lines.
+
+    Lines appended to a file after its index was built are parsed, a file without index (None) is parsed
+    as a whole. With a time range of aggregator.line_filter statistics of segments inside the range are taken,
+    only blocks overlapping the range are parsed (see SegmentIndex.select). With workers > 1 all parsed ranges
+    go to one process pool after the indexed statistics, so endpoints of equal totals may be ordered
+    unlike the serial path. Indexes keep only endpoint statistics, so the aggregator must satisfy can_use_index().
+    """
+    if not can_use_index(aggregator):
+        raise Exception('Statistics of time series, groups and top endpoints can not be taken from indexes.')
+    line_filter = aggregator.line_filter
+    file_ranges: list[tuple[str, int, int | None]] = []
+    for file, index in zip(files, indexes):
+        ranges: list[tuple[int, int | None]]
+        if index is None:
+            ranges = [find_file_range(file, line_filter)]
+        elif line_filter is None:
+            aggregator.merge(index.load_endpoint_requests(normalize_url=aggregator.normalize_url))
+            ranges = [] if index.compressed else [(index.end, None)]
+        else:
+            numbers, ranges = index.select(line_filter.since, line_filter.until)
+            aggregator.merge(index.load_endpoint_requests(numbers, aggregator.normalize_url))
+            if not index.compressed:
+                ranges.append((index.end, None))
+        if workers > 1:
+            file_ranges.extend((file, start, end) for start, end in ranges)
+            continue
+        with open(file, 'rb') as opened_file:
+            for start, end in ranges:
+                incomplete_tail = bad_lines is not None and has_incomplete_tail(opened_file, end)
+                lines = read_lines(opened_file, io_mode, start, end, stats)
+                parsing_file(lines, aggregator, bad_lines, file, incomplete_tail, stats)
+
+    if not file_ranges:
+        return
+    for endpoint_requests in parse_file_ranges_parallel(
+        file_ranges, workers, io_mode, aggregator.time_bucket, aggregator.url_rules, line_filter=line_filter
+    ):
+        aggregator.merge(endpoint_requests)
 
 
-def generate_average_format_for_table() -> list[list[str | int | float]]:
+def build_indexes(files: list[str], workers: int = DEFAULT_WORKERS, bad_lines: BadLines | None = None) -> None:
     """
-    Generate data format: [[...], [...]].
+    Build and save sidecar indexes of files (see segment_index.SegmentIndex), print a summary of every index.
 
-    Determine subsequence in AVERAGE_HEADERS.
-    Order by '-total'.
+    Bad lines are skipped by bad_lines if it is given (serial parsing only), they are not in the index.
     """
-    table_data = [value.get_correct_format_for_tabulate() for value in ALL_ENDPOINT_REQUESTS.values()]
-    table_data.sort(key=lambda x: 1 / int(x[AVERAGE_HEADERS.index(REQUESTS_TOTAL_COLUMN_NAME)]))  # int() for mypy.
-    return table_data
+    for file in files:
+        index = SegmentIndex.build(file, workers, bad_lines=bad_lines)
+        index_file = get_index_file(file)
+        index.save(index_file)
+        print(f'{file}: {len(index.segments)} segments, {len(index.blocks)} blocks, {index.end} bytes -> {index_file}')
+
 
+def read_files_incrementally(
+    files: list[str],
+    aggregator: LogAggregator,
+    state_file: str,
+    workers: int = DEFAULT_WORKERS,
+    io_mode: str = DEFAULT_IO_MODE,
+    bad_lines: BadLines | None = None,
+    stats: RunStats | None = None,
+) -> None:
+    """
+    Add saved statistics from state_file and parse only lines appended since the previous run.
 
-def create_table(type_report: str) -> str:
-    """Create table object according to the given '--report'."""
-    if type_report == AVERAGE_REPORT_NAME:
-        table_data = generate_average_format_for_table()
-        table = tabulate(table_data, headers=AVERAGE_HEADERS, showindex='always')
+    Rotated, truncated and replaced files are detected (see IncrementalState),
+    the updated state is saved back to state_file. A state saved with other url rules or time bucket raises.
+    """
+    state = IncrementalState.load(state_file, aggregator.url_rules, aggregator.time_bucket)
+    aggregator.merge(state.endpoint_requests)
+    file_ranges = state.get_new_ranges(files)
+
+    if workers > 1:
+        for endpoint_requests in parse_file_ranges_parallel(
+            file_ranges, workers, io_mode, aggregator.time_bucket, aggregator.url_rules
+        ):
+            aggregator.merge(endpoint_requests)
     else:
-        raise Exception(f'No action specified for parameter "--report {type_report}" in "create_table(type_report)".')
-    return table
+        for file, start, end in file_ranges:
+            with open(file, 'rb') as opened_file:
+                # Ranges end with complete lines (no truncated tail).
+                lines = read_lines(opened_file, io_mode, start, end, stats)
+                parsing_file(lines, aggregator, bad_lines, file, stats=stats)
+
+    state.endpoint_requests = aggregator.endpoint_requests
+    state.save(state_file)
+
+
+def get_url_rules(args: argparse.Namespace) -> list[str] | None:
+    """Return url rules of '--url-rules' file and '--url-rule' options, None if there are none."""
+    rules = (load_url_rules(args.url_rules) if args.url_rules is not None else []) + (args.url_rule or [])
+    return rules or None
+
+
+def create_table(type_report: str, aggregator: LogAggregator, limit: int | None = None) -> str:
+    """Create table object according to the given '--report' (the first '--limit' rows)."""
+    return aggregator.report(type_report, limit=limit)
+
+
+def write_rows(type_report: str, aggregator: LogAggregator, output_format: str, limit: int | None = None) -> None:
+    """Stream rows of the given '--report' to stdout in the machine-readable '--format'."""
+    headers, rows = aggregator.iter_report_data(type_report, limit)
+    sys.stdout.flush()
+    write_report(headers, rows, output_format, sys.stdout.buffer)
+    sys.stdout.buffer.flush()
+
+
+def run(args: argparse.Namespace) -> None:
+    """Execute the script step by step with the given command line options."""
+    aggregator = LogAggregator(
+        args.bucket if args.report == TIMESERIES_REPORT_NAME else None,
+        get_url_rules(args),
+        args.group_by if args.report == GROUPBY_REPORT_NAME else None,
+        args.metrics,
+        top=args.top,
+        top_by=args.top_by,
+        line_filter=get_line_filter(args),
+    )
+    bad_lines = None if args.on_error == ON_ERROR_FAIL_NAME else BadLines(args.on_error, args.quarantine_file)
+    stats = RunStats() if args.stats else None
+    try:
+        if args.build_index:
+            build_indexes(args.file, args.workers, bad_lines)
+            return
+        if args.serve is not None:
+            serve(aggregator, args.serve, args.listen, args.file, args.snapshot_interval, bad_lines)
+            return
+        if args.follow:
+            follow_files(args.file, aggregator, args.report, args.interval, bad_lines=bad_lines)
+            return
+        with measure_stage(stats, INPUT_STAGE_NAME):
+            if args.merge is not None:
+                merge_partials(args.merge, aggregator)
+            elif args.state is None:
+                read_files(args.file, aggregator, args.workers, args.io, args.concurrency, bad_lines, stats)
+            else:
+                read_files_incrementally(args.file, aggregator, args.state, args.workers, args.io, bad_lines, stats)
+        with measure_stage(stats, RENDER_STAGE_NAME):
+            if args.partial is not None:
+                save_partial(aggregator, args.partial)
+            elif args.format == TEXT_FORMAT_NAME:
+                table = create_table(args.report, aggregator, args.limit)
+                print(table)
+            else:
+                write_rows(args.report, aggregator, args.format, args.limit)
+    finally:
+        if bad_lines is not None:
+            bad_lines.flush()
+            if summary := bad_lines.get_summary():
+                print(summary, file=sys.stderr)
+        if stats is not None:
+            print(stats.get_summary(), file=sys.stderr)
 
 
 def main() -> None:
-    """Execute the script step by step."""
+    """Execute the script, under cProfile with '--profile'."""
     args = get_command_line_options()
-    read_files(args.file)
-    table = create_table(args.report)
-    print(table)
+    if args.profile is None:
+        run(args)
+    else:
+        run_profiled(lambda: run(args), args.profile)
 
 
 if __name__ == '__main__':
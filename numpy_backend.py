@@ -0,0 +1,254 @@
+"""Vectorised batch aggregation of log lines with NumPy (optional dependency, selected automatically)."""
+
+from itertools import islice
+from typing import Any, Callable, Iterable
+
+from config import NUMPY_BATCH_SIZE, NUMPY_MAX_VALUE_SIZE, NUMPY_SEARCH_WINDOW
+from endpoint_stats import EndpointStatsMap
+from line_decoder import LineDecoder
+
+try:
+    import numpy
+    from numpy.lib.stride_tricks import sliding_window_view
+except ImportError:  # Optional dependency, the pure Python path is used without it.
+    numpy = None  # type: ignore[assignment]
+
+URL_KEY = b'"url":'
+RESPONSE_TIME_KEY = b'"response_time":'
+# NUL bytes after the joined lines of a batch, so windows of values never go beyond the buffer.
+BUFFER_PADDING = NUMPY_MAX_VALUE_SIZE + NUMPY_SEARCH_WINDOW + 8
+
+
+def find_key(buffer: Any, size: int, key: bytes) -> Any:
+    """
+    Return sorted positions of key in the first size bytes of buffer.
+
+    The first 2 bytes of key are compared as little-endian words at both alignments of the buffer,
+    the other bytes only at the found positions.
+    """
+    prefix = int.from_bytes(key[:2], 'little')
+    found = []
+    for alignment in range(2):
+        words = buffer[alignment : alignment + (size - alignment) // 2 * 2].view('<u2')  # noqa: E203
+        found.append(numpy.flatnonzero(words == prefix) * 2 + alignment)
+    positions = numpy.sort(numpy.concatenate(found))
+    positions = positions[positions <= size - len(key)]
+    for offset in range(2, len(key)):
+        positions = positions[buffer[positions + offset] == key[offset]]
+    return positions
+
+
+def get_value_starts(buffer: Any, size: int, line_starts: Any, good: Any, key: bytes) -> Any:
+    """
+    Return position of the value of key in every line (after an optional space, as LineDecoder.scan).
+
+    Lines without exactly one occurrence of the key are marked as not good
+    (LineDecoder uses the last duplicate key).
+    """
+    positions = find_key(buffer, size, key)
+    line_indices = numpy.searchsorted(line_starts, positions, 'right') - 1
+    good &= numpy.bincount(line_indices, minlength=len(line_starts)) == 1
+
+    value_starts = numpy.zeros(len(line_starts), dtype=numpy.int64)
+    value_starts[line_indices] = positions + len(key)
+    value_starts += buffer[value_starts] == ord(' ')
+    return value_starts
+
+
+def find_next(buffer: Any, joined: bytes, starts: Any, byte: int) -> Any:
+    """
+    Return position of the first byte not before every start (len(joined) if there is none).
+
+    NUMPY_SEARCH_WINDOW bytes after every start are compared at once,
+    the search goes on by bytes.find only for starts without the byte in the window.
+    """
+    found = sliding_window_view(buffer, NUMPY_SEARCH_WINDOW)[starts] == byte
+    positions = starts + found.argmax(axis=1)
+    for index in numpy.flatnonzero(~found.any(axis=1)).tolist():
+        position = joined.find(bytes((byte,)), int(starts[index]))
+        positions[index] = len(joined) if position == -1 else position
+    return positions
+
+
+def gather_values(buffer: Any, starts: Any, ends: Any) -> Any:
+    """Return byte ranges [start, end) of buffer as rows of a matrix padded by NUL to a multiple of 8 bytes."""
+    width = max(8, -(-int((ends - starts).max(initial=0)) // 8) * 8)
+    values = sliding_window_view(buffer, width)[starts]
+    values[numpy.arange(width) >= (ends - starts)[:, None]] = 0
+    return values
+
+
+def is_json_number(values: Any) -> Any:
+    """
+    Return True for rows of gather_values() result which are JSON numbers (as LineDecoder.scan checks).
+
+    float() takes more ('1_0', '+1', '.5', '01', 'nan', 'inf'), so the grammar -?int(.digits)?([eE][+-]?digits)?
+    is checked by comparisons of every byte with its neighbours.
+    """
+    digit = (values >= ord('0')) & (values <= ord('9'))
+    point = values == ord('.')
+    exponent = (values == ord('e')) | (values == ord('E'))
+    minus = values == ord('-')
+    plus = values == ord('+')
+    padding = values == 0
+    previous_digit = numpy.zeros_like(digit)
+    previous_digit[:, 1:] = digit[:, :-1]
+    previous_exponent = numpy.zeros_like(exponent)
+    previous_exponent[:, 1:] = exponent[:, :-1]
+    next_digit = numpy.zeros_like(digit)
+    next_digit[:, :-1] = digit[:, 1:]
+    next_sign = numpy.zeros_like(digit)
+    next_sign[:, :-1] = minus[:, 1:] | plus[:, 1:]
+    first_column = numpy.zeros_like(digit)
+    first_column[:, 0] = True
+
+    valid = (digit | point | exponent | minus | plus | padding).all(axis=1)
+    valid &= digit[:, 0] | minus[:, 0]
+    valid &= ~(minus & ~(first_column | previous_exponent) | (minus | plus) & ~next_digit).any(axis=1)
+    valid &= ~(plus & ~previous_exponent).any(axis=1)
+    valid &= ~(point & ~(previous_digit & next_digit)).any(axis=1)
+    valid &= ~(exponent & ~(previous_digit & (next_digit | next_sign))).any(axis=1)
+    valid &= (point.sum(axis=1) <= 1) & (exponent.sum(axis=1) <= 1)
+    valid &= ~(point & numpy.cumsum(exponent, axis=1).astype(bool)).any(axis=1)  # No fraction in the exponent.
+    # No leading zero: '0' at the start of the integer part followed by a digit.
+    leading_zero = (values[:, 0] == ord('0')) & digit[:, 1]
+    leading_zero |= minus[:, 0] & (values[:, 1] == ord('0')) & digit[:, 2]
+    return valid & ~leading_zero
+
+
+def intern_values(values: Any) -> tuple[list[bytes], Any]:
+    """
+    Return distinct rows of gather_values() result as bytes and index of every row in them.
+
+    Rows are grouped by a 64-bit hash of their words, the grouping is checked by comparison
+    of every row with the first row of its group (rows are sorted as strings only on a hash collision).
+    """
+    words = values.view('<u8')
+    hashes = numpy.zeros(len(words), dtype=numpy.uint64)
+    for column in words.T:
+        hashes ^= column
+        hashes *= numpy.uint64(0x100000001B3)
+    _, first_indices, inverse = numpy.unique(hashes, return_index=True, return_inverse=True)
+    if not (words == words[first_indices[inverse]]).all():
+        _, first_indices, inverse = numpy.unique(
+            values.view(f'S{values.shape[1]}').ravel(), return_index=True, return_inverse=True
+        )
+    return values[first_indices].view(f'S{values.shape[1]}').ravel().tolist(), inverse.ravel()
+
+
+def decode_batch(lines: list[bytes], decoder: LineDecoder) -> tuple[list[str], Any, Any]:
+    """
+    Return urls (in order of first occurrence), url index of every line and response times of lines.
+
+    All lines are joined into one buffer, the checks and value positions of LineDecoder.scan
+    are computed for all lines at once by array operations. Lines which do not pass the checks
+    are decoded one by one by the decoder (same values or exceptions as the pure Python path).
+    """
+    count = len(lines)
+    joined = b'\n'.join(lines)
+    size = len(joined)
+    buffer = numpy.frombuffer(joined + bytes(BUFFER_PADDING), dtype=numpy.uint8)
+    lengths = numpy.fromiter(map(len, lines), dtype=numpy.int64, count=count)
+    line_starts = numpy.zeros(count, dtype=numpy.int64)
+    numpy.cumsum(lengths[:-1] + 1, out=line_starts[1:])
+    line_ends = line_starts + lengths
+
+    # A complete object: '{' first, '}' last before an optional '\r\n' (see LINE_ENDINGS).
+    good = (lengths > 0) & (buffer[line_starts] == ord('{'))
+    object_ends = line_ends - (buffer[numpy.maximum(line_ends - 1, 0)] == ord('\n'))
+    object_ends -= buffer[numpy.maximum(object_ends - 1, 0)] == ord('\r')
+    good &= (object_ends > line_starts) & (buffer[numpy.maximum(object_ends - 1, 0)] == ord('}'))
+    # Escapes need json.loads, NUL bytes would be lost in padded values.
+    for byte in (b'\\', b'\x00'):
+        if byte in joined:
+            positions = numpy.flatnonzero(buffer[:size] == byte[0])
+            good[numpy.searchsorted(line_starts, positions, 'right') - 1] = False
+
+    url_starts = get_value_starts(buffer, size, line_starts, good, URL_KEY)
+    good &= buffer[url_starts] == ord('"')
+    url_starts += 1
+    url_ends = find_next(buffer, joined, url_starts, ord('"'))
+    good &= (url_ends < line_ends) & (url_ends - url_starts <= NUMPY_MAX_VALUE_SIZE)
+
+    # The value ends at the next ',' of the line, at the next '}' if there is no ',' (as LineDecoder.scan).
+    response_time_starts = get_value_starts(buffer, size, line_starts, good, RESPONSE_TIME_KEY)
+    response_time_ends = find_next(buffer, joined, response_time_starts, ord(','))
+    without_comma = numpy.flatnonzero(response_time_ends >= line_ends)
+    response_time_ends[without_comma] = find_next(buffer, joined, response_time_starts[without_comma], ord('}'))
+    good &= (response_time_ends > response_time_starts) & (
+        response_time_ends - response_time_starts <= NUMPY_MAX_VALUE_SIZE
+    )
+
+    good_indices = numpy.flatnonzero(good)
+    response_times = numpy.zeros(count, dtype=numpy.float64)
+    values = gather_values(buffer, response_time_starts[good_indices], response_time_ends[good_indices])
+    numbers = is_json_number(values)  # Other values go to LineDecoder: json.loads or an exception.
+    good[good_indices[~numbers]] = False
+    good_indices = good_indices[numbers]
+    values = values[numbers]
+    response_times[good_indices] = values.view(f'S{values.shape[1]}').ravel().astype(numpy.float64)
+    finite = numpy.isfinite(response_times[good_indices])  # Out of float range, e.g. 1e400.
+    good[good_indices[~finite]] = False
+    good_indices = good_indices[finite]
+
+    unique_urls, url_ids = intern_values(gather_values(buffer, url_starts[good_indices], url_ends[good_indices]))
+    urls = [url.decode() for url in unique_urls]
+    ids = numpy.zeros(count, dtype=numpy.int64)
+    ids[good_indices] = url_ids
+
+    bad_indices = numpy.flatnonzero(~good).tolist()
+    if bad_indices:
+        url_indices = {url: index for index, url in enumerate(urls)}
+        for index in bad_indices:
+            url, response_time = decoder.decode(lines[index])
+            url_id = url_indices.setdefault(url, len(urls))
+            if url_id == len(urls):
+                urls.append(url)
+            ids[index] = url_id
+            response_times[index] = response_time
+
+    # Renumber urls in order of their first line.
+    first_lines = numpy.full(len(urls), count, dtype=numpy.int64)
+    numpy.minimum.at(first_lines, ids, numpy.arange(count))
+    order = numpy.argsort(first_lines)
+    new_ids = numpy.empty(len(urls), dtype=numpy.int64)
+    new_ids[order] = numpy.arange(len(urls))
+    return [urls[index] for index in order.tolist()], new_ids[ids], response_times
+
+
+def aggregate_batch(
+    endpoint_requests: EndpointStatsMap,
+    urls: list[str],
+    ids: Any,
+    response_times: Any,
+    normalize_url: Callable[[str], str] | None = None,
+) -> None:
+    """
+    Add decoded lines to endpoint statistics grouped by array operations.
+
+    Lines are ordered by url id (stable sort), counts are taken by bincount, then every endpoint
+    gets its response times as one list: exact sums and sketches are the same as for one by one adding.
+    """
+    if normalize_url is not None:  # Before any change, so a batch with a bad url is not added in part.
+        urls = [normalize_url(url) for url in urls]
+    order = numpy.argsort(ids, kind='stable')
+    counts = numpy.bincount(ids, minlength=len(urls))
+    parts = numpy.split(response_times[order], numpy.cumsum(counts)[:-1])
+    for url, count, part in zip(urls, counts.tolist(), parts):
+        endpoint_requests.add_many(url, count, part.tolist())
+
+
+def feed_lines_batched(
+    endpoint_requests: EndpointStatsMap,
+    lines: Iterable[str | bytes],
+    decoder: LineDecoder,
+    normalize_url: Callable[[str], str] | None = None,
+    batch_size: int = NUMPY_BATCH_SIZE,
+) -> None:
+    """Add log lines (of 'url' and 'response_time' fields decoder) to endpoint statistics by batches."""
+    iterator = iter(lines)
+    while batch := list(islice(iterator, batch_size)):
+        if isinstance(batch[0], str):
+            batch = [line.encode() if isinstance(line, str) else line for line in batch]
+        urls, ids, response_times = decode_batch(batch, decoder)  # type: ignore[arg-type]
+        aggregate_batch(endpoint_requests, urls, ids, response_times, normalize_url)
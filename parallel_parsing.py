@@ -0,0 +1,131 @@
+"""Parallel parsing of log files by newline-aligned byte ranges."""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, Sequence
+
+from compressed_input import is_compressed
+from config import DEFAULT_IO_MODE, MIN_SHARD_SIZE, TOP_BY_COUNT_NAME
+from endpoint_stats import EndpointStatsMap
+from group_by import GroupTable
+from heavy_hitters import HeavyHitters
+from line_filter import LineFilter
+from line_readers import iter_lines
+from log_aggregator import LogAggregator
+
+
+def split_file_into_ranges(
+    file: str, parts: int, min_shard_size: int = MIN_SHARD_SIZE, start: int = 0, end: int | None = None
+) -> list[tuple[int, int]]:
+    """
+    Split byte range [start, end) of file (the whole file by default) into newline-aligned byte ranges.
+
+    Every range is [start, end) and starts at the beginning of a line ('start' must be one).
+    The number of ranges is less than 'parts' for small files (see 'min_shard_size').
+    """
+    if end is None:
+        end = os.path.getsize(file)
+    range_size = max(0, end - start)
+    parts = max(1, min(parts, range_size // max(1, min_shard_size)))
+
+    boundaries = [start]
+    with open(file, 'rb') as opened_file:
+        for i in range(1, parts):
+            approximate_position = start + range_size * i // parts
+            if approximate_position <= boundaries[-1]:
+                continue
+            opened_file.seek(approximate_position - 1)
+            opened_file.readline()  # Move to the beginning of the next line.
+            position = opened_file.tell()
+            if boundaries[-1] < position < end:
+                boundaries.append(position)
+    boundaries.append(max(start, end))
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def parse_file_range(
+    file: str,
+    start: int,
+    end: int | None,
+    io_mode: str = DEFAULT_IO_MODE,
+    time_bucket: int | None = None,
+    url_rules: list[str] | None = None,
+    group_by: list[str] | None = None,
+    top: int | None = None,
+    top_by: str = TOP_BY_COUNT_NAME,
+    line_filter: LineFilter | None = None,
+) -> EndpointStatsMap | GroupTable | HeavyHitters:
+    """
+    Parse lines in range [start, end) of file (a compressed file with start=0, end=None) into a partial map.
+
+    time_bucket - size of time bucket in seconds to collect time series (see LogAggregator)
+    url_rules - rules of url normalization (see LogAggregator)
+    group_by - dimensions of records, a partial group table is returned instead of the map (see LogAggregator)
+    top, top_by - number and weight of top endpoints, partial top endpoints are returned (see LogAggregator)
+    line_filter - predicates of parsed lines (see LogAggregator)
+    """
+    aggregator = LogAggregator(time_bucket, url_rules, group_by, top=top, top_by=top_by, line_filter=line_filter)
+    with open(file, 'rb') as opened_file:
+        aggregator.feed_lines(iter_lines(opened_file, io_mode, start, end))
+    return aggregator.get_result()
+
+
+def parse_files_parallel(
+    files: list[str],
+    workers: int,
+    io_mode: str = DEFAULT_IO_MODE,
+    time_bucket: int | None = None,
+    url_rules: list[str] | None = None,
+    group_by: list[str] | None = None,
+    top: int | None = None,
+    top_by: str = TOP_BY_COUNT_NAME,
+    line_filter: LineFilter | None = None,
+) -> Iterator[EndpointStatsMap | GroupTable | HeavyHitters]:
+    """
+    Parse files in a process pool.
+
+    Partial endpoint maps (group tables, top endpoints) are yielded in file and range order, so merging them one by one
+    gives the same endpoint order as the serial path.
+    """
+    return parse_file_ranges_parallel(
+        [(file, 0, None) for file in files],
+        workers,
+        io_mode,
+        time_bucket,
+        url_rules,
+        group_by,
+        top,
+        top_by,
+        line_filter,
+    )
+
+
+def parse_file_ranges_parallel(
+    file_ranges: Sequence[tuple[str, int, int | None]],
+    workers: int,
+    io_mode: str = DEFAULT_IO_MODE,
+    time_bucket: int | None = None,
+    url_rules: list[str] | None = None,
+    group_by: list[str] | None = None,
+    top: int | None = None,
+    top_by: str = TOP_BY_COUNT_NAME,
+    line_filter: LineFilter | None = None,
+) -> Iterator[EndpointStatsMap | GroupTable | HeavyHitters]:
+    """
+    Parse byte ranges (file, start, end) of files in a process pool (end=None - up to the end of file).
+
+    Every range is split further by split_file_into_ranges(), partial endpoint maps are yielded in order.
+    A compressed file can not be split, it is parsed as a whole by one process.
+    """
+    tasks = [
+        (file, shard_start, shard_end, io_mode, time_bucket, url_rules, group_by, top, top_by, line_filter)
+        for file, start, end in file_ranges
+        for shard_start, shard_end in (
+            [(start, end)] if is_compressed(file) else split_file_into_ranges(file, workers, start=start, end=end)
+        )
+    ]
+    if not tasks:
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(parse_file_range, *zip(*tasks))
@@ -0,0 +1,81 @@
+"""Partial aggregates of hosts (--partial FILE, --merge DUMP...): serialized endpoint statistics and their settings."""
+
+import json
+import os
+import struct
+import sys
+from typing import Any
+
+from config import PARTIAL_STDOUT
+from endpoint_stats import EndpointStatsMap
+from log_aggregator import LogAggregator
+
+# Binary format of a partial dump: magic, format version, length of settings, settings (JSON, utf-8),
+# then endpoint statistics (see EndpointStatsMap.to_bytes()).
+PARTIAL_DUMP_HEADER = struct.Struct('<4sBI')
+PARTIAL_DUMP_MAGIC = b'LFPD'
+PARTIAL_DUMP_VERSION = 1
+
+
+def get_settings(aggregator: LogAggregator) -> dict[str, Any]:
+    """Return settings changing collected statistics: time bucket of time series and url rules."""
+    return {'time_bucket': aggregator.time_bucket, 'url_rules': aggregator.url_rules}
+
+
+def dump_partial(aggregator: LogAggregator) -> bytes:
+    """Serialize endpoint statistics of the aggregator with its settings (see PARTIAL_DUMP_HEADER)."""
+    settings = json.dumps(get_settings(aggregator)).encode()
+    header = PARTIAL_DUMP_HEADER.pack(PARTIAL_DUMP_MAGIC, PARTIAL_DUMP_VERSION, len(settings))
+    return header + settings + aggregator.endpoint_requests.to_bytes()
+
+
+def load_partial(data: bytes) -> tuple[dict[str, Any], EndpointStatsMap]:
+    """Deserialize settings and endpoint statistics created by dump_partial()."""
+    magic, version, settings_length = PARTIAL_DUMP_HEADER.unpack_from(data)
+    if magic != PARTIAL_DUMP_MAGIC or version != PARTIAL_DUMP_VERSION:
+        raise Exception('Unknown format of partial dump.')
+    settings_start = PARTIAL_DUMP_HEADER.size
+    settings_end = settings_start + settings_length
+    settings = json.loads(data[settings_start:settings_end])
+    return settings, EndpointStatsMap.from_bytes(data[settings_end:])
+
+
+def save_partial(aggregator: LogAggregator, partial_file: str) -> None:
+    """Write the partial dump to partial_file atomically (a crash leaves no broken dump), PARTIAL_STDOUT is stdout."""
+    data = dump_partial(aggregator)
+    if partial_file == PARTIAL_STDOUT:
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+        return
+
+    temporary_file = f'{partial_file}.tmp'
+    with open(temporary_file, 'wb') as opened_file:
+        opened_file.write(data)
+    os.replace(temporary_file, partial_file)
+
+
+def merge_partials(partial_files: list[str], aggregator: LogAggregator) -> None:
+    """
+    Add statistics of partial dumps to the aggregator in the given order.
+
+    Merge is exact and order of first occurrence of endpoints is kept, so dumps of hosts given in order
+    of their files make the same report as a single run over all files.
+    Dumps must be collected with the time bucket of the report and with the url rules of the aggregator
+    (their handlers are merged as they are) or without url rules (raw urls are normalized by the aggregator).
+    """
+    for partial_file in partial_files:
+        with open(partial_file, 'rb') as opened_file:
+            settings, endpoint_requests = load_partial(opened_file.read())
+        if settings['time_bucket'] != aggregator.time_bucket:
+            raise Exception(
+                f'Partial dump "{partial_file}" has time bucket {settings["time_bucket"]}, '
+                f'the report needs {aggregator.time_bucket} (use the same --report and --bucket).'
+            )
+        if settings['url_rules'] == aggregator.url_rules:
+            aggregator.endpoint_requests.merge(endpoint_requests)
+        elif settings['url_rules'] is None:
+            aggregator.endpoint_requests.merge(endpoint_requests, aggregator.normalize_url)
+        else:
+            raise Exception(
+                f'Partial dump "{partial_file}" is collected with other url rules (use the same --url-rule).'
+            )
@@ -0,0 +1,157 @@
+"""Module with QuantileSketch."""
+
+import math
+import struct
+from collections import Counter
+from typing import Iterable, Self
+
+from config import QUANTILE_SKETCH_MAX_BUCKETS, QUANTILE_SKETCH_RELATIVE_ACCURACY
+
+# Values not greater than this one are counted as zero (log of them is not usable).
+MIN_INDEXABLE_VALUE = 1e-9
+# Binary format of QuantileSketch: zero count, number of buckets, then bucket keys (int32) and counts (int64).
+QUANTILE_SKETCH_HEADER = struct.Struct('<qI')
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch with relative accuracy (DDSketch).
+
+    A positive value x goes to bucket ceil(log(x) / log(gamma)), gamma = (1 + a) / (1 - a),
+    every value of a bucket is estimated with relative error not greater than a.
+    Memory is bounded by max_buckets: buckets lower than (highest key - max_buckets + 1) are folded
+    into that key. The folding depends only on the highest key, so the result of adding and merging
+    does not depend on order (serial, per range or per file runs give the same sketch).
+    """
+
+    __slots__ = ('relative_accuracy', 'max_buckets', 'gamma', '_multiplier', 'buckets', 'zero_count')
+
+    def __init__(
+        self,
+        relative_accuracy: float = QUANTILE_SKETCH_RELATIVE_ACCURACY,
+        max_buckets: int = QUANTILE_SKETCH_MAX_BUCKETS,
+    ):
+        """
+        Set up initial values.
+
+        self.buckets - bucket key: number of values
+        self.zero_count - number of values not greater than MIN_INDEXABLE_VALUE
+        """
+        self.relative_accuracy = relative_accuracy
+        self.max_buckets = max_buckets
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._multiplier = 1 / math.log(self.gamma)
+        self.buckets: dict[int, int] = {}
+        self.zero_count = 0
+
+    def __eq__(self, other: object) -> bool:
+        """Compare parameters and counts."""
+        if not isinstance(other, QuantileSketch):
+            return NotImplemented
+        self._collapse()
+        other._collapse()
+        return (
+            self.relative_accuracy == other.relative_accuracy
+            and self.zero_count == other.zero_count
+            and self.buckets == other.buckets
+        )
+
+    @property
+    def count(self) -> int:
+        """Number of added values."""
+        return self.zero_count + sum(self.buckets.values())
+
+    def get_key(self, value: float) -> int:
+        """Return bucket key of a positive value."""
+        return math.ceil(math.log(value) * self._multiplier)
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Add value (count times)."""
+        if value <= MIN_INDEXABLE_VALUE:
+            self.zero_count += count
+            return
+        key = self.get_key(value)
+        self.buckets[key] = self.buckets.get(key, 0) + count
+        if len(self.buckets) > self.max_buckets:
+            self._collapse()
+
+    def add_many(self, values: Iterable[float]) -> None:
+        """Add all values (equal values are counted once, so repeated values are cheap)."""
+        buckets = self.buckets
+        multiplier = self._multiplier
+        log = math.log
+        ceil = math.ceil
+        for value, count in Counter(values).items():
+            if value <= MIN_INDEXABLE_VALUE:
+                self.zero_count += count
+            else:
+                key = ceil(log(value) * multiplier)  # Inlined get_key().
+                buckets[key] = buckets.get(key, 0) + count
+        self._collapse()
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """
+        Add counts of other sketch.
+
+        Collapsing depends only on the highest key, so the result does not depend on merge order.
+        """
+        if other.relative_accuracy != self.relative_accuracy or other.max_buckets != self.max_buckets:
+            raise Exception('Can not merge quantile sketches with different parameters.')
+        self.zero_count += other.zero_count
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self._collapse()
+
+    def _collapse(self) -> None:
+        """Fold buckets lower than (highest key - max_buckets + 1) into that key."""
+        if not self.buckets:
+            return
+        lowest_key = max(self.buckets) - self.max_buckets + 1
+        if min(self.buckets) >= lowest_key:
+            return
+        folded_count = 0
+        for key in [key for key in self.buckets if key < lowest_key]:
+            folded_count += self.buckets.pop(key)
+        self.buckets[lowest_key] = self.buckets.get(lowest_key, 0) + folded_count
+
+    def get_quantile(self, quantile: float) -> float:
+        """Return estimated value of the quantile (0 <= quantile <= 1), 0.0 for an empty sketch."""
+        self._collapse()
+        count = self.count
+        if count == 0:
+            return 0.0
+
+        rank = quantile * (count - 1)
+        cumulative_count = self.zero_count
+        if cumulative_count > rank:
+            return 0.0
+        for key in sorted(self.buckets):
+            cumulative_count += self.buckets[key]
+            if cumulative_count > rank:
+                return 2 * self.gamma**key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def to_bytes(self) -> bytes:
+        """Serialize counts to compact binary form (see QUANTILE_SKETCH_HEADER)."""
+        self._collapse()
+        keys = sorted(self.buckets)
+        return b''.join(
+            (
+                QUANTILE_SKETCH_HEADER.pack(self.zero_count, len(keys)),
+                struct.pack(f'<{len(keys)}i', *keys),
+                struct.pack(f'<{len(keys)}q', *(self.buckets[key] for key in keys)),
+            )
+        )
+
+    @classmethod
+    def unpack_from(cls, data: bytes, offset: int = 0) -> tuple[Self, int]:
+        """Deserialize counts starting at offset, return the sketch and offset of the next byte."""
+        sketch = cls()
+        sketch.zero_count, buckets_count = QUANTILE_SKETCH_HEADER.unpack_from(data, offset)
+        offset += QUANTILE_SKETCH_HEADER.size
+        keys = struct.unpack_from(f'<{buckets_count}i', data, offset)
+        offset += 4 * buckets_count
+        counts = struct.unpack_from(f'<{buckets_count}q', data, offset)
+        offset += 8 * buckets_count
+        sketch.buckets = dict(zip(keys, counts))
+        return sketch, offset
@@ -0,0 +1,147 @@
+"""Streamed output of report rows in machine-readable formats (--format csv|jsonl|binary), without tabulate."""
+
+import csv
+import io
+import json
+import struct
+from typing import Any, BinaryIO, Iterable, TextIO
+
+from config import BINARY_FORMAT_NAME, CSV_FORMAT_NAME, JSONL_FORMAT_NAME
+
+# Binary report: magic, format version, number of columns, then column names (uint16 length and utf-8),
+# rows of tagged values (a tag byte and the value, little-endian) after ROW_TAG, END_TAG after the last row.
+BINARY_REPORT_HEADER = struct.Struct('<4sBH')
+BINARY_REPORT_MAGIC = b'LFPR'
+BINARY_REPORT_VERSION = 1
+NAME_LENGTH = struct.Struct('<H')
+TEXT_LENGTH = struct.Struct('<I')
+INT_VALUE = struct.Struct('<q')
+FLOAT_VALUE = struct.Struct('<d')
+ROW_TAG = b'R'
+END_TAG = b'E'
+NONE_TAG = b'n'
+BOOL_TAG = b'b'  # uint8
+INT_TAG = b'i'  # int64
+FLOAT_TAG = b'f'  # float64
+STR_TAG = b's'  # uint32 length and utf-8
+JSON_TAG = b'j'  # Other values (e.g. lists of group keys) as JSON text, uint32 length and utf-8.
+
+
+def parse_limit(value: str) -> int:
+    """Return number of reported rows (a positive integer)."""
+    if not value.strip().isdigit() or int(value) == 0:
+        raise ValueError(f'Invalid limit "{value}", use a positive number of rows.')
+    return int(value)
+
+
+def write_csv(headers: list[str], rows: Iterable[list[Any]], output: TextIO) -> None:
+    """Write the header line and rows one by one as CSV."""
+    writer = csv.writer(output, lineterminator='\n')
+    writer.writerow(headers)
+    for row in rows:
+        writer.writerow(row)
+
+
+def write_jsonl(headers: list[str], rows: Iterable[list[Any]], output: TextIO) -> None:
+    """Write rows one by one as JSON objects (header: value), one per line."""
+    for row in rows:
+        output.write(json.dumps(dict(zip(headers, row)), ensure_ascii=False) + '\n')
+
+
+def pack_text(tag: bytes, text: str) -> bytes:
+    """Return tagged utf-8 text with its length."""
+    data = text.encode()
+    return tag + TEXT_LENGTH.pack(len(data)) + data
+
+
+def pack_value(value: Any) -> bytes:
+    """Return tagged value of the binary report."""
+    if value is None:
+        return NONE_TAG
+    elif isinstance(value, bool):  # Before int, bool is its subclass.
+        return BOOL_TAG + bytes((value,))
+    elif isinstance(value, int):
+        return INT_TAG + INT_VALUE.pack(value)
+    elif isinstance(value, float):
+        return FLOAT_TAG + FLOAT_VALUE.pack(value)
+    elif isinstance(value, str):
+        return pack_text(STR_TAG, value)
+    return pack_text(JSON_TAG, json.dumps(value))
+
+
+def write_binary(headers: list[str], rows: Iterable[list[Any]], output: BinaryIO) -> None:
+    """Write the binary report (see BINARY_REPORT_HEADER), rows one by one."""
+    names = [header.encode() for header in headers]
+    output.write(BINARY_REPORT_HEADER.pack(BINARY_REPORT_MAGIC, BINARY_REPORT_VERSION, len(names)))
+    output.write(b''.join(NAME_LENGTH.pack(len(name)) + name for name in names))
+    for row in rows:
+        output.write(ROW_TAG + b''.join(map(pack_value, row)))
+    output.write(END_TAG)
+
+
+def unpack_value(data: bytes, offset: int) -> tuple[Any, int]:
+    """Return tagged value of the binary report starting at offset and offset of the next byte."""
+    tag_end = offset + 1
+    tag = data[offset:tag_end]
+    offset = tag_end
+    if tag == NONE_TAG:
+        return None, offset
+    elif tag == BOOL_TAG:
+        return bool(data[offset]), offset + 1
+    elif tag == INT_TAG:
+        return INT_VALUE.unpack_from(data, offset)[0], offset + INT_VALUE.size
+    elif tag == FLOAT_TAG:
+        return FLOAT_VALUE.unpack_from(data, offset)[0], offset + FLOAT_VALUE.size
+    elif tag in (STR_TAG, JSON_TAG):
+        (length,) = TEXT_LENGTH.unpack_from(data, offset)
+        offset += TEXT_LENGTH.size
+        end = offset + length
+        text = bytes(data[offset:end]).decode()
+        return (text if tag == STR_TAG else json.loads(text)), end
+    raise Exception(f'Unknown value tag {tag!r} in binary report.')
+
+
+def read_binary(data: bytes) -> tuple[list[str], list[list[Any]]]:
+    """Return headers and rows of the binary report created by write_binary()."""
+    magic, version, count = BINARY_REPORT_HEADER.unpack_from(data)
+    if magic != BINARY_REPORT_MAGIC or version != BINARY_REPORT_VERSION:
+        raise Exception('Unknown format of binary report.')
+
+    offset = BINARY_REPORT_HEADER.size
+    headers = []
+    for _ in range(count):
+        (length,) = NAME_LENGTH.unpack_from(data, offset)
+        offset += NAME_LENGTH.size
+        end = offset + length
+        headers.append(bytes(data[offset:end]).decode())
+        offset = end
+    rows = []
+    while data.startswith(ROW_TAG, offset):
+        offset += 1
+        row = []
+        for _ in range(count):
+            value, offset = unpack_value(data, offset)
+            row.append(value)
+        rows.append(row)
+    if data[offset:] != END_TAG:
+        raise Exception('Unexpected end of binary report.')
+    return headers, rows
+
+
+def write_report(headers: list[str], rows: Iterable[list[Any]], output_format: str, output: BinaryIO) -> None:
+    """Write rows to the binary stream (e.g. sys.stdout.buffer) one by one in the given machine-readable format."""
+    if output_format == BINARY_FORMAT_NAME:
+        write_binary(headers, rows, output)
+        return
+
+    text_output = io.TextIOWrapper(output, encoding='utf-8', newline='')
+    try:
+        if output_format == CSV_FORMAT_NAME:
+            write_csv(headers, rows, text_output)
+        elif output_format == JSONL_FORMAT_NAME:
+            write_jsonl(headers, rows, text_output)
+        else:
+            raise Exception(f'Unknown output format "{output_format}".')
+    finally:
+        text_output.flush()
+        text_output.detach()  # The stream stays open.
@@ -0,0 +1,166 @@
+"""Stage timers and counters of a run (--stats) and profiling of a run (--profile FILE)."""
+
+import cProfile
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+from itertools import islice
+from typing import BinaryIO, Callable, ContextManager, Iterable, Iterator
+
+from bad_lines import BadLines
+from config import (
+    AGGREGATE_STAGE_NAME,
+    DECODE_STAGE_NAME,
+    INPUT_STAGE_NAME,
+    ON_ERROR_FAIL_NAME,
+    READ_STAGE_NAME,
+    RENDER_STAGE_NAME,
+    STATS_BATCH_SIZE,
+    STATS_STAGES,
+)
+from line_decoder import LINE_ERRORS
+from line_readers import get_range_end
+from log_aggregator import LogAggregator
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, peak RSS is not reported there.
+    resource = None  # type: ignore[assignment]
+
+
+def get_peak_rss_mb(who: int) -> float:
+    """Return peak resident set size in MB (ru_maxrss is in KB on Linux and in bytes on macOS)."""
+    peak_rss = resource.getrusage(who).ru_maxrss
+    return peak_rss / 2**20 if sys.platform == 'darwin' else peak_rss / 2**10
+
+
+class RunStats:
+    """
+    Time of stages and counters of a run printed with --stats.
+
+    Lines of files parsed in this process are read, decoded and aggregated by batches (see feed_lines()),
+    so the timer is read a few times per batch and not per line. The input stage is the whole reading,
+    its part not covered by the other stages is spent in worker processes, the asyncio pipeline
+    and merges of indexes, states and partial dumps (their lines are not counted).
+    Without --stats nothing is measured: the reading functions get no RunStats and parse lines as usual.
+    """
+
+    def __init__(self, batch_size: int = STATS_BATCH_SIZE):
+        """
+        Set up initial values.
+
+        self.seconds - stage name (see STATS_STAGES): seconds spent in the stage
+        self.lines - number of lines parsed in this process
+        self.bytes_read - size of byte ranges of files read for these lines (see count_bytes())
+        self.start_time - start of the run (time.perf_counter())
+        """
+        self.batch_size = batch_size
+        self.seconds = dict.fromkeys(STATS_STAGES, 0.0)
+        self.lines = 0
+        self.bytes_read = 0
+        self.start_time = time.perf_counter()
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """Add the time of the block to the stage."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[stage] += time.perf_counter() - start_time
+
+    def count_bytes(self, opened_file: BinaryIO, start: int = 0, end: int | None = None) -> None:
+        """
+        Add the size of byte range [start, end) of the file (see line_readers.iter_lines) to bytes_read.
+
+        Bytes are counted by file offsets and not by lengths of lines, which differ between --io modes
+        (bytes or decoded str, with or without line endings). A compressed file read as a whole
+        is counted by its size on disk.
+        """
+        self.bytes_read += max(get_range_end(opened_file, end) - start, 0)
+
+    def iter_batches(self, lines: Iterable[str | bytes]) -> Iterator[list[str | bytes]]:
+        """Return lines by batches, time of getting them goes to the read stage, lines are counted."""
+        iterator = iter(lines)
+        while True:
+            start_time = time.perf_counter()
+            batch = list(islice(iterator, self.batch_size))
+            self.seconds[READ_STAGE_NAME] += time.perf_counter() - start_time
+            if not batch:
+                return
+            self.lines += len(batch)
+            yield batch
+
+    def feed_lines(
+        self,
+        aggregator: LogAggregator,
+        lines: Iterable[str | bytes],
+        bad_lines: BadLines | None = None,
+        source: str = '',
+        incomplete_tail: bool = False,
+    ) -> None:
+        """
+        Add lines of the source to the aggregator as main.parsing_file() does, timing every stage.
+
+        Every batch is decoded (LogAggregator.decode_lines) and then added (LogAggregator.add_decoded).
+        A batch with a bad line is added by bad_lines if it is given (see BadLines.feed_batch),
+        its time goes to the decode stage.
+        """
+        batches = self.iter_batches(lines)
+        batch = next(batches, None)
+        while batch is not None:
+            next_batch = next(batches, None)
+            start_time = time.perf_counter()
+            try:
+                decoded = aggregator.decode_lines(batch)
+            except LINE_ERRORS:
+                if bad_lines is None or bad_lines.mode == ON_ERROR_FAIL_NAME:
+                    raise
+                bad_lines.feed_batch(aggregator, batch, source, incomplete_tail and next_batch is None)
+                self.seconds[DECODE_STAGE_NAME] += time.perf_counter() - start_time
+                batch = next_batch
+                continue
+            decoded_time = time.perf_counter()
+            aggregator.add_decoded(decoded)
+            self.seconds[DECODE_STAGE_NAME] += decoded_time - start_time
+            self.seconds[AGGREGATE_STAGE_NAME] += time.perf_counter() - decoded_time
+            batch = next_batch
+
+    def get_summary(self) -> str:
+        """Return stage times, counters, throughput and peak memory, one value per line."""
+        total = time.perf_counter() - self.start_time
+        seconds = self.seconds
+        parsed = seconds[READ_STAGE_NAME] + seconds[DECODE_STAGE_NAME] + seconds[AGGREGATE_STAGE_NAME]
+        rows = [f'stats: total {total:.3f} s']
+        rows.append(
+            f'stats: {INPUT_STAGE_NAME} {seconds[INPUT_STAGE_NAME]:.3f} s'
+            f' ({READ_STAGE_NAME} {seconds[READ_STAGE_NAME]:.3f} s,'
+            f' {DECODE_STAGE_NAME} {seconds[DECODE_STAGE_NAME]:.3f} s,'
+            f' {AGGREGATE_STAGE_NAME} {seconds[AGGREGATE_STAGE_NAME]:.3f} s,'
+            f' other {max(seconds[INPUT_STAGE_NAME] - parsed, 0.0):.3f} s)'
+        )
+        rows.append(f'stats: {RENDER_STAGE_NAME} {seconds[RENDER_STAGE_NAME]:.3f} s')
+        megabytes = self.bytes_read / 2**20
+        rows.append(f'stats: lines {self.lines}, bytes read {self.bytes_read} ({megabytes:.1f} MB)')
+        if parsed > 0:
+            rows.append(f'stats: {self.lines / parsed:.0f} lines/s, {megabytes / parsed:.1f} MB/s of parsing')
+        if resource is not None:
+            rows.append(
+                f'stats: peak RSS {get_peak_rss_mb(resource.RUSAGE_SELF):.1f} MB'
+                f' (workers {get_peak_rss_mb(resource.RUSAGE_CHILDREN):.1f} MB)'
+            )
+        return '\n'.join(rows)
+
+
+def measure_stage(stats: RunStats | None, stage: str) -> ContextManager[None]:
+    """Return context manager adding the time of the block to the stage, doing nothing without stats."""
+    return nullcontext() if stats is None else stats.measure(stage)
+
+
+def run_profiled(function: Callable[[], None], profile_file: str) -> None:
+    """Call the function under cProfile, the profile is saved to profile_file even if the function raises."""
+    profile = cProfile.Profile()
+    try:
+        profile.runcall(function)
+    finally:
+        profile.dump_stats(profile_file)
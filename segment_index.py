@@ -0,0 +1,344 @@
+"""Sidecar index of a log file (--build-index): partial statistics by segments, timestamps by blocks."""
+
+import hashlib
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import BinaryIO, Callable, Iterable, Self
+
+from bad_lines import BadLines
+from compressed_input import detect_compression
+from config import (
+    DEFAULT_WORKERS,
+    INDEX_BLOCK_SIZE,
+    INDEX_FINGERPRINT_SIZE,
+    INDEX_SEGMENT_SIZE,
+    INDEX_SUFFIX,
+    IO_CHUNKED_NAME,
+)
+from endpoint_stats import EndpointStatsMap
+from incremental_state import get_complete_lines_end
+from line_decoder import LineDecoder
+from line_readers import iter_lines
+from log_aggregator import LogAggregator
+from parallel_parsing import split_file_into_ranges
+from timestamp_parser import TimestampParser
+
+# Binary format: header (magic, version, compressed flag, file size, end of indexed lines, fingerprints
+# of the first and the last indexed bytes, number of segments, number of blocks, size of statistics of the file),
+# segment entries, block entries, statistics of the file and of every segment (EndpointStatsMap.to_bytes()),
+# little-endian.
+INDEX_HEADER = struct.Struct('<8sHBqq16s16sIIQ')
+INDEX_MAGIC = b'LOGINDEX'
+INDEX_VERSION = 1
+SEGMENT_ENTRY = struct.Struct('<qqqqQ')  # Start, end, min time, max time, size of statistics.
+BLOCK_ENTRY = struct.Struct('<qqqq')  # Start, end, min time, max time.
+# Time range of lines without valid timestamps: it overlaps every time range, so such lines are always parsed.
+MIN_TIME = -(2**63)
+MAX_TIME = 2**63 - 1
+SCAN_BATCH_SIZE = 8192  # Lines aggregated at once while the index is built.
+
+# (start, end, min time, max time): byte range of complete lines and epoch seconds of their timestamps.
+IndexEntry = tuple[int, int, int, int]
+
+
+def get_index_file(file: str) -> str:
+    """Return path of the sidecar index of file."""
+    return file + INDEX_SUFFIX
+
+
+def get_fingerprint(opened_file: BinaryIO, start: int, end: int) -> bytes:
+    """Return hash of byte range [start, end) of file."""
+    opened_file.seek(start)
+    return hashlib.blake2b(opened_file.read(end - start), digest_size=16).digest()
+
+
+def can_use_index(aggregator: LogAggregator) -> bool:
+    """Return True if statistics of the aggregator can be taken from an index (endpoint statistics only)."""
+    line_filter = aggregator.line_filter
+    return (
+        aggregator.time_bucket is None
+        and aggregator.group_by is None
+        and aggregator.top is None
+        and (line_filter is None or line_filter.has_only_time_range())
+    )
+
+
+def scan_lines(
+    lines: Iterable[bytes | str], aggregator: LogAggregator, bad_lines: BadLines | None = None, source: str = ''
+) -> tuple[int, int]:
+    """
+    Add lines to the aggregator, return minimal and maximal timestamp of lines (epoch seconds).
+
+    (MIN_TIME, MAX_TIME) if a line has no valid '@timestamp' (a bad line too), (MAX_TIME, MIN_TIME) without lines.
+    Bad lines of the source are skipped by bad_lines if it is given (see BadLines.feed_batch).
+    """
+    decode = LineDecoder({'@timestamp': bytes}).decode
+    parse_timestamp = TimestampParser().parse
+    min_time, max_time = MAX_TIME, MIN_TIME
+    iterator = iter(lines)
+    while batch := list(islice(iterator, SCAN_BATCH_SIZE)):
+        if bad_lines is None:
+            aggregator.feed_lines(batch)
+        else:
+            bad_lines.feed_batch(aggregator, batch, source)
+        if min_time == MIN_TIME and max_time == MAX_TIME:
+            continue
+        try:
+            times = [parse_timestamp(timestamp) for (timestamp,) in map(decode, batch)]
+        except (KeyError, ValueError, TypeError):
+            min_time, max_time = MIN_TIME, MAX_TIME
+        else:
+            min_time, max_time = min(min_time, *times), max(max_time, *times)
+    return min_time, max_time
+
+
+def build_segment(
+    file: str, start: int, end: int | None, block_size: int, bad_lines: BadLines | None = None
+) -> tuple[bytes, list[IndexEntry]]:
+    """
+    Parse segment [start, end) of file (a compressed file with start=0, end=None).
+
+    Return serialized statistics of the segment and its blocks, a compressed file has one block.
+    Bad lines are skipped by bad_lines if it is given.
+    """
+    aggregator = LogAggregator()
+    blocks = []
+    with open(file, 'rb') as opened_file:
+        if end is None:
+            min_time, max_time = scan_lines(iter_lines(opened_file), aggregator, bad_lines, file)
+            blocks.append((0, os.fstat(opened_file.fileno()).st_size, min_time, max_time))
+        else:
+            parts = max(1, -(-(end - start) // block_size))
+            for block_start, block_end in split_file_into_ranges(file, parts, 1, start, end):
+                lines = iter_lines(opened_file, IO_CHUNKED_NAME, block_start, block_end)
+                blocks.append((block_start, block_end, *scan_lines(lines, aggregator, bad_lines, file)))
+    return aggregator.endpoint_requests.to_bytes(), blocks
+
+
+class SegmentIndex:
+    """
+    Partial statistics of a log file saved next to it (see get_index_file()).
+
+    Complete lines of the file are split into segments (about INDEX_SEGMENT_SIZE bytes) with own statistics,
+    segments are split into blocks (about INDEX_BLOCK_SIZE bytes) with the range of their timestamps.
+    A report over the whole file takes the saved statistics of the file, only lines appended after
+    the indexed ones are parsed. A query of a time range takes statistics of segments inside the range
+    and parses only blocks overlapping the range (lines do not have to be sorted by time, see select()).
+    Statistics are kept for raw urls, url rules are applied on loading. The index is not valid
+    for a file whose indexed lines changed (see matches()), a compressed file must not change at all.
+    """
+
+    def __init__(self) -> None:
+        """
+        Set up initial values.
+
+        self.compressed - True for a compressed file (it has one segment and one block)
+        self.file_size - size of the file when the index was built
+        self.end - end of indexed complete lines
+        self.head_fingerprint, self.tail_fingerprint - hashes of the first and the last indexed bytes
+        self.segments, self.blocks - (start, end, min time, max time) of segments and blocks in file order
+        self.statistics - serialized statistics of all indexed lines
+        self.segment_statistics - serialized statistics of every segment
+        """
+        self.compressed = False
+        self.file_size = 0
+        self.end = 0
+        self.head_fingerprint = b''
+        self.tail_fingerprint = b''
+        self.segments: list[IndexEntry] = []
+        self.blocks: list[IndexEntry] = []
+        self.statistics = b''
+        self.segment_statistics: list[bytes] = []
+
+    @classmethod
+    def build(
+        cls,
+        file: str,
+        workers: int = DEFAULT_WORKERS,
+        segment_size: int = INDEX_SEGMENT_SIZE,
+        block_size: int = INDEX_BLOCK_SIZE,
+        bad_lines: BadLines | None = None,
+    ) -> Self:
+        """
+        Parse complete lines of file by segments (in a process pool with workers > 1).
+
+        Bad lines are skipped by bad_lines if it is given (serial parsing only, as in main.read_files).
+        """
+        index = cls()
+        with open(file, 'rb') as opened_file:
+            index.file_size = os.fstat(opened_file.fileno()).st_size
+            index.compressed = detect_compression(opened_file) is not None
+            index.end = index.file_size if index.compressed else get_complete_lines_end(opened_file, 0, index.file_size)
+            index.head_fingerprint, index.tail_fingerprint = index.get_fingerprints(opened_file)
+
+        if index.compressed:
+            ranges: list[tuple[int, int | None]] = [(0, None)]
+        else:
+            ranges = list(split_file_into_ranges(file, max(1, -(-index.end // segment_size)), 1, 0, index.end))
+        arguments = ([file] * len(ranges), *zip(*ranges), [block_size] * len(ranges), [bad_lines] * len(ranges))
+        if workers > 1 and len(ranges) > 1 and bad_lines is None:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(build_segment, *arguments))
+        else:
+            results = list(map(build_segment, *arguments))
+
+        endpoint_requests = EndpointStatsMap()
+        for statistics, blocks in results:
+            index.segments.append(
+                (blocks[0][0], blocks[-1][1], min(block[2] for block in blocks), max(block[3] for block in blocks))
+            )
+            index.blocks.extend(blocks)
+            index.segment_statistics.append(statistics)
+            endpoint_requests.merge(EndpointStatsMap.from_bytes(statistics))
+        index.statistics = endpoint_requests.to_bytes()
+        return index
+
+    def get_fingerprints(self, opened_file: BinaryIO) -> tuple[bytes, bytes]:
+        """Return hashes of the first and the last INDEX_FINGERPRINT_SIZE indexed bytes of file."""
+        size = min(self.end, INDEX_FINGERPRINT_SIZE)
+        return get_fingerprint(opened_file, 0, size), get_fingerprint(opened_file, self.end - size, self.end)
+
+    def matches(self, file: str) -> bool:
+        """Return True if indexed lines of file are not changed (lines may be appended to an uncompressed file)."""
+        with open(file, 'rb') as opened_file:
+            size = os.fstat(opened_file.fileno()).st_size
+            if size < self.end or (self.compressed and size != self.file_size):
+                return False
+            return self.get_fingerprints(opened_file) == (self.head_fingerprint, self.tail_fingerprint)
+
+    def to_bytes(self) -> bytes:
+        """Serialize the index to compact binary form (see INDEX_HEADER)."""
+        header = INDEX_HEADER.pack(
+            INDEX_MAGIC,
+            INDEX_VERSION,
+            self.compressed,
+            self.file_size,
+            self.end,
+            self.head_fingerprint,
+            self.tail_fingerprint,
+            len(self.segments),
+            len(self.blocks),
+            len(self.statistics),
+        )
+        segments = (
+            SEGMENT_ENTRY.pack(*segment, len(statistics))
+            for segment, statistics in zip(self.segments, self.segment_statistics)
+        )
+        blocks = (BLOCK_ENTRY.pack(*block) for block in self.blocks)
+        return b''.join((header, *segments, *blocks, self.statistics, *self.segment_statistics))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Self:
+        """Deserialize index created by to_bytes()."""
+        (
+            magic,
+            version,
+            compressed,
+            file_size,
+            end,
+            head_fingerprint,
+            tail_fingerprint,
+            segment_count,
+            block_count,
+            statistics_size,
+        ) = INDEX_HEADER.unpack_from(data)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise Exception('Unknown format of index.')
+        index = cls()
+        index.compressed = bool(compressed)
+        index.file_size, index.end = file_size, end
+        index.head_fingerprint, index.tail_fingerprint = head_fingerprint, tail_fingerprint
+
+        offset = INDEX_HEADER.size
+        statistics_sizes = []
+        for _ in range(segment_count):
+            *segment, size = SEGMENT_ENTRY.unpack_from(data, offset)
+            index.segments.append(tuple(segment))  # type: ignore[arg-type]
+            statistics_sizes.append(size)
+            offset += SEGMENT_ENTRY.size
+        for _ in range(block_count):
+            index.blocks.append(BLOCK_ENTRY.unpack_from(data, offset))
+            offset += BLOCK_ENTRY.size
+        index.statistics = data[offset : offset + statistics_size]  # noqa: E203
+        offset += statistics_size
+        for size in statistics_sizes:
+            index.segment_statistics.append(data[offset : offset + size])  # noqa: E203
+            offset += size
+        return index
+
+    def save(self, index_file: str) -> None:
+        """Save the index atomically (a crash leaves the previous index file)."""
+        temporary_file = f'{index_file}.tmp'
+        with open(temporary_file, 'wb') as opened_file:
+            opened_file.write(self.to_bytes())
+        os.replace(temporary_file, index_file)
+
+    @classmethod
+    def load(cls, index_file: str) -> Self:
+        """Load the index saved by save()."""
+        with open(index_file, 'rb') as opened_file:
+            return cls.from_bytes(opened_file.read())
+
+    def select(
+        self, since: int | None = None, until: int | None = None
+    ) -> tuple[list[int], list[tuple[int, int | None]]]:
+        """
+        Return numbers of segments with all lines in time range [since, until) and byte ranges to parse.
+
+        Byte ranges are made of blocks of the other segments overlapping the range, their lines
+        must be filtered by time (a compressed file is parsed as a whole: (0, None)).
+        None - the range is not limited.
+        """
+        since = MIN_TIME if since is None else since
+        until = MAX_TIME if until is None else until
+        numbers = []
+        ranges: list[tuple[int, int | None]] = []
+        blocks = iter(self.blocks)
+        for number, (start, end, min_time, max_time) in enumerate(self.segments):
+            segment_blocks = [next(blocks)]
+            while segment_blocks[-1][1] < end:
+                segment_blocks.append(next(blocks))
+            if min_time > max_time or max_time < since or min_time >= until:  # No lines of the range.
+                continue
+            if since <= min_time and (max_time < until or until == MAX_TIME):
+                numbers.append(number)
+                continue
+            if self.compressed:
+                ranges.append((0, None))
+                continue
+            for block_start, block_end, block_min_time, block_max_time in segment_blocks:
+                if block_min_time > block_max_time or block_max_time < since or block_min_time >= until:
+                    continue
+                if ranges and ranges[-1][1] == block_start:
+                    ranges[-1] = (ranges[-1][0], block_end)
+                else:
+                    ranges.append((block_start, block_end))
+        return numbers, ranges
+
+    def load_endpoint_requests(
+        self, numbers: list[int] | None = None, normalize_url: Callable[[str], str] | None = None
+    ) -> EndpointStatsMap:
+        """Return statistics of the given segments (all indexed lines by default) with urls normalized."""
+        if numbers is None:
+            endpoint_requests = EndpointStatsMap.from_bytes(self.statistics)
+        else:
+            endpoint_requests = EndpointStatsMap()
+            for number in numbers:
+                endpoint_requests.merge(EndpointStatsMap.from_bytes(self.segment_statistics[number]))
+        if normalize_url is None:
+            return endpoint_requests
+
+        normalized = EndpointStatsMap()
+        normalized.merge(endpoint_requests, normalize_url)
+        return normalized
+
+
+def load_file_index(file: str) -> SegmentIndex | None:
+    """Return the index of file, None if there is no index or indexed lines of file changed."""
+    index_file = get_index_file(file)
+    if not os.path.exists(index_file):
+        return None
+    index = SegmentIndex.load(index_file)
+    return index if index.matches(file) else None
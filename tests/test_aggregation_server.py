@@ -0,0 +1,212 @@
+"""Module with tests aggregation_server.py."""
+
+import asyncio
+import json
+from unittest import mock
+
+import pytest
+from aggregation_server import AggregationServer, ReportSnapshot, parse_server_address, serve
+from bad_lines import BadLines
+from config import AVERAGE_REPORT_NAME, ON_ERROR_QUARANTINE_NAME, ON_ERROR_SKIP_NAME, PERCENTILES_REPORT_NAME
+from log_aggregator import LogAggregator
+
+LINES = [
+    b'{"url": "/api/1/...", "response_time": 0.1}',
+    b'{"url": "/api/2/...", "response_time": 0.2}',
+    b'{"url": "/api/1/...", "response_time": 0.3}',
+]
+
+
+async def query(socket_path: str, *targets: str, method: str = 'GET') -> list[tuple[int, dict[str, str], bytes]]:
+    """Send requests of targets by one connection, return status, headers and body of every response."""
+    reader, writer = await asyncio.open_unix_connection(socket_path)
+    responses = []
+    for index, target in enumerate(targets):
+        close = 'Connection: close\r\n' if index == len(targets) - 1 else ''
+        writer.write(f'{method} {target} HTTP/1.1\r\nHost: localhost\r\n{close}\r\n'.encode())
+        status_line = await reader.readline()
+        headers = {}
+        while (header := await reader.readline()) != b'\r\n':
+            name, _, value = header.decode().partition(':')
+            headers[name.lower()] = value.strip()
+        body = await reader.readexactly(int(headers['content-length']))
+        responses.append((int(status_line.split()[1]), headers, body))
+    writer.close()
+    return responses
+
+
+async def push(socket_path: str, lines: list[bytes]) -> None:
+    """Push lines to the ingest socket."""
+    _, writer = await asyncio.open_unix_connection(socket_path)
+    writer.write(b'\n'.join(lines) + b'\n')
+    await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+
+async def wait_for_snapshot(server: AggregationServer, version: int) -> None:
+    """Wait until the snapshot of the given version is published."""
+    while server.snapshot.version < version:
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def addresses(tmp_path):
+    """Return query and ingest addresses of Unix sockets."""
+    return f'unix:{tmp_path / "query.sock"}', f'unix:{tmp_path / "ingest.sock"}'
+
+
+class TestParseServerAddress:
+    """Tests parse_server_address(value)."""
+
+    @pytest.mark.parametrize('value', ['unix:/run/logs.sock', 'tcp:127.0.0.1:8080'])
+    def test_return_value(self, value):
+        """Test valid addresses are returned as is."""
+        assert parse_server_address(value) == value
+
+    @pytest.mark.parametrize('value', ['unix:', 'tcp:localhost', '/run/logs.sock'])
+    def test_invalid_value(self, value):
+        """Test exception for invalid address."""
+        with pytest.raises(ValueError, match='Invalid'):
+            parse_server_address(value)
+
+
+class TestReportSnapshot:
+    """Tests ReportSnapshot(aggregator, version)."""
+
+    def test_render(self):
+        """Test text and JSON reports, rendered reports are cached."""
+        aggregator = LogAggregator()
+        aggregator.feed_lines(LINES)
+        snapshot = ReportSnapshot(aggregator, 1)
+
+        assert snapshot.render(AVERAGE_REPORT_NAME, 'text') == (aggregator.report(AVERAGE_REPORT_NAME) + '\n').encode()
+        assert json.loads(snapshot.render(PERCENTILES_REPORT_NAME, 'json')) == {
+            'report': PERCENTILES_REPORT_NAME,
+            'version': 1,
+            'headers': ['handler', 'total', 'p50', 'p90', 'p95', 'p99'],
+            'rows': aggregator.get_report_data(PERCENTILES_REPORT_NAME)[1],
+        }
+        aggregator.feed_lines(LINES)
+        assert snapshot.render(AVERAGE_REPORT_NAME, 'text') == snapshot.responses[(AVERAGE_REPORT_NAME, 'text')]
+
+
+class TestAggregationServer:
+    """Tests AggregationServer(aggregator, query_address, ingest_addresses, files, snapshot_interval)."""
+
+    def test_queries(self, addresses, tmp_path):
+        """Test reports of pushed and followed lines, keep-alive connection."""
+        log_file = tmp_path / 'test.log'
+        log_file.write_bytes(LINES[0] + b'\n')
+        query_address, ingest_address = addresses
+        server = AggregationServer(LogAggregator(), query_address, [ingest_address], [str(log_file)], 0.01)
+
+        async def run() -> list[tuple[int, dict[str, str], bytes]]:
+            stop = asyncio.Event()
+            task = asyncio.create_task(server.run(stop))
+            while len(server.servers) < 2:
+                await asyncio.sleep(0.01)
+            await push(ingest_address.removeprefix('unix:'), LINES[1:])
+            await wait_for_snapshot(server, 2)
+            responses = await query(
+                query_address.removeprefix('unix:'),
+                '/report/average',
+                '/report/average?format=json',
+                '/status',
+                '/unknown',
+                '/report/average?format=xml',
+            )
+            stop.set()
+            await task
+            return responses
+
+        responses = asyncio.run(run())
+        expected = LogAggregator()
+        expected.feed_lines(LINES)
+
+        assert responses[0][:2] == (200, {'content-type': 'text/plain; charset=utf-8', 'content-length': mock.ANY})
+        assert responses[0][2].decode() == expected.report(AVERAGE_REPORT_NAME) + '\n'
+        assert responses[1][1]['content-type'] == 'application/json'
+        assert json.loads(responses[1][2])['rows'] == expected.get_report_data(AVERAGE_REPORT_NAME)[1]
+        assert json.loads(responses[2][2])['endpoints'] == 2
+        assert [status for status, _, _ in responses[3:]] == [404, 400]
+        assert not (tmp_path / 'query.sock').exists()
+
+    def test_snapshot_isolation(self, addresses):
+        """Test queries see the published snapshot, not the live statistics."""
+        server = AggregationServer(LogAggregator(), *addresses)
+        server.ingest(LINES[:1])
+        server.publish_snapshot()
+        server.ingest(LINES[1:])
+
+        assert server.snapshot.version == 1
+        assert server.snapshot.aggregator.get_report_data(AVERAGE_REPORT_NAME)[1] == [['/api/1/...', 1, 0.1]]
+        assert len(server.aggregator.endpoint_requests) == 2
+        server.publish_snapshot()
+        assert server.snapshot.aggregator.endpoint_requests == server.aggregator.endpoint_requests
+        assert server.snapshot.aggregator.endpoint_requests['/api/1/...'] is not (
+            server.aggregator.endpoint_requests['/api/1/...']
+        )
+
+    def test_invalid_line(self, addresses, capsys):
+        """Test connection with an invalid line is closed, the server keeps working."""
+        query_address, ingest_address = addresses
+        server = AggregationServer(LogAggregator(), query_address, [ingest_address], snapshot_interval=0.01)
+
+        async def run() -> list[tuple[int, dict[str, str], bytes]]:
+            stop = asyncio.Event()
+            task = asyncio.create_task(server.run(stop))
+            while len(server.servers) < 2:
+                await asyncio.sleep(0.01)
+            await push(ingest_address.removeprefix('unix:'), [b'not json'])
+            await push(ingest_address.removeprefix('unix:'), LINES)
+            await wait_for_snapshot(server, 1)
+            responses = await query(query_address.removeprefix('unix:'), '/status', method='POST')
+            stop.set()
+            await task
+            return responses
+
+        responses = asyncio.run(run())
+        assert responses[0][0] == 405
+        assert len(server.aggregator.endpoint_requests) == 2
+        assert 'Invalid line' in capsys.readouterr().err
+
+    def test_ingest_bad_lines(self, addresses, tmp_path):
+        """Test bad lines are skipped by bad_lines, the rest of the batch is added and published."""
+        quarantine_file = tmp_path / 'bad.log'
+        bad_lines = BadLines(ON_ERROR_QUARANTINE_NAME, str(quarantine_file))
+        server = AggregationServer(LogAggregator(), *addresses, bad_lines=bad_lines)
+        server.ingest([LINES[0], b'not json', *LINES[1:]], 'ingest.sock')
+        server.publish_snapshot()
+
+        expected = LogAggregator()
+        expected.feed_lines(LINES)
+        assert server.snapshot.version == 1
+        assert server.snapshot.aggregator.endpoint_requests == expected.endpoint_requests
+        assert bad_lines.counts == {'ingest.sock': 1}
+        assert quarantine_file.read_bytes() == b'not json\n'
+
+    @pytest.mark.parametrize('bad_lines', [None, BadLines(ON_ERROR_SKIP_NAME)])
+    def test_ingest_version(self, addresses, bad_lines):
+        """Test the version is changed by a batch with a bad line, the lines added by it are published."""
+        server = AggregationServer(LogAggregator(backend='python'), *addresses, bad_lines=bad_lines)
+        try:
+            server.ingest([LINES[0], b'not json', *LINES[1:]])
+        except ValueError:
+            assert bad_lines is None
+        server.publish_snapshot()
+
+        assert server.version == server.snapshot.version == 1
+        assert server.snapshot.aggregator.endpoint_requests == server.aggregator.endpoint_requests
+        assert len(server.aggregator.endpoint_requests) == (1 if bad_lines is None else 2)
+
+
+class TestServe:
+    """Tests serve(aggregator, query_address, ingest_addresses, files, snapshot_interval)."""
+
+    @mock.patch('aggregation_server.AggregationServer.run', side_effect=KeyboardInterrupt)
+    def test_keyboard_interrupt(self, mock_run, addresses):
+        """Test the server stops on Ctrl+C."""
+        serve(LogAggregator(), addresses[0])
+
+        mock_run.assert_called_once()
@@ -0,0 +1,172 @@
+"""Module with tests async_ingestion.py."""
+
+import asyncio
+import gzip
+import io
+import json
+import sys
+from typing import Any, Iterator
+
+import pytest
+from async_ingestion import (
+    LineBatch,
+    ingest_sources,
+    is_stream_source,
+    iter_file_line_batches,
+    iter_stdin_line_batches,
+    parse_tcp_address,
+)
+from bad_lines import BadLines
+from config import ON_ERROR_SKIP_NAME
+from log_aggregator import LogAggregator
+
+TEST_REQUEST_DATA: list[dict[str, Any]] = [
+    {"url": f"/api/{i % 3}/...", "response_time": round(0.001 * (i + 1), 3)} for i in range(30)
+]
+TEST_LOG = b''.join(json.dumps(data).encode() + b'\n' for data in TEST_REQUEST_DATA)
+
+
+@pytest.fixture
+def log_files(tmp_path):
+    """Create plain and gzip compressed log files with TEST_REQUEST_DATA."""
+    plain_file = tmp_path / 'test.log'
+    plain_file.write_bytes(TEST_LOG)
+    compressed_file = tmp_path / 'test.log.gz'
+    compressed_file.write_bytes(gzip.compress(TEST_LOG))
+    return [str(plain_file), str(compressed_file)]
+
+
+def serial_aggregator(copies: int) -> LogAggregator:
+    """Build expected aggregator from copies of TEST_REQUEST_DATA."""
+    aggregator = LogAggregator()
+    aggregator.feed(TEST_REQUEST_DATA * copies)
+    return aggregator
+
+
+async def serve_log(data: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Send data to the connected client by small parts and close the connection."""
+    for start in range(0, len(data), 100):
+        writer.write(data[start : start + 100])  # noqa: E203
+        await writer.drain()
+    writer.close()
+    await writer.wait_closed()
+
+
+class TestIsStreamSource:
+    """Tests is_stream_source(source)."""
+
+    @pytest.mark.parametrize(
+        'source, expected',
+        [('-', True), ('unix:/run/app.sock', True), ('tcp:localhost:5140', True), ('app.log', False)],
+    )
+    def test_return_value(self, source, expected):
+        """Test stdin and sockets are stream sources, other values are files."""
+        assert is_stream_source(source) is expected
+
+
+class TestParseTcpAddress:
+    """Tests parse_tcp_address(source)."""
+
+    @pytest.mark.parametrize(
+        'source, expected',
+        [('tcp:localhost:5140', ('localhost', 5140)), ('tcp:[::1]:80', ('::1', 80))],
+    )
+    def test_return_value(self, source, expected):
+        """Test host and port."""
+        assert parse_tcp_address(source) == expected
+
+    @pytest.mark.parametrize('source', ['tcp:localhost', 'tcp::5140', 'tcp:localhost:http'])
+    def test_invalid_value(self, source):
+        """Test exception for invalid address."""
+        with pytest.raises(ValueError, match='Invalid source'):
+            parse_tcp_address(source)
+
+
+class TestLineBatches:
+    """Tests iter_file_line_batches(file, io_mode, batch_size) and iter_stdin_line_batches(chunk_size)."""
+
+    def test_file(self, log_files):
+        """Test batches of at most batch_size lines of the decompressed file."""
+        batches = list(iter_file_line_batches(log_files[1], batch_size=7))
+
+        assert [len(batch) for batch in batches] == [7, 7, 7, 7, 2]
+        assert b'\n'.join(line for batch in batches for line in batch) + b'\n' == TEST_LOG
+
+    def test_stdin(self, monkeypatch):
+        """Test lines cut by chunks of stdin are completed."""
+        monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BytesIO(TEST_LOG)))
+
+        lines = [line for batch in iter_stdin_line_batches(chunk_size=10) for line in batch]
+        assert b'\n'.join(lines) + b'\n' == TEST_LOG
+
+
+class TestIngestSources:
+    """Tests ingest_sources(sources, aggregator, io_mode, concurrency, queue_size, bad_lines)."""
+
+    @pytest.mark.parametrize('concurrency, queue_size', [(1, 1), (4, 1), (4, 16)])
+    def test_files(self, log_files, concurrency, queue_size):
+        """Test statistics of all files are the same as of the serial parsing."""
+        aggregator = LogAggregator()
+        asyncio.run(ingest_sources(log_files * 3, aggregator, concurrency=concurrency, queue_size=queue_size))
+
+        assert aggregator.endpoint_requests == serial_aggregator(6).endpoint_requests
+
+    def test_sockets_and_stdin(self, log_files, tmp_path, monkeypatch):
+        """Test lines of Unix and TCP sockets (read up to EOF) and stdin are aggregated with files."""
+        monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BytesIO(TEST_LOG)))
+        aggregator = LogAggregator()
+
+        async def run() -> None:
+            unix_server = await asyncio.start_unix_server(
+                lambda reader, writer: serve_log(TEST_LOG, reader, writer), str(tmp_path / 'log.sock')
+            )
+            tcp_server = await asyncio.start_server(
+                lambda reader, writer: serve_log(TEST_LOG.rstrip(b'\n'), reader, writer), '127.0.0.1', 0
+            )
+            port = tcp_server.sockets[0].getsockname()[1]
+            async with unix_server, tcp_server:
+                sources = [f'unix:{tmp_path / "log.sock"}', f'tcp:127.0.0.1:{port}', '-', log_files[0]]
+                await ingest_sources(sources, aggregator, concurrency=2)
+
+        asyncio.run(run())
+        assert aggregator.endpoint_requests == serial_aggregator(4).endpoint_requests
+
+    def test_backpressure(self, log_files, monkeypatch):
+        """Test sources are suspended by the full queue: at most queue_size + concurrency batches are read ahead."""
+        aggregator = LogAggregator()
+        fed_batches = 0
+        read_batches = 0
+
+        def feed_lines(lines: list[bytes]) -> None:
+            nonlocal fed_batches
+            fed_batches += 1
+            assert read_batches - fed_batches <= 2 + 3
+            LogAggregator.feed_lines(aggregator, lines)
+
+        def iter_counted_batches(file: str, io_mode: str) -> Iterator[LineBatch]:
+            nonlocal read_batches
+            for batch in iter_file_line_batches(file, io_mode, batch_size=1):
+                read_batches += 1
+                yield batch
+
+        aggregator.feed_lines = feed_lines  # type: ignore[method-assign]
+        monkeypatch.setattr('async_ingestion.iter_file_line_batches', iter_counted_batches)
+        asyncio.run(ingest_sources(log_files * 3, aggregator, concurrency=3, queue_size=2))
+
+        assert fed_batches == read_batches == 6 * len(TEST_REQUEST_DATA)
+
+    def test_error(self, log_files, tmp_path):
+        """Test exception of a source is raised, the other sources are cancelled."""
+        with pytest.raises(FileNotFoundError):
+            asyncio.run(ingest_sources([*log_files, str(tmp_path / 'missing.log')], LogAggregator(), concurrency=3))
+
+    def test_bad_lines(self, log_files, tmp_path):
+        """Test bad lines are skipped and counted by sources."""
+        bad_file = tmp_path / 'bad.log'
+        bad_file.write_bytes(b'not json\n' + TEST_LOG + b'{"url": "/api/1/..."}\n')
+        bad_lines = BadLines(ON_ERROR_SKIP_NAME)
+        aggregator = LogAggregator()
+        asyncio.run(ingest_sources([*log_files, str(bad_file)], aggregator, concurrency=2, bad_lines=bad_lines))
+
+        assert aggregator.endpoint_requests == serial_aggregator(3).endpoint_requests
+        assert bad_lines.counts == {str(bad_file): 2}
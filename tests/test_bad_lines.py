@@ -0,0 +1,179 @@
+"""Module with tests bad_lines.py."""
+
+import gzip
+import json
+from unittest import mock
+
+import pytest
+from bad_lines import BadLines, has_incomplete_tail
+from config import ON_ERROR_FAIL_NAME, ON_ERROR_QUARANTINE_NAME, ON_ERROR_SKIP_NAME
+from line_filter import LineFilter
+from log_aggregator import LogAggregator
+
+START_TIME = 1704067200  # 2024-01-01T00:00:00+00:00
+GOOD_LINES = [
+    json.dumps(
+        {
+            '@timestamp': f'2024-01-01T00:00:{i:02d}+00:00',
+            'status': (200, 500)[i % 2],
+            'url': f'/api/{i % 3}/...',
+            'response_time': 0.001 * (i + 1),
+        }
+    ).encode()
+    for i in range(40)
+]
+BAD_LINES = [
+    b'not json',
+    b'{"url": "/api/1/...", "status": 200}',  # Missing response_time.
+    b'{"@timestamp": "2024-01-01T00:00:00+00:00", "url": "/api/1/...", "status": 200, "response_time": null}',
+    b'{"@timestamp": "now", "url": "/api/1/...", "status": 200, "response_time": 0.1}',
+]
+# Bad lines among good ones: in the first batches, at a batch border and in the last batch.
+LINES = GOOD_LINES[:3] + BAD_LINES[:2] + GOOD_LINES[3:20] + BAD_LINES[2:3] + GOOD_LINES[20:] + BAD_LINES[3:]
+
+
+class TestHasIncompleteTail:
+    """Tests has_incomplete_tail(opened_file, end)."""
+
+    @pytest.mark.parametrize(
+        'data, end, expected',
+        [
+            (b'{}\n{}\n', None, False),
+            (b'{}\n{', None, True),
+            (b'{}\n{', 3, False),  # The range ends before the last line.
+            (b'', None, False),
+            (gzip.compress(b'{}\n{'), None, False),
+        ],
+    )
+    def test_return_value(self, tmp_path, data, end, expected):
+        """Test only the last line without line ending of an uncompressed file is incomplete."""
+        path = tmp_path / 'test.log'
+        path.write_bytes(data)
+        with open(path, 'rb') as opened_file:
+            assert has_incomplete_tail(opened_file, end) is expected
+            assert opened_file.tell() == 0
+
+
+class TestBadLines:
+    """Tests BadLines(mode, quarantine_file, batch_size)."""
+
+    @pytest.mark.parametrize(
+        'settings, count',
+        [
+            ({'backend': 'python'}, 3),  # A bad timestamp is read only by time series and the time filter.
+            ({'backend': 'numpy'}, 3),
+            ({'backend': 'numpy', 'url_rules': ['/api/{group}/...']}, 3),
+            ({'time_bucket': 60}, 4),
+            ({'group_by': ['url', 'status']}, 3),
+            ({'top': 2}, 3),
+            ({'line_filter': LineFilter(START_TIME + 10, statuses=['5xx'])}, 2),  # Lines of status 200 are skipped.
+        ],
+    )
+    @pytest.mark.parametrize('batch_size', [1, 8, 4096])
+    def test_same_as_good_lines(self, settings, count, batch_size):
+        """Test statistics are the same as of good lines for every way of aggregation, bad lines are counted."""
+        aggregator = LogAggregator(**settings)
+        bad_lines = BadLines(ON_ERROR_SKIP_NAME, batch_size=batch_size)
+        bad_lines.feed_lines(aggregator, LINES, 'test.log')
+        bad_lines.feed_lines(aggregator, [line.decode() + '\n' for line in LINES], 'test2.log')
+
+        expected = LogAggregator(**settings)
+        expected.feed_lines((GOOD_LINES if count != 3 else [*GOOD_LINES, BAD_LINES[3]]) * 2)
+        assert aggregator.get_result() == expected.get_result()
+        assert bad_lines.counts == {'test.log': count, 'test2.log': count}
+
+    @pytest.mark.parametrize('settings', [{'backend': 'python'}, {'backend': 'numpy'}, {'group_by': ['url']}])
+    def test_not_string_url(self, settings):
+        """Test a line with a url which is not a string is a bad line."""
+        aggregator = LogAggregator(**settings)
+        bad_lines = BadLines(ON_ERROR_SKIP_NAME)
+        line = b'{"url": 5, "status": 200, "response_time": 0.2}'
+        bad_lines.feed_lines(aggregator, [*GOOD_LINES[:5], line, *GOOD_LINES[5:]], 'test.log')
+
+        expected = LogAggregator(**settings)
+        expected.feed_lines(GOOD_LINES)
+        assert aggregator.get_result() == expected.get_result()
+        assert bad_lines.counts == {'test.log': 1}
+
+    @pytest.mark.parametrize('settings', [{'group_by': ['url']}, {'top': 2}, {'time_bucket': 60}])
+    def test_out_of_range_response_time(self, settings):
+        """Test a response time out of range of microsecond sums is a bad line."""
+        aggregator = LogAggregator(**settings)
+        bad_lines = BadLines(ON_ERROR_SKIP_NAME)
+        line = json.loads(GOOD_LINES[0])
+        line['response_time'] = 1e300
+        bad_lines.feed_lines(aggregator, [*GOOD_LINES[:5], json.dumps(line).encode(), *GOOD_LINES[5:]], 'test.log')
+
+        expected = LogAggregator(**settings)
+        expected.feed_lines(GOOD_LINES)
+        assert aggregator.get_result() == expected.get_result()
+        assert bad_lines.counts == {'test.log': 1}
+
+    def test_fail(self):
+        """Test the first bad line raises in ON_ERROR_FAIL_NAME mode."""
+        with pytest.raises(json.decoder.JSONDecodeError):
+            BadLines(ON_ERROR_FAIL_NAME).feed_lines(LogAggregator(), LINES, 'test.log')
+
+    def test_hot_path(self):
+        """Test lines of batches without bad lines are not checked one by one."""
+        aggregator = LogAggregator()
+        bad_lines = BadLines(ON_ERROR_SKIP_NAME, batch_size=8)
+        with mock.patch.object(aggregator, 'is_valid_line', wraps=aggregator.is_valid_line) as mock_is_valid_line:
+            bad_lines.feed_lines(aggregator, LINES, 'test.log')
+
+        assert mock_is_valid_line.call_count == 2 * 8  # Two batches with bad lines (a bad timestamp is not read).
+
+    def test_not_line_error(self):
+        """Test an exception not caused by a bad line is raised."""
+        aggregator = LogAggregator()
+        with mock.patch.object(aggregator, 'feed_lines', side_effect=TypeError('Not a line error.')):
+            with pytest.raises(TypeError, match='Not a line error.'):
+                BadLines(ON_ERROR_SKIP_NAME).feed_lines(aggregator, GOOD_LINES, 'test.log')
+
+    def test_quarantine(self, tmp_path):
+        """Test bad lines are appended to the quarantine file by batches."""
+        quarantine_file = tmp_path / 'quarantine.log'
+        quarantine_file.write_bytes(b'old\n')
+        bad_lines = BadLines(ON_ERROR_QUARANTINE_NAME, str(quarantine_file), batch_size=8)
+        with mock.patch('bad_lines.QUARANTINE_BATCH_SIZE', 2):
+            bad_lines.feed_lines(LogAggregator(), LINES, 'test.log')
+            assert quarantine_file.read_bytes() == b'old\n' + b''.join(line + b'\n' for line in BAD_LINES[:2])
+            assert bad_lines.quarantined_lines == [BAD_LINES[2]]
+        bad_lines.feed_lines(LogAggregator(), [line.decode() + '\n' for line in BAD_LINES[:1]], 'test2.log')
+        bad_lines.flush()
+
+        assert quarantine_file.read_bytes() == b'old\n' + b''.join(
+            line + b'\n' for line in [*BAD_LINES[:3], b'not json']
+        )
+        assert bad_lines.get_summary() == (
+            f'test.log: 3 bad lines quarantined to {quarantine_file}\n'
+            f'test2.log: 1 bad lines quarantined to {quarantine_file}'
+        )
+
+    @pytest.mark.parametrize('incomplete_tail, expected_counts', [(True, {}), (False, {'test.log': 1})])
+    def test_truncated_last_line(self, tmp_path, incomplete_tail, expected_counts):
+        """Test the bad last line of a source without line ending is counted as truncated and not quarantined."""
+        quarantine_file = tmp_path / 'quarantine.log'
+        bad_lines = BadLines(ON_ERROR_QUARANTINE_NAME, str(quarantine_file), batch_size=8)
+        aggregator = LogAggregator()
+        bad_lines.feed_lines(aggregator, [*GOOD_LINES[:16], GOOD_LINES[16][:20]], 'test.log', incomplete_tail)
+        bad_lines.flush()
+
+        expected = LogAggregator()
+        expected.feed_lines(GOOD_LINES[:16])
+        assert aggregator.endpoint_requests == expected.endpoint_requests
+        assert bad_lines.counts == expected_counts
+        assert bad_lines.truncated_counts == ({'test.log': 1} if incomplete_tail else {})
+        assert quarantine_file.exists() is not incomplete_tail
+        assert bad_lines.get_summary() == (
+            'test.log: 0 bad lines quarantined to ' + str(quarantine_file) + ', 1 truncated last line (not parsed)'
+            if incomplete_tail
+            else f'test.log: 1 bad lines quarantined to {quarantine_file}'
+        )
+
+    def test_empty_summary(self):
+        """Test summary without bad lines."""
+        bad_lines = BadLines(ON_ERROR_SKIP_NAME)
+        bad_lines.feed_lines(LogAggregator(), GOOD_LINES, 'test.log')
+
+        assert bad_lines.get_summary() == ''
@@ -0,0 +1,132 @@
+"""Module with tests compressed_input.py."""
+
+import bz2
+import gzip
+import io
+import lzma
+import threading
+
+import pytest
+from compressed_input import (
+    detect_compression,
+    is_compressed,
+    iter_decompressed_chunks,
+    iter_prefetched,
+    open_decompressed,
+)
+from config import BZIP2_NAME, GZIP_NAME, XZ_NAME, ZSTD_NAME
+
+TEST_CONTENT = b''.join(b'{"url": "/api/%d/...", "response_time": 0.1}\n' % i for i in range(1000))
+
+
+def zstd_compress(data: bytes) -> bytes:
+    """Compress data with zstandard (test is skipped without the optional package)."""
+    zstandard = pytest.importorskip('zstandard')
+    return zstandard.ZstdCompressor().compress(data)
+
+
+COMPRESSORS = {
+    GZIP_NAME: gzip.compress,
+    BZIP2_NAME: bz2.compress,
+    XZ_NAME: lzma.compress,
+    ZSTD_NAME: zstd_compress,
+}
+
+
+class TestDetectCompression:
+    """Tests detect_compression(opened_file)."""
+
+    @pytest.mark.parametrize('compression', COMPRESSORS)
+    def test_return_value(self, compression):
+        """Test compression is detected by magic bytes, file position is kept."""
+        opened_file = io.BytesIO(COMPRESSORS[compression](TEST_CONTENT))
+        opened_file.seek(3)
+
+        assert detect_compression(opened_file) == compression
+        assert opened_file.tell() == 3
+
+    @pytest.mark.parametrize('data', [b'', b'{', TEST_CONTENT])
+    def test_uncompressed(self, data):
+        """Test None for uncompressed data."""
+        assert detect_compression(io.BytesIO(data)) is None
+
+    def test_is_compressed(self, tmp_path):
+        """Test is_compressed(file)."""
+        compressed_file, plain_file = tmp_path / 'test.log.gz', tmp_path / 'test.log'
+        compressed_file.write_bytes(gzip.compress(TEST_CONTENT))
+        plain_file.write_bytes(TEST_CONTENT)
+
+        assert is_compressed(str(compressed_file)) is True
+        assert is_compressed(str(plain_file)) is False
+
+
+class TestOpenDecompressed:
+    """Tests open_decompressed(opened_file, compression)."""
+
+    @pytest.mark.parametrize('compression', COMPRESSORS)
+    def test_return_value(self, compression):
+        """Test decompressed data of several concatenated streams."""
+        compressed_data = COMPRESSORS[compression](TEST_CONTENT)
+
+        with open_decompressed(io.BytesIO(compressed_data * 2), compression) as decompressed_file:
+            assert decompressed_file.read() == TEST_CONTENT * 2
+
+    def test_raise_without_zstandard(self, monkeypatch):
+        """Test call exception due to missing optional package."""
+        monkeypatch.setattr('compressed_input.zstandard', None)
+        with pytest.raises(Exception, match='Install "zstandard" package to read zstd compressed files.'):
+            open_decompressed(io.BytesIO(b''), ZSTD_NAME)
+
+    def test_raise(self):
+        """Test call exception due to unknown compression."""
+        with pytest.raises(Exception, match='No action specified for compression "unknown"'):
+            open_decompressed(io.BytesIO(b''), 'unknown')
+
+
+class TestIterDecompressedChunks:
+    """Tests iter_decompressed_chunks(opened_file, compression, chunk_size)."""
+
+    def test_return_value(self):
+        """Test chunks of decompressed data."""
+        chunks = list(iter_decompressed_chunks(io.BytesIO(gzip.compress(TEST_CONTENT)), GZIP_NAME, chunk_size=1000))
+
+        assert b''.join(chunks) == TEST_CONTENT
+        assert max(len(chunk) for chunk in chunks) <= 1000
+
+
+class TestIterPrefetched:
+    """Tests iter_prefetched(items, queue_size)."""
+
+    def test_return_value(self):
+        """Test items are produced in another thread and kept in order."""
+        producer_threads = set()
+
+        def produce():
+            for i in range(100):
+                producer_threads.add(threading.get_ident())
+                yield i
+
+        assert list(iter_prefetched(produce(), queue_size=2)) == list(range(100))
+        assert producer_threads and threading.get_ident() not in producer_threads
+
+    def test_raise(self):
+        """Test exception of the producer is raised in the consumer."""
+
+        def produce():
+            yield 1
+            raise ValueError('Broken stream.')
+
+        items = iter_prefetched(produce())
+        assert next(items) == 1
+        with pytest.raises(ValueError, match='Broken stream.'):
+            next(items)
+
+    def test_close(self):
+        """Test closed consumer stops the blocked producer."""
+        threads_count = threading.active_count()
+        items = iter_prefetched(iter(range(1000)), queue_size=1)
+        assert next(items) == 0
+
+        items.close()
+
+        assert threading.active_count() == threads_count
@@ -10,6 +10,10 @@ class TestGlobalValues:
         """Test name AVERAGE_REPORT_NAME."""
         assert config.AVERAGE_REPORT_NAME == 'average'
 
+    def test_name_percentiles_report_name(self):
+        """Test name PERCENTILES_REPORT_NAME."""
+        assert config.PERCENTILES_REPORT_NAME == 'percentiles'
+
     def test_name_url_column_name(self):
         """Test name URL_COLUMN_NAME."""
         assert config.URL_COLUMN_NAME == 'handler'
@@ -29,3 +33,274 @@ class TestGlobalValues:
             config.REQUESTS_TOTAL_COLUMN_NAME,
             config.AVG_RESPONSE_TIME_COLUMN_NAME,
         ]
+
+    def test_name_percentile_column_names(self):
+        """Test names P50_COLUMN_NAME, P90_COLUMN_NAME, P95_COLUMN_NAME, P99_COLUMN_NAME."""
+        assert config.P50_COLUMN_NAME == 'p50'
+        assert config.P90_COLUMN_NAME == 'p90'
+        assert config.P95_COLUMN_NAME == 'p95'
+        assert config.P99_COLUMN_NAME == 'p99'
+
+    def test_value_percentiles_headers(self):
+        """Test value PERCENTILES_HEADERS."""
+        assert config.PERCENTILES_HEADERS == [
+            config.URL_COLUMN_NAME,
+            config.REQUESTS_TOTAL_COLUMN_NAME,
+            config.P50_COLUMN_NAME,
+            config.P90_COLUMN_NAME,
+            config.P95_COLUMN_NAME,
+            config.P99_COLUMN_NAME,
+        ]
+
+    def test_value_percentile_columns(self):
+        """Test value PERCENTILE_COLUMNS."""
+        assert config.PERCENTILE_COLUMNS == {'p50': 0.5, 'p90': 0.9, 'p95': 0.95, 'p99': 0.99}
+
+    def test_value_quantile_sketch(self):
+        """Test values QUANTILE_SKETCH_RELATIVE_ACCURACY and QUANTILE_SKETCH_MAX_BUCKETS."""
+        assert config.QUANTILE_SKETCH_RELATIVE_ACCURACY == 0.01
+        assert config.QUANTILE_SKETCH_MAX_BUCKETS == 2048
+
+    def test_value_default_workers(self):
+        """Test value DEFAULT_WORKERS."""
+        assert config.DEFAULT_WORKERS == 1
+
+    def test_value_min_shard_size(self):
+        """Test value MIN_SHARD_SIZE."""
+        assert config.MIN_SHARD_SIZE == 1024 * 1024
+
+    def test_value_response_times_buffer_size(self):
+        """Test value RESPONSE_TIMES_BUFFER_SIZE."""
+        assert config.RESPONSE_TIMES_BUFFER_SIZE == 1024
+
+    def test_value_response_times_buffer_limit(self):
+        """Test value RESPONSE_TIMES_BUFFER_LIMIT."""
+        assert config.RESPONSE_TIMES_BUFFER_LIMIT == 262144
+
+    def test_value_io_modes(self):
+        """Test value IO_MODES and DEFAULT_IO_MODE."""
+        assert config.IO_MODES == [config.IO_TEXT_NAME, config.IO_CHUNKED_NAME, config.IO_MMAP_NAME]
+        assert config.IO_MODES == ['text', 'chunked', 'mmap']
+        assert config.DEFAULT_IO_MODE == config.IO_CHUNKED_NAME
+
+    def test_value_io_chunk_size(self):
+        """Test value IO_CHUNK_SIZE."""
+        assert config.IO_CHUNK_SIZE == 4 * 1024 * 1024
+
+    def test_value_state_fingerprint_size(self):
+        """Test value STATE_FINGERPRINT_SIZE."""
+        assert config.STATE_FINGERPRINT_SIZE == 1024
+
+    def test_value_follow_intervals(self):
+        """Test values FOLLOW_REFRESH_INTERVAL and FOLLOW_POLL_INTERVAL."""
+        assert config.FOLLOW_REFRESH_INTERVAL == 2.0
+        assert config.FOLLOW_POLL_INTERVAL == 0.25
+
+    def test_name_compressions(self):
+        """Test names GZIP_NAME, BZIP2_NAME, XZ_NAME, ZSTD_NAME."""
+        assert config.GZIP_NAME == 'gzip'
+        assert config.BZIP2_NAME == 'bz2'
+        assert config.XZ_NAME == 'xz'
+        assert config.ZSTD_NAME == 'zstd'
+
+    def test_value_decompression_queue_size(self):
+        """Test value DECOMPRESSION_QUEUE_SIZE."""
+        assert config.DECOMPRESSION_QUEUE_SIZE == 4
+
+    def test_name_timeseries(self):
+        """Test names TIMESERIES_REPORT_NAME and BUCKET_COLUMN_NAME."""
+        assert config.TIMESERIES_REPORT_NAME == 'timeseries'
+        assert config.BUCKET_COLUMN_NAME == 'bucket'
+
+    def test_value_timeseries_headers(self):
+        """Test value TIMESERIES_HEADERS."""
+        assert config.TIMESERIES_HEADERS == [
+            config.BUCKET_COLUMN_NAME,
+            config.URL_COLUMN_NAME,
+            config.REQUESTS_TOTAL_COLUMN_NAME,
+            config.AVG_RESPONSE_TIME_COLUMN_NAME,
+            config.P50_COLUMN_NAME,
+            config.P90_COLUMN_NAME,
+            config.P95_COLUMN_NAME,
+            config.P99_COLUMN_NAME,
+        ]
+
+    def test_value_default_time_bucket(self):
+        """Test value DEFAULT_TIME_BUCKET."""
+        assert config.DEFAULT_TIME_BUCKET == '1m'
+
+    def test_value_timestamp_cache_size(self):
+        """Test value TIMESTAMP_CACHE_SIZE."""
+        assert config.TIMESTAMP_CACHE_SIZE == 4096
+
+    def test_value_url_cache_size(self):
+        """Test value URL_CACHE_SIZE."""
+        assert config.URL_CACHE_SIZE == 65536
+
+    def test_value_url_id_placeholder(self):
+        """Test value URL_ID_PLACEHOLDER."""
+        assert config.URL_ID_PLACEHOLDER == '{id}'
+
+    def test_name_groupby(self):
+        """Test names GROUPBY_REPORT_NAME, DEFAULT_GROUP_BY and DEFAULT_METRICS."""
+        assert config.GROUPBY_REPORT_NAME == 'groupby'
+        assert config.DEFAULT_GROUP_BY == 'url'
+        assert config.DEFAULT_METRICS == 'count,mean'
+
+    def test_value_group_by_field_types(self):
+        """Test value GROUP_BY_FIELD_TYPES."""
+        assert config.GROUP_BY_FIELD_TYPES == {'status': int}
+
+    def test_value_error_status_min(self):
+        """Test value ERROR_STATUS_MIN."""
+        assert config.ERROR_STATUS_MIN == 500
+
+    def test_name_backends(self):
+        """Test names PYTHON_BACKEND_NAME and NUMPY_BACKEND_NAME."""
+        assert config.PYTHON_BACKEND_NAME == 'python'
+        assert config.NUMPY_BACKEND_NAME == 'numpy'
+
+    def test_value_numpy_batch_size(self):
+        """Test value NUMPY_BATCH_SIZE."""
+        assert config.NUMPY_BATCH_SIZE == 4096
+
+    def test_value_numpy_max_value_size(self):
+        """Test value NUMPY_MAX_VALUE_SIZE."""
+        assert config.NUMPY_MAX_VALUE_SIZE == 512
+
+    def test_value_numpy_search_window(self):
+        """Test value NUMPY_SEARCH_WINDOW."""
+        assert config.NUMPY_SEARCH_WINDOW == 32
+
+    def test_name_top_by(self):
+        """Test names TOP_BY_COUNT_NAME, TOP_BY_TIME_NAME, TOP_BY_NAMES and DEFAULT_TOP_BY."""
+        assert config.TOP_BY_COUNT_NAME == 'count'
+        assert config.TOP_BY_TIME_NAME == 'time'
+        assert config.TOP_BY_NAMES == [config.TOP_BY_COUNT_NAME, config.TOP_BY_TIME_NAME]
+        assert config.DEFAULT_TOP_BY == config.TOP_BY_COUNT_NAME
+
+    def test_value_top_capacity(self):
+        """Test values TOP_CAPACITY_FACTOR and TOP_MIN_CAPACITY."""
+        assert config.TOP_CAPACITY_FACTOR == 10
+        assert config.TOP_MIN_CAPACITY == 1000
+
+    def test_value_top_headers(self):
+        """Test values TOP_BY_COUNT_HEADERS and TOP_BY_TIME_HEADERS."""
+        assert config.RESPONSE_TIME_TOTAL_COLUMN_NAME == 'time_total'
+        assert config.MAX_ERROR_COLUMN_NAME == 'max_error'
+        assert config.TOP_BY_COUNT_HEADERS == [
+            config.URL_COLUMN_NAME,
+            config.REQUESTS_TOTAL_COLUMN_NAME,
+            config.MAX_ERROR_COLUMN_NAME,
+            config.AVG_RESPONSE_TIME_COLUMN_NAME,
+        ]
+        assert config.TOP_BY_TIME_HEADERS == [
+            config.URL_COLUMN_NAME,
+            config.RESPONSE_TIME_TOTAL_COLUMN_NAME,
+            config.MAX_ERROR_COLUMN_NAME,
+            config.AVG_RESPONSE_TIME_COLUMN_NAME,
+        ]
+
+    def test_value_concurrency(self):
+        """Test values DEFAULT_CONCURRENCY, INGEST_QUEUE_SIZE and INGEST_BATCH_SIZE."""
+        assert config.DEFAULT_CONCURRENCY == 1
+        assert config.INGEST_QUEUE_SIZE == 16
+        assert config.INGEST_BATCH_SIZE == 4096
+
+    def test_name_sources(self):
+        """Test names STDIN_SOURCE, UNIX_SOURCE_PREFIX and TCP_SOURCE_PREFIX."""
+        assert config.STDIN_SOURCE == '-'
+        assert config.UNIX_SOURCE_PREFIX == 'unix:'
+        assert config.TCP_SOURCE_PREFIX == 'tcp:'
+
+    def test_value_server_snapshot_interval(self):
+        """Test value SERVER_SNAPSHOT_INTERVAL."""
+        assert config.SERVER_SNAPSHOT_INTERVAL == 0.5
+
+    def test_name_server_paths(self):
+        """Test names SERVER_REPORT_PATH and SERVER_STATUS_PATH."""
+        assert config.SERVER_REPORT_PATH == '/report/'
+        assert config.SERVER_STATUS_PATH == '/status'
+
+    def test_name_response_formats(self):
+        """Test names TEXT_FORMAT_NAME, JSON_FORMAT_NAME, RESPONSE_FORMATS and DEFAULT_RESPONSE_FORMAT."""
+        assert config.TEXT_FORMAT_NAME == 'text'
+        assert config.JSON_FORMAT_NAME == 'json'
+        assert config.RESPONSE_FORMATS == [config.TEXT_FORMAT_NAME, config.JSON_FORMAT_NAME]
+        assert config.DEFAULT_RESPONSE_FORMAT == config.TEXT_FORMAT_NAME
+
+    def test_value_index(self):
+        """Test values INDEX_SUFFIX, INDEX_SEGMENT_SIZE, INDEX_BLOCK_SIZE and INDEX_FINGERPRINT_SIZE."""
+        assert config.INDEX_SUFFIX == '.idx'
+        assert config.INDEX_SEGMENT_SIZE == 64 * 1024 * 1024
+        assert config.INDEX_BLOCK_SIZE == 1024 * 1024
+        assert config.INDEX_FINGERPRINT_SIZE == 1024
+
+    def test_value_status_patterns(self):
+        """Test values STATUS_WILDCARD and STATUS_PATTERN_LENGTH."""
+        assert config.STATUS_WILDCARD == 'x'
+        assert config.STATUS_PATTERN_LENGTH == 3
+
+    def test_name_on_error(self):
+        """Test names ON_ERROR_FAIL_NAME, ON_ERROR_SKIP_NAME, ON_ERROR_QUARANTINE_NAME, ON_ERROR_NAMES."""
+        assert config.ON_ERROR_FAIL_NAME == 'fail'
+        assert config.ON_ERROR_SKIP_NAME == 'skip'
+        assert config.ON_ERROR_QUARANTINE_NAME == 'quarantine'
+        assert config.ON_ERROR_NAMES == [
+            config.ON_ERROR_FAIL_NAME,
+            config.ON_ERROR_SKIP_NAME,
+            config.ON_ERROR_QUARANTINE_NAME,
+        ]
+        assert config.DEFAULT_ON_ERROR == config.ON_ERROR_FAIL_NAME
+        assert config.DEFAULT_QUARANTINE_FILE == 'quarantine.log'
+
+    def test_value_error_batches(self):
+        """Test values ERROR_BATCH_SIZE and QUARANTINE_BATCH_SIZE, a batch is one batch of the numpy backend."""
+        assert config.ERROR_BATCH_SIZE == 4096
+        assert config.ERROR_BATCH_SIZE <= config.NUMPY_BATCH_SIZE
+        assert config.QUARANTINE_BATCH_SIZE == 1024
+
+    def test_name_spread_report(self):
+        """Test names SPREAD_REPORT_NAME and columns of min, max and standard deviation of response time."""
+        assert config.SPREAD_REPORT_NAME == 'spread'
+        assert config.MIN_RESPONSE_TIME_COLUMN_NAME == 'min_response_time'
+        assert config.MAX_RESPONSE_TIME_COLUMN_NAME == 'max_response_time'
+        assert config.STDDEV_RESPONSE_TIME_COLUMN_NAME == 'stddev_response_time'
+
+    def test_value_spread_headers(self):
+        """Test value SPREAD_HEADERS."""
+        assert config.SPREAD_HEADERS == [
+            config.URL_COLUMN_NAME,
+            config.REQUESTS_TOTAL_COLUMN_NAME,
+            config.AVG_RESPONSE_TIME_COLUMN_NAME,
+            config.MIN_RESPONSE_TIME_COLUMN_NAME,
+            config.MAX_RESPONSE_TIME_COLUMN_NAME,
+            config.STDDEV_RESPONSE_TIME_COLUMN_NAME,
+        ]
+
+    def test_value_output_formats(self):
+        """Test value OUTPUT_FORMATS and DEFAULT_OUTPUT_FORMAT."""
+        assert config.OUTPUT_FORMATS == [
+            config.TEXT_FORMAT_NAME,
+            config.CSV_FORMAT_NAME,
+            config.JSONL_FORMAT_NAME,
+            config.BINARY_FORMAT_NAME,
+        ]
+        assert config.OUTPUT_FORMATS == ['text', 'csv', 'jsonl', 'binary']
+        assert config.DEFAULT_OUTPUT_FORMAT == config.TEXT_FORMAT_NAME
+
+    def test_value_partial_stdout(self):
+        """Test value PARTIAL_STDOUT."""
+        assert config.PARTIAL_STDOUT == '-'
+
+    def test_value_stats(self):
+        """Test value STATS_BATCH_SIZE and STATS_STAGES."""
+        assert config.STATS_BATCH_SIZE == 4096
+        assert config.STATS_STAGES == [
+            config.INPUT_STAGE_NAME,
+            config.READ_STAGE_NAME,
+            config.DECODE_STAGE_NAME,
+            config.AGGREGATE_STAGE_NAME,
+            config.RENDER_STAGE_NAME,
+        ]
+        assert config.STATS_STAGES == ['input', 'read', 'decode', 'aggregate', 'render']
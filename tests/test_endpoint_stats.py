@@ -1,9 +1,36 @@
 """Module with tests test_endpoint_stats.py."""
 
-import pytest
+import math
+import random
+import statistics
+from fractions import Fraction
+from unittest import mock
 
-from config import AVERAGE_HEADERS, AVG_RESPONSE_TIME_COLUMN_NAME, REQUESTS_TOTAL_COLUMN_NAME, URL_COLUMN_NAME
-from endpoint_stats import EndpointStats
+import endpoint_stats
+import pytest
+from config import (
+    AVERAGE_HEADERS,
+    AVG_RESPONSE_TIME_COLUMN_NAME,
+    MAX_RESPONSE_TIME_COLUMN_NAME,
+    MIN_RESPONSE_TIME_COLUMN_NAME,
+    P50_COLUMN_NAME,
+    P99_COLUMN_NAME,
+    PERCENTILE_COLUMNS,
+    PERCENTILES_HEADERS,
+    REQUESTS_TOTAL_COLUMN_NAME,
+    SPREAD_HEADERS,
+    STDDEV_RESPONSE_TIME_COLUMN_NAME,
+    URL_COLUMN_NAME,
+)
+from endpoint_stats import (
+    EndpointStats,
+    EndpointStatsMap,
+    get_exact_squares,
+    get_exact_sum_parts,
+    get_float_sum,
+    get_integer_sum,
+)
+from time_series import TimeSeries
 
 
 class TestEndpointStats:
@@ -49,6 +76,89 @@ class TestEndpointStats:
             else:
                 raise Exception('Change test!')
 
+    def test_get_correct_format_for_tabulate_percentiles(self, endpoint_stats_object):
+        """Test get_correct_format_for_tabulate(PERCENTILES_HEADERS) return value."""
+        for fake_time in TestEndpointStats.fake_times:
+            endpoint_stats_object.add_response_time(fake_time)
+            endpoint_stats_object.add_request()
+
+        table_row = endpoint_stats_object.get_correct_format_for_tabulate(PERCENTILES_HEADERS)
+
+        assert table_row[:2] == [endpoint_stats_object.url, endpoint_stats_object.total_requests]
+        for column_name, data_element in zip(PERCENTILES_HEADERS[2:], table_row[2:]):
+            quantile = PERCENTILE_COLUMNS[column_name]
+            assert data_element == endpoint_stats_object.get_percentile_response_time(quantile)
+
+    def test_get_correct_format_for_tabulate_raise(self, endpoint_stats_object):
+        """Test call exception due to unknown column."""
+        with pytest.raises(Exception, match='Unknown column in headers. Add new functionality to EndpointStats.'):
+            endpoint_stats_object.get_correct_format_for_tabulate(['UNKNOWN_COLUMN'])
+
+    def test_get_percentile_response_time(self, endpoint_stats_object):
+        """Test percentiles are within 1% of exact values (buffered values included)."""
+        fake_times = [0.001 * i for i in range(1, 1001)]
+        endpoint_stats_object.add_response_times(fake_times)
+
+        assert endpoint_stats_object.get_percentile_response_time(PERCENTILE_COLUMNS[P50_COLUMN_NAME]) == (
+            pytest.approx(0.5, rel=0.01)
+        )
+        assert endpoint_stats_object.get_percentile_response_time(PERCENTILE_COLUMNS[P99_COLUMN_NAME]) == (
+            pytest.approx(0.99, rel=0.01)
+        )
+
+    def test_get_correct_format_for_tabulate_spread(self, endpoint_stats_object):
+        """Test get_correct_format_for_tabulate(SPREAD_HEADERS) return value."""
+        for fake_time in TestEndpointStats.fake_times:
+            endpoint_stats_object.add_response_time(fake_time)
+            endpoint_stats_object.add_request()
+
+        assert endpoint_stats_object.get_correct_format_for_tabulate(SPREAD_HEADERS) == [
+            endpoint_stats_object.url,
+            5,
+            0.032,
+            0.02,
+            0.06,
+            round(statistics.pstdev(TestEndpointStats.fake_times), 3),
+        ]
+
+    def test_get_stddev_response_time(self, endpoint_stats_object):
+        """Test standard deviation without cancellation of large close values, 0.0 without requests."""
+        assert endpoint_stats_object.get_stddev_response_time() == 0.0
+
+        fake_times = [1e6 + 0.002 * (i % 2) for i in range(10_000)]
+        for fake_time in fake_times:
+            endpoint_stats_object.add_request()
+            endpoint_stats_object.add_response_time(fake_time)
+
+        assert endpoint_stats_object.get_stddev_response_time() == round(statistics.pstdev(fake_times), 3) == 0.001
+        assert endpoint_stats_object.get_min_response_time() == 1e6
+        assert endpoint_stats_object.get_max_response_time() == 1e6 + 0.002
+
+    def test_spread_order_independent(self):
+        """Test min, max and standard deviation do not depend on order and chunks of response times."""
+        fake_times = [random.Random(i).choice([0.001, 0.024, 0.0145, 1e-9, 12.5]) for i in range(5000)]
+        endpoint_stats1 = EndpointStats(TestEndpointStats.endpoint_url)
+        for fake_time in fake_times:
+            endpoint_stats1.add_request()
+            endpoint_stats1.add_response_time(fake_time)
+        endpoint_stats2 = EndpointStats(TestEndpointStats.endpoint_url)
+        for shard in reversed(range(7)):
+            part = EndpointStats(TestEndpointStats.endpoint_url)
+            part.total_requests = len(fake_times[shard::7])
+            part.add_response_times(reversed(fake_times[shard::7]))
+            endpoint_stats2 = EndpointStats.from_bytes((part + endpoint_stats2).to_bytes())
+
+        headers = [MIN_RESPONSE_TIME_COLUMN_NAME, MAX_RESPONSE_TIME_COLUMN_NAME, STDDEV_RESPONSE_TIME_COLUMN_NAME]
+        assert endpoint_stats1 == endpoint_stats2
+        assert endpoint_stats1.get_correct_format_for_tabulate(headers) == [
+            0.0,  # Rounded.
+            12.5,
+            round(statistics.pstdev(fake_times), 3),
+        ]
+        assert endpoint_stats1.get_correct_format_for_tabulate(headers) == (
+            endpoint_stats2.get_correct_format_for_tabulate(headers)
+        )
+
     def test_add_request(self, endpoint_stats_object):
         """Test add_request() working."""
         for i, _ in enumerate(TestEndpointStats.fake_times):
@@ -60,3 +170,282 @@ class TestEndpointStats:
         for i, fake_time in enumerate(TestEndpointStats.fake_times):
             endpoint_stats_object.add_response_time(fake_time)
             assert endpoint_stats_object.total_response_time == sum(TestEndpointStats.fake_times[: i + 1])
+
+    def test_add_response_times(self, endpoint_stats_object):
+        """Test add_response_times(new_response_times) working."""
+        endpoint_stats_object.add_response_times(TestEndpointStats.fake_times)
+        assert endpoint_stats_object.total_response_time == math.fsum(TestEndpointStats.fake_times)
+
+    def test_total_response_time_order_independent(self):
+        """Test total_response_time does not depend on order and chunks of response times."""
+        fake_times = [random.Random(i).choice([0.001, 0.024, 0.0145, 1e-9, 12.5]) for i in range(5000)]
+        endpoint_stats1 = EndpointStats(TestEndpointStats.endpoint_url)
+        for fake_time in fake_times:
+            endpoint_stats1.add_response_time(fake_time)
+        endpoint_stats2 = EndpointStats(TestEndpointStats.endpoint_url)
+        for shard in range(7):
+            part = EndpointStats(TestEndpointStats.endpoint_url)
+            part.add_response_times(reversed(fake_times[shard::7]))
+            endpoint_stats2.merge(part)
+
+        assert endpoint_stats1.total_response_time == endpoint_stats2.total_response_time == math.fsum(fake_times)
+        assert endpoint_stats1 == endpoint_stats2  # Quantile sketch too.
+
+    def test_merge(self, endpoint_stats_object):
+        """Test merge(other) working."""
+        other = EndpointStats(TestEndpointStats.endpoint_url)
+        other.add_request()
+        other.add_response_time(0.5)
+        endpoint_stats_object.add_request()
+        endpoint_stats_object.add_response_time(0.25)
+
+        endpoint_stats_object.merge(other)
+
+        assert endpoint_stats_object.total_requests == 2
+        assert endpoint_stats_object.total_response_time == 0.75
+        assert other.total_requests == 1  # Other object is not changed.
+
+    def test_merge_raise(self, endpoint_stats_object):
+        """Test call exception due to merge of different endpoints."""
+        with pytest.raises(Exception, match='Can not merge statistics of different endpoints'):
+            endpoint_stats_object.merge(EndpointStats('other/url/'))
+
+    def test_add(self):
+        """Test __add__ returns new object and is associative."""
+        parts = []
+        for fake_time in TestEndpointStats.fake_times:
+            part = EndpointStats(TestEndpointStats.endpoint_url)
+            part.add_request()
+            part.add_response_time(fake_time)
+            parts.append(part)
+
+        left = ((parts[0] + parts[1]) + parts[2]) + (parts[3] + parts[4])
+        right = parts[4] + (parts[3] + (parts[2] + (parts[1] + parts[0])))
+
+        assert left == right
+        assert left.total_requests == len(TestEndpointStats.fake_times)
+        assert left.total_response_time == math.fsum(TestEndpointStats.fake_times)
+        assert parts[0].total_requests == 1
+
+    def test_to_bytes_from_bytes(self, endpoint_stats_object):
+        """Test serialization round trip."""
+        for fake_time in TestEndpointStats.fake_times:
+            endpoint_stats_object.add_request()
+            endpoint_stats_object.add_response_time(fake_time)
+
+        restored = EndpointStats.from_bytes(endpoint_stats_object.to_bytes())
+
+        assert restored == endpoint_stats_object
+        assert restored.total_response_time == endpoint_stats_object.total_response_time
+
+    def test_time_series_merge_to_bytes(self, endpoint_stats_object):
+        """Test time series are merged and serialized."""
+        other = EndpointStats(endpoint_stats_object.url)
+        other.time_series = TimeSeries(60)
+        other.time_series.add(1750600620, 0.5)
+
+        endpoint_stats_object.merge(other)
+        restored = EndpointStats.from_bytes(endpoint_stats_object.to_bytes())
+
+        assert endpoint_stats_object.time_series == other.time_series
+        assert endpoint_stats_object.time_series is not other.time_series
+        assert restored == endpoint_stats_object
+
+    def test_get_time_series_format_for_tabulate(self, endpoint_stats_object):
+        """Test a row for every time bucket in TIMESERIES_HEADERS subsequence."""
+        assert endpoint_stats_object.get_time_series_format_for_tabulate() == []
+
+        endpoint_stats_object.time_series = TimeSeries(60)
+        for timestamp, response_time in ((1750600680, 0.2), (1750600620, 0.1), (1750600621, 0.3)):
+            endpoint_stats_object.time_series.add(timestamp, response_time)
+
+        first_row, second_row = endpoint_stats_object.get_time_series_format_for_tabulate()
+        assert first_row[:4] == ['2025-06-22T13:57:00+00:00', endpoint_stats_object.url, 2, 0.2]
+        assert second_row[:4] == ['2025-06-22T13:58:00+00:00', endpoint_stats_object.url, 1, 0.2]
+        # Percentiles (lower rank of 2 values is the first one) within relative accuracy (rounded).
+        assert first_row[4:] == pytest.approx([0.1] * 4, abs=0.002)
+        assert second_row[4:] == pytest.approx([0.2] * 4, abs=0.004)
+        with pytest.raises(Exception, match='Unknown column in headers. Add new functionality to EndpointStats.'):
+            endpoint_stats_object.get_time_series_format_for_tabulate(['UNKNOWN_COLUMN'])
+
+    def test_from_bytes_raise(self, endpoint_stats_object):
+        """Test call exception due to extra data."""
+        with pytest.raises(Exception, match='Unexpected data after serialized EndpointStats.'):
+            EndpointStats.from_bytes(endpoint_stats_object.to_bytes() + b'\x00')
+
+
+class TestEndpointStatsMap:
+    """Tests EndpointStatsMap."""
+
+    @pytest.fixture
+    def endpoint_stats_maps(self):
+        """Create three maps with overlapping endpoints."""
+        endpoint_stats_maps = []
+        for urls in (['/a/', '/b/'], ['/b/', '/c/'], ['/c/', '/a/', 'юникод/']):
+            endpoint_stats_map = EndpointStatsMap()
+            for i, url in enumerate(urls):
+                endpoint_stats_map[url] = EndpointStats(url)
+                endpoint_stats_map[url].add_request()
+                endpoint_stats_map[url].add_response_time(0.1 * (i + 1))
+            endpoint_stats_maps.append(endpoint_stats_map)
+        return endpoint_stats_maps
+
+    def test_merge(self, endpoint_stats_maps):
+        """Test merge(other) working."""
+        first, second, third = endpoint_stats_maps
+        first.merge(second)
+        first.merge(third)
+
+        assert list(first) == ['/a/', '/b/', '/c/', 'юникод/']
+        assert first['/a/'].total_requests == 2
+        assert first['/b/'].total_response_time == 0.2 + 0.1
+        assert second['/b/'].total_requests == 1  # Other map is not changed.
+
+    @pytest.mark.parametrize(
+        'value, expected_average, expected_max',
+        [(math.nan, 'nan', 0.1), (math.inf, 'inf', math.inf), (1e308, 'inf', 1e308)],
+    )
+    def test_out_of_float_range(self, value, expected_average, expected_max):
+        """Test nan, infinite and huge response times among many others are compacted and reported."""
+        endpoint_stats_map = EndpointStatsMap()
+        for response_times in ([0.1] * 5000, [value], [0.1] * 5000, [value]):
+            for response_time in response_times:
+                endpoint_stats_map.add('/a/', response_time)
+            endpoint_stats_map.compact()
+
+        endpoint_stats = endpoint_stats_map['/a/']
+        assert endpoint_stats.total_requests == 10002
+        assert str(endpoint_stats.get_avg_response_time()) == expected_average
+        assert endpoint_stats.max_response_time == expected_max
+        assert math.isnan(endpoint_stats.get_stddev_response_time())
+        assert endpoint_stats.get_percentile_response_time(0.5) > 0  # Infinite and nan values are not sketched.
+        data = endpoint_stats_map.to_bytes()
+        assert EndpointStatsMap.from_bytes(data).to_bytes() == data
+
+    def test_add_associative(self, endpoint_stats_maps):
+        """Test __add__ is associative and commutative by values."""
+        first, second, third = endpoint_stats_maps
+        assert (first + second) + third == first + (second + third) == third + second + first
+
+    def test_to_bytes_from_bytes(self, endpoint_stats_maps):
+        """Test serialization round trip."""
+        endpoint_stats_map = endpoint_stats_maps[0] + endpoint_stats_maps[1] + endpoint_stats_maps[2]
+
+        restored = EndpointStatsMap.from_bytes(endpoint_stats_map.to_bytes())
+
+        assert isinstance(restored, EndpointStatsMap) is True
+        assert list(restored) == list(endpoint_stats_map)
+        assert restored == endpoint_stats_map
+
+    def test_from_bytes_raise(self):
+        """Test call exception due to unknown format."""
+        with pytest.raises(Exception, match='Unknown format of serialized EndpointStatsMap.'):
+            EndpointStatsMap.from_bytes(b'XXXX\x01\x00\x00\x00\x00')
+
+    def test_views(self, endpoint_stats_maps):
+        """Test values are views of the map columns, assigned statistics are copied."""
+        first, second, _ = endpoint_stats_maps
+        first.setdefault('/a/', EndpointStats('/a/')).add_request()
+        first.setdefault('/d/', second['/b/']).add_request()
+        first['/b/'] = second['/b/']
+
+        assert first['/a/'].total_requests == 2
+        assert first['/d/'].url == '/d/'
+        assert first['/d/'].total_requests == 2
+        assert first['/b/'].total_response_time == 0.1
+        assert second['/b/'].total_requests == 1  # Other map is not changed.
+        assert list(first) == ['/a/', '/b/', '/d/']
+
+    def test_merge_normalize_url(self, endpoint_stats_maps):
+        """Test statistics of urls with the same normalized url are merged."""
+        endpoint_stats_map = EndpointStatsMap()
+        endpoint_stats_map.merge(endpoint_stats_maps[2], lambda url: url[:1])
+
+        assert list(endpoint_stats_map) == ['/', 'ю']
+        assert endpoint_stats_map['/'].total_requests == 2
+        assert endpoint_stats_map['/'].total_response_time == math.fsum([0.1, 0.2])
+
+    @pytest.mark.parametrize('buffer_limit', [1, 5, 1000])
+    def test_add_buffer_limit(self, buffer_limit):
+        """Test statistics do not depend on compaction of buffered response times by their total number."""
+        response_times = [round(random.Random(i).uniform(0.001, 2.0), 3) for i in range(300)]
+        expected = EndpointStatsMap()
+        for i, response_time in enumerate(response_times):
+            endpoint_stats = expected.setdefault(f'/{i % 7}/', EndpointStats(f'/{i % 7}/'))
+            endpoint_stats.add_request()
+            endpoint_stats.add_response_time(response_time)
+
+        endpoint_stats_map = EndpointStatsMap()
+        with mock.patch('endpoint_stats.RESPONSE_TIMES_BUFFER_LIMIT', buffer_limit):
+            for i, response_time in enumerate(response_times):
+                assert endpoint_stats_map.add(f'/{i % 7}/', response_time) == i % 7
+                assert endpoint_stats_map._new_count <= buffer_limit
+
+        assert endpoint_stats_map == expected
+
+
+class TestGetExactSumParts:
+    """Tests get_exact_sum_parts(values)."""
+
+    @pytest.mark.parametrize('values', [[], [0.1] * 10, [1e100, 1.0, -1e100, 0.024], [0.024, 0.02, 0.024, 0.06]])
+    def test_return_value(self, values):
+        """Test parts keep the exact sum of values."""
+        parts = get_exact_sum_parts(values)
+        assert math.fsum(parts) == math.fsum(values)
+        assert math.fsum(parts + [-value for value in values]) == 0.0
+
+    @pytest.mark.parametrize(
+        'values, expected',
+        [
+            ([0.1, math.nan], [math.nan]),
+            ([0.1] * 3 + [math.nan], [math.nan]),
+            ([math.inf, 0.1], [math.inf]),
+            ([0.1, -math.inf, 0.2], [-math.inf]),
+            ([math.inf, -math.inf, 0.1], [math.nan]),
+            ([1e308, 1e308], [math.inf]),
+            ([-1e308, -1e308, -1e308], [-math.inf]),
+            ([1e308, 1e308, -1e308, 1e-300], [1e308, 1e-300]),  # Intermediate overflow, the sum is a float.
+        ],
+    )
+    def test_out_of_float_range(self, values, expected):
+        """Test nan, infinities and overflow give one part (nan or infinity) instead of endless parts."""
+        parts = get_exact_sum_parts(values)
+        assert [str(part) for part in parts] == [str(part) for part in expected]
+        assert str(get_float_sum(values)) == str(expected[0])
+
+
+class TestGetIntegerSum:
+    """Tests get_integer_sum(values)."""
+
+    @pytest.mark.parametrize('values', [[], [0.1] * 10, [1e100, 1.0, -1e100, 0.024], [1e-300, 3.0, 2.5e-17]])
+    def test_return_value(self, values):
+        """Test numerator / 2**exponent is the exact sum of values."""
+        numerator, exponent = get_integer_sum(values)
+        assert Fraction(numerator, 2**exponent) == sum(map(Fraction, values), Fraction(0))
+
+
+class TestGetExactSquares:
+    """Tests get_exact_squares(values)."""
+
+    @pytest.mark.parametrize('values', [[], [0.1] * 10, [1e6 + 0.001, 0.024, 12.5, 1e-9], [0.024, 0.02, -0.06]])
+    @pytest.mark.parametrize('has_numpy', [True, False])
+    def test_return_value(self, values, has_numpy):
+        """Test exact sum of floats equals exact sum of squares, the same floats without numpy."""
+        with (
+            mock.patch('endpoint_stats.numpy', endpoint_stats.numpy if has_numpy else None),
+            mock.patch('endpoint_stats.NUMPY_MIN_VALUES', 0),
+        ):
+            squares = get_exact_squares(values)
+        assert len(squares) == 2 * len(values)
+        assert sum(map(Fraction, squares), Fraction(0)) == sum(Fraction(value) ** 2 for value in values)
+        assert squares == get_exact_squares(values)
+
+    @pytest.mark.parametrize('has_numpy', [True, False])
+    def test_out_of_float_range(self, has_numpy):
+        """Test squares out of float range have zero errors, not nan."""
+        with (
+            mock.patch('endpoint_stats.numpy', endpoint_stats.numpy if has_numpy else None),
+            mock.patch('endpoint_stats.NUMPY_MIN_VALUES', 0),
+        ):
+            squares = get_exact_squares([1e308, math.inf, 0.5])
+        assert squares == [math.inf, math.inf, 0.25, 0.0, 0.0, 0.0]
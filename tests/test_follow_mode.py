@@ -0,0 +1,219 @@
+"""Module with tests follow_mode.py."""
+
+import os
+import random
+from unittest import mock
+
+import pytest
+from bad_lines import BadLines
+from config import AVERAGE_REPORT_NAME, GROUPBY_REPORT_NAME, ON_ERROR_SKIP_NAME, PERCENTILES_REPORT_NAME
+from endpoint_stats import EndpointStats, EndpointStatsMap
+from follow_mode import CLEAR_SCREEN, EndpointRanking, FileFollower, follow_files, print_table
+from log_aggregator import LogAggregator
+
+LINE1 = b'{"url": "/api/1/...", "response_time": 0.1}'
+LINE2 = b'{"url": "/api/2/...", "response_time": 0.2}'
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    """Create log file with one line."""
+    new_file = tmp_path / 'test.log'
+    new_file.write_bytes(LINE1 + b'\n')
+    return str(new_file)
+
+
+def read_new_lines(follower: FileFollower) -> list[bytes]:
+    """Return all lines of all new batches."""
+    return [line for lines in follower.iter_new_line_batches() for line in lines]
+
+
+def append(file: str, data: bytes) -> None:
+    """Append data to file."""
+    with open(file, 'ab') as opened_file:
+        opened_file.write(data)
+
+
+class TestFileFollower:
+    """Tests FileFollower."""
+
+    def test_appended_lines(self, log_file):
+        """Test only new complete lines are returned."""
+        follower = FileFollower(log_file, chunk_size=7)
+        assert read_new_lines(follower) == [LINE1]
+        assert read_new_lines(follower) == []
+
+        append(log_file, LINE2[:5])
+        assert read_new_lines(follower) == []
+
+        append(log_file, LINE2[5:] + b'\n' + LINE1 + b'\n')
+        assert read_new_lines(follower) == [LINE2, LINE1]
+        follower.close()
+
+    def test_truncated_file(self, log_file):
+        """Test truncated file is read from the beginning."""
+        follower = FileFollower(log_file)
+        read_new_lines(follower)
+
+        with open(log_file, 'wb') as opened_file:
+            opened_file.write(LINE2[:10] + b'\n')
+
+        assert read_new_lines(follower) == [LINE2[:10]]
+        follower.close()
+
+    def test_rotated_file(self, tmp_path, log_file):
+        """Test the rest of the rotated file and then the new file are read."""
+        follower = FileFollower(log_file)
+        read_new_lines(follower)
+
+        append(log_file, LINE2 + b'\n')
+        os.rename(log_file, tmp_path / 'test.log.1')
+        assert read_new_lines(follower) == [LINE2]  # New file is not created yet.
+
+        append(str(tmp_path / 'test.log.1'), LINE2 + b'\n')
+        with open(log_file, 'wb') as opened_file:
+            opened_file.write(LINE1 + b'\n')
+
+        assert read_new_lines(follower) == [LINE2, LINE1]
+        follower.close()
+
+    def test_rotated_file_tail(self, tmp_path, log_file):
+        """Test the last line of the rotated file without line ending is read before the new file."""
+        follower = FileFollower(log_file)
+        read_new_lines(follower)
+
+        append(log_file, LINE2[:10])
+        assert read_new_lines(follower) == []  # The line may be not written completely yet.
+
+        append(log_file, LINE2[10:])
+        os.rename(log_file, tmp_path / 'test.log.1')
+        with open(log_file, 'wb') as opened_file:
+            opened_file.write(LINE1 + b'\n')
+
+        assert list(follower.iter_new_line_batches()) == [[LINE2], [LINE1]]
+        follower.close()
+
+
+class TestEndpointRanking:
+    """Tests EndpointRanking."""
+
+    def test_same_order_as_sort(self):
+        """Test urls are in the order of rows of LogAggregator.get_report_data() after every update."""
+        fake_random = random.Random(3)
+        aggregator = LogAggregator()
+        ranking = EndpointRanking()
+
+        for _ in range(50):
+            batch = EndpointStatsMap()
+            for _ in range(fake_random.randint(1, 5)):
+                url = f'/api/{fake_random.randint(0, 9)}/...'
+                batch.setdefault(url, EndpointStats(url)).add_request()
+            aggregator.merge(batch)
+            ranking.update(aggregator.endpoint_requests, batch)
+
+            expected_urls = [row[0] for row in aggregator.get_report_data(AVERAGE_REPORT_NAME)[1]]
+            assert ranking.urls == expected_urls
+
+
+class TestPrintTable:
+    """Tests print_table(table)."""
+
+    @pytest.mark.parametrize('isatty, expected_output', [(True, CLEAR_SCREEN + 'table\n'), (False, 'table\n')])
+    def test_output(self, isatty, expected_output, capsys):
+        """Test screen is cleared only on a terminal."""
+        with mock.patch('sys.stdout.isatty', return_value=isatty):
+            print_table('table')
+        assert capsys.readouterr().out == expected_output
+
+
+class TestFollowFiles:
+    """Tests follow_files(files, aggregator, type_report, refresh_interval, poll_interval, max_refreshes, bad_lines)."""
+
+    @mock.patch('follow_mode.print_table')
+    def test_refresh(self, mock_print_table, log_file):
+        """Test appended lines get to the refreshed table."""
+        aggregator = LogAggregator()
+
+        def append_line(table):
+            append(log_file, LINE2 + b'\n')
+
+        mock_print_table.side_effect = append_line
+        follow_files([log_file], aggregator, AVERAGE_REPORT_NAME, refresh_interval=0, max_refreshes=3)
+
+        assert mock_print_table.call_count == 3
+        assert aggregator.endpoint_requests['/api/1/...'].total_requests == 1
+        assert aggregator.endpoint_requests['/api/2/...'].total_requests == 2
+        expected_aggregator = LogAggregator()
+        expected_aggregator.feed_lines([LINE1, LINE2, LINE2])
+        assert mock_print_table.call_args.args[0] == expected_aggregator.report(AVERAGE_REPORT_NAME)
+
+    @mock.patch('follow_mode.print_table')
+    @mock.patch('follow_mode.time.sleep', side_effect=KeyboardInterrupt)
+    def test_stop_by_keyboard_interrupt(self, mock_sleep, mock_print_table, log_file):
+        """Test Ctrl+C stops following, the process sleeps between checks."""
+        follow_files([log_file], LogAggregator(), AVERAGE_REPORT_NAME, refresh_interval=10, poll_interval=0.5)
+
+        mock_print_table.assert_called_once()
+        mock_sleep.assert_called_once_with(0.5)
+
+    @mock.patch('follow_mode.print_table')
+    def test_percentiles_report(self, mock_print_table, log_file):
+        """Test table of the given report type."""
+        aggregator = LogAggregator()
+        follow_files([log_file], aggregator, PERCENTILES_REPORT_NAME, max_refreshes=1)
+
+        mock_print_table.assert_called_once_with(aggregator.report(PERCENTILES_REPORT_NAME))
+
+    @mock.patch('follow_mode.print_table')
+    def test_groupby_report(self, mock_print_table, tmp_path):
+        """Test batches are merged into the group table of a grouping aggregator."""
+        log_file = tmp_path / 'test.log'
+        log_file.write_bytes(b'{"status": 500, "url": "/api/1/...", "response_time": 0.1}\n' * 2)
+        aggregator = LogAggregator(group_by=['status'])
+        follow_files([str(log_file)], aggregator, GROUPBY_REPORT_NAME, max_refreshes=1)
+
+        assert aggregator.generate_groupby_format_for_table() == [[500, 2, 0.1]]
+        mock_print_table.assert_called_once_with(aggregator.report(GROUPBY_REPORT_NAME))
+
+    @mock.patch('follow_mode.print_table')
+    def test_top(self, mock_print_table, log_file):
+        """Test batches are merged into top endpoints of an aggregator with top."""
+        append(log_file, LINE2 + b'\n' + LINE2 + b'\n')
+        aggregator = LogAggregator(top=1)
+        follow_files([log_file], aggregator, AVERAGE_REPORT_NAME, max_refreshes=1)
+
+        assert aggregator.generate_top_format_for_table() == [['/api/2/...', 2, 0, 0.2]]
+        mock_print_table.assert_called_once_with(aggregator.report(AVERAGE_REPORT_NAME))
+
+    @mock.patch('follow_mode.print_table')
+    def test_copy_settings_once(self, mock_print_table, log_file):
+        """Test one batch aggregator for all batches, it is cleared after every batch."""
+        aggregator = LogAggregator(url_rules=['/api/{id}/...'])
+
+        def append_line(table):
+            append(log_file, LINE2 + b'\n')
+
+        mock_print_table.side_effect = append_line
+        with mock.patch.object(aggregator, 'copy_settings', wraps=aggregator.copy_settings) as mock_copy_settings:
+            follow_files([log_file], aggregator, AVERAGE_REPORT_NAME, refresh_interval=0, max_refreshes=3)
+
+        mock_copy_settings.assert_called_once_with()
+        assert aggregator.endpoint_requests['/api/{id}/...'].total_requests == 3
+
+    @mock.patch('follow_mode.print_table')
+    def test_bad_lines(self, mock_print_table, log_file):
+        """Test bad lines are skipped, an incomplete line waits until it is complete."""
+        append(log_file, b'not json\n' + LINE2 + b'\n' + LINE2[:10])
+        aggregator = LogAggregator()
+        bad_lines = BadLines(ON_ERROR_SKIP_NAME)
+
+        def append_tail(table):
+            append(log_file, LINE2[10:] + b'\n')
+
+        mock_print_table.side_effect = append_tail
+        follow_files(
+            [log_file], aggregator, AVERAGE_REPORT_NAME, refresh_interval=0, max_refreshes=2, bad_lines=bad_lines
+        )
+
+        assert aggregator.endpoint_requests['/api/2/...'].total_requests == 2
+        assert bad_lines.counts == {log_file: 1}
@@ -0,0 +1,130 @@
+"""Module with tests group_by.py."""
+
+import math
+
+import pytest
+from config import ERROR_STATUS_MIN
+from group_by import METRICS, GroupTable, get_field_types, parse_group_by, parse_metrics
+from line_decoder import microsecond_float
+
+TEST_REQUESTS = [
+    (('/api/users/', 'GET'), 0.024, 200),
+    (('/api/users/', 'POST'), 0.5, ERROR_STATUS_MIN),
+    (('/api/users/', 'GET'), 0.016, 404),
+    (('/api/items/', 'GET'), 0.1, 503),
+    (('/api/users/', 'GET'), 0.2, 200),
+]
+
+
+def fill(table: GroupTable, requests: list[tuple[tuple[str, str], float, int]]) -> GroupTable:
+    """Add requests (key, response time, status) to table."""
+    for key, response_time, status in requests:
+        table.add(key, response_time, status)
+    return table
+
+
+class TestParseGroupBy:
+    """Tests parse_group_by(value)."""
+
+    @pytest.mark.parametrize(
+        'value, expected',
+        [
+            ('url', ['url']),
+            ('url,status', ['url', 'status']),
+            (' status , request_method ', ['status', 'request_method']),
+        ],
+    )
+    def test_return_value(self, value, expected):
+        """Test dimensions of comma-separated names."""
+        assert parse_group_by(value) == expected
+
+    @pytest.mark.parametrize('value', ['', 'url,', 'url,url'])
+    def test_raise(self, value):
+        """Test exception for empty and repeated names."""
+        with pytest.raises(ValueError, match='Invalid group by'):
+            parse_group_by(value)
+
+
+class TestParseMetrics:
+    """Tests parse_metrics(value)."""
+
+    def test_return_value(self):
+        """Test metric names in the given order."""
+        assert parse_metrics('max, count,error_rate') == ['max', 'count', 'error_rate']
+
+    @pytest.mark.parametrize('value', ['', 'count,median'])
+    def test_raise(self, value):
+        """Test exception for unknown metrics."""
+        with pytest.raises(ValueError, match='Invalid metrics'):
+            parse_metrics(value)
+
+
+class TestGetFieldTypes:
+    """Tests get_field_types(dimensions)."""
+
+    def test_return_value(self):
+        """Test response_time and status go first, status is int in any position."""
+        assert get_field_types(['http_user_agent', 'status']) == {
+            'response_time': microsecond_float,
+            'status': int,
+            'http_user_agent': str,
+        }
+
+
+class TestGroupTable:
+    """Tests GroupTable."""
+
+    def test_init_attributes(self):
+        """Test initialization attributes."""
+        table = GroupTable(['url'])
+
+        assert table.dimensions == ['url']
+        assert len(table) == 0
+        assert table.keys == [] and table.key_ids == {}
+
+    def test_add(self):
+        """Test columns of every group."""
+        table = fill(GroupTable(['url', 'request_method']), TEST_REQUESTS)
+
+        assert table.keys == [('/api/users/', 'GET'), ('/api/users/', 'POST'), ('/api/items/', 'GET')]
+        assert list(table.counts) == [3, 1, 1]
+        assert list(table.response_time_sums) == [240000, 500000, 100000]
+        assert list(table.min_response_times) == [0.016, 0.5, 0.1]
+        assert list(table.max_response_times) == [0.2, 0.5, 0.1]
+        assert list(table.error_counts) == [0, 1, 1]
+
+    def test_get_id(self):
+        """Test keys are interned to ids in order of first occurrence."""
+        table = GroupTable(['url'])
+
+        assert [table.get_id(key) for key in [('/a/',), ('/b/',), ('/a/',)]] == [0, 1, 0]
+        assert table.min_response_times[1] == math.inf and table.max_response_times[1] == -math.inf
+
+    @pytest.mark.parametrize('cut', [0, 1, 2, 4])
+    def test_merge_equal_serial(self, cut):
+        """Test merged tables of consecutive parts are equal to the serial one (order of groups included)."""
+        merged = GroupTable(['url', 'request_method'])
+        merged.merge(fill(GroupTable(['url', 'request_method']), TEST_REQUESTS[:cut]))
+        merged.merge(fill(GroupTable(['url', 'request_method']), TEST_REQUESTS[cut:]))
+
+        assert merged == fill(GroupTable(['url', 'request_method']), TEST_REQUESTS)
+
+    def test_merge_raise(self):
+        """Test exception for tables of different dimensions."""
+        with pytest.raises(Exception, match='Can not merge group tables with different dimensions.'):
+            GroupTable(['url']).merge(GroupTable(['status']))
+
+    def test_get_format_for_tabulate(self):
+        """Test rows ordered by '-count' with the given metrics."""
+        table = fill(GroupTable(['url', 'request_method']), TEST_REQUESTS)
+
+        assert table.get_format_for_tabulate(list(METRICS)) == [
+            ['/api/users/', 'GET', 3, 0.24, 0.08, 0.016, 0.2, 0.0],
+            ['/api/users/', 'POST', 1, 0.5, 0.5, 0.5, 0.5, 1.0],
+            ['/api/items/', 'GET', 1, 0.1, 0.1, 0.1, 0.1, 1.0],
+        ]
+        assert table.get_format_for_tabulate(['count']) == [
+            ['/api/users/', 'GET', 3],
+            ['/api/users/', 'POST', 1],
+            ['/api/items/', 'GET', 1],
+        ]
@@ -0,0 +1,147 @@
+"""Module with tests heavy_hitters.py."""
+
+import random
+from collections import Counter
+
+import pytest
+from config import TOP_BY_COUNT_NAME, TOP_BY_TIME_NAME, TOP_MIN_CAPACITY
+from heavy_hitters import HeavyHitters, get_top_capacity, parse_top
+
+
+def skewed_stream(length: int, seed: int = 1) -> list[tuple[str, float]]:
+    """Return requests (url, response time): a few heavy urls among many unique ones."""
+    generator = random.Random(seed)
+    requests = []
+    for index in range(length):
+        if generator.random() < 0.5:
+            url = f'/api/heavy/{generator.randrange(5)}'
+        else:
+            url = f'/api/unique/{index}'
+        requests.append((url, generator.randrange(1, 1000) / 1000))
+    return requests
+
+
+def fill(table: HeavyHitters, requests: list[tuple[str, float]]) -> HeavyHitters:
+    """Add requests (url, response time) to table."""
+    for url, response_time in requests:
+        table.add(url, response_time)
+    return table
+
+
+def true_weights(requests: list[tuple[str, float]], top_by: str) -> Counter:
+    """Return exact weight of every url."""
+    weights: Counter = Counter()
+    for url, response_time in requests:
+        weights[url] += 1 if top_by == TOP_BY_COUNT_NAME else round(response_time * 1_000_000)
+    return weights
+
+
+def assert_bounds(table: HeavyHitters, weights: Counter) -> None:
+    """Check weight - error <= true weight <= weight of monitored urls and that heavy urls are monitored."""
+    for slot, url in enumerate(table.urls):
+        assert table.weights[slot] - table.errors[slot] <= weights[url] <= table.weights[slot]
+        assert table.errors[slot] <= table.total_weight / table.capacity
+    for url, weight in weights.items():
+        if weight > table.total_weight / table.capacity:
+            assert url in table.slots
+
+
+class TestParseTop:
+    """Tests parse_top(value)."""
+
+    @pytest.mark.parametrize('value, expected', [('1', 1), ('20', 20), (' 5 ', 5)])
+    def test_return_value(self, value, expected):
+        """Test number of endpoints."""
+        assert parse_top(value) == expected
+
+    @pytest.mark.parametrize('value', ['0', '-1', '1.5', 'ten', ''])
+    def test_invalid_value(self, value):
+        """Test exception for invalid number of endpoints."""
+        with pytest.raises(ValueError, match='Invalid top'):
+            parse_top(value)
+
+
+class TestGetTopCapacity:
+    """Tests get_top_capacity(top)."""
+
+    @pytest.mark.parametrize('top, expected', [(1, TOP_MIN_CAPACITY), (1000, 10000)])
+    def test_return_value(self, top, expected):
+        """Test capacity is proportional to top, but not less than TOP_MIN_CAPACITY."""
+        assert get_top_capacity(top) == expected
+
+
+class TestHeavyHitters:
+    """Tests HeavyHitters(capacity, top_by)."""
+
+    @pytest.mark.parametrize('top_by', [TOP_BY_COUNT_NAME, TOP_BY_TIME_NAME])
+    def test_exact_without_eviction(self, top_by):
+        """Test weights are exact while all urls are monitored."""
+        requests = skewed_stream(200)
+        table = fill(HeavyHitters(len(requests), top_by), requests)
+
+        weights = true_weights(requests, top_by)
+        assert {url: table.weights[slot] for url, slot in table.slots.items()} == weights
+        assert not any(table.errors)
+        assert table.total_weight == sum(weights.values())
+
+    @pytest.mark.parametrize('top_by', [TOP_BY_COUNT_NAME, TOP_BY_TIME_NAME])
+    def test_bounds(self, top_by):
+        """Test error bounds on a stream of many more distinct urls than capacity."""
+        requests = skewed_stream(5000)
+        table = fill(HeavyHitters(50, top_by), requests)
+
+        assert len(table) == 50
+        assert_bounds(table, true_weights(requests, top_by))
+
+    def test_top_urls(self):
+        """Test heavy urls are the top ones."""
+        table = fill(HeavyHitters(50), skewed_stream(5000))
+
+        assert {table.urls[slot] for slot in table.get_top_slots(5)} == {f'/api/heavy/{index}' for index in range(5)}
+
+    @pytest.mark.parametrize('top_by', [TOP_BY_COUNT_NAME, TOP_BY_TIME_NAME])
+    def test_merge(self, top_by):
+        """Test merged tables of parts of the stream keep the error bounds."""
+        requests = skewed_stream(6000)
+        table = HeavyHitters(50, top_by)
+        for start in range(0, len(requests), 1500):
+            table.merge(fill(HeavyHitters(50, top_by), requests[start : start + 1500]))  # noqa: E203
+
+        assert len(table) == 50
+        assert table.total_weight == sum(true_weights(requests, top_by).values())
+        assert_bounds(table, true_weights(requests, top_by))
+        fill(table, requests)  # The heap is rebuilt after merging.
+        assert_bounds(table, true_weights(requests * 2, top_by))
+
+    def test_merge_exact(self):
+        """Test merging tables without eviction equals adding all requests to one table."""
+        requests = skewed_stream(100)
+        table = fill(HeavyHitters(1000), requests[:50])
+        table.merge(fill(HeavyHitters(1000), requests[50:]))
+
+        assert table == fill(HeavyHitters(1000), requests)
+
+    def test_merge_different_weights(self):
+        """Test exception for merging tables of different weights."""
+        with pytest.raises(Exception, match='Can not merge heavy hitters of different weights.'):
+            HeavyHitters(10).merge(HeavyHitters(10, TOP_BY_TIME_NAME))
+
+    @pytest.mark.parametrize(
+        'top_by, expected',
+        [
+            (TOP_BY_COUNT_NAME, [['/b/', 2, 0, 0.15], ['/a/', 1, 0, 1.0]]),
+            (TOP_BY_TIME_NAME, [['/a/', 1.0, 0.0, 1.0], ['/b/', 0.3, 0.0, 0.15]]),
+        ],
+    )
+    def test_get_format_for_tabulate(self, top_by, expected):
+        """Test rows of url, weight, maximal error and average response time ordered by '-weight'."""
+        table = fill(HeavyHitters(10, top_by), [('/a/', 1.0), ('/b/', 0.1), ('/b/', 0.2), ('/c/', 0.001)])
+
+        assert table.get_format_for_tabulate(2) == expected
+
+    def test_eviction(self):
+        """Test a new url takes over the minimal weight as its error, its average is counted since monitored."""
+        table = fill(HeavyHitters(2), [('/a/', 0.1), ('/a/', 0.1), ('/b/', 0.5), ('/c/', 0.2)])
+
+        assert table.urls == ['/a/', '/c/']
+        assert table.get_format_for_tabulate(2) == [['/a/', 2, 0, 0.1], ['/c/', 2, 1, 0.2]]
@@ -0,0 +1,215 @@
+"""Module with tests incremental_state.py."""
+
+import gzip
+import io
+import json
+import os
+
+import pytest
+from config import STATE_FINGERPRINT_SIZE
+from endpoint_stats import EndpointStats, EndpointStatsMap
+from incremental_state import IncrementalState, get_complete_lines_end, get_fingerprint, get_resume_offset
+
+LINE1 = b'{"url": "/api/1/...", "response_time": 0.1}\n'
+LINE2 = b'{"url": "/api/2/...", "response_time": 0.2}\n'
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    """Create log file with two lines."""
+    new_file = tmp_path / 'test.log'
+    new_file.write_bytes(LINE1 + LINE2)
+    return str(new_file)
+
+
+def append(file: str, data: bytes) -> None:
+    """Append data to file."""
+    with open(file, 'ab') as opened_file:
+        opened_file.write(data)
+
+
+class TestGetCompleteLinesEnd:
+    """Tests get_complete_lines_end(opened_file, start, end)."""
+
+    @pytest.mark.parametrize(
+        'data, start, expected_end',
+        [
+            (b'', 0, 0),
+            (b'abc', 0, 0),
+            (b'abc\n', 0, 4),
+            (b'abc\nde', 0, 4),
+            (b'abc\nde', 4, 4),
+            (b'abc\nde\nf', 2, 7),
+        ],
+    )
+    def test_return_value(self, data, start, expected_end):
+        """Test position after the last line ending."""
+        assert get_complete_lines_end(io.BytesIO(data), start, len(data)) == expected_end
+
+    def test_several_blocks(self, monkeypatch):
+        """Test search through several blocks."""
+        monkeypatch.setattr('incremental_state.LINE_END_SEARCH_BLOCK_SIZE', 3)
+        data = b'a\n' + b'b' * 10
+        assert get_complete_lines_end(io.BytesIO(data), 0, len(data)) == 2
+
+
+class TestGetResumeOffset:
+    """Tests get_resume_offset(opened_file, file_state, size)."""
+
+    def test_return_value(self):
+        """Test saved offset for unknown, unchanged, truncated and replaced file."""
+        opened_file = io.BytesIO(LINE1 + LINE2)
+        file_state = {
+            'offset': len(LINE1),
+            'fingerprint_size': len(LINE1),
+            'fingerprint': get_fingerprint(opened_file, len(LINE1)),
+        }
+
+        assert get_resume_offset(opened_file, None, len(LINE1 + LINE2)) == 0
+        assert get_resume_offset(opened_file, file_state, len(LINE1 + LINE2)) == len(LINE1)
+        assert get_resume_offset(opened_file, file_state, len(LINE1) - 1) == 0
+        assert get_resume_offset(io.BytesIO(LINE2 + LINE1), file_state, len(LINE1 + LINE2)) == 0
+
+
+class TestIncrementalState:
+    """Tests IncrementalState."""
+
+    def test_init_attributes(self):
+        """Test initialization attributes."""
+        state = IncrementalState()
+        assert isinstance(state.endpoint_requests, EndpointStatsMap) is True
+        assert state.endpoint_requests == {}
+        assert state.files == {}
+        assert state.url_rules is None
+        assert state.time_bucket is None
+
+    def test_load_missing_file(self, tmp_path):
+        """Test empty state with the given settings for missing state file."""
+        state = IncrementalState.load(str(tmp_path / 'missing.state'), ['/api/{id}/...'], 60)
+        assert state.endpoint_requests == {}
+        assert state.files == {}
+        assert state.url_rules == ['/api/{id}/...']
+        assert state.time_bucket == 60
+
+    def test_save_load(self, tmp_path, log_file):
+        """Test saved state is loaded back and no temporary file is left."""
+        state_file = str(tmp_path / 'test.state')
+        state = IncrementalState()
+        state.get_new_ranges([log_file])
+        endpoint_stats = EndpointStats('/api/1/...')
+        endpoint_stats.add_request()
+        endpoint_stats.add_response_time(0.1)
+        state.endpoint_requests[endpoint_stats.url] = endpoint_stats
+
+        state.save(state_file)
+        restored = IncrementalState.load(state_file)
+
+        assert restored.files == state.files
+        assert restored.endpoint_requests == state.endpoint_requests
+        assert sorted(os.listdir(tmp_path)) == ['test.log', 'test.state']
+
+    @pytest.mark.parametrize(
+        'url_rules, time_bucket, expected_error',
+        [
+            (['/api/{id}/...'], 60, None),
+            (None, 60, 'is saved with url rules'),
+            (['/api/{name}/...'], 60, 'is saved with url rules'),
+            (['/api/{id}/...'], None, 'is saved with url rules'),
+            (['/api/{id}/...'], 3600, 'is saved with url rules'),
+        ],
+    )
+    def test_load_settings(self, url_rules, time_bucket, expected_error, tmp_path):
+        """Test the state is resumed only with the url rules and time bucket it is saved with."""
+        state_file = str(tmp_path / 'test.state')
+        IncrementalState.load(state_file, ['/api/{id}/...'], 60).save(state_file)
+
+        if expected_error is None:
+            state = IncrementalState.load(state_file, url_rules, time_bucket)
+            assert (state.url_rules, state.time_bucket) == (url_rules, time_bucket)
+        else:
+            with pytest.raises(Exception, match=expected_error):
+                IncrementalState.load(state_file, url_rules, time_bucket)
+
+    def test_load_raise(self, tmp_path):
+        """Test call exception due to unknown state format."""
+        state_file = tmp_path / 'test.state'
+        state_file.write_text(json.dumps({'version': -1}))
+        with pytest.raises(Exception, match='Unknown format of state file'):
+            IncrementalState.load(str(state_file))
+
+    def test_get_new_ranges_appended(self, log_file):
+        """Test only appended complete lines are returned."""
+        state = IncrementalState()
+        assert state.get_new_ranges([log_file]) == [(log_file, 0, len(LINE1 + LINE2))]
+        assert state.get_new_ranges([log_file]) == []
+
+        append(log_file, LINE1[:10])  # Incomplete line waits for its line ending.
+        assert state.get_new_ranges([log_file]) == []
+
+        append(log_file, LINE1[10:])
+        assert state.get_new_ranges([log_file]) == [(log_file, len(LINE1 + LINE2), len(LINE1 + LINE2 + LINE1))]
+
+        (file_state,) = state.files.values()
+        assert file_state['path'] == log_file
+        assert file_state['offset'] == file_state['size'] == len(LINE1 + LINE2 + LINE1)
+        assert file_state['fingerprint_size'] == min(file_state['offset'], STATE_FINGERPRINT_SIZE)
+
+    def test_get_new_ranges_truncated(self, log_file):
+        """Test truncated file is parsed from the beginning."""
+        state = IncrementalState()
+        state.get_new_ranges([log_file])
+
+        with open(log_file, 'wb') as opened_file:
+            opened_file.write(LINE2)
+
+        assert state.get_new_ranges([log_file]) == [(log_file, 0, len(LINE2))]
+
+    def test_get_new_ranges_replaced(self, log_file):
+        """Test file rewritten in place (same inode, other first bytes) is parsed from the beginning."""
+        state = IncrementalState()
+        state.get_new_ranges([log_file])
+
+        with open(log_file, 'r+b') as opened_file:
+            opened_file.write(LINE2 + LINE1 + LINE1)
+
+        assert state.get_new_ranges([log_file]) == [(log_file, 0, len(LINE2 + LINE1 + LINE1))]
+
+    def test_get_new_ranges_rotated(self, tmp_path, log_file):
+        """Test rotated (renamed) file is resumed under its new name, the new file is parsed from the beginning."""
+        state = IncrementalState()
+        state.get_new_ranges([log_file])
+
+        append(log_file, LINE1)  # Written before rotation.
+        rotated_file = str(tmp_path / 'test.log.1')
+        os.rename(log_file, rotated_file)
+        with open(log_file, 'wb') as opened_file:
+            opened_file.write(LINE2)
+
+        assert state.get_new_ranges([rotated_file, log_file]) == [
+            (rotated_file, len(LINE1 + LINE2), len(LINE1 + LINE2 + LINE1)),
+            (log_file, 0, len(LINE2)),
+        ]
+
+    def test_get_new_ranges_same_file_twice(self, log_file):
+        """Test the same file given twice is parsed once."""
+        assert IncrementalState().get_new_ranges([log_file, log_file]) == [(log_file, 0, len(LINE1 + LINE2))]
+
+    def test_get_new_ranges_forget_files(self, tmp_path, log_file):
+        """Test files not given are removed from state."""
+        other_file = tmp_path / 'other.log'
+        other_file.write_bytes(LINE1)
+        state = IncrementalState()
+        state.get_new_ranges([log_file, str(other_file)])
+
+        state.get_new_ranges([log_file])
+
+        assert [file_state['path'] for file_state in state.files.values()] == [log_file]
+
+    def test_get_new_ranges_compressed(self, tmp_path):
+        """Test compressed file is returned as a whole once."""
+        compressed_file = tmp_path / 'test.log.gz'
+        compressed_file.write_bytes(gzip.compress(LINE1 + LINE2))
+        state = IncrementalState()
+
+        assert state.get_new_ranges([str(compressed_file)]) == [(str(compressed_file), 0, None)]
+        assert state.get_new_ranges([str(compressed_file)]) == []
@@ -0,0 +1,130 @@
+"""Module with tests line_decoder.py."""
+
+import json
+
+import pytest
+from line_decoder import LineDecoder, microsecond_float
+
+TEST_REQUEST_DATA = {
+    "@timestamp": "2025-06-22T13:57:32+00:00",
+    "status": 200,
+    "url": "/api/context/...",
+    "request_method": "GET",
+    "response_time": 0.024,
+    "http_user_agent": "Mozilla/5.0 (X11; Linux x86_64)",
+}
+
+
+@pytest.fixture
+def decoder():
+    """Create LineDecoder object for url, response_time and status."""
+    return LineDecoder({'url': str, 'response_time': float, 'status': int})
+
+
+class TestLineDecoder:
+    """Tests LineDecoder."""
+
+    def test_init_attributes(self, decoder):
+        """Test initialization attributes."""
+        assert decoder.field_names == ('url', 'response_time', 'status')
+
+    @pytest.mark.parametrize(
+        'line',
+        [
+            json.dumps(TEST_REQUEST_DATA) + '\n',
+            json.dumps(TEST_REQUEST_DATA),
+            json.dumps(TEST_REQUEST_DATA) + '\r\n',
+            json.dumps(TEST_REQUEST_DATA, separators=(',', ':')) + '\n',
+            json.dumps(dict(reversed(TEST_REQUEST_DATA.items()))) + '\n',
+            json.dumps({**TEST_REQUEST_DATA, 'url': 'юникод/путь'}, ensure_ascii=False) + '\n',
+        ],
+    )
+    def test_fast_path(self, decoder, line):
+        """Test fields are found by scanning for lines written by json.dumps."""
+        expected = tuple(json.loads(line)[name] for name in decoder.field_names)
+
+        assert decoder.scan(line.encode()) == expected
+        assert decoder.decode(line.encode()) == expected
+        assert decoder.decode(line) == expected  # str line.
+
+    @pytest.mark.parametrize(
+        'line',
+        [
+            json.dumps({**TEST_REQUEST_DATA, 'url': '/api/"quoted"/'}),  # Escapes.
+            json.dumps({**TEST_REQUEST_DATA, 'url': 'юникод/путь'}),  # \\u escapes (ensure_ascii).
+            json.dumps({**TEST_REQUEST_DATA, 'status': '200'}).replace('"200"', '200.0'),  # Not int.
+            json.dumps(TEST_REQUEST_DATA).replace('"url":', '"url" :'),
+            ' ' + json.dumps(TEST_REQUEST_DATA),
+            json.dumps(TEST_REQUEST_DATA).replace('0.024', '0.024 '),  # Not only a JSON number before ','.
+        ],
+    )
+    def test_fallback(self, decoder, line):
+        """Test lines not handled by scanning are decoded by json.loads."""
+        expected = tuple(json.loads(line)[name] for name in decoder.field_names)
+
+        assert decoder.scan(line.encode()) is None
+        assert decoder.decode(line.encode()) == expected
+
+    def test_bytes_field(self):
+        """Test bytes fields are not decoded by scanning, json.loads fallback gives str."""
+        decoder = LineDecoder({'url': str, '@timestamp': bytes})
+        line = json.dumps(TEST_REQUEST_DATA)
+
+        assert decoder.decode(line.encode()) == ('/api/context/...', b'2025-06-22T13:57:32+00:00')
+        assert decoder.decode(' ' + line) == ('/api/context/...', '2025-06-22T13:57:32+00:00')
+
+    def test_duplicate_key(self, decoder):
+        """Test the last duplicate key is used (same as json.loads)."""
+        line = json.dumps(TEST_REQUEST_DATA)[:-1] + ', "url": "/last/"}'
+
+        assert decoder.decode(line.encode())[0] == json.loads(line)['url'] == '/last/'
+
+    @pytest.mark.parametrize(
+        'line, exception',
+        [
+            ('Uncorect data format.', json.decoder.JSONDecodeError),
+            ('\n', json.decoder.JSONDecodeError),
+            (json.dumps(TEST_REQUEST_DATA)[:-10], json.decoder.JSONDecodeError),  # Truncated line.
+            (json.dumps({'url': '/api/'}), KeyError),  # Missing fields.
+            (json.dumps({**TEST_REQUEST_DATA, 'response_time': None}), TypeError),  # null.
+            (json.dumps({**TEST_REQUEST_DATA, 'status': '200'}), TypeError),  # Not a number.
+            (json.dumps({**TEST_REQUEST_DATA, 'url': 5}), TypeError),  # Not a string.
+            (json.dumps({**TEST_REQUEST_DATA, 'url': None}), TypeError),
+            (json.dumps({**TEST_REQUEST_DATA, 'response_time': float('nan')}), ValueError),  # NaN.
+            (json.dumps({**TEST_REQUEST_DATA, 'response_time': float('inf')}), ValueError),  # Infinity.
+            (json.dumps({**TEST_REQUEST_DATA, 'response_time': -float('inf')}), ValueError),  # -Infinity.
+            (json.dumps(TEST_REQUEST_DATA).replace('0.024', '1e400'), ValueError),  # Out of float range.
+            (json.dumps(TEST_REQUEST_DATA).replace('0.024', '1_0'), json.decoder.JSONDecodeError),
+            (json.dumps(TEST_REQUEST_DATA).replace('0.024', 'nan'), json.decoder.JSONDecodeError),
+            (json.dumps(TEST_REQUEST_DATA).replace('0.024', '+1'), json.decoder.JSONDecodeError),
+            (json.dumps(TEST_REQUEST_DATA).replace('0.024', '.5'), json.decoder.JSONDecodeError),
+            (json.dumps(TEST_REQUEST_DATA).replace('0.024', '01'), json.decoder.JSONDecodeError),
+            (json.dumps(TEST_REQUEST_DATA).replace('200', '2_00'), json.decoder.JSONDecodeError),
+        ],
+    )
+    def test_raise(self, decoder, line, exception):
+        """Test exceptions for incorrect lines are the same as for json.loads, values must be of the field types."""
+        with pytest.raises(exception):
+            decoder.decode(line.encode())
+
+
+class TestMicrosecondFloat:
+    """Tests microsecond_float(value)."""
+
+    @pytest.mark.parametrize('value, expected', [(b'0.024', 0.024), (3, 3.0), (b'-9.2e12', -9.2e12)])
+    def test_return_value(self, value, expected):
+        """Test floats of bytes and numbers."""
+        assert microsecond_float(value) == expected
+
+    @pytest.mark.parametrize('value', [b'1e300', -1e13, 2**63])
+    def test_raise(self, value):
+        """Test call exception due to response time out of range of int64 microseconds."""
+        with pytest.raises(OverflowError, match='out of range of microsecond sums'):
+            microsecond_float(value)
+
+    def test_decode(self):
+        """Test fast path and json.loads fallback raise the same exception."""
+        decoder = LineDecoder({'url': str, 'response_time': microsecond_float})
+        for line in [b'{"url": "/a", "response_time": 1e300}', b'{"url": "/\\u0061", "response_time": 1e300}']:
+            with pytest.raises(OverflowError):
+                decoder.decode(line)
@@ -0,0 +1,186 @@
+"""Module with tests line_filter.py."""
+
+import gzip
+import json
+from typing import Any
+from unittest import mock
+
+import pytest
+from line_filter import LineFilter, expand_status_patterns, parse_methods, parse_statuses, parse_time
+
+START_TIME = 1704067200  # 2024-01-01T00:00:00+00:00
+TEST_REQUEST_DATA: list[dict[str, Any]] = [
+    {
+        "@timestamp": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}+00:00",
+        "status": (200, 404, 500, 503)[i % 4],
+        "url": ("/api/users/1", "/api/orders/2", "/health")[i % 3],
+        "request_method": ("GET", "POST")[i % 2],
+        "response_time": round(0.001 * (i + 1), 3),
+    }
+    for i in range(200)
+]
+TEST_LINES = [json.dumps(data).encode() for data in TEST_REQUEST_DATA]
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    """Create log file with TEST_LINES (sorted by time)."""
+    path = tmp_path / 'test.log'
+    path.write_bytes(b'\n'.join(TEST_LINES) + b'\n')
+    return str(path)
+
+
+class TestParseTime:
+    """Tests parse_time(value)."""
+
+    @pytest.mark.parametrize(
+        'value, expected',
+        [
+            ('2024-01-01', START_TIME),
+            ('2024-01-01T00:01:00', START_TIME + 60),
+            ('2024-01-01T03:00:00+03:00', START_TIME),
+            ('2024-01-01T00:00:00Z', START_TIME),
+        ],
+    )
+    def test_return_value(self, value, expected):
+        """Test epoch seconds, UTC without time zone."""
+        assert parse_time(value) == expected
+
+    def test_invalid_value(self):
+        """Test exception for invalid time."""
+        with pytest.raises(ValueError, match='Invalid time'):
+            parse_time('yesterday')
+
+
+class TestParseStatuses:
+    """Tests parse_statuses(value) and expand_status_patterns(patterns)."""
+
+    @pytest.mark.parametrize('value, expected', [('5xx', ['5xx']), ('500, 40X', ['500', '40x'])])
+    def test_return_value(self, value, expected):
+        """Test patterns of comma-separated value."""
+        assert parse_statuses(value) == expected
+
+    @pytest.mark.parametrize('value', ['5', '5xxx', '5y0', '500,'])
+    def test_invalid_value(self, value):
+        """Test exception for invalid patterns."""
+        with pytest.raises(ValueError, match='Invalid status'):
+            parse_statuses(value)
+
+    def test_expand(self):
+        """Test statuses matched by patterns."""
+        assert expand_status_patterns(['5xx']) == frozenset(range(500, 600))
+        assert expand_status_patterns(['404', '50x']) == frozenset([404, *range(500, 510)])
+
+
+class TestParseMethods:
+    """Tests parse_methods(value)."""
+
+    def test_return_value(self):
+        """Test upper case methods."""
+        assert parse_methods('get, POST') == ['GET', 'POST']
+
+    def test_invalid_value(self):
+        """Test exception for invalid methods."""
+        with pytest.raises(ValueError, match='Invalid method'):
+            parse_methods('GET,')
+
+
+class TestLineFilter:
+    """Tests LineFilter(since, until, statuses, methods, url_prefixes, sorted_by_time)."""
+
+    @pytest.mark.parametrize(
+        'arguments, predicate',
+        [
+            ((START_TIME + 30, START_TIME + 90), lambda data: '00:00:30' <= data['@timestamp'][11:19] < '00:01:30'),
+            ((None, None, ['5xx']), lambda data: data['status'] >= 500),
+            ((None, None, ['404', '503']), lambda data: data['status'] in (404, 503)),
+            ((None, None, None, ['POST']), lambda data: data['request_method'] == 'POST'),
+            ((None, None, None, None, ['/api/']), lambda data: data['url'].startswith('/api/')),
+            (
+                (START_TIME + 60, None, ['5xx'], ['GET'], ['/health', '/api/users']),
+                lambda data: data['@timestamp'] >= '2024-01-01T00:01'
+                and data['status'] >= 500
+                and data['request_method'] == 'GET'
+                and data['url'] != '/api/orders/2',
+            ),
+        ],
+    )
+    def test_filter_lines(self, arguments, predicate):
+        """Test lines matching all predicates are kept (str lines too)."""
+        line_filter = LineFilter(*arguments)
+        expected = [line for line, data in zip(TEST_LINES, TEST_REQUEST_DATA) if predicate(data)]
+
+        assert list(line_filter.filter_lines(TEST_LINES)) == expected
+        assert list(line_filter.filter_lines(line.decode() for line in TEST_LINES)) == [
+            line.decode() for line in expected
+        ]
+
+    def test_cheap_checks(self):
+        """Test lines without wanted raw values are rejected without decoding, escaped lines are decoded."""
+        line_filter = LineFilter(methods=['POST'], url_prefixes=['/api/'])
+        escaped_line = b'{"url": "\\/api\\/users", "request_method": "POST", "response_time": 0.1}'
+        with mock.patch.object(line_filter.decoder, 'decode', wraps=line_filter.decoder.decode) as mock_decode:
+            assert list(line_filter.filter_lines([*TEST_LINES[:6], escaped_line])) == [
+                TEST_LINES[1],
+                TEST_LINES[3],
+                escaped_line,
+            ]
+
+        assert mock_decode.call_args_list == [
+            mock.call(TEST_LINES[1]),
+            mock.call(TEST_LINES[3]),
+            mock.call(escaped_line),
+        ]
+
+    def test_missing_fields(self):
+        """Test lines without filtered fields or with invalid status do not match."""
+        line_filter = LineFilter(statuses=['5xx'])
+        lines = [b'{"url": "/a", "response_time": 0.1}', b'{"url": "/a", "status": null, "response_time": 0.1}']
+        assert list(line_filter.filter_lines(lines)) == []
+
+    @pytest.mark.parametrize(
+        'since, until, expected',
+        [
+            (START_TIME + 30, START_TIME + 90, (30, 90)),
+            (None, START_TIME + 1, (0, 1)),
+            (START_TIME + 150, None, (150, 200)),
+            (START_TIME - 10, START_TIME + 1000, (0, 200)),
+            (START_TIME + 1000, None, (200, 200)),
+        ],
+    )
+    def test_find_byte_range(self, log_file, since, until, expected):
+        """Test byte range of lines in the time range of the sorted file."""
+        offsets = [0]
+        for line in TEST_LINES:
+            offsets.append(offsets[-1] + len(line) + 1)
+        line_filter = LineFilter(since, until, sorted_by_time=True)
+
+        with open(log_file, 'rb') as opened_file:
+            assert line_filter.can_skip_ranges(opened_file) is True
+            assert line_filter.find_byte_range(opened_file) == (offsets[expected[0]], offsets[expected[1]])
+
+    def test_find_byte_range_unknown_time(self, tmp_path):
+        """Test lines without timestamp at borders of the time range are kept."""
+        path = tmp_path / 'test.log'
+        unknown_line = b'{"url": "/a", "response_time": 0.1}'
+        path.write_bytes(b'\n'.join([*TEST_LINES[:10], unknown_line, *TEST_LINES[10:20]]) + b'\n')
+        line_filter = LineFilter(START_TIME + 10, START_TIME + 10, sorted_by_time=True)
+
+        with open(path, 'rb') as opened_file:
+            start, end = line_filter.find_byte_range(opened_file)
+            opened_file.seek(start)
+            assert opened_file.read(end - start) == unknown_line + b'\n'
+
+    def test_can_skip_ranges(self, tmp_path):
+        """Test ranges are skipped only for time range of an uncompressed file sorted by time."""
+        path = tmp_path / 'test.log.gz'
+        path.write_bytes(gzip.compress(b'\n'.join(TEST_LINES)))
+        with open(path, 'rb') as opened_file:
+            assert LineFilter(START_TIME, sorted_by_time=True).can_skip_ranges(opened_file) is False
+            assert LineFilter(START_TIME).can_skip_ranges(opened_file) is False
+            assert LineFilter(statuses=['5xx'], sorted_by_time=True).can_skip_ranges(opened_file) is False
+
+    def test_has_only_time_range(self):
+        """Test only time range filters can be answered by indexes."""
+        assert LineFilter(START_TIME).has_only_time_range() is True
+        assert LineFilter(START_TIME, statuses=['5xx']).has_only_time_range() is False
@@ -0,0 +1,106 @@
+"""Module with tests line_readers.py."""
+
+import gzip
+import lzma
+import re
+
+import pytest
+from config import IO_MODES, IO_TEXT_NAME
+from line_readers import iter_chunked_line_batches, iter_lines, iter_mmap_line_batches, split_chunks
+
+TEST_CONTENT = b'{"url": "/a/"}\n{"url": "/bb/"}\n\n{"url": "/ccc/", "response_time": 0.5}\n{"url": "/d/"}'
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    """Create file with TEST_CONTENT (blank line inside, no line ending at the end)."""
+    new_file = tmp_path / 'test.log'
+    new_file.write_bytes(TEST_CONTENT)
+    return new_file
+
+
+def expected_lines(content: bytes) -> list[bytes]:
+    """Lines of content as a file opened in text mode gives them, without line endings."""
+    return [line.rstrip(b'\n') for line in content.splitlines(keepends=True)]
+
+
+class TestSplitChunks:
+    """Tests split_chunks(chunks)."""
+
+    @pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 16, 1000])
+    def test_return_value(self, chunk_size):
+        """Test lines cut by chunks are restored."""
+        chunks = [TEST_CONTENT[i:][:chunk_size] for i in range(0, len(TEST_CONTENT), chunk_size)]
+
+        lines = [line for batch in split_chunks(chunks) for line in batch]
+
+        assert lines == expected_lines(TEST_CONTENT)
+
+    def test_trailing_line_ending(self):
+        """Test line ending at the end of file does not give an empty line."""
+        assert list(split_chunks([b'a\nb\n'])) == [[b'a', b'b']]
+
+
+class TestIterLines:
+    """Tests iter_lines(opened_file, io_mode, start, end)."""
+
+    @pytest.mark.parametrize('io_mode', IO_MODES)
+    def test_return_value(self, log_file, io_mode):
+        """Test every io mode gives the same lines."""
+        with open(log_file, 'rb') as opened_file:
+            lines = list(iter_lines(opened_file, io_mode))
+
+        if io_mode == IO_TEXT_NAME:
+            assert all(isinstance(line, str) for line in lines)
+            lines = [line.encode().rstrip(b'\n') for line in lines]
+        assert lines == expected_lines(TEST_CONTENT)
+
+    @pytest.mark.parametrize('io_mode', IO_MODES)
+    def test_range(self, log_file, io_mode):
+        """Test only lines of the byte range are read."""
+        start = TEST_CONTENT.index(b'{"url": "/bb/"}')
+        end = TEST_CONTENT.index(b'{"url": "/d/"}')
+        with open(log_file, 'rb') as opened_file:
+            lines = list(iter_lines(opened_file, io_mode, start, end))
+
+        lines = [line.encode() if isinstance(line, str) else line for line in lines]
+        assert [line.rstrip(b'\n') for line in lines] == expected_lines(TEST_CONTENT[start:end])
+
+    @pytest.mark.parametrize('io_mode', IO_MODES)
+    def test_empty_file(self, tmp_path, io_mode):
+        """Test empty file gives no lines."""
+        new_file = tmp_path / 'empty.log'
+        new_file.write_bytes(b'')
+        with open(new_file, 'rb') as opened_file:
+            assert list(iter_lines(opened_file, io_mode)) == []
+
+    @pytest.mark.parametrize('iter_line_batches', [iter_chunked_line_batches, iter_mmap_line_batches])
+    def test_small_chunks(self, log_file, iter_line_batches):
+        """Test lines cut by chunks (windows) are restored."""
+        with open(log_file, 'rb') as opened_file:
+            lines = [line for batch in iter_line_batches(opened_file, chunk_size=5) for line in batch]
+
+        assert lines == expected_lines(TEST_CONTENT)
+
+    @pytest.mark.parametrize('io_mode', IO_MODES)
+    @pytest.mark.parametrize('compress', [gzip.compress, lzma.compress])
+    def test_compressed_file(self, tmp_path, io_mode, compress):
+        """Test lines of a compressed file are the same as of the uncompressed one."""
+        compressed_file = tmp_path / 'test.log.gz'
+        compressed_file.write_bytes(compress(TEST_CONTENT))
+
+        with open(compressed_file, 'rb') as opened_file:
+            lines = list(iter_lines(opened_file, io_mode))
+
+        assert lines == expected_lines(TEST_CONTENT)
+
+    def test_raise(self, log_file):
+        """Test call exception due to unknown io mode."""
+        with open(log_file, 'rb') as opened_file:
+            with pytest.raises(
+                Exception,
+                match=re.escape(
+                    'No action specified for parameter "--io unknown" in "iter_lines(opened_file, io_mode)".'
+                ),
+            ):
+                iter_lines(opened_file, 'unknown')
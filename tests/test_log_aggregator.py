@@ -0,0 +1,702 @@
+"""Module with tests log_aggregator.py."""
+
+import io
+import re
+from unittest import mock
+
+import pytest
+from config import (
+    AVERAGE_HEADERS,
+    AVERAGE_REPORT_NAME,
+    GROUPBY_REPORT_NAME,
+    PERCENTILES_HEADERS,
+    PERCENTILES_REPORT_NAME,
+    REQUESTS_TOTAL_COLUMN_NAME,
+    SPREAD_HEADERS,
+    SPREAD_REPORT_NAME,
+    TIMESERIES_HEADERS,
+    TIMESERIES_REPORT_NAME,
+    TOP_BY_COUNT_HEADERS,
+    TOP_BY_TIME_HEADERS,
+    TOP_BY_TIME_NAME,
+)
+from endpoint_stats import EndpointStats, EndpointStatsMap
+from group_by import GroupTable
+from heavy_hitters import HeavyHitters
+from line_decoder import LINE_ERRORS
+from line_filter import LineFilter
+from log_aggregator import LogAggregator
+from tabulate import tabulate
+
+TEST_TIMED_LINES = (
+    '{"@timestamp": "2025-06-22T13:58:01+00:00", "url": "/api/context/...", "response_time": 0.024}\n',
+    '{"@timestamp": "2025-06-22T13:57:59+00:00", "url": "/api/homeworks/...", "response_time": 0.02}\n',
+    '{"@timestamp": "2025-06-22T13:58:30+00:00", "url": "/api/homeworks/...", "response_time": 0.03}\n',
+    '{"@timestamp": "2025-06-22T13:58:31+00:00", "url": "/api/homeworks/...", "response_time": 0.04}\n',
+)
+TEST_LINES = (
+    '{"url": "/api/context/...", "response_time": 0.024}\n',
+    '{"url": "/api/context/...", "response_time": 0.02}\n',
+    '{"url": "/api/homeworks/...", "response_time": 0.024}\n',
+)
+
+
+@pytest.fixture
+def aggregator():
+    """Create LogAggregator object."""
+    return LogAggregator()
+
+
+class TestInit:
+    """Tests LogAggregator()."""
+
+    def test_init_attributes(self, aggregator):
+        """Test initialization attributes."""
+        assert isinstance(aggregator.endpoint_requests, EndpointStatsMap) is True
+        assert aggregator.endpoint_requests == {}
+
+    def test_independent_tables(self):
+        """Test two aggregators do not share endpoint tables."""
+        first, second = LogAggregator(), LogAggregator()
+        first.feed(first.iter_records(TEST_LINES))
+
+        assert len(first.endpoint_requests) == 2
+        assert second.endpoint_requests == {}
+
+
+class TestIterRecords:
+    """Tests iter_records(lines)."""
+
+    @pytest.mark.parametrize('lines', [io.StringIO(''.join(TEST_LINES)), [line.encode() for line in TEST_LINES]])
+    def test_return_value(self, aggregator, lines):
+        """Test records decoded from an opened file and from bytes lines."""
+        records = list(aggregator.iter_records(lines))
+
+        assert records == [
+            {"url": "/api/context/...", "response_time": 0.024},
+            {"url": "/api/context/...", "response_time": 0.02},
+            {"url": "/api/homeworks/...", "response_time": 0.024},
+        ]
+
+
+class TestAddRecord:
+    """Tests add_record(request_data)."""
+
+    def test_working(self, aggregator):
+        """Test working."""
+        test_request_data = (
+            {
+                "@timestamp": "2025-06-22T13:57:32+00:00",
+                "status": 200,
+                "url": "/api/context/...",
+                "request_method": "GET",
+                "response_time": 0.024,
+                "http_user_agent": "...",
+            },
+            {
+                "@timestamp": "2025-06-22T13:57:32+00:00",
+                "status": 200,
+                "url": "/api/context/...",
+                "request_method": "GET",
+                "response_time": 0.02,
+                "http_user_agent": "...",
+            },
+            {
+                "@timestamp": "2025-06-22T13:57:32+00:00",
+                "status": 200,
+                "url": "/api/homeworks/...",
+                "request_method": "GET",
+                "response_time": 0.024,
+                "http_user_agent": "...",
+            },
+            {
+                "@timestamp": "2025-06-22T13:57:34+00:00",
+                "status": 200,
+                "url": "/api/specializations/...",
+                "request_method": "GET",
+                "response_time": 0.04,
+                "http_user_agent": "...",
+            },
+        )
+        expected_endpoint_requests = {  # From test_request_data.
+            '/api/context/...': {'total_response_time': 0.044, 'total_requests': 2},
+            '/api/homeworks/...': {'total_response_time': 0.024, 'total_requests': 1},
+            '/api/specializations/...': {'total_response_time': 0.04, 'total_requests': 1},
+        }
+
+        for data in test_request_data:  # Add data from file.
+            aggregator.add_record(data)
+
+        for key, value in aggregator.endpoint_requests.items():
+            # Check true key (url).
+            assert key in expected_endpoint_requests
+            # Check true value class object.
+            assert isinstance(value, EndpointStats) is True
+            # Check true EndpointStats(key).total_response_time.
+            assert value.total_response_time == expected_endpoint_requests[key]['total_response_time']
+            # Check true EndpointStats(key).total_requests.
+            assert value.total_requests == expected_endpoint_requests[key]['total_requests']
+
+
+class TestGenerateFormatForTable:
+    """Tests generate_format_for_table(headers, urls, limit)."""
+
+    def test_return_value(self, aggregator):
+        """Test return value."""
+        # Create objects for aggregator.endpoint_requests.
+        # Create endpoint_stats1
+        endpoint_stats1 = EndpointStats('/path/1/...')
+        endpoint_stats1.total_response_time = 1.5
+        endpoint_stats1.total_requests = 3
+        # Create endpoint_stats2
+        endpoint_stats2 = EndpointStats('/path/2/...')
+        endpoint_stats2.total_response_time = 2
+        endpoint_stats2.total_requests = 2
+        # Create endpoint_stats3
+        endpoint_stats3 = EndpointStats('/path/3/...')
+        endpoint_stats3.total_response_time = 0.3
+        endpoint_stats3.total_requests = 1
+
+        # Fill aggregator.endpoint_requests.
+        aggregator.endpoint_requests[endpoint_stats1.url] = endpoint_stats1
+        aggregator.endpoint_requests[endpoint_stats2.url] = endpoint_stats2
+        aggregator.endpoint_requests[endpoint_stats3.url] = endpoint_stats3
+
+        # Run generate_format_for_table(AVERAGE_HEADERS)
+        fact_table_data = aggregator.generate_format_for_table(AVERAGE_HEADERS)
+
+        # Check "fact_table_data == expected_table_data"
+        expected_table_data = sorted(
+            [
+                endpoint_stats1.get_correct_format_for_tabulate(),
+                endpoint_stats2.get_correct_format_for_tabulate(),
+                endpoint_stats3.get_correct_format_for_tabulate(),
+            ],
+            key=lambda x: 1 / x[AVERAGE_HEADERS.index(REQUESTS_TOTAL_COLUMN_NAME)],
+        )
+        assert fact_table_data == expected_table_data
+
+    def test_percentiles_headers(self, aggregator):
+        """Test rows in PERCENTILES_HEADERS subsequence ordered by '-total'."""
+        aggregator.feed_lines(TEST_LINES)
+
+        fact_table_data = aggregator.generate_format_for_table(PERCENTILES_HEADERS)
+
+        assert fact_table_data == [
+            aggregator.endpoint_requests['/api/context/...'].get_correct_format_for_tabulate(PERCENTILES_HEADERS),
+            aggregator.endpoint_requests['/api/homeworks/...'].get_correct_format_for_tabulate(PERCENTILES_HEADERS),
+        ]
+        assert [row[PERCENTILES_HEADERS.index(REQUESTS_TOTAL_COLUMN_NAME)] for row in fact_table_data] == [2, 1]
+
+    def test_spread_headers(self, aggregator):
+        """Test rows in SPREAD_HEADERS subsequence ordered by '-total' (or by the given urls), limited rows."""
+        aggregator.feed_lines(TEST_LINES)
+
+        expected = [
+            aggregator.endpoint_requests['/api/context/...'].get_correct_format_for_tabulate(SPREAD_HEADERS),
+            aggregator.endpoint_requests['/api/homeworks/...'].get_correct_format_for_tabulate(SPREAD_HEADERS),
+        ]
+        assert aggregator.generate_format_for_table(SPREAD_HEADERS) == expected
+        assert aggregator.generate_format_for_table(SPREAD_HEADERS, ['/api/homeworks/...']) == expected[1:]
+        assert aggregator.generate_format_for_table(SPREAD_HEADERS, limit=1) == expected[:1]
+        assert aggregator.get_report_data(SPREAD_REPORT_NAME) == (SPREAD_HEADERS, expected)
+
+    def test_given_order(self, aggregator):
+        """Test rows are not sorted when the order of urls is given."""
+        aggregator.feed_lines(TEST_LINES)
+
+        fact_table_data = aggregator.generate_format_for_table(AVERAGE_HEADERS, ['/api/homeworks/...'])
+
+        assert fact_table_data == [aggregator.endpoint_requests['/api/homeworks/...'].get_correct_format_for_tabulate()]
+
+
+class TestGetSortedUrls:
+    """Tests get_sorted_urls(limit)."""
+
+    @pytest.mark.parametrize('limit', [None, 1, 3, 5, 100])
+    def test_return_value(self, aggregator, limit):
+        """Test order of '-total', equal totals in order of first occurrence, same order with partial selection."""
+        for i, count in enumerate([1, 3, 2, 3, 1, 2]):
+            aggregator.endpoint_requests[f'/{i}/'] = EndpointStats(f'/{i}/')
+            aggregator.endpoint_requests[f'/{i}/'].total_requests = count
+
+        expected = ['/1/', '/3/', '/2/', '/5/', '/0/', '/4/']
+        assert aggregator.get_sorted_urls(limit) == expected[:limit]
+
+
+class TestIterReportData:
+    """Tests iter_report_data(type_report, limit)."""
+
+    @pytest.mark.parametrize('type_report', [AVERAGE_REPORT_NAME, PERCENTILES_REPORT_NAME, SPREAD_REPORT_NAME])
+    @pytest.mark.parametrize('limit', [None, 1])
+    def test_same_as_get_report_data(self, aggregator, type_report, limit):
+        """Test rows of endpoint reports are formatted only while they are consumed."""
+        aggregator.feed_lines(TEST_LINES)
+
+        with mock.patch.object(LogAggregator, 'generate_format_for_table') as mock_generate_format_for_table:
+            headers, rows = aggregator.iter_report_data(type_report, limit)
+        mock_generate_format_for_table.assert_not_called()
+        assert isinstance(rows, list) is False
+        assert (headers, list(rows)) == aggregator.get_report_data(type_report, limit=limit)
+        assert len(aggregator.get_report_data(type_report, limit=limit)[1]) == (limit or 2)
+
+    def test_other_reports(self):
+        """Test rows of other reports are the limited rows of get_report_data()."""
+        aggregator = LogAggregator(time_bucket=60)
+        aggregator.feed_lines(TEST_TIMED_LINES)
+
+        headers, rows = aggregator.iter_report_data(TIMESERIES_REPORT_NAME, 2)
+
+        assert (headers, rows) == (TIMESERIES_HEADERS, aggregator.generate_timeseries_format_for_table()[:2])
+
+
+class TestTimeSeries:
+    """Tests LogAggregator(time_bucket) and generate_timeseries_format_for_table()."""
+
+    def test_feed_lines_same_as_feed(self):
+        """Test fast path gives the same time series as json.loads path."""
+        fast_aggregator, json_aggregator = LogAggregator(60), LogAggregator(60)
+        fast_aggregator.feed_lines(TEST_TIMED_LINES)
+        json_aggregator.feed(json_aggregator.iter_records(TEST_TIMED_LINES))
+
+        assert fast_aggregator.endpoint_requests == json_aggregator.endpoint_requests
+        assert fast_aggregator.endpoint_requests['/api/homeworks/...'].time_series.bucket_size == 60
+
+    def test_no_time_series_by_default(self, aggregator):
+        """Test time series are not collected without time_bucket ('@timestamp' is not needed)."""
+        aggregator.feed_lines(TEST_LINES)
+        assert aggregator.endpoint_requests['/api/context/...'].time_series is None
+        assert aggregator.generate_timeseries_format_for_table() == []
+
+    def test_return_value(self):
+        """Test rows ordered by time bucket, then by '-total'."""
+        aggregator = LogAggregator(60)
+        aggregator.feed_lines(TEST_TIMED_LINES)
+
+        table_data = aggregator.generate_timeseries_format_for_table()
+
+        assert [row[:4] for row in table_data] == [
+            ['2025-06-22T13:57:00+00:00', '/api/homeworks/...', 1, 0.02],
+            ['2025-06-22T13:58:00+00:00', '/api/homeworks/...', 2, 0.035],
+            ['2025-06-22T13:58:00+00:00', '/api/context/...', 1, 0.024],
+        ]
+        assert all(len(row) == len(TIMESERIES_HEADERS) for row in table_data)
+
+    def test_report(self):
+        """Test return value for type_report=TIMESERIES_REPORT_NAME."""
+        aggregator = LogAggregator(60)
+        aggregator.feed_lines(TEST_TIMED_LINES)
+
+        expected_table = tabulate(
+            aggregator.generate_timeseries_format_for_table(), headers=TIMESERIES_HEADERS, showindex='always'
+        )
+        assert aggregator.report(TIMESERIES_REPORT_NAME) == expected_table
+
+
+class TestUrlRules:
+    """Tests LogAggregator(url_rules)."""
+
+    lines = (
+        '{"url": "/api/users/1?page=2", "response_time": 0.024}\n',
+        '{"url": "/api/users/2", "response_time": 0.02}\n',
+        '{"url": "/api/orders/15/lines/3/", "response_time": 0.03}\n',
+    )
+
+    @pytest.mark.parametrize('time_bucket', [None, 60])
+    def test_feed_lines_same_as_feed(self, time_bucket):
+        """Test urls are normalized the same way by feed_lines() and feed()."""
+        lines = [line.replace('{', '{"@timestamp": "2025-06-22T13:58:01+00:00", ', 1) for line in self.lines]
+        fast_aggregator = LogAggregator(time_bucket, ['/api/users/{id}'])
+        json_aggregator = LogAggregator(time_bucket, ['/api/users/{id}'])
+        fast_aggregator.feed_lines(lines)
+        json_aggregator.feed(json_aggregator.iter_records(lines))
+
+        assert list(fast_aggregator.endpoint_requests) == ['/api/users/{id}', '/api/orders/{id}/lines/{id}/']
+        assert fast_aggregator.endpoint_requests == json_aggregator.endpoint_requests
+        assert fast_aggregator.endpoint_requests['/api/users/{id}'].total_requests == 2
+
+    def test_raw_urls_by_default(self, aggregator):
+        """Test urls are not normalized without url_rules."""
+        aggregator.feed_lines(self.lines)
+        assert list(aggregator.endpoint_requests) == ['/api/users/1?page=2', '/api/users/2', '/api/orders/15/lines/3/']
+        assert aggregator.normalize_url is None
+
+
+class TestGroupBy:
+    """Tests LogAggregator(group_by, metrics) and generate_groupby_format_for_table()."""
+
+    lines = (
+        '{"status": 200, "url": "/api/users/1", "request_method": "GET", "response_time": 0.024}\n',
+        '{"status": 500, "url": "/api/users/2", "request_method": "POST", "response_time": 0.5}\n',
+        '{"status": 200, "url": "/api/users/3", "request_method": "GET", "response_time": 0.016}\n',
+        '{"status": 200, "url": "/api/\\"quoted\\"/", "request_method": "GET", "response_time": 0.1}\n',  # json.loads.
+    )
+
+    @pytest.mark.parametrize(
+        'group_by, url_rules',
+        [(['request_method'], None), (['url', 'status'], None), (['status', 'url'], ['/api/users/{id}'])],
+    )
+    def test_feed_lines_same_as_feed(self, group_by, url_rules):
+        """Test fast path gives the same group table as json.loads path."""
+        fast_aggregator = LogAggregator(url_rules=url_rules, group_by=group_by)
+        json_aggregator = LogAggregator(url_rules=url_rules, group_by=group_by)
+        fast_aggregator.feed_lines(self.lines)
+        json_aggregator.feed(json_aggregator.iter_records(self.lines))
+
+        assert fast_aggregator.group_table == json_aggregator.group_table
+        assert len(fast_aggregator.endpoint_requests) == 0
+
+    def test_return_value(self):
+        """Test rows of dimension values and metrics ordered by '-count'."""
+        aggregator = LogAggregator(url_rules=['/api/users/{id}'], group_by=['url', 'status'], metrics=['count', 'max'])
+        aggregator.feed_lines(self.lines)
+
+        assert aggregator.generate_groupby_format_for_table() == [
+            ['/api/users/{id}', 200, 2, 0.024],
+            ['/api/users/{id}', 500, 1, 0.5],
+            ['/api/"quoted"/', 200, 1, 0.1],
+        ]
+
+    def test_get_result(self, aggregator):
+        """Test the group table is the result of grouping aggregator, the endpoint map otherwise."""
+        grouping_aggregator = LogAggregator(group_by=['status'])
+
+        assert isinstance(grouping_aggregator.get_result(), GroupTable)
+        assert aggregator.get_result() is aggregator.endpoint_requests
+        assert aggregator.generate_groupby_format_for_table() == []
+
+    def test_merge(self):
+        """Test merge of partial group tables."""
+        aggregator = LogAggregator(group_by=['request_method'])
+        for line in self.lines:
+            partial = LogAggregator(group_by=['request_method'])
+            partial.feed_lines([line])
+            aggregator.merge(partial.get_result())
+
+        expected = LogAggregator(group_by=['request_method'])
+        expected.feed_lines(self.lines)
+        assert aggregator.group_table == expected.group_table
+
+    def test_report(self):
+        """Test return value for type_report=GROUPBY_REPORT_NAME."""
+        aggregator = LogAggregator(group_by=['request_method', 'status'], metrics=['count', 'error_rate'])
+        aggregator.feed_lines(self.lines)
+
+        expected_table = tabulate(
+            aggregator.generate_groupby_format_for_table(),
+            headers=['request_method', 'status', 'count', 'error_rate'],
+            showindex='always',
+        )
+        assert aggregator.report(GROUPBY_REPORT_NAME) == expected_table
+
+
+class TestTop:
+    """Tests LogAggregator(top, top_by) and generate_top_format_for_table()."""
+
+    def test_feed_lines_same_as_feed(self):
+        """Test fast path gives the same top endpoints as json.loads path."""
+        fast_aggregator = LogAggregator(top=1)
+        json_aggregator = LogAggregator(top=1)
+        fast_aggregator.feed_lines(TEST_LINES)
+        json_aggregator.feed(json_aggregator.iter_records(TEST_LINES))
+
+        assert fast_aggregator.heavy_hitters == json_aggregator.heavy_hitters
+        assert len(fast_aggregator.endpoint_requests) == 0
+
+    def test_return_value(self):
+        """Test self.top rows ordered by '-total', urls are normalized."""
+        aggregator = LogAggregator(url_rules=['/api/{name}/...'], top=1)
+        aggregator.feed_lines(TEST_LINES)
+
+        assert aggregator.generate_top_format_for_table() == [['/api/{name}/...', 3, 0, 0.023]]
+        assert LogAggregator().generate_top_format_for_table() == []
+
+    def test_get_result(self):
+        """Test top endpoints are the result of the aggregator with top."""
+        assert isinstance(LogAggregator(top=1).get_result(), HeavyHitters)
+
+    def test_merge(self):
+        """Test merge of partial top endpoints."""
+        aggregator = LogAggregator(top=2)
+        for line in TEST_LINES:
+            partial = LogAggregator(top=2)
+            partial.feed_lines([line])
+            aggregator.merge(partial.get_result())
+
+        expected = LogAggregator(top=2)
+        expected.feed_lines(TEST_LINES)
+        assert aggregator.heavy_hitters == expected.heavy_hitters
+
+    @pytest.mark.parametrize('top_by, headers', [(None, TOP_BY_COUNT_HEADERS), (TOP_BY_TIME_NAME, TOP_BY_TIME_HEADERS)])
+    def test_report(self, top_by, headers):
+        """Test the average report is the table of top endpoints."""
+        aggregator = LogAggregator(top=2) if top_by is None else LogAggregator(top=2, top_by=top_by)
+        aggregator.feed_lines(TEST_LINES)
+
+        expected_table = tabulate(aggregator.generate_top_format_for_table(), headers=headers, showindex='always')
+        assert aggregator.report(AVERAGE_REPORT_NAME) == expected_table
+
+
+class TestCopySettings:
+    """Tests copy_settings()."""
+
+    def test_return_value(self):
+        """Test new empty aggregator with the same settings."""
+        aggregator = LogAggregator(
+            60, ['/api/{name}/...'], metrics=['count'], top=5, top_by=TOP_BY_TIME_NAME, line_filter=LineFilter(0)
+        )
+        aggregator.feed_lines(TEST_TIMED_LINES)
+
+        copy = aggregator.copy_settings()
+        for name in ('time_bucket', 'url_rules', 'group_by', 'metrics', 'backend', 'top', 'top_by', 'line_filter'):
+            assert getattr(copy, name) == getattr(aggregator, name)
+        assert len(copy.heavy_hitters) == 0
+
+
+class TestClear:
+    """Tests clear()."""
+
+    @pytest.mark.parametrize(
+        'settings', [{'url_rules': ['/api/{name}/...']}, {'group_by': ['url']}, {'top': 2}, {'time_bucket': 60}]
+    )
+    def test_result(self, settings):
+        """Test collected statistics are dropped, the aggregator collects as a new one."""
+        lines = [line.replace('"url"', '"status": 500, "url"') for line in TEST_TIMED_LINES]
+        aggregator = LogAggregator(**settings)
+        aggregator.feed_lines(lines)
+        result = aggregator.get_result()
+        aggregator.clear()
+        expected = LogAggregator(**settings)
+
+        assert aggregator.get_result() == expected.get_result()
+        assert aggregator.get_result() is not result
+        aggregator.feed_lines(lines[:2])
+        expected.feed_lines(lines[:2])
+        assert aggregator.get_result() == expected.get_result()
+
+
+class TestFeed:
+    """Tests feed(records)."""
+
+    def test_call_add_record(self, aggregator):
+        """Test call add_record(request_data) for every record."""
+        records = [{'url': '/a/', 'response_time': 0.1}, {'url': '/b/', 'response_time': 0.2}]
+        with mock.patch.object(aggregator, 'add_record') as mock_add_record:
+            aggregator.feed(iter(records))
+
+        assert mock_add_record.call_args_list == [mock.call(records[0]), mock.call(records[1])]
+
+
+class TestFeedLines:
+    """Tests feed_lines(lines)."""
+
+    @pytest.mark.parametrize('lines', [TEST_LINES, [line.encode() for line in TEST_LINES]])
+    def test_same_as_feed(self, aggregator, lines):
+        """Test result is the same as feed(iter_records(lines))."""
+        expected = LogAggregator()
+        expected.feed(expected.iter_records(lines))
+
+        aggregator.feed_lines(lines)
+
+        assert list(aggregator.endpoint_requests) == list(expected.endpoint_requests)
+        assert aggregator.endpoint_requests == expected.endpoint_requests
+
+    @pytest.mark.parametrize('time_bucket, top', [(None, None), (60, None), (None, 2)])
+    def test_line_filter(self, time_bucket, top):
+        """Test only lines matching the line filter are added."""
+        line_filter = LineFilter(1750600710, url_prefixes=['/api/homeworks/'])
+        aggregator = LogAggregator(time_bucket, top=top, line_filter=line_filter)
+        aggregator.feed_lines(TEST_TIMED_LINES)
+
+        expected = LogAggregator(time_bucket, top=top)
+        expected.feed_lines(TEST_TIMED_LINES[2:])
+        assert aggregator.get_result() == expected.get_result()
+
+
+class TestIsValidLine:
+    """Tests is_valid_line(line) and adds_batches_atomically()."""
+
+    @pytest.mark.parametrize(
+        'line, settings, expected',
+        [
+            (TEST_TIMED_LINES[0], {}, True),
+            ('not json', {}, False),
+            ('{"url": "/api/context/..."}', {}, False),
+            ('{"url": "/api/context/...", "response_time": null}', {}, False),
+            ('{"url": ["/api/"], "response_time": 0.1}', {}, False),  # Unhashable url.
+            ('{"url": 5, "response_time": 0.2}', {}, False),  # Not a string url.
+            ('{"url": 5, "response_time": 0.2}', {'backend': 'numpy'}, False),
+            ('{"url": "/api/", "status": 200, "response_time": 1e300}', {'group_by': ['url']}, False),
+            ('{"url": "/api/", "response_time": 1e300}', {'top': 2}, False),
+            ('{"url": "/api/", "response_time": 1e300}', {}, True),  # Endpoint sums are floats.
+            ('{"url": "/api/", "response_time": NaN}', {}, False),
+            ('{"url": "/api/", "status": 500, "response_time": Infinity}', {'group_by': ['url']}, False),
+            (TEST_LINES[0], {'time_bucket': 60}, False),  # No timestamp.
+            ('{"@timestamp": "now", "url": "/api/", "response_time": 0.1}', {'time_bucket': 60}, False),
+            (  # Second out of range, not the next minute.
+                '{"@timestamp": "2025-06-22T13:57:99+00:00", "url": "/api/", "response_time": 0.1}',
+                {'time_bucket': 60},
+                False,
+            ),
+            (TEST_LINES[0], {'group_by': ['url']}, False),  # No status.
+            (TEST_LINES[0], {'line_filter': LineFilter(1750600710)}, True),  # Skipped by the filter.
+            ('not json', {'line_filter': LineFilter(1750600710)}, False),
+        ],
+    )
+    def test_return_value(self, line, settings, expected):
+        """Test lines which feed_lines() can not add are not valid, statistics are not changed."""
+        aggregator = LogAggregator(**settings)
+        assert aggregator.is_valid_line(line) is expected
+        assert aggregator.is_valid_line(line.encode()) is expected
+        assert aggregator.get_result() == LogAggregator(**settings).get_result()
+
+    @pytest.mark.parametrize(
+        'settings, expected',
+        [
+            ({'backend': 'numpy'}, True),
+            ({'backend': 'numpy', 'url_rules': ['/api/{name}/...']}, True),
+            ({'backend': 'python'}, False),
+            ({'backend': 'numpy', 'time_bucket': 60}, False),
+            ({'backend': 'numpy', 'top': 2}, False),
+        ],
+    )
+    def test_adds_batches_atomically(self, settings, expected):
+        """Test a failed batch adds no lines only for endpoint statistics of the numpy backend."""
+        aggregator = LogAggregator(**settings)
+        assert aggregator.adds_batches_atomically() is expected
+        with pytest.raises(TypeError):
+            aggregator.feed_lines([TEST_TIMED_LINES[0], '{"url": "/api/", "response_time": null}'])
+        assert (aggregator.get_result() == LogAggregator(**settings).get_result()) is expected
+
+
+class TestDecodeLines:
+    """Tests decode_lines(lines) and add_decoded(decoded)."""
+
+    @pytest.mark.parametrize(
+        'settings',
+        [
+            {'backend': 'python'},
+            {'backend': 'numpy'},
+            {'backend': 'numpy', 'url_rules': ['/api/{name}/...']},
+            {'time_bucket': 60, 'url_rules': ['/api/{name}/...']},
+            {'top': 2},
+            {'line_filter': LineFilter(1750600710, url_prefixes=['/api/homeworks/'])},
+        ],
+    )
+    @pytest.mark.parametrize('lines', [TEST_TIMED_LINES, [line.encode() for line in TEST_TIMED_LINES], []])
+    def test_same_as_feed_lines(self, settings, lines):
+        """Test a batch decoded and added in two steps gives the result of feed_lines()."""
+        aggregator = LogAggregator(**settings)
+        decoded = aggregator.decode_lines(list(lines))
+        assert aggregator.get_result() == LogAggregator(**settings).get_result()
+        aggregator.add_decoded(decoded)
+
+        expected = LogAggregator(**settings)
+        expected.feed_lines(lines)
+        assert aggregator.get_result() == expected.get_result()
+        assert list(aggregator.endpoint_requests) == list(expected.endpoint_requests)
+
+    def test_group_by(self):
+        """Test a batch of the group table."""
+        lines = [line.replace('"url"', '"status": 500, "url"') for line in TEST_TIMED_LINES]
+        aggregator = LogAggregator(group_by=['url', 'status'])
+        aggregator.add_decoded(aggregator.decode_lines(lines))
+
+        expected = LogAggregator(group_by=['url', 'status'])
+        expected.feed_lines(lines)
+        assert aggregator.get_result() == expected.get_result()
+
+    @pytest.mark.parametrize(
+        'line, settings',
+        [
+            ('{"url": ["/api/"], "response_time": 0.1}', {'backend': 'python'}),  # Unhashable url.
+            ('{"url": "/api/", "response_time": null}', {'backend': 'numpy'}),
+            ('{"@timestamp": "now", "url": "/api/", "response_time": 0.1}', {'time_bucket': 60}),
+            ('{"@timestamp": "2025-06-22T13:58:60+00:00", "url": "/api/", "response_time": 0.1}', {'time_bucket': 60}),
+            ('{"url": "/api/", "status": 200, "method": ["GET"], "response_time": 0.1}', {'group_by': ['method']}),
+        ],
+    )
+    def test_raise(self, line, settings):
+        """Test a bad line fails at decoding, statistics are not changed."""
+        aggregator = LogAggregator(**settings)
+        with pytest.raises(LINE_ERRORS):
+            aggregator.decode_lines([TEST_TIMED_LINES[0], line])
+        assert aggregator.get_result() == LogAggregator(**settings).get_result()
+
+
+class TestMerge:
+    """Tests merge(endpoint_requests)."""
+
+    def test_working(self, aggregator):
+        """Test partial statistics are added to the endpoint table."""
+        aggregator.feed(aggregator.iter_records(TEST_LINES))
+        other = LogAggregator()
+        other.feed(other.iter_records(TEST_LINES))
+
+        aggregator.merge(other.endpoint_requests)
+
+        assert aggregator.endpoint_requests['/api/context/...'].total_requests == 4
+        assert aggregator.endpoint_requests['/api/homeworks/...'].total_response_time == 0.048
+
+
+class TestReport:
+    """Tests report(type_report)."""
+
+    @mock.patch.object(LogAggregator, 'generate_format_for_table', side_effect=SystemExit)
+    def test_call_generate_format_for_table(self, mock_generate_format_for_table, aggregator):
+        """Test call generate_format_for_table(AVERAGE_HEADERS) for type_report=AVERAGE_REPORT_NAME."""
+        with pytest.raises(SystemExit):  # Stop run after call report(type_report).
+            _ = aggregator.report(AVERAGE_REPORT_NAME)
+        mock_generate_format_for_table.assert_called_once_with(AVERAGE_HEADERS, None, None)
+
+    @pytest.mark.parametrize(
+        'type_report, headers',
+        [
+            (AVERAGE_REPORT_NAME, AVERAGE_HEADERS),
+            (PERCENTILES_REPORT_NAME, PERCENTILES_HEADERS),
+            (SPREAD_REPORT_NAME, SPREAD_HEADERS),
+        ],
+    )
+    def test_get_report_data(self, aggregator, type_report, headers):
+        """Test headers and rows of endpoint reports."""
+        aggregator.feed_lines(TEST_LINES)
+
+        assert aggregator.get_report_data(type_report) == (headers, aggregator.generate_format_for_table(headers))
+
+    def test_raise(self, aggregator):
+        """Test call exception due to unknown type report."""
+        unknown_type_report = 'UNKNOWN_TYPE_REPORT'
+        with pytest.raises(
+            Exception,
+            match=re.escape(  # match uses regex (use re.escape).
+                f'No action specified for parameter "--report {unknown_type_report}" '
+                'in "LogAggregator.report(type_report)".'
+            ),
+        ):
+            _ = aggregator.report(unknown_type_report)
+
+    @mock.patch.object(LogAggregator, 'generate_format_for_table')
+    def test_return_value_for_average_type(self, mock_generate_format_for_table, aggregator):
+        """Test return value for type_report=AVERAGE_REPORT_NAME."""
+        # Create ident return value from generate_format_for_table()
+        # Count values == len(AVERAGE_HEADERS)
+        test_return_value = []
+        test_return_value.append([f'random_value{i}' for i in range(len(AVERAGE_HEADERS))])
+
+        mock_generate_format_for_table.return_value = test_return_value
+
+        fact_table = aggregator.report(AVERAGE_REPORT_NAME)
+        expected_table = tabulate(test_return_value, headers=AVERAGE_HEADERS, showindex='always')
+
+        assert fact_table == expected_table
+
+    @mock.patch.object(LogAggregator, 'generate_format_for_table')
+    def test_return_value_for_percentiles_type(self, mock_generate_format_for_table, aggregator):
+        """Test return value for type_report=PERCENTILES_REPORT_NAME."""
+        test_return_value = [[f'random_value{i}' for i in range(len(PERCENTILES_HEADERS))]]
+        mock_generate_format_for_table.return_value = test_return_value
+
+        fact_table = aggregator.report(PERCENTILES_REPORT_NAME)
+        expected_table = tabulate(test_return_value, headers=PERCENTILES_HEADERS, showindex='always')
+
+        assert fact_table == expected_table
@@ -0,0 +1,64 @@
+"""Module with tests benchmarks/log_generator.py."""
+
+import itertools
+import json
+
+import pytest
+from benchmarks.log_generator import generate_log_lines, get_endpoint_urls, write_synthetic_log
+
+LOG_FIELDS = {'@timestamp', 'status', 'url', 'request_method', 'response_time', 'http_user_agent'}
+
+
+class TestGenerateLogLines:
+    """Tests generate_log_lines(endpoints, malformed_rate, seed)."""
+
+    def test_deterministic(self):
+        """Test the same lines for the same seed and other lines for another seed."""
+        first = list(itertools.islice(generate_log_lines(10, 0.1, seed=1), 200))
+
+        assert first == list(itertools.islice(generate_log_lines(10, 0.1, seed=1), 200))
+        assert first != list(itertools.islice(generate_log_lines(10, 0.1, seed=2), 200))
+
+    def test_schema(self):
+        """Test every line is a JSON object of the log schema with one of the urls."""
+        urls = set(get_endpoint_urls(5))
+        for line in itertools.islice(generate_log_lines(5), 500):
+            request_data = json.loads(line)
+            assert set(request_data) == LOG_FIELDS
+            assert request_data['url'] in urls
+            assert line.endswith('\n')
+
+    def test_malformed_rate(self):
+        """Test share of lines which are not valid records."""
+        malformed = 0
+        for line in itertools.islice(generate_log_lines(5, malformed_rate=0.2), 5000):
+            try:
+                json.loads(line)['response_time']
+            except (ValueError, KeyError):
+                malformed += 1
+
+        assert 0.15 < malformed / 5000 < 0.25
+
+
+class TestWriteSyntheticLog:
+    """Tests write_synthetic_log(file, lines, endpoints, seed, size, malformed_rate)."""
+
+    def test_lines(self, tmp_path):
+        """Test number of written lines."""
+        file = tmp_path / 'test.log'
+        assert write_synthetic_log(str(file), lines=100) == 100
+        assert len(file.read_text().splitlines()) == 100
+
+    def test_size(self, tmp_path):
+        """Test file is written up to the given size."""
+        file = tmp_path / 'test.log'
+        lines = write_synthetic_log(str(file), size=10000)
+
+        assert 10000 <= file.stat().st_size < 11000
+        assert len(file.read_text().splitlines()) == lines
+
+    @pytest.mark.parametrize('lines, size', [(None, None), (10, 10)])
+    def test_raise(self, tmp_path, lines, size):
+        """Test call exception when not exactly one of lines and size is given."""
+        with pytest.raises(Exception, match='Specify exactly one of "lines" and "size".'):
+            write_synthetic_log(str(tmp_path / 'test.log'), lines, size=size)
@@ -1,5 +1,7 @@
 """Module with tests."""
 
+import gzip
+import io
 import json
 import os
 import re
@@ -12,22 +14,35 @@ from unittest import mock
 
 import main
 import pytest
-from config import AVERAGE_HEADERS, AVERAGE_REPORT_NAME, REQUESTS_TOTAL_COLUMN_NAME
-from endpoint_stats import EndpointStats
+from bad_lines import BadLines
+from config import (
+    AVERAGE_HEADERS,
+    AVERAGE_REPORT_NAME,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_IO_MODE,
+    DEFAULT_WORKERS,
+    FOLLOW_REFRESH_INTERVAL,
+    GROUPBY_REPORT_NAME,
+    IO_MODES,
+    ON_ERROR_FAIL_NAME,
+    ON_ERROR_QUARANTINE_NAME,
+    ON_ERROR_SKIP_NAME,
+    REQUESTS_TOTAL_COLUMN_NAME,
+    SERVER_SNAPSHOT_INTERVAL,
+    TEXT_FORMAT_NAME,
+    TIMESERIES_REPORT_NAME,
+    TOP_BY_COUNT_NAME,
+    TOP_BY_TIME_NAME,
+)
+from endpoint_stats import EndpointStats, EndpointStatsMap
+from line_filter import LineFilter
+from log_aggregator import LogAggregator
+from report_renderer import read_binary
+from run_stats import RunStats
+from segment_index import SegmentIndex
 from tabulate import tabulate
 
 
-@pytest.fixture(autouse=True)
-def autoclear_all_endpoint_requests():
-    """Autoclear ALL_ENDPOINT_REQUESTS between tests."""
-    main.ALL_ENDPOINT_REQUESTS.clear()
-
-
-def test_value_all_endpoint_requests():
-    """Test value ALL_ENDPOINT_REQUESTS."""
-    assert main.ALL_ENDPOINT_REQUESTS == {}
-
-
 class TestMainFunc:
     """Tests main()."""
 
@@ -41,26 +56,313 @@ class TestMainFunc:
 
     @mock.patch('main.read_files')
     def test_call_read_files(self, mock_read_files):
-        """Test call read_files(files)."""
+        """Test call read_files(files, aggregator, workers, io_mode, concurrency, bad_lines)."""
         test_files = ['example3.log', 'example4.log']
 
         with mock.patch('main.get_command_line_options') as mock_get_command_line_options:
-            mock_get_command_line_options.return_value = mock.Mock(file=test_files, report=AVERAGE_REPORT_NAME)
+            mock_get_command_line_options.return_value = mock.Mock(
+                file=test_files,
+                report=AVERAGE_REPORT_NAME,
+                workers=DEFAULT_WORKERS,
+                io=DEFAULT_IO_MODE,
+                concurrency=DEFAULT_CONCURRENCY,
+                state=None,
+                follow=False,
+                url_rule=None,
+                url_rules=None,
+                top=None,
+                on_error=ON_ERROR_FAIL_NAME,
+                since=None,
+                until=None,
+                status=None,
+                method=None,
+                url_prefix=None,
+                serve=None,
+                build_index=False,
+                format=TEXT_FORMAT_NAME,
+                limit=None,
+                partial=None,
+                merge=None,
+                stats=False,
+                profile=None,
+            )
+            main.main()
+
+        mock_read_files.assert_called_once_with(
+            test_files, mock.ANY, DEFAULT_WORKERS, DEFAULT_IO_MODE, DEFAULT_CONCURRENCY, None, None
+        )
+        assert isinstance(mock_read_files.call_args.args[1], LogAggregator) is True
+
+    @mock.patch('main.read_files')
+    @mock.patch('main.read_files_incrementally')
+    def test_call_read_files_incrementally(self, mock_read_files_incrementally, mock_read_files):
+        """Test call read_files_incrementally(files, aggregator, state_file, workers, io_mode, bad_lines)."""
+        test_files = ['example3.log']
+
+        with mock.patch('main.get_command_line_options') as mock_get_command_line_options:
+            mock_get_command_line_options.return_value = mock.Mock(
+                file=test_files,
+                report=AVERAGE_REPORT_NAME,
+                workers=DEFAULT_WORKERS,
+                io=DEFAULT_IO_MODE,
+                state='example.state',
+                follow=False,
+                url_rule=None,
+                url_rules=None,
+                top=None,
+                on_error=ON_ERROR_FAIL_NAME,
+                since=None,
+                until=None,
+                status=None,
+                method=None,
+                url_prefix=None,
+                serve=None,
+                build_index=False,
+                format=TEXT_FORMAT_NAME,
+                limit=None,
+                partial=None,
+                merge=None,
+                stats=False,
+                profile=None,
+            )
+            main.main()
+
+        mock_read_files_incrementally.assert_called_once_with(
+            test_files, mock.ANY, 'example.state', DEFAULT_WORKERS, DEFAULT_IO_MODE, None, None
+        )
+        mock_read_files.assert_not_called()
+
+    @mock.patch('main.read_files')
+    @mock.patch('main.create_table')
+    @mock.patch('main.follow_files')
+    def test_call_follow_files(self, mock_follow_files, mock_create_table, mock_read_files):
+        """Test call follow_files(files, aggregator, type_report, interval) for '--follow'."""
+        with mock.patch('main.get_command_line_options') as mock_get_command_line_options:
+            mock_get_command_line_options.return_value = mock.Mock(
+                file=['example3.log'],
+                report=AVERAGE_REPORT_NAME,
+                follow=True,
+                interval=5.0,
+                url_rule=None,
+                url_rules=None,
+                top=None,
+                on_error=ON_ERROR_FAIL_NAME,
+                since=None,
+                until=None,
+                status=None,
+                method=None,
+                url_prefix=None,
+                serve=None,
+                build_index=False,
+                format=TEXT_FORMAT_NAME,
+                limit=None,
+                partial=None,
+                merge=None,
+                stats=False,
+                profile=None,
+            )
             main.main()
 
-        mock_read_files.assert_called_once_with(test_files)
+        mock_follow_files.assert_called_once_with(['example3.log'], mock.ANY, AVERAGE_REPORT_NAME, 5.0, bad_lines=None)
+        mock_read_files.assert_not_called()
+        mock_create_table.assert_not_called()
+
+    @mock.patch('main.read_files')
+    @mock.patch('main.create_table')
+    @mock.patch('main.build_indexes')
+    def test_call_build_indexes(self, mock_build_indexes, mock_create_table, mock_read_files):
+        """Test call build_indexes(files, workers, bad_lines) for '--build-index'."""
+        with mock.patch('main.get_command_line_options') as mock_get_command_line_options:
+            mock_get_command_line_options.return_value = mock.Mock(
+                file=['example3.log'],
+                report=AVERAGE_REPORT_NAME,
+                workers=2,
+                url_rule=None,
+                url_rules=None,
+                top=None,
+                on_error=ON_ERROR_FAIL_NAME,
+                since=None,
+                until=None,
+                status=None,
+                method=None,
+                url_prefix=None,
+                serve=None,
+                build_index=True,
+                stats=False,
+                profile=None,
+            )
+            main.main()
+
+        mock_build_indexes.assert_called_once_with(['example3.log'], 2, None)
+        mock_read_files.assert_not_called()
+        mock_create_table.assert_not_called()
+
+    @mock.patch('main.read_files')
+    @mock.patch('main.create_table')
+    @mock.patch('main.serve')
+    def test_call_serve(self, mock_serve, mock_create_table, mock_read_files):
+        """Test call serve(aggregator, query_address, ingest_addresses, files, snapshot_interval, bad_lines)."""
+        with mock.patch('main.get_command_line_options') as mock_get_command_line_options:
+            mock_get_command_line_options.return_value = mock.Mock(
+                file=['example3.log'],
+                report=AVERAGE_REPORT_NAME,
+                url_rule=None,
+                url_rules=None,
+                top=None,
+                on_error=ON_ERROR_FAIL_NAME,
+                since=None,
+                until=None,
+                status=None,
+                method=None,
+                url_prefix=None,
+                serve='unix:/run/query.sock',
+                listen=['unix:/run/ingest.sock'],
+                snapshot_interval=0.5,
+                build_index=False,
+                stats=False,
+                profile=None,
+            )
+            main.main()
+
+        mock_serve.assert_called_once_with(
+            mock.ANY, 'unix:/run/query.sock', ['unix:/run/ingest.sock'], ['example3.log'], 0.5, None
+        )
+        mock_read_files.assert_not_called()
+        mock_create_table.assert_not_called()
 
     @mock.patch('main.read_files', return_value=None)
-    @mock.patch('main.get_command_line_options', return_value=mock.Mock(file=['testfile1.log'], report='test_report'))
+    def test_time_bucket_for_timeseries(self, mock_read_files):
+        """Test aggregator collects time series only for the timeseries report."""
+        with mock.patch('main.get_command_line_options') as mock_get_command_line_options:
+            mock_get_command_line_options.return_value = mock.Mock(
+                file=['example3.log'],
+                report=TIMESERIES_REPORT_NAME,
+                bucket=300,
+                state=None,
+                follow=False,
+                url_rule=None,
+                url_rules=None,
+                top=None,
+                on_error=ON_ERROR_FAIL_NAME,
+                since=None,
+                until=None,
+                status=None,
+                method=None,
+                url_prefix=None,
+                serve=None,
+                build_index=False,
+                format=TEXT_FORMAT_NAME,
+                limit=None,
+                partial=None,
+                merge=None,
+                stats=False,
+                profile=None,
+            )
+            with mock.patch('main.create_table') as mock_create_table:
+                main.main()
+
+        assert mock_create_table.call_args.args[1].time_bucket == 300
+
+    @mock.patch('main.read_files', return_value=None)
+    def test_url_rules(self, mock_read_files, tmp_path):
+        """Test aggregator gets rules of '--url-rules' file, then of '--url-rule' options."""
+        rules_file = tmp_path / 'rules.txt'
+        rules_file.write_text('# Comment.\n/api/users/{id}\n\n^/api/v\\d+/.*$ => /api/v{n}\n')
+        with mock.patch('main.get_command_line_options') as mock_get_command_line_options:
+            mock_get_command_line_options.return_value = mock.Mock(
+                file=['example3.log'],
+                report=AVERAGE_REPORT_NAME,
+                state=None,
+                follow=False,
+                url_rule=['/static/{name}'],
+                url_rules=str(rules_file),
+                top=None,
+                on_error=ON_ERROR_FAIL_NAME,
+                since=None,
+                until=None,
+                status=None,
+                method=None,
+                url_prefix=None,
+                serve=None,
+                build_index=False,
+                format=TEXT_FORMAT_NAME,
+                limit=None,
+                partial=None,
+                merge=None,
+                stats=False,
+                profile=None,
+            )
+            with mock.patch('main.create_table'):
+                main.main()
+
+        assert mock_read_files.call_args.args[1].url_rules == [
+            '/api/users/{id}',
+            '^/api/v\\d+/.*$ => /api/v{n}',
+            '/static/{name}',
+        ]
+
+    @mock.patch('main.read_files', return_value=None)
+    @mock.patch(
+        'main.get_command_line_options',
+        return_value=mock.Mock(
+            file=['testfile1.log'],
+            report='test_report',
+            state=None,
+            follow=False,
+            url_rule=None,
+            url_rules=None,
+            top=None,
+            on_error=ON_ERROR_FAIL_NAME,
+            since=None,
+            until=None,
+            status=None,
+            method=None,
+            url_prefix=None,
+            serve=None,
+            build_index=False,
+            format=TEXT_FORMAT_NAME,
+            limit=None,
+            partial=None,
+            merge=None,
+            stats=False,
+            profile=None,
+        ),
+    )
     def test_call_create_table(self, *args):
-        """Test call create_table(type_report)."""
+        """Test call create_table(type_report, aggregator) with the aggregator filled by read_files()."""
         with mock.patch('main.create_table') as mock_create_table:
             main.main()
-            mock_create_table.assert_called_once_with('test_report')
+            mock_create_table.assert_called_once_with('test_report', mock.ANY, None)
+            assert mock_create_table.call_args.args[1] is main.read_files.call_args.args[1]
 
     @mock.patch('main.create_table', return_value='String with table')
     @mock.patch('main.read_files', return_value=None)
-    @mock.patch('main.get_command_line_options', return_value=mock.Mock(file=['testfile1.log'], report='test_report'))
+    @mock.patch(
+        'main.get_command_line_options',
+        return_value=mock.Mock(
+            file=['testfile1.log'],
+            report='test_report',
+            state=None,
+            follow=False,
+            url_rule=None,
+            url_rules=None,
+            top=None,
+            on_error=ON_ERROR_FAIL_NAME,
+            since=None,
+            until=None,
+            status=None,
+            method=None,
+            url_prefix=None,
+            serve=None,
+            build_index=False,
+            format=TEXT_FORMAT_NAME,
+            limit=None,
+            partial=None,
+            merge=None,
+            stats=False,
+            profile=None,
+        ),
+    )
     def test_call_print(self, *args):
         """Test call print() with table='String with table'."""
         with mock.patch('main.print') as mock_print:
@@ -85,6 +387,7 @@ class TestGetCommandLineOptions:
                 'average',
             ),
             (['main.py', '--file', 'example.log'], ['example.log'], 'average'),  # default --report average
+            (['main.py', '--file', 'example.log', '-r', 'percentiles'], ['example.log'], 'percentiles'),
         ],
     )
     def test_return_value(self, test_command_line_args, expected_files, expected_report, monkeypatch):
@@ -96,91 +399,857 @@ class TestGetCommandLineOptions:
         assert args.file == expected_files
         assert args.report == expected_report
 
+    @pytest.mark.parametrize(
+        'test_command_line_args, expected_workers',
+        [
+            (['main.py', '--file', 'example.log', '--workers', '4'], 4),
+            (['main.py', '--file', 'example.log', '-w', '2'], 2),
+            (['main.py', '--file', 'example.log'], DEFAULT_WORKERS),  # default --workers
+        ],
+    )
+    def test_return_value_workers(self, test_command_line_args, expected_workers, monkeypatch):
+        """Tests return value for '--workers'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+
+        args = main.get_command_line_options()
+        assert args.workers == expected_workers
+
+    @pytest.mark.parametrize(
+        'test_command_line_args',
+        [
+            ['main.py', '--file', 'example.log', '--workers', '0'],
+            ['main.py', '--file', 'example.log', '-w', '-2'],
+            ['main.py', '--file', 'example.log', '--workers', 'two'],
+        ],
+    )
+    def test_invalid_workers(self, test_command_line_args, monkeypatch):
+        """Tests exit due to not positive or not integer '--workers'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+        with pytest.raises(SystemExit) as system_exit:
+            main.get_command_line_options()
+        assert system_exit.value.code == 2
+
+    @pytest.mark.parametrize(
+        'test_command_line_args, expected_files, expected_concurrency',
+        [
+            (['main.py', '--file', 'a.log', 'b.log', '--concurrency', '8'], ['a.log', 'b.log'], 8),
+            (
+                ['main.py', '--file', '-', 'unix:/run/app.sock', 'tcp:[::1]:5140'],
+                ['-', 'unix:/run/app.sock', 'tcp:[::1]:5140'],
+                1,
+            ),
+            (['main.py', '--file', 'example.log'], ['example.log'], DEFAULT_CONCURRENCY),  # default --concurrency
+        ],
+    )
+    def test_return_value_concurrency(self, test_command_line_args, expected_files, expected_concurrency, monkeypatch):
+        """Tests return value for '--concurrency' and stdin, socket sources."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+
+        args = main.get_command_line_options()
+        assert args.file == expected_files
+        assert args.concurrency == expected_concurrency
+
+    @pytest.mark.parametrize(
+        'test_command_line_args',
+        [
+            ['main.py', '--file', 'example.log', '--concurrency', '0'],
+            ['main.py', '--file', 'example.log', '--concurrency', '4', '--workers', '2'],
+            ['main.py', '--file', '-', '--state', 'example.state'],
+            ['main.py', '--file', 'unix:/run/app.sock', '--follow'],
+            ['main.py', '--file', 'tcp:localhost'],
+        ],
+    )
+    def test_invalid_concurrency(self, test_command_line_args, monkeypatch):
+        """Tests exit due to invalid '--concurrency', socket address or use with '--workers', '--state', '--follow'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+        with pytest.raises(SystemExit) as system_exit:
+            main.get_command_line_options()
+        assert system_exit.value.code == 2
+
+    @pytest.mark.parametrize(
+        'test_command_line_args, expected_files, expected_serve, expected_listen',
+        [
+            (
+                ['main.py', '--serve', 'tcp:127.0.0.1:8080', '--listen', 'unix:/run/ingest.sock'],
+                [],
+                'tcp:127.0.0.1:8080',
+                ['unix:/run/ingest.sock'],
+            ),
+            (
+                ['main.py', '--file', 'app.log', '--serve', 'unix:/run/query.sock'],
+                ['app.log'],
+                'unix:/run/query.sock',
+                None,
+            ),
+            (['main.py', '--file', 'app.log'], ['app.log'], None, None),  # default: no server
+        ],
+    )
+    def test_return_value_serve(
+        self, test_command_line_args, expected_files, expected_serve, expected_listen, monkeypatch
+    ):
+        """Tests return value for '--serve' and '--listen' ('--file' is not required)."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+
+        args = main.get_command_line_options()
+        assert args.file == expected_files
+        assert args.serve == expected_serve
+        assert args.listen == expected_listen
+        assert args.snapshot_interval == SERVER_SNAPSHOT_INTERVAL
+
+    @pytest.mark.parametrize(
+        'test_command_line_args',
+        [
+            ['main.py'],
+            ['main.py', '--serve', '/run/query.sock'],
+            ['main.py', '--file', 'app.log', '--listen', 'unix:/run/ingest.sock'],
+            ['main.py', '--file', 'app.log', '--serve', 'unix:/run/query.sock', '--follow'],
+            ['main.py', '--file', 'app.log', '--serve', 'unix:/run/query.sock', '--workers', '2'],
+            ['main.py', '--file', '-', '--serve', 'unix:/run/query.sock'],
+        ],
+    )
+    def test_invalid_serve(self, test_command_line_args, monkeypatch):
+        """Tests exit due to missing '--file', invalid address or '--serve' with other modes."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+        with pytest.raises(SystemExit) as system_exit:
+            main.get_command_line_options()
+        assert system_exit.value.code == 2
+
+    @pytest.mark.parametrize('mode', [['--follow'], ['--serve', 'unix:/run/query.sock']])
+    def test_invalid_compressed_follow(self, mode, tmp_path, monkeypatch, capsys):
+        """Tests exit due to a compressed file with '--follow' or '--serve' (appended lines can not be read)."""
+        compressed_file = tmp_path / 'app.log.gz'
+        compressed_file.write_bytes(gzip.compress(b'{"url": "/api/1/...", "response_time": 0.1}\n'))
+        plain_file = tmp_path / 'app.log'
+        plain_file.write_bytes(b'')
+        monkeypatch.setattr(sys, 'argv', ['main.py', '--file', str(plain_file), str(compressed_file), *mode])
+        with pytest.raises(SystemExit) as system_exit:
+            main.get_command_line_options()
+        assert system_exit.value.code == 2
+        assert f'can not follow compressed files: {compressed_file}.' in capsys.readouterr().err
+
+    @pytest.mark.parametrize(
+        'test_command_line_args',
+        [
+            ['main.py', '--file', 'app.log', '--build-index', '--follow'],
+            ['main.py', '--file', 'app.log', '--build-index', '--state', 'app.state'],
+            ['main.py', '--file', '-', '--build-index'],
+        ],
+    )
+    def test_invalid_build_index(self, test_command_line_args, monkeypatch):
+        """Tests exit due to '--build-index' with other modes or not a file."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+        with pytest.raises(SystemExit) as system_exit:
+            main.get_command_line_options()
+        assert system_exit.value.code == 2
+
+    @pytest.mark.parametrize(
+        'test_command_line_args, expected_io',
+        [
+            (['main.py', '--file', 'example.log', '--io', 'mmap'], 'mmap'),
+            (['main.py', '--file', 'example.log', '--io', 'text'], 'text'),
+            (['main.py', '--file', 'example.log'], DEFAULT_IO_MODE),  # default --io
+        ],
+    )
+    def test_return_value_io(self, test_command_line_args, expected_io, monkeypatch):
+        """Tests return value for '--io'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+
+        args = main.get_command_line_options()
+        assert args.io == expected_io
+
+    @pytest.mark.parametrize(
+        'test_command_line_args, expected_follow, expected_interval',
+        [
+            (['main.py', '--file', 'example.log', '--follow', '--interval', '0.5'], True, 0.5),
+            (['main.py', '--file', 'example.log'], False, FOLLOW_REFRESH_INTERVAL),  # default: no follow
+        ],
+    )
+    def test_return_value_follow(self, test_command_line_args, expected_follow, expected_interval, monkeypatch):
+        """Tests return value for '--follow' and '--interval'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+
+        args = main.get_command_line_options()
+        assert args.follow is expected_follow
+        assert args.interval == expected_interval
+
+    @pytest.mark.parametrize(
+        'test_command_line_args',
+        [
+            ['main.py', '--file', 'example.log', '--follow', '--limit', '10'],
+            ['main.py', '--file', 'example.log', '--follow', '--format', 'csv'],
+        ],
+    )
+    def test_invalid_follow(self, test_command_line_args, monkeypatch):
+        """Tests exit due to '--follow' with '--limit' and '--format'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+        with pytest.raises(SystemExit) as system_exit:
+            main.get_command_line_options()
+        assert system_exit.value.code == 2
+
+    @pytest.mark.parametrize(
+        'test_command_line_args, expected_bucket',
+        [
+            (['main.py', '--file', 'example.log', '--report', 'timeseries', '--bucket', '5m'], 300),
+            (['main.py', '--file', 'example.log'], 60),  # default --bucket 1m
+        ],
+    )
+    def test_return_value_bucket(self, test_command_line_args, expected_bucket, monkeypatch):
+        """Tests return value for '--bucket' (size in seconds)."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+
+        args = main.get_command_line_options()
+        assert args.bucket == expected_bucket
+
+    def test_invalid_bucket(self, monkeypatch):
+        """Tests exit due to invalid '--bucket'."""
+        monkeypatch.setattr(sys, 'argv', ['main.py', '--file', 'example.log', '--bucket', '1w'])
+        with pytest.raises(SystemExit) as system_exit:
+            main.get_command_line_options()
+        assert system_exit.value.code == 2
+
+    @pytest.mark.parametrize(
+        'test_command_line_args, expected_url_rule, expected_url_rules',
+        [
+            (
+                ['main.py', '--file', 'example.log', '--url-rule', '/api/users/{id}', '--url-rule', 'a => b'],
+                ['/api/users/{id}', 'a => b'],
+                None,
+            ),
+            (['main.py', '--file', 'example.log', '--url-rules', 'rules.txt'], None, 'rules.txt'),
+            (['main.py', '--file', 'example.log'], None, None),  # default: raw urls
+        ],
+    )
+    def test_return_value_url_rules(self, test_command_line_args, expected_url_rule, expected_url_rules, monkeypatch):
+        """Tests return value for '--url-rule' and '--url-rules'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+
+        args = main.get_command_line_options()
+        assert args.url_rule == expected_url_rule
+        assert args.url_rules == expected_url_rules
+
+    @pytest.mark.parametrize(
+        'test_command_line_args, expected_group_by, expected_metrics',
+        [
+            (
+                [
+                    'main.py',
+                    '--file',
+                    'example.log',
+                    '--report',
+                    'groupby',
+                    '--group-by',
+                    'url,status',
+                    '--metrics',
+                    'max',
+                ],
+                ['url', 'status'],
+                ['max'],
+            ),
+            (['main.py', '--file', 'example.log'], ['url'], ['count', 'mean']),  # default --group-by, --metrics
+        ],
+    )
+    def test_return_value_group_by(self, test_command_line_args, expected_group_by, expected_metrics, monkeypatch):
+        """Tests return value for '--group-by' and '--metrics'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+
+        args = main.get_command_line_options()
+        assert args.group_by == expected_group_by
+        assert args.metrics == expected_metrics
+
+    @pytest.mark.parametrize(
+        'test_command_line_args',
+        [
+            ['main.py', '--file', 'example.log', '--metrics', 'count,median'],
+            ['main.py', '--file', 'example.log', '--group-by', 'url,,status'],
+            ['main.py', '--file', 'example.log', '--report', 'groupby', '--state', 'example.state'],
+        ],
+    )
+    def test_invalid_group_by(self, test_command_line_args, monkeypatch):
+        """Tests exit due to invalid '--group-by', '--metrics' or '--state' with the groupby report."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+        with pytest.raises(SystemExit) as system_exit:
+            main.get_command_line_options()
+        assert system_exit.value.code == 2
+
+    @pytest.mark.parametrize(
+        'test_command_line_args, expected_top, expected_top_by',
+        [
+            (['main.py', '--file', 'example.log', '--top', '10', '--top-by', 'time'], 10, 'time'),
+            (['main.py', '--file', 'example.log'], None, 'count'),  # default --top, --top-by
+        ],
+    )
+    def test_return_value_top(self, test_command_line_args, expected_top, expected_top_by, monkeypatch):
+        """Tests return value for '--top' and '--top-by'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+
+        args = main.get_command_line_options()
+        assert args.top == expected_top
+        assert args.top_by == expected_top_by
+
+    @pytest.mark.parametrize(
+        'test_command_line_args',
+        [
+            ['main.py', '--file', 'example.log', '--top', '0'],
+            ['main.py', '--file', 'example.log', '--top', 'ten'],
+            ['main.py', '--file', 'example.log', '--top', '10', '--top-by', 'size'],
+            ['main.py', '--file', 'example.log', '--top', '10', '--report', 'percentiles'],
+            ['main.py', '--file', 'example.log', '--top', '10', '--state', 'example.state'],
+        ],
+    )
+    def test_invalid_top(self, test_command_line_args, monkeypatch):
+        """Tests exit due to invalid '--top', '--top-by' or '--top' with other report or '--state'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+        with pytest.raises(SystemExit) as system_exit:
+            main.get_command_line_options()
+        assert system_exit.value.code == 2
+
+    @pytest.mark.parametrize(
+        'test_command_line_args, expected_format, expected_limit',
+        [
+            (['main.py', '--file', 'example.log', '--format', 'jsonl', '--limit', '10'], 'jsonl', 10),
+            (['main.py', '--file', 'example.log', '--format', 'binary'], 'binary', None),
+            (['main.py', '--file', 'example.log'], 'text', None),  # default --format, --limit
+        ],
+    )
+    def test_return_value_output(self, test_command_line_args, expected_format, expected_limit, monkeypatch):
+        """Tests return value for '--format' and '--limit'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+
+        args = main.get_command_line_options()
+        assert args.format == expected_format
+        assert args.limit == expected_limit
+
+    @pytest.mark.parametrize(
+        'test_command_line_args',
+        [
+            ['main.py', '--file', 'example.log', '--limit', '0'],
+            ['main.py', '--file', 'example.log', '--limit', '-1'],
+            ['main.py', '--file', 'example.log', '--format', 'parquet'],
+        ],
+    )
+    def test_invalid_output(self, test_command_line_args, monkeypatch):
+        """Tests exit due to invalid '--format' or '--limit'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+        with pytest.raises(SystemExit) as system_exit:
+            main.get_command_line_options()
+        assert system_exit.value.code == 2
+
+    @pytest.mark.parametrize(
+        'test_command_line_args, expected_filters',
+        [
+            (
+                [
+                    'main.py',
+                    '--file',
+                    'example.log',
+                    '--since',
+                    '2024-01-01',
+                    '--until',
+                    '2024-01-01T00:01:00',
+                    '--status',
+                    '5xx,404',
+                    '--method',
+                    'get',
+                    '--url-prefix',
+                    '/api/',
+                    '--url-prefix',
+                    '/health',
+                ],
+                [1704067200, 1704067260, ['5xx', '404'], ['GET'], ['/api/', '/health']],
+            ),
+            (['main.py', '--file', 'example.log'], [None, None, None, None, None]),  # default: no filters
+        ],
+    )
+    def test_return_value_filters(self, test_command_line_args, expected_filters, monkeypatch):
+        """Tests return value for '--since', '--until', '--status', '--method' and '--url-prefix'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+
+        args = main.get_command_line_options()
+        assert [args.since, args.until, args.status, args.method, args.url_prefix] == expected_filters
+        assert args.sorted is False
+
+    @pytest.mark.parametrize(
+        'test_command_line_args',
+        [
+            ['main.py', '--file', 'example.log', '--since', 'yesterday'],
+            ['main.py', '--file', 'example.log', '--status', '5'],
+            ['main.py', '--file', 'example.log', '--sorted'],
+            ['main.py', '--file', 'example.log', '--status', '5xx', '--state', 'example.state'],
+        ],
+    )
+    def test_invalid_filters(self, test_command_line_args, monkeypatch):
+        """Tests exit due to invalid filters, '--sorted' without time range or filters with '--state'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+        with pytest.raises(SystemExit) as system_exit:
+            main.get_command_line_options()
+        assert system_exit.value.code == 2
+
+    @pytest.mark.parametrize(
+        'test_command_line_args, expected_on_error, expected_quarantine_file',
+        [
+            (
+                ['main.py', '--file', 'example.log', '--on-error', 'quarantine', '--quarantine-file', 'bad.log'],
+                'quarantine',
+                'bad.log',
+            ),
+            (['main.py', '--file', 'example.log'], 'fail', 'quarantine.log'),  # default --on-error
+            (['main.py', '--on-error', 'skip', '--serve', 'unix:/run/query.sock'], 'skip', 'quarantine.log'),
+        ],
+    )
+    def test_return_value_on_error(
+        self, test_command_line_args, expected_on_error, expected_quarantine_file, monkeypatch
+    ):
+        """Tests return value for '--on-error' and '--quarantine-file'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+
+        args = main.get_command_line_options()
+        assert args.on_error == expected_on_error
+        assert args.quarantine_file == expected_quarantine_file
+
+    @pytest.mark.parametrize(
+        'test_command_line_args',
+        [
+            ['main.py', '--file', 'example.log', '--on-error', 'ignore'],
+            ['main.py', '--file', 'example.log', '--on-error', 'skip', '--workers', '2'],
+        ],
+    )
+    def test_invalid_on_error(self, test_command_line_args, monkeypatch):
+        """Tests exit due to invalid '--on-error' or skipping bad lines with '--workers'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+        with pytest.raises(SystemExit) as system_exit:
+            main.get_command_line_options()
+        assert system_exit.value.code == 2
+
+    @pytest.mark.parametrize(
+        'test_command_line_args, expected_state',
+        [
+            (['main.py', '--file', 'example.log', '--state', 'example.state'], 'example.state'),
+            (['main.py', '--file', 'example.log'], None),  # default: no state
+        ],
+    )
+    def test_return_value_state(self, test_command_line_args, expected_state, monkeypatch):
+        """Tests return value for '--state'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+
+        args = main.get_command_line_options()
+        assert args.state == expected_state
+
+    @pytest.mark.parametrize(
+        'test_command_line_args, expected_partial, expected_merge',
+        [
+            (['main.py', '--file', 'example.log', '--partial', 'host1.dump'], 'host1.dump', None),
+            (['main.py', '--merge', 'host1.dump', 'host2.dump'], None, ['host1.dump', 'host2.dump']),
+            (['main.py', '--file', 'example.log'], None, None),  # default: no partial dumps
+        ],
+    )
+    def test_return_value_partial(self, test_command_line_args, expected_partial, expected_merge, monkeypatch):
+        """Tests return value for '--partial' and '--merge'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+
+        args = main.get_command_line_options()
+        assert args.partial == expected_partial
+        assert args.merge == expected_merge
+
+    @pytest.mark.parametrize(
+        'test_command_line_args',
+        [
+            ['main.py', '--file', 'example.log', '--partial', 'host1.dump', '--top', '10'],
+            ['main.py', '--file', 'example.log', '--partial', 'host1.dump', '--follow'],
+            ['main.py', '--merge', 'host1.dump', '--report', 'groupby'],
+            ['main.py', '--merge', 'host1.dump', '--file', 'example.log'],
+            ['main.py', '--merge', 'host1.dump', '--state', 'example.state'],
+            ['main.py', '--merge', 'host1.dump', '--status', '5xx'],
+        ],
+    )
+    def test_invalid_partial(self, test_command_line_args, monkeypatch):
+        """Tests exit due to '--partial' or '--merge' with unsupported options."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+        with pytest.raises(SystemExit) as system_exit:
+            main.get_command_line_options()
+        assert system_exit.value.code == 2
+
+    @pytest.mark.parametrize(
+        'test_command_line_args, expected_stats, expected_profile',
+        [
+            (['main.py', '--file', 'example.log', '--stats', '--profile', 'run.prof'], True, 'run.prof'),
+            (['main.py', '--file', 'example.log'], False, None),  # default: no statistics and profile
+        ],
+    )
+    def test_return_value_stats(self, test_command_line_args, expected_stats, expected_profile, monkeypatch):
+        """Tests return value for '--stats' and '--profile'."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+
+        args = main.get_command_line_options()
+        assert args.stats is expected_stats
+        assert args.profile == expected_profile
+
+    @pytest.mark.parametrize(
+        'test_command_line_args',
+        [
+            ['main.py', '--file', 'example.log', '--stats', '--follow'],
+            ['main.py', '--file', 'example.log', '--stats', '--build-index'],
+            ['main.py', '--stats', '--serve', 'unix:/run/query.sock'],
+        ],
+    )
+    def test_invalid_stats(self, test_command_line_args, monkeypatch):
+        """Tests exit due to '--stats' of a long-running mode or index building."""
+        monkeypatch.setattr(sys, 'argv', test_command_line_args)
+        with pytest.raises(SystemExit) as system_exit:
+            main.get_command_line_options()
+        assert system_exit.value.code == 2
+
 
 class TestReadFiles:
-    """Tests read_files(files)."""
+    """Tests read_files(files, aggregator, workers)."""
 
+    @pytest.mark.parametrize('io_mode', IO_MODES)
+    @mock.patch('main.iter_lines')
     @mock.patch('main.parsing_file')
-    def test_call_parsing_file(self, mock_parsing_file):
-        """Test call parsing_file(opened_file)."""
+    def test_call_parsing_file(self, mock_parsing_file, mock_iter_lines, io_mode):
+        """Test call parsing_file(lines, aggregator, bad_lines, source, incomplete_tail) with lines of the file."""
+        aggregator = LogAggregator()
         with mock.patch('main.open', new_callable=mock.mock_open) as mock_open:  # Use mock.mock_open!
             main.read_files(
                 [
                     'test_file.log',
-                ]
+                ],
+                aggregator,
+                io_mode=io_mode,
             )
 
-        mock_parsing_file.assert_called_once_with(mock_open.return_value)
+        mock_open.assert_called_once_with('test_file.log', 'rb')
+        mock_iter_lines.assert_called_once_with(mock_open.return_value, io_mode, 0, None)
+        mock_parsing_file.assert_called_once_with(
+            mock_iter_lines.return_value, aggregator, None, 'test_file.log', False, None
+        )
 
+    @pytest.mark.parametrize('compressed', [False, True])
+    def test_stats_bytes_read(self, compressed, tmp_path):
+        """Test every '--io' mode reports the same lines and bytes read (the size of the file)."""
+        data = b''.join(json.dumps(data).encode() + b'\n' for data in TestRunFile.test_request_data) * 3
+        path = tmp_path / 'test.log'
+        path.write_bytes(gzip.compress(data) if compressed else data)
+
+        counters = []
+        for io_mode in IO_MODES:
+            stats = RunStats()
+            main.read_files([str(path)], LogAggregator(), io_mode=io_mode, stats=stats)
+            counters.append((stats.lines, stats.bytes_read))
+
+        assert counters == [(12, path.stat().st_size)] * len(IO_MODES)
+
+    @pytest.mark.parametrize('io_mode', IO_MODES)
+    def test_stats_bytes_read_range(self, io_mode, tmp_path):
+        """Test only the byte range of the time range is counted in a file sorted by time."""
+        lines = [
+            json.dumps({'@timestamp': f'2024-01-01T00:00:{i:02d}+00:00', 'url': '/', 'response_time': 0.1}) + '\n'
+            for i in range(60)
+        ]
+        path = tmp_path / 'test.log'
+        path.write_text(''.join(lines))
+        stats = RunStats()
+        aggregator = LogAggregator(line_filter=LineFilter(1704067200 + 20, sorted_by_time=True))
+        main.read_files([str(path)], aggregator, io_mode=io_mode, stats=stats)
 
-class TestAccountingEndpointRequest:
-    """Tests accounting_endpoint_request(request_data)."""
+        assert stats.bytes_read == sum(map(len, lines[20:]))
 
-    def test_working(self):
-        """Test working."""
-        test_request_data = (
-            {
-                "@timestamp": "2025-06-22T13:57:32+00:00",
-                "status": 200,
-                "url": "/api/context/...",
-                "request_method": "GET",
-                "response_time": 0.024,
-                "http_user_agent": "...",
-            },
-            {
-                "@timestamp": "2025-06-22T13:57:32+00:00",
-                "status": 200,
-                "url": "/api/context/...",
-                "request_method": "GET",
-                "response_time": 0.02,
-                "http_user_agent": "...",
-            },
-            {
-                "@timestamp": "2025-06-22T13:57:32+00:00",
-                "status": 200,
-                "url": "/api/homeworks/...",
-                "request_method": "GET",
-                "response_time": 0.024,
-                "http_user_agent": "...",
-            },
+    @mock.patch('main.parsing_file')
+    @mock.patch('main.parse_files_parallel')
+    def test_call_parse_files_parallel(self, mock_parse_files_parallel, mock_parsing_file):
+        """Test call parse_files_parallel(files, workers) and merge of partial results."""
+        endpoint_stats = EndpointStats('/path/1/...')
+        endpoint_stats.total_requests = 2
+        endpoint_stats.total_response_time = 0.5
+        mock_parse_files_parallel.return_value = iter([EndpointStatsMap({endpoint_stats.url: endpoint_stats})])
+
+        aggregator = LogAggregator()
+        main.read_files(['test_file.log'], aggregator, workers=2)
+
+        mock_parse_files_parallel.assert_called_once_with(
+            ['test_file.log'], 2, DEFAULT_IO_MODE, None, None, None, None, TOP_BY_COUNT_NAME, None
+        )
+        mock_parsing_file.assert_not_called()
+        assert aggregator.endpoint_requests[endpoint_stats.url].total_requests == 2
+        assert aggregator.endpoint_requests[endpoint_stats.url].total_response_time == 0.5
+
+    @pytest.mark.parametrize('files, concurrency', [(['a.log', 'b.log'], 4), (['-'], 1)])
+    @mock.patch('main.parsing_file')
+    @mock.patch('main.ingest_sources')
+    def test_call_ingest_sources(self, mock_ingest_sources, mock_parsing_file, files, concurrency):
+        """Test call ingest_sources(files, aggregator, io_mode, concurrency) for concurrency or stdin."""
+        aggregator = LogAggregator()
+        main.read_files(files, aggregator, concurrency=concurrency)
+
+        mock_ingest_sources.assert_awaited_once_with(files, aggregator, DEFAULT_IO_MODE, concurrency, bad_lines=None)
+        mock_parsing_file.assert_not_called()
+
+
+class TestReadFilesFiltered:
+    """Tests read_files(files, aggregator, workers) with a line filter."""
+
+    lines = [
+        json.dumps(
             {
-                "@timestamp": "2025-06-22T13:57:34+00:00",
-                "status": 200,
-                "url": "/api/specializations/...",
-                "request_method": "GET",
-                "response_time": 0.04,
-                "http_user_agent": "...",
-            },
+                '@timestamp': f'2024-01-01T00:{i // 60:02d}:{i % 60:02d}+00:00',
+                'status': (200, 500)[i % 2],
+                'url': f'/api/{i % 3}/...',
+                'response_time': 0.001 * (i + 1),
+            }
         )
-        expected_all_endpoint_requests = {  # From test_request_data.
-            '/api/context/...': {'total_response_time': 0.044, 'total_requests': 2},
-            '/api/homeworks/...': {'total_response_time': 0.024, 'total_requests': 1},
-            '/api/specializations/...': {'total_response_time': 0.04, 'total_requests': 1},
-        }
-
-        for data in test_request_data:  # Add data from file.
-            main.accounting_endpoint_request(data)
-
-        for key, value in main.ALL_ENDPOINT_REQUESTS.items():
-            # Check true key (url).
-            assert key in expected_all_endpoint_requests
-            # Check true value class object.
-            assert isinstance(value, EndpointStats) is True
-            # Check true EndpointStats(key).total_response_time.
-            assert value.total_response_time == expected_all_endpoint_requests[key]['total_response_time']
-            # Check true EndpointStats(key).total_requests.
-            assert value.total_requests == expected_all_endpoint_requests[key]['total_requests']
+        + '\n'
+        for i in range(600)
+    ]
+
+    @pytest.fixture
+    def log_file(self, tmp_path):
+        """Create log file with lines sorted by time."""
+        path = tmp_path / 'test.log'
+        path.write_text(''.join(self.lines))
+        return str(path)
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    @pytest.mark.parametrize('sorted_by_time', [False, True])
+    @pytest.mark.parametrize('statuses', [None, ['5xx']])
+    @pytest.mark.parametrize('indexed', [False, True])
+    def test_same_as_filtered_lines(self, log_file, workers, sorted_by_time, statuses, indexed):
+        """Test statistics are the same as of the filtered lines for every way of reading."""
+        if indexed:
+            SegmentIndex.build(log_file, segment_size=5000, block_size=1000).save(log_file + '.idx')
+        line_filter = LineFilter(1704067200 + 100, 1704067200 + 400, statuses, sorted_by_time=sorted_by_time)
+        aggregator = LogAggregator(line_filter=line_filter)
+        main.read_files([log_file], aggregator, workers)
+
+        expected = LogAggregator()
+        expected.feed_lines(line for line in self.lines[100:400] if statuses is None or '"status": 500' in line)
+        assert aggregator.endpoint_requests == expected.endpoint_requests
+
+    def test_skip_ranges(self, log_file):
+        """Test only the byte range of the time range is read from a file sorted by time."""
+        line_filter = LineFilter(1704067200 + 100, 1704067200 + 400, sorted_by_time=True)
+        start = sum(len(line) for line in self.lines[:100])
+        end = start + sum(len(line) for line in self.lines[100:400])
+        with mock.patch('main.iter_lines', wraps=main.iter_lines) as mock_iter_lines:
+            main.read_files([log_file], LogAggregator(line_filter=line_filter))
+
+        mock_iter_lines.assert_called_once_with(mock.ANY, DEFAULT_IO_MODE, start, end)
+
+    def test_get_line_filter(self):
+        """Test the filter of command line options, None without filters."""
+        args = Namespace(since=1, until=None, status=['5xx'], method=None, url_prefix=None, sorted=True)
+        line_filter = main.get_line_filter(args)
+
+        assert (line_filter.since, line_filter.statuses, line_filter.sorted_by_time) == (1, ['5xx'], True)
+        assert main.get_line_filter(Namespace(**{**vars(args), 'since': None, 'status': None})) is None
+
+
+class TestReadFilesBadLines:
+    """Tests read_files(files, aggregator, workers, io_mode, concurrency, bad_lines) with bad lines."""
+
+    good_lines = [json.dumps({'url': f'/api/{i % 3}/...', 'response_time': 0.001 * (i + 1)}) for i in range(50)]
+    bad_lines = [
+        'not json',
+        json.dumps({'url': '/api/1/...'}),
+        json.dumps({'url': '/api/1/...', 'response_time': None}),
+    ]
+
+    @pytest.fixture
+    def log_file(self, tmp_path):
+        """Create log file with bad lines among good ones and a truncated last line."""
+        lines = self.good_lines[:10] + self.bad_lines[:2] + self.good_lines[10:40] + self.bad_lines[2:]
+        path = tmp_path / 'test.log'
+        path.write_text('\n'.join([*lines, *self.good_lines[40:]]) + '\n' + self.good_lines[0][:20])
+        return str(path)
+
+    @pytest.mark.parametrize('io_mode', IO_MODES)
+    @pytest.mark.parametrize('concurrency', [1, 2])
+    @pytest.mark.parametrize('indexed', [False, True])
+    def test_same_as_good_lines(self, log_file, tmp_path, io_mode, concurrency, indexed):
+        """Test statistics of good lines, bad lines are counted and quarantined, the truncated line is not."""
+        if indexed:  # Index of the good first lines, the other lines are appended.
+            content = Path(log_file).read_bytes()
+            Path(log_file).write_text('\n'.join(self.good_lines[:10]) + '\n')
+            SegmentIndex.build(log_file, segment_size=500, block_size=200).save(log_file + '.idx')
+            Path(log_file).write_bytes(content)
+        quarantine_file = str(tmp_path / 'quarantine.log')
+        bad_lines = BadLines(ON_ERROR_QUARANTINE_NAME, quarantine_file, batch_size=8)
+        aggregator = LogAggregator()
+        main.read_files([log_file], aggregator, io_mode=io_mode, concurrency=concurrency, bad_lines=bad_lines)
+        bad_lines.flush()
+
+        expected_aggregator = LogAggregator()
+        expected_aggregator.feed_lines(self.good_lines)
+        assert aggregator.endpoint_requests == expected_aggregator.endpoint_requests
+        assert bad_lines.counts == {log_file: 3 if concurrency == 1 else 4}
+        assert bad_lines.truncated_counts == ({log_file: 1} if concurrency == 1 else {})
+        with open(quarantine_file) as opened_file:
+            assert opened_file.read().splitlines()[:3] == self.bad_lines
+
+    def test_incrementally(self, tmp_path):
+        """Test bad lines are skipped by runs over an appended file, the truncated line is parsed when complete."""
+        log_file = tmp_path / 'test.log'
+        state_file = str(tmp_path / 'test.state')
+        log_file.write_text('\n'.join(self.good_lines[:10] + self.bad_lines) + '\n' + self.good_lines[10][:20])
+        bad_lines = BadLines(ON_ERROR_SKIP_NAME)
+        main.read_files_incrementally([str(log_file)], LogAggregator(), state_file, bad_lines=bad_lines)
+        with open(log_file, 'a') as opened_file:
+            opened_file.write(self.good_lines[10][20:] + '\n' + '\n'.join(self.good_lines[11:]) + '\n')
+        aggregator = LogAggregator()
+        main.read_files_incrementally([str(log_file)], aggregator, state_file, bad_lines=bad_lines)
+
+        expected_aggregator = LogAggregator()
+        expected_aggregator.feed_lines(self.good_lines)
+        assert aggregator.endpoint_requests == expected_aggregator.endpoint_requests
+        assert bad_lines.counts == {str(log_file): 3}
+
+    def test_fail(self, log_file):
+        """Test the first bad line raises without bad_lines."""
+        with pytest.raises(json.decoder.JSONDecodeError):
+            main.read_files([log_file], LogAggregator())
+
+
+class TestReadFilesIncrementally:
+    """Tests read_files_incrementally(files, aggregator, state_file, workers, io_mode)."""
+
+    lines = [json.dumps({'url': f'/api/{i % 3}/...', 'response_time': 0.001 * (i + 1)}) + '\n' for i in range(40)]
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_same_as_full_read(self, tmp_path, workers):
+        """Test runs over an appended file give the same statistics as one full read."""
+        log_file = tmp_path / 'test.log'
+        state_file = str(tmp_path / 'test.state')
+        for lines in (self.lines[:15], self.lines[15:16], self.lines[16:]):
+            with open(log_file, 'a') as opened_file:
+                opened_file.writelines(lines)
+            aggregator = LogAggregator()
+            main.read_files_incrementally([str(log_file)], aggregator, state_file, workers)
+
+        expected_aggregator = LogAggregator()
+        main.read_files([str(log_file)], expected_aggregator)
+        assert list(aggregator.endpoint_requests) == list(expected_aggregator.endpoint_requests)
+        assert aggregator.endpoint_requests == expected_aggregator.endpoint_requests
+
+    def test_truncated_file(self, tmp_path):
+        """Test lines of a truncated file are added to the saved statistics."""
+        log_file = tmp_path / 'test.log'
+        state_file = str(tmp_path / 'test.state')
+        log_file.write_text(''.join(self.lines[:20]))
+        main.read_files_incrementally([str(log_file)], LogAggregator(), state_file)
+
+        log_file.write_text(''.join(self.lines[20:]))
+        aggregator = LogAggregator()
+        main.read_files_incrementally([str(log_file)], aggregator, state_file)
+
+        assert sum(stats.total_requests for stats in aggregator.endpoint_requests.values()) == len(self.lines)
+
+    @pytest.mark.parametrize('settings', [{}, {'url_rules': ['/api/{id}/...']}, {'time_bucket': 60}])
+    def test_other_settings(self, settings, tmp_path):
+        """Test a state saved with other url rules or time bucket is not resumed, the state file is kept."""
+        log_file = tmp_path / 'test.log'
+        state_file = tmp_path / 'test.state'
+        log_file.write_text(''.join(self.lines))
+        main.read_files_incrementally([str(log_file)], LogAggregator(url_rules=['/api/{name}/...']), str(state_file))
+        saved_state = state_file.read_bytes()
+
+        log_file.write_text(''.join(self.lines) * 2)
+        aggregator = LogAggregator(**settings)
+        with pytest.raises(Exception, match='is saved with url rules'):
+            main.read_files_incrementally([str(log_file)], aggregator, str(state_file))
+        assert state_file.read_bytes() == saved_state
+
+
+class TestReadIndexedFiles:
+    """Tests read_indexed_files(files, indexes, aggregator, workers, io_mode) and build_indexes(files, workers)."""
+
+    lines = [json.dumps({'url': f'/api/{i % 3}/{i}', 'response_time': 0.001 * (i + 1)}) + '\n' for i in range(40)]
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_same_as_full_read(self, tmp_path, workers):
+        """Test statistics of indexed, appended, compressed and unindexed files are the same as of full parsing."""
+        indexed_file = tmp_path / 'indexed.log'
+        indexed_file.write_text(''.join(self.lines[:30]))
+        compressed_file = tmp_path / 'indexed.log.gz'
+        compressed_file.write_bytes(gzip.compress(''.join(self.lines).encode()))
+        unindexed_file = tmp_path / 'unindexed.log'
+        unindexed_file.write_text(''.join(self.lines[5:]))
+        files = [str(indexed_file), str(compressed_file), str(unindexed_file)]
+        with mock.patch('builtins.print') as mock_print:
+            main.build_indexes(files[:2])
+        assert mock_print.call_count == 2
+        with open(indexed_file, 'a') as opened_file:
+            opened_file.writelines(self.lines[30:])
+
+        url_rules = ['/api/{group}/{id}']
+        aggregator = LogAggregator(url_rules=url_rules)
+        with mock.patch('main.parsing_file', wraps=main.parsing_file) as mock_parsing_file:
+            main.read_files(files, aggregator, workers)
+
+        expected_aggregator = LogAggregator(url_rules=url_rules)
+        for file in files:
+            main.read_files([file], expected_aggregator, io_mode='text')
+        assert mock_parsing_file.call_count == (2 if workers == 1 else 0)
+        assert aggregator.endpoint_requests == expected_aggregator.endpoint_requests
+        if workers == 1:
+            assert list(aggregator.endpoint_requests) == list(expected_aggregator.endpoint_requests)
+
+    def test_changed_file(self, tmp_path):
+        """Test the index of a changed file and the index for other reports are not used."""
+        log_file = tmp_path / 'test.log'
+        log_file.write_text(''.join(self.lines[:20]))
+        with mock.patch('builtins.print'):
+            main.build_indexes([str(log_file)])
+        log_file.write_text(''.join(self.lines[20:]))
+
+        with mock.patch('main.read_indexed_files') as mock_read_indexed_files:
+            main.read_files([str(log_file)], LogAggregator())
+            main.read_files([str(log_file)], LogAggregator(top=2))
+        mock_read_indexed_files.assert_not_called()
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_nothing_to_parse(self, tmp_path, workers):
+        """Test the process pool is not used when all lines are taken from the indexes."""
+        compressed_file = tmp_path / 'indexed.log.gz'
+        compressed_file.write_bytes(gzip.compress(''.join(self.lines).encode()))
+        with mock.patch('builtins.print'):
+            main.build_indexes([str(compressed_file)])
+
+        aggregator = LogAggregator()
+        with mock.patch('main.parse_file_ranges_parallel') as mock_parse_file_ranges_parallel:
+            main.read_files([str(compressed_file)], aggregator, workers)
+
+        mock_parse_file_ranges_parallel.assert_not_called()
+        assert sum(stats.total_requests for stats in aggregator.endpoint_requests.values()) == len(self.lines)
+
+    @pytest.mark.parametrize('settings', [{'time_bucket': 60}, {'group_by': ['url']}, {'top': 2}])
+    def test_raise(self, settings):
+        """Test call exception due to statistics which are not kept in indexes."""
+        with pytest.raises(Exception, match='can not be taken from indexes'):
+            main.read_indexed_files([], [], LogAggregator(**settings))
+
+
+class TestParsingFile:
+    """Tests parsing_file(lines, aggregator)."""
+
+    def test_working(self):
+        """Test lines of opened file are fed into the aggregator."""
+        aggregator = LogAggregator()
+        opened_file = io.StringIO('{"url": "/a/", "response_time": 0.5}\n{"url": "/a/", "response_time": 0.25}\n')
+
+        main.parsing_file(opened_file, aggregator)
+
+        assert aggregator.endpoint_requests['/a/'].total_requests == 2
+        assert aggregator.endpoint_requests['/a/'].total_response_time == 0.75
 
 
 class TestCreateTable:
-    """Tests create_table(type_report)."""
+    """Tests create_table(type_report, aggregator, limit)."""
+
+    def test_call_report(self):
+        """Test call aggregator.report(type_report)."""
+        aggregator = mock.Mock(spec=LogAggregator)
+        aggregator.report.return_value = 'String with table'
 
-    @mock.patch('main.generate_average_format_for_table', side_effect=SystemExit)
-    def test_call_generate_average_format_for_table(self, mock_generate_average_format_for_table):
-        """Test call generate_average_format_for_table() for type_report=AVERAGE_REPORT_NAME."""
-        with pytest.raises(SystemExit):  # Stop run after call create_table(type_report).
-            _ = main.create_table(AVERAGE_REPORT_NAME)
-        mock_generate_average_format_for_table.assert_called_once()
+        assert main.create_table(AVERAGE_REPORT_NAME, aggregator, 5) == 'String with table'
+        aggregator.report.assert_called_once_with(AVERAGE_REPORT_NAME, limit=5)
 
     def test_raise(self):
         """Test call exception due to unknown type report."""
@@ -188,64 +1257,11 @@ class TestCreateTable:
         with pytest.raises(
             Exception,
             match=re.escape(  # match uses regex (use re.escape).
-                f'No action specified for parameter "--report {unknown_type_report}" in "create_table(type_report)".'
+                f'No action specified for parameter "--report {unknown_type_report}" '
+                'in "LogAggregator.report(type_report)".'
             ),
         ):
-            _ = main.create_table(unknown_type_report)
-
-    @mock.patch('main.generate_average_format_for_table')
-    def test_return_value_for_average_type(self, mock_generate_average_format_for_table):
-        """Test return value for type_report=AVERAGE_REPORT_NAME."""
-        # Create ident return value from generate_average_format_for_table()
-        # Count values == len(AVERAGE_HEADERS)
-        test_return_value = []
-        test_return_value.append([f'random_value{i}' for i in range(len(AVERAGE_HEADERS))])
-
-        mock_generate_average_format_for_table.return_value = test_return_value
-
-        fact_table = main.create_table(AVERAGE_REPORT_NAME)
-        expected_table = tabulate(test_return_value, headers=AVERAGE_HEADERS, showindex='always')
-
-        assert fact_table == expected_table
-
-
-class TestGenerateAverageFormatForTable:
-    """Tests generate_average_format_for_table()."""
-
-    def test_return_value(self):
-        """Test return value."""
-        # Create objects for ALL_ENDPOINT_REQUESTS.
-        # Create endpoint_stats1
-        endpoint_stats1 = EndpointStats('/path/1/...')
-        endpoint_stats1.total_response_time = 1.5
-        endpoint_stats1.total_requests = 3
-        # Create endpoint_stats2
-        endpoint_stats2 = EndpointStats('/path/2/...')
-        endpoint_stats2.total_response_time = 2
-        endpoint_stats2.total_requests = 2
-        # Create endpoint_stats3
-        endpoint_stats3 = EndpointStats('/path/3/...')
-        endpoint_stats3.total_response_time = 0.3
-        endpoint_stats3.total_requests = 1
-
-        # Create ALL_ENDPOINT_REQUESTS.
-        main.ALL_ENDPOINT_REQUESTS[endpoint_stats1.url] = endpoint_stats1
-        main.ALL_ENDPOINT_REQUESTS[endpoint_stats2.url] = endpoint_stats2
-        main.ALL_ENDPOINT_REQUESTS[endpoint_stats3.url] = endpoint_stats3
-
-        # Run generate_average_format_for_table()
-        fact_table_data = main.generate_average_format_for_table()
-
-        # Check "fact_table_data == expected_table_data"
-        expected_table_data = sorted(
-            [
-                endpoint_stats1.get_correct_format_for_tabulate(),
-                endpoint_stats2.get_correct_format_for_tabulate(),
-                endpoint_stats3.get_correct_format_for_tabulate(),
-            ],
-            key=lambda x: 1 / x[AVERAGE_HEADERS.index(REQUESTS_TOTAL_COLUMN_NAME)],
-        )
-        assert fact_table_data == expected_table_data
+            _ = main.create_table(unknown_type_report, LogAggregator())
 
 
 class TestRunFile:
@@ -490,6 +1506,169 @@ class TestRunFile:
 
         os.remove(new_file)
 
+    def test_run_parser_workers(self, new_local_file1, new_local_file2, expected_table_file1_file2, monkeypatch):
+        """
+        Run 'python main.py --file testfile1.log testfile2.log --workers 2'.
+
+        Two files in local directory, parsed in a process pool, default report.
+        """
+        monkeypatch.setattr(sys, 'argv', ['main.py', '--file', new_local_file1, new_local_file2, '--workers', '2'])
+        with mock.patch('builtins.print') as mock_print:
+            runpy.run_path("main.py", run_name="__main__")
+
+        mock_print.assert_called_once_with(expected_table_file1_file2)
+
+    def test_run_parser_concurrency(self, new_local_file1, new_local_file2, expected_table_file1_file2, monkeypatch):
+        """
+        Run 'python main.py --file testfile1.log testfile2.log --concurrency 2'.
+
+        Two files in local directory, read concurrently, default report.
+        """
+        monkeypatch.setattr(sys, 'argv', ['main.py', '--file', new_local_file1, new_local_file2, '--concurrency', '2'])
+        with mock.patch('builtins.print') as mock_print:
+            runpy.run_path("main.py", run_name="__main__")
+
+        mock_print.assert_called_once_with(expected_table_file1_file2)
+
+    def test_run_parser_stdin(self, new_local_file1, expected_table_file1, monkeypatch):
+        """
+        Run 'python main.py --file - < testfile1.log'.
+
+        Lines of the first file from stdin, default report.
+        """
+        monkeypatch.setattr(sys, 'argv', ['main.py', '--file', '-'])
+        monkeypatch.setattr(sys, 'stdin', io.TextIOWrapper(io.BytesIO(Path(new_local_file1).read_bytes())))
+        with mock.patch('builtins.print') as mock_print:
+            runpy.run_path("main.py", run_name="__main__")
+
+        mock_print.assert_called_once_with(expected_table_file1)
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_run_parser_timeseries(self, new_local_file1, workers, monkeypatch):
+        """
+        Run 'python main.py --file testfile1.log --report timeseries --bucket 1h --workers <workers>'.
+
+        First file in local directory, all records in one time bucket.
+        """
+        monkeypatch.setattr(
+            sys,
+            'argv',
+            [
+                'main.py',
+                '--file',
+                new_local_file1,
+                '--report',
+                'timeseries',
+                '--bucket',
+                '1h',
+                '--workers',
+                str(workers),
+            ],
+        )
+        with mock.patch('builtins.print') as mock_print:
+            runpy.run_path("main.py", run_name="__main__")
+
+        aggregator = LogAggregator(3600)
+        aggregator.feed(TestRunFile.test_request_data)
+        mock_print.assert_called_once_with(aggregator.report(TIMESERIES_REPORT_NAME))
+        assert '2025-06-22T13:00:00+00:00' in mock_print.call_args.args[0]
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_run_parser_groupby(self, new_local_file1, workers, monkeypatch):
+        """Run 'python main.py --file testfile1.log --report groupby --group-by status,request_method -w <workers>'."""
+        monkeypatch.setattr(
+            sys,
+            'argv',
+            [
+                'main.py',
+                '--file',
+                new_local_file1,
+                '--report',
+                'groupby',
+                '--group-by',
+                'status,request_method',
+                '--metrics',
+                'count,mean,max',
+                '--workers',
+                str(workers),
+            ],
+        )
+        with mock.patch('builtins.print') as mock_print:
+            runpy.run_path("main.py", run_name="__main__")
+
+        aggregator = LogAggregator(group_by=['status', 'request_method'], metrics=['count', 'mean', 'max'])
+        aggregator.feed(TestRunFile.test_request_data)
+        mock_print.assert_called_once_with(aggregator.report(GROUPBY_REPORT_NAME))
+        assert 'request_method' in mock_print.call_args.args[0]
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_run_parser_top(self, new_local_file1, workers, monkeypatch):
+        """Run 'python main.py --file testfile1.log --top 2 --top-by time -w <workers>'."""
+        monkeypatch.setattr(
+            sys,
+            'argv',
+            ['main.py', '--file', new_local_file1, '--top', '2', '--top-by', 'time', '--workers', str(workers)],
+        )
+        with mock.patch('builtins.print') as mock_print:
+            runpy.run_path("main.py", run_name="__main__")
+
+        aggregator = LogAggregator(top=2, top_by=TOP_BY_TIME_NAME)
+        aggregator.feed(TestRunFile.test_request_data)
+        mock_print.assert_called_once_with(aggregator.report(AVERAGE_REPORT_NAME))
+        assert 'max_error' in mock_print.call_args.args[0]
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_run_parser_compressed(self, new_local_file1, expected_table_file1, workers, tmp_path, monkeypatch):
+        """
+        Run 'python main.py --file testfile1.log.gz --workers <workers>'.
+
+        Gzip compressed first file, same table as for the uncompressed one.
+        """
+        compressed_file = tmp_path / 'testfile1.log.gz'
+        compressed_file.write_bytes(gzip.compress(Path(new_local_file1).read_bytes()))
+        monkeypatch.setattr(sys, 'argv', ['main.py', '--file', str(compressed_file), '--workers', str(workers)])
+        with mock.patch('builtins.print') as mock_print:
+            runpy.run_path("main.py", run_name="__main__")
+
+        mock_print.assert_called_once_with(expected_table_file1)
+
+    @pytest.mark.parametrize('io_mode', IO_MODES)
+    def test_run_parser_io(self, new_local_file1, new_local_file2, expected_table_file1_file2, io_mode, monkeypatch):
+        """
+        Run 'python main.py --file testfile1.log testfile2.log --io <io_mode>'.
+
+        Two files in local directory, every way of reading files, default report.
+        """
+        monkeypatch.setattr(sys, 'argv', ['main.py', '--file', new_local_file1, new_local_file2, '--io', io_mode])
+        with mock.patch('builtins.print') as mock_print:
+            runpy.run_path("main.py", run_name="__main__")
+
+        mock_print.assert_called_once_with(expected_table_file1_file2)
+
+    @pytest.mark.parametrize('limit', [None, 2])
+    def test_run_parser_format(self, new_local_file1, limit, monkeypatch):
+        """
+        Run 'python main.py --file testfile1.log --format <format> --limit <limit>'.
+
+        Rows are streamed to stdout in every machine-readable format, same rows as of the table.
+        """
+        aggregator = LogAggregator()
+        aggregator.feed(TestRunFile.test_request_data)
+        headers, rows = aggregator.get_report_data(AVERAGE_REPORT_NAME, limit=limit)
+        outputs = {}
+        for output_format in ('csv', 'jsonl', 'binary'):
+            output = io.BytesIO()
+            arguments = ['main.py', '--file', new_local_file1, '--format', output_format]
+            monkeypatch.setattr(sys, 'argv', arguments + (['--limit', str(limit)] if limit else []))
+            monkeypatch.setattr(sys, 'stdout', io.TextIOWrapper(output))
+            runpy.run_path("main.py", run_name="__main__")
+            outputs[output_format] = output.getvalue()
+
+        assert len(rows) == (limit or 3)
+        assert outputs['csv'].decode().splitlines() == [','.join(map(str, row)) for row in [headers, *rows]]
+        assert [json.loads(line) for line in outputs['jsonl'].splitlines()] == [dict(zip(headers, row)) for row in rows]
+        assert read_binary(outputs['binary']) == (headers, rows)
+
     def test_run_parser_10(self, new_local_file1, monkeypatch):
         """
         Run 'python main.py --file testfile1.txt --report unknown_report'.
@@ -501,3 +1680,106 @@ class TestRunFile:
             runpy.run_path("main.py", run_name="__main__")
 
         assert system_exit.value.code == 2
+
+    def test_run_parser_on_error(self, new_local_file1, expected_table_file1, tmp_path, monkeypatch, capsys):
+        """
+        Run 'python main.py --file testfile1.log bad.log --on-error quarantine --quarantine-file quarantine.log'.
+
+        Bad lines are quarantined, their numbers by files are printed to stderr.
+        """
+        bad_file = tmp_path / 'bad.log'
+        bad_file.write_text('not json\n{"url": "/api/context/..."}\n')
+        quarantine_file = tmp_path / 'quarantine.log'
+        monkeypatch.setattr(
+            sys,
+            'argv',
+            [
+                'main.py',
+                '--file',
+                new_local_file1,
+                str(bad_file),
+                '--on-error',
+                'quarantine',
+                '--quarantine-file',
+                str(quarantine_file),
+            ],
+        )
+        runpy.run_path("main.py", run_name="__main__")
+
+        output = capsys.readouterr()
+        assert output.out == expected_table_file1 + '\n'
+        assert output.err == f'{bad_file}: 2 bad lines quarantined to {quarantine_file}\n'
+        assert quarantine_file.read_text() == bad_file.read_text()
+
+    def test_run_parser_build_index_on_error(self, expected_table_file1, tmp_path, monkeypatch, capsys):
+        """
+        Run 'python main.py --file bad.log --build-index --on-error skip', then 'python main.py --file bad.log'.
+
+        The malformed line is skipped while the index is built, the report is taken from the index.
+        """
+        lines = [json.dumps(data) + '\n' for data in TestRunFile.test_request_data]
+        bad_file = tmp_path / 'bad.log'
+        bad_file.write_text(''.join(lines[:2] + ['not json\n'] + lines[2:]))
+        monkeypatch.setattr(sys, 'argv', ['main.py', '--file', str(bad_file), '--build-index', '--on-error', 'skip'])
+        runpy.run_path("main.py", run_name="__main__")
+
+        output = capsys.readouterr()
+        assert output.out.startswith(f'{bad_file}: 1 segments, ')
+        assert output.err == f'{bad_file}: 1 bad lines skipped\n'
+        monkeypatch.setattr(sys, 'argv', ['main.py', '--file', str(bad_file)])
+        runpy.run_path("main.py", run_name="__main__")
+        assert capsys.readouterr().out == expected_table_file1 + '\n'
+
+    def test_run_parser_partial(
+        self, new_local_file1, new_local_file2, expected_table_file1_file2, tmp_path, monkeypatch
+    ):
+        """
+        Run 'python main.py --file testfile<N>.log --partial host<N>.dump' and 'python main.py --merge <dumps>'.
+
+        Merged dumps of hosts make the same table as a single run over both files.
+        """
+        partial_files = [str(tmp_path / 'host1.dump'), str(tmp_path / 'host2.dump')]
+        for log_file, partial_file in zip([new_local_file1, new_local_file2], partial_files):
+            monkeypatch.setattr(sys, 'argv', ['main.py', '--file', log_file, '--partial', partial_file])
+            with mock.patch('builtins.print') as mock_print:
+                runpy.run_path("main.py", run_name="__main__")
+            mock_print.assert_not_called()
+
+        monkeypatch.setattr(sys, 'argv', ['main.py', '--merge', *partial_files])
+        with mock.patch('builtins.print') as mock_print:
+            runpy.run_path("main.py", run_name="__main__")
+
+        mock_print.assert_called_once_with(expected_table_file1_file2)
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_run_parser_stats(self, new_local_file1, expected_table_file1, workers, tmp_path, monkeypatch, capsys):
+        """
+        Run 'python main.py --file testfile1.log --stats --profile run.prof --workers <workers>'.
+
+        The table is the same, stage times and counters are printed to stderr, the profile is saved.
+        """
+        profile_file = tmp_path / 'run.prof'
+        monkeypatch.setattr(
+            sys,
+            'argv',
+            [
+                'main.py',
+                '--file',
+                new_local_file1,
+                '--stats',
+                '--profile',
+                str(profile_file),
+                '--workers',
+                str(workers),
+            ],
+        )
+        runpy.run_path("main.py", run_name="__main__")
+
+        output = capsys.readouterr()
+        assert output.out == expected_table_file1 + '\n'
+        errors = output.err.splitlines()
+        assert [row.split()[1] for row in errors[:4]] == ['total', 'input', 'render', 'lines']
+        assert errors[3].startswith(
+            f'stats: lines {len(TestRunFile.test_request_data) if workers == 1 else 0}, bytes read '
+        )
+        assert profile_file.stat().st_size > 0
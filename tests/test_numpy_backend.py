@@ -0,0 +1,185 @@
+"""Module with tests numpy_backend.py."""
+
+import json
+from unittest import mock
+
+import numpy_backend
+import pytest
+from config import NUMPY_BACKEND_NAME, PYTHON_BACKEND_NAME
+from endpoint_stats import EndpointStatsMap
+from line_decoder import LineDecoder
+from log_aggregator import LogAggregator
+
+pytest.importorskip('numpy')
+
+TEST_REQUEST_DATA = {
+    "@timestamp": "2025-06-22T13:57:32+00:00",
+    "status": 200,
+    "url": "/api/context/...",
+    "request_method": "GET",
+    "response_time": 0.024,
+    "http_user_agent": "Mozilla/5.0 (X11; Linux x86_64)",
+}
+
+# Lines of the fast path and lines which need LineDecoder one by one (json.loads).
+TEST_LINES = [
+    json.dumps(TEST_REQUEST_DATA) + '\n',
+    json.dumps(TEST_REQUEST_DATA),
+    json.dumps({**TEST_REQUEST_DATA, 'url': '/api/users/1'}) + '\r\n',
+    json.dumps({**TEST_REQUEST_DATA, 'url': '/api/users/2'}, separators=(',', ':')) + '\r',
+    json.dumps(dict(reversed(TEST_REQUEST_DATA.items()))) + '\n',  # response_time is the last field.
+    json.dumps({**TEST_REQUEST_DATA, 'url': 'юникод/путь'}, ensure_ascii=False) + '\n',
+    json.dumps({**TEST_REQUEST_DATA, 'url': 'юникод/путь'}) + '\n',  # \\u escapes.
+    json.dumps({**TEST_REQUEST_DATA, 'url': '/api/"quoted"/'}) + '\n',
+    json.dumps({**TEST_REQUEST_DATA, 'url': ''}) + '\n',
+    json.dumps({**TEST_REQUEST_DATA, 'url': '/' + 'a' * 1000}) + '\n',  # Longer than NUMPY_MAX_VALUE_SIZE.
+    json.dumps({**TEST_REQUEST_DATA, 'response_time': 1}) + '\n',
+    json.dumps({**TEST_REQUEST_DATA, 'response_time': 1e-07}) + '\n',
+    json.dumps(TEST_REQUEST_DATA).replace('"url":', '"url" :') + '\n',
+    json.dumps(TEST_REQUEST_DATA).replace('}', ', "url": "/api/duplicate/"}') + '\n',  # Last key is used.
+    json.dumps(TEST_REQUEST_DATA).replace('0.024', '  0.024  ') + '\n',
+    ' ' + json.dumps(TEST_REQUEST_DATA) + '\n',
+    json.dumps({**TEST_REQUEST_DATA, 'url': '/api/nul\x00/'}, ensure_ascii=False) + '\n',
+]
+
+
+class TestNumpyBackend:
+    """Tests batch aggregation with NumPy."""
+
+    @pytest.mark.parametrize('batch_size', [1, 3, 4096])
+    def test_same_result_as_python(self, batch_size):
+        """Test endpoint statistics (with their order) are equal to line by line aggregation."""
+        lines = [line.encode() for line in TEST_LINES * 3]
+        expected = LogAggregator(backend=PYTHON_BACKEND_NAME)
+        expected.feed_lines(lines)
+
+        endpoint_requests = EndpointStatsMap()
+        numpy_backend.feed_lines_batched(
+            endpoint_requests, lines, LineDecoder({'url': str, 'response_time': float}), batch_size=batch_size
+        )
+
+        assert list(endpoint_requests) == list(expected.endpoint_requests)
+        assert endpoint_requests == expected.endpoint_requests
+        assert endpoint_requests.to_bytes() == expected.endpoint_requests.to_bytes()
+
+    def test_str_lines(self):
+        """Test lines of a file opened in text mode."""
+        expected = LogAggregator(backend=PYTHON_BACKEND_NAME)
+        expected.feed_lines(TEST_LINES)
+        aggregator = LogAggregator(backend=NUMPY_BACKEND_NAME)
+        aggregator.feed_lines(TEST_LINES)
+
+        assert aggregator.endpoint_requests == expected.endpoint_requests
+
+    def test_url_rules(self):
+        """Test urls are normalized once per distinct url of a batch."""
+        lines = [line.encode() for line in TEST_LINES]
+        expected = LogAggregator(url_rules=['/api/users/{id}'], backend=PYTHON_BACKEND_NAME)
+        expected.feed_lines(lines)
+        aggregator = LogAggregator(url_rules=['/api/users/{id}'], backend=NUMPY_BACKEND_NAME)
+        aggregator.feed_lines(lines)
+
+        assert '/api/users/{id}' in aggregator.endpoint_requests
+        assert list(aggregator.endpoint_requests) == list(expected.endpoint_requests)
+        assert aggregator.endpoint_requests == expected.endpoint_requests
+
+    @pytest.mark.parametrize(
+        'line',
+        [
+            b'{"url": "/api/", "response_time": 1e}',
+            b'{"url": "/api/", "response_time": NaN}',
+            b'{"url": "/api/", "response_time": -Infinity}',
+            b'{"url": "/api/", "response_time": 1e400}',
+            b'{"url": "/api/", "response_time": 1_0}',
+            b'{"url": "/api/", "response_time": 01}',
+            b'{"url": "/api/"}',
+            b'',
+            b'{"url": "/api/", "response_time": 0.1',  # Truncated line.
+        ],
+    )
+    def test_invalid_line(self, line):
+        """Test an invalid line raises the same exception as the pure Python path."""
+        lines = [json.dumps(TEST_REQUEST_DATA).encode(), line]
+        with pytest.raises(Exception) as expected:
+            LogAggregator(backend=PYTHON_BACKEND_NAME).feed_lines(lines)
+
+        with pytest.raises(expected.type):
+            LogAggregator(backend=NUMPY_BACKEND_NAME).feed_lines(lines)
+
+    @pytest.mark.parametrize(
+        'value, expected',
+        [
+            (b'0', True),
+            (b'-0.5', True),
+            (b'1.5e-3', True),
+            (b'12E+05', True),
+            (b'-1234567890.123456', True),
+            (b'01', False),
+            (b'-01', False),
+            (b'1.', False),
+            (b'.5', False),
+            (b'-', False),
+            (b'+1', False),
+            (b'1e', False),
+            (b'1e5.5', False),
+            (b'1.5.5', False),
+            (b'1-2', False),
+            (b'1_0', False),
+            (b'nan', False),
+            (b'inf', False),
+            (b' 1', False),
+        ],
+    )
+    def test_is_json_number(self, value, expected):
+        """Test rows of values are checked by the grammar of JSON numbers (as LineDecoder.scan)."""
+        values = numpy_backend.numpy.zeros((2, 24), dtype=numpy_backend.numpy.uint8)
+        values[0, : len(value)] = list(value)
+        values[1, :3] = list(b'0.1')
+
+        assert numpy_backend.is_json_number(values).tolist() == [expected, True]
+
+    def test_decode_batch(self):
+        """Test urls in order of first occurrence, url ids and response times of every line."""
+        lines = [
+            b'{"url": "/b/", "response_time": 0.5}',
+            b'{"url": "/a/\\u0041", "response_time": 1}',
+            b'{"url": "/b/", "response_time": 2.25}\n',
+        ]
+        urls, ids, response_times = numpy_backend.decode_batch(lines, LineDecoder({'url': str, 'response_time': float}))
+
+        assert urls == ['/b/', '/a/A']
+        assert ids.tolist() == [0, 1, 0]
+        assert response_times.tolist() == [0.5, 1.0, 2.25]
+
+
+class TestBackendSelection:
+    """Tests choice of the aggregation backend."""
+
+    def test_default(self):
+        """Test numpy is used if it is installed."""
+        assert LogAggregator().backend == NUMPY_BACKEND_NAME
+
+    def test_default_without_numpy(self):
+        """Test the pure Python path is used without numpy."""
+        with mock.patch('log_aggregator.numpy', None):
+            assert LogAggregator().backend == PYTHON_BACKEND_NAME
+
+    def test_numpy_not_installed(self):
+        """Test numpy backend can not be used without numpy."""
+        with mock.patch('log_aggregator.numpy', None), pytest.raises(Exception, match='Install "numpy"'):
+            LogAggregator(backend=NUMPY_BACKEND_NAME)
+
+    def test_unknown_backend(self):
+        """Test exception for unknown backend."""
+        with pytest.raises(Exception, match='Unknown aggregation backend "cuda"'):
+            LogAggregator(backend='cuda')
+
+    @pytest.mark.parametrize('kwargs', [{'time_bucket': 60}, {'group_by': ['url']}])
+    def test_line_by_line_modes(self, kwargs):
+        """Test time series and groups are aggregated line by line with any backend."""
+        aggregator = LogAggregator(**kwargs, backend=NUMPY_BACKEND_NAME)
+        with mock.patch('log_aggregator.feed_lines_batched') as feed_lines_batched:
+            aggregator.feed_lines([json.dumps(TEST_REQUEST_DATA)])
+
+        feed_lines_batched.assert_not_called()
+        assert aggregator.get_result()
@@ -0,0 +1,197 @@
+"""Module with tests parallel_parsing.py."""
+
+import gzip
+import json
+from typing import Any
+
+import pytest
+from endpoint_stats import EndpointStats, EndpointStatsMap
+from line_filter import LineFilter
+from log_aggregator import LogAggregator
+from parallel_parsing import (
+    parse_file_range,
+    parse_file_ranges_parallel,
+    parse_files_parallel,
+    split_file_into_ranges,
+)
+
+TEST_REQUEST_DATA: list[dict[str, Any]] = [
+    {
+        "@timestamp": f"2025-06-22T13:{57 + i // 20}:{i % 60:02d}+00:00",
+        "url": f"/api/{i % 3}/...",
+        "response_time": round(0.001 * (i + 1), 3),
+        "status": 200,
+    }
+    for i in range(30)
+]
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    """Create log file with TEST_REQUEST_DATA."""
+    new_file = tmp_path / 'test.log'
+    with open(new_file, 'w') as file:
+        for data in TEST_REQUEST_DATA:
+            json.dump(data, file)
+            file.write('\n')
+    return str(new_file)
+
+
+def serial_endpoint_requests() -> EndpointStatsMap:
+    """Build expected endpoint map from TEST_REQUEST_DATA."""
+    endpoint_requests = EndpointStatsMap()
+    for data in TEST_REQUEST_DATA:
+        endpoint_requests.setdefault(data['url'], EndpointStats(data['url']))
+        endpoint_requests[data['url']].add_request()
+        endpoint_requests[data['url']].add_response_time(data['response_time'])
+    return endpoint_requests
+
+
+class TestSplitFileIntoRanges:
+    """Tests split_file_into_ranges(file, parts, min_shard_size)."""
+
+    @pytest.mark.parametrize('parts', [1, 2, 3, 7, 100])
+    def test_ranges_cover_file(self, log_file, parts):
+        """Test ranges are contiguous and cover the whole file."""
+        ranges = split_file_into_ranges(log_file, parts, min_shard_size=1)
+
+        with open(log_file, 'rb') as file:
+            data = file.read()
+        assert ranges[0][0] == 0
+        assert ranges[-1][1] == len(data)
+        for (_, end), (start, _) in zip(ranges[:-1], ranges[1:]):
+            assert end == start
+        assert len(ranges) <= parts
+
+    def test_ranges_aligned_to_lines(self, log_file):
+        """Test every range starts at the beginning of a line."""
+        with open(log_file, 'rb') as file:
+            data = file.read()
+
+        for start, _ in split_file_into_ranges(log_file, 5, min_shard_size=1):
+            assert start == 0 or data[:start].endswith(b'\n')
+
+    def test_small_file_not_split(self, log_file):
+        """Test file smaller than min_shard_size gives one range."""
+        assert len(split_file_into_ranges(log_file, 4, min_shard_size=10**9)) == 1
+
+    def test_part_of_file(self, log_file):
+        """Test ranges cover only [start, end) of file."""
+        with open(log_file, 'rb') as file:
+            lines = file.readlines()
+        start, end = len(lines[0]), len(b''.join(lines[:-1]))
+
+        ranges = split_file_into_ranges(log_file, 3, min_shard_size=1, start=start, end=end)
+
+        assert ranges[0][0] == start
+        assert ranges[-1][1] == end
+        assert len(ranges) == 3
+
+    def test_empty_file(self, tmp_path):
+        """Test empty file gives one empty range."""
+        new_file = tmp_path / 'empty.log'
+        new_file.write_text('')
+        assert split_file_into_ranges(str(new_file), 4, min_shard_size=1) == [(0, 0)]
+
+
+class TestParseFileRange:
+    """Tests parse_file_range(file, start, end)."""
+
+    def test_merged_ranges_equal_serial(self, log_file):
+        """Test merged partial maps give the same totals and order as serial parsing."""
+        merged = EndpointStatsMap()
+        for start, end in split_file_into_ranges(log_file, 4, min_shard_size=1):
+            merged.merge(parse_file_range(log_file, start, end))
+
+        expected = serial_endpoint_requests()
+        assert list(merged) == list(expected)
+        assert merged == expected
+
+    def test_time_series(self, log_file):
+        """Test merged partial time series equal the serial ones."""
+        merged = EndpointStatsMap()
+        for start, end in split_file_into_ranges(log_file, 4, min_shard_size=1):
+            merged.merge(parse_file_range(log_file, start, end, time_bucket=60))
+
+        aggregator = LogAggregator(60)
+        aggregator.feed(TEST_REQUEST_DATA)
+        assert merged == aggregator.endpoint_requests
+
+    def test_url_rules(self, log_file):
+        """Test urls of partial maps are normalized by url_rules."""
+        endpoint_requests = parse_file_range(log_file, 0, None, url_rules=['/api/{n}/...'])
+
+        assert list(endpoint_requests) == ['/api/{n}/...']
+        assert endpoint_requests['/api/{n}/...'].total_requests == len(TEST_REQUEST_DATA)
+
+    def test_group_by(self, log_file):
+        """Test merged partial group tables equal the serial one."""
+        aggregator = LogAggregator(group_by=['url', 'status'])
+        for start, end in split_file_into_ranges(log_file, 4, min_shard_size=1):
+            aggregator.merge(parse_file_range(log_file, start, end, group_by=['url', 'status']))
+
+        expected = LogAggregator(group_by=['url', 'status'])
+        expected.feed(TEST_REQUEST_DATA)
+        assert aggregator.group_table == expected.group_table
+
+    def test_top(self, log_file):
+        """Test merged partial top endpoints equal the serial ones."""
+        aggregator = LogAggregator(top=2)
+        for start, end in split_file_into_ranges(log_file, 4, min_shard_size=1):
+            aggregator.merge(parse_file_range(log_file, start, end, top=2))
+
+        expected = LogAggregator(top=2)
+        expected.feed(TEST_REQUEST_DATA)
+        assert aggregator.heavy_hitters == expected.heavy_hitters
+
+    def test_line_filter(self, log_file):
+        """Test only lines matching line_filter are parsed."""
+        line_filter = LineFilter(url_prefixes=['/api/1/'])
+        merged = EndpointStatsMap()
+        for start, end in split_file_into_ranges(log_file, 4, min_shard_size=1):
+            merged.merge(parse_file_range(log_file, start, end, line_filter=line_filter))
+
+        assert list(merged) == ['/api/1/...']
+        assert merged['/api/1/...'] == serial_endpoint_requests()['/api/1/...']
+
+
+class TestParseFilesParallel:
+    """Tests parse_files_parallel(files, workers)."""
+
+    def test_return_value(self, log_file):
+        """Test partial maps from the process pool."""
+        merged = EndpointStatsMap()
+        for endpoint_requests in parse_files_parallel([log_file, log_file], 2):
+            merged.merge(endpoint_requests)
+
+        expected = serial_endpoint_requests()
+        assert merged == expected + expected
+
+
+class TestParseFileRangesParallel:
+    """Tests parse_file_ranges_parallel(file_ranges, workers)."""
+
+    def test_return_value(self, log_file):
+        """Test partial maps of the given ranges only."""
+        with open(log_file, 'rb') as file:
+            first_line = file.readline()
+
+        merged = EndpointStatsMap()
+        for endpoint_requests in parse_file_ranges_parallel([(log_file, len(first_line), None)], 2):
+            merged.merge(endpoint_requests)
+
+        assert sum(endpoint_stats.total_requests for endpoint_stats in merged.values()) == len(TEST_REQUEST_DATA) - 1
+
+    def test_no_ranges(self):
+        """Test nothing is yielded for no ranges."""
+        assert list(parse_file_ranges_parallel([], 2)) == []
+
+    def test_compressed_file(self, log_file, tmp_path):
+        """Test compressed file is parsed as a whole."""
+        compressed_file = tmp_path / 'test.log.gz'
+        with open(log_file, 'rb') as file:
+            compressed_file.write_bytes(gzip.compress(file.read()))
+
+        (endpoint_requests,) = parse_file_ranges_parallel([(str(compressed_file), 0, None)], 4)
+
+        assert endpoint_requests == serial_endpoint_requests()
@@ -0,0 +1,150 @@
+"""Module with tests partial_dump.py."""
+
+import io
+from unittest import mock
+
+import pytest
+from config import PARTIAL_STDOUT
+from log_aggregator import LogAggregator
+from partial_dump import dump_partial, get_settings, load_partial, merge_partials, save_partial
+
+LINES1 = [
+    '{"@timestamp": "2025-06-22T13:57:32+00:00", "url": "/api/users/1", "response_time": 0.1}',
+    '{"@timestamp": "2025-06-22T13:58:10+00:00", "url": "/api/homeworks/...", "response_time": 0.3}',
+]
+LINES2 = [
+    '{"@timestamp": "2025-06-22T13:59:01+00:00", "url": "/api/users/2", "response_time": 0.2}',
+    '{"@timestamp": "2025-06-22T14:01:45+00:00", "url": "/api/context/...", "response_time": 0.05}',
+]
+
+
+def create_aggregator(lines: list[str], **kwargs) -> LogAggregator:
+    """Return aggregator fed with lines."""
+    aggregator = LogAggregator(**kwargs)
+    aggregator.feed(aggregator.iter_records(lines))
+    return aggregator
+
+
+def write_partial(tmp_path, name: str, aggregator: LogAggregator) -> str:
+    """Save the partial dump of the aggregator and return its path."""
+    partial_file = str(tmp_path / name)
+    save_partial(aggregator, partial_file)
+    return partial_file
+
+
+class TestGetSettings:
+    """Tests get_settings(aggregator)."""
+
+    def test_return_value(self):
+        """Test time bucket and url rules of the aggregator."""
+        aggregator = LogAggregator(time_bucket=60, url_rules=['/api/users/{id}'])
+
+        assert get_settings(aggregator) == {'time_bucket': 60, 'url_rules': ['/api/users/{id}']}
+
+
+class TestDumpPartial:
+    """Tests dump_partial(aggregator) and load_partial(data)."""
+
+    def test_round_trip(self):
+        """Test settings and statistics are restored."""
+        aggregator = create_aggregator(LINES1, time_bucket=60)
+
+        settings, endpoint_requests = load_partial(dump_partial(aggregator))
+
+        assert settings == get_settings(aggregator)
+        assert endpoint_requests.to_bytes() == aggregator.endpoint_requests.to_bytes()
+
+    def test_raise(self):
+        """Test call exception due to unknown format."""
+        with pytest.raises(Exception, match='Unknown format of partial dump.'):
+            load_partial(b'XXXX\x01\x00\x00\x00\x00')
+
+
+class TestSavePartial:
+    """Tests save_partial(aggregator, partial_file)."""
+
+    def test_file(self, tmp_path):
+        """Test the dump is written to the file without a temporary file left."""
+        aggregator = create_aggregator(LINES1)
+
+        partial_file = write_partial(tmp_path, 'host1.dump', aggregator)
+
+        with open(partial_file, 'rb') as opened_file:
+            assert opened_file.read() == dump_partial(aggregator)
+        assert [path.name for path in tmp_path.iterdir()] == ['host1.dump']
+
+    def test_stdout(self):
+        """Test the dump is written to stdout."""
+        aggregator = create_aggregator(LINES1)
+        stdout = mock.Mock(buffer=io.BytesIO())
+
+        with mock.patch('sys.stdout', stdout):
+            save_partial(aggregator, PARTIAL_STDOUT)
+
+        assert stdout.buffer.getvalue() == dump_partial(aggregator)
+
+
+class TestMergePartials:
+    """Tests merge_partials(partial_files, aggregator)."""
+
+    @pytest.mark.parametrize('type_report', ['average', 'percentiles', 'spread', 'timeseries'])
+    def test_working(self, tmp_path, type_report):
+        """Test merged dumps of hosts make the same report as a single run over all lines."""
+        time_bucket = 60 if type_report == 'timeseries' else None
+        partial_files = [
+            write_partial(tmp_path, 'host1.dump', create_aggregator(LINES1, time_bucket=time_bucket)),
+            write_partial(tmp_path, 'host2.dump', create_aggregator(LINES2, time_bucket=time_bucket)),
+        ]
+        aggregator = LogAggregator(time_bucket=time_bucket)
+
+        merge_partials(partial_files, aggregator)
+
+        expected = create_aggregator(LINES1 + LINES2, time_bucket=time_bucket)
+        assert aggregator.get_report_data(type_report) == expected.get_report_data(type_report)
+
+    def test_url_rules(self, tmp_path):
+        """Test urls of dumps collected without rules are normalized by rules of the aggregator."""
+        partial_files = [
+            write_partial(tmp_path, 'host1.dump', create_aggregator(LINES1)),
+            write_partial(tmp_path, 'host2.dump', create_aggregator(LINES2)),
+        ]
+        aggregator = LogAggregator(url_rules=['/api/users/{id}'])
+
+        merge_partials(partial_files, aggregator)
+
+        expected = create_aggregator(LINES1 + LINES2, url_rules=['/api/users/{id}'])
+        assert aggregator.get_report_data('average') == expected.get_report_data('average')
+
+    def test_raise_time_bucket(self, tmp_path):
+        """Test call exception due to the dump without time series of the report."""
+        partial_files = [write_partial(tmp_path, 'host1.dump', create_aggregator(LINES1))]
+
+        with pytest.raises(Exception, match='has time bucket None, the report needs 60'):
+            merge_partials(partial_files, LogAggregator(time_bucket=60))
+
+    def test_same_url_rules(self, tmp_path):
+        """Test handlers of dumps collected with the url rules of the aggregator are not normalized again."""
+        url_rules = ['/api/users/{id}']
+        partial_files = [
+            write_partial(tmp_path, 'host1.dump', create_aggregator(LINES1, url_rules=url_rules)),
+            write_partial(tmp_path, 'host2.dump', create_aggregator(LINES2)),
+        ]
+        aggregator = LogAggregator(url_rules=url_rules)
+
+        with mock.patch.object(aggregator, 'normalize_url', wraps=aggregator.normalize_url) as mock_normalize_url:
+            merge_partials(partial_files, aggregator)
+
+        expected = create_aggregator(LINES1 + LINES2, url_rules=url_rules)
+        assert aggregator.get_report_data('average') == expected.get_report_data('average')
+        assert mock_normalize_url.call_count == len(create_aggregator(LINES2).endpoint_requests)
+
+    @pytest.mark.parametrize('aggregator_url_rules', [None, ['/api/{group}/...']])
+    def test_raise_url_rules(self, tmp_path, aggregator_url_rules):
+        """Test call exception due to the dump collected with url rules other than the rules of the aggregator."""
+        partial_files = [
+            write_partial(tmp_path, 'host1.dump', create_aggregator(LINES1)),
+            write_partial(tmp_path, 'host2.dump', create_aggregator(LINES2, url_rules=['/api/users/{id}'])),
+        ]
+
+        with pytest.raises(Exception, match='host2.dump" is collected with other url rules'):
+            merge_partials(partial_files, LogAggregator(url_rules=aggregator_url_rules))
@@ -0,0 +1,53 @@
+"""Module with tests benchmarks/pipeline_benchmark.py."""
+
+import sys
+
+import pytest
+from benchmarks.log_generator import write_synthetic_log
+from benchmarks.pipeline_benchmark import compare_with_baseline, main, run_pipeline
+from config import AVERAGE_REPORT_NAME, DEFAULT_IO_MODE
+
+
+class TestRunPipeline:
+    """Tests run_pipeline(file, report, workers, io_mode, malformed_rate)."""
+
+    @pytest.mark.parametrize('malformed_rate', [0.0, 0.05])
+    def test_return_value(self, malformed_rate, tmp_path):
+        """Test time and memory of a run, malformed lines are skipped and counted."""
+        file = str(tmp_path / 'synthetic.log')
+        write_synthetic_log(file, 2000, endpoints=10, malformed_rate=malformed_rate)
+
+        run = run_pipeline(file, AVERAGE_REPORT_NAME, 1, DEFAULT_IO_MODE, malformed_rate)
+
+        assert set(run) == {'seconds', 'peak_rss_mb', 'workers_peak_rss_mb', 'bad_lines'}
+        assert run['seconds'] > 0
+        assert (run['bad_lines'] > 0) is (malformed_rate > 0)
+
+    def test_error(self, tmp_path):
+        """Test the error of the pipeline is returned."""
+        run = run_pipeline(str(tmp_path / 'missing.log'), AVERAGE_REPORT_NAME, 1, DEFAULT_IO_MODE)
+
+        assert run['error'].startswith('FileNotFoundError: ')
+
+
+class TestCompareWithBaseline:
+    """Tests compare_with_baseline(results, baseline, tolerance)."""
+
+    @pytest.mark.parametrize('lines_per_second, expected', [(95.0, True), (80.0, False)])
+    def test_return_value(self, lines_per_second, expected):
+        """Test throughput drop within and beyond tolerance."""
+        baseline = {'version': 'v1', 'parameters': {}, 'results': {'lines_per_second': 100.0, 'peak_rss_mb': 10.0}}
+        results = {'parameters': {}, 'results': {'lines_per_second': lines_per_second, 'peak_rss_mb': 10.0}}
+
+        assert compare_with_baseline(results, baseline, 0.1) is expected
+
+
+class TestMain:
+    """Tests main()."""
+
+    def test_malformed_rate_with_workers(self, monkeypatch):
+        """Test exit due to '--malformed-rate' with '--workers' (bad lines are skipped only by serial parsing)."""
+        monkeypatch.setattr(sys, 'argv', ['pipeline_benchmark', '--malformed-rate', '0.01', '--workers', '2'])
+        with pytest.raises(SystemExit) as system_exit:
+            main()
+        assert system_exit.value.code == 2
@@ -0,0 +1,102 @@
+"""Module with tests quantile_sketch.py."""
+
+import random
+
+import pytest
+from quantile_sketch import QuantileSketch
+
+RANDOM_VALUES = [random.Random(7).lognormvariate(-3, 1) for _ in range(5000)]
+
+
+def exact_quantile(values: list[float], quantile: float) -> float:
+    """Return value with rank quantile * (count - 1) (lower rank)."""
+    return sorted(values)[int(quantile * (len(values) - 1))]
+
+
+class TestQuantileSketch:
+    """Tests QuantileSketch."""
+
+    def test_init_attributes(self):
+        """Test initialization attributes."""
+        sketch = QuantileSketch(0.02, 100)
+        assert sketch.relative_accuracy == 0.02
+        assert sketch.max_buckets == 100
+        assert sketch.buckets == {}
+        assert sketch.zero_count == 0
+        assert sketch.count == 0
+
+    def test_empty_quantile(self):
+        """Test quantile of an empty sketch."""
+        assert QuantileSketch().get_quantile(0.5) == 0.0
+
+    @pytest.mark.parametrize('quantile', [0, 0.5, 0.9, 0.95, 0.99, 1])
+    def test_relative_accuracy(self, quantile):
+        """Test estimated quantile is within relative accuracy of the exact one."""
+        sketch = QuantileSketch(0.01)
+        for value in RANDOM_VALUES:
+            sketch.add(value)
+
+        expected = exact_quantile(RANDOM_VALUES, quantile)
+        assert sketch.get_quantile(quantile) == pytest.approx(expected, rel=0.01)
+
+    def test_zero_values(self):
+        """Test zero values are counted apart from buckets."""
+        sketch = QuantileSketch()
+        sketch.add_many([0, 0, 0, 1.0])
+
+        assert sketch.zero_count == 3
+        assert sketch.count == 4
+        assert sketch.get_quantile(0.5) == 0.0
+        assert sketch.get_quantile(1) == pytest.approx(1.0, rel=0.01)
+
+    def test_add_many_equal_add(self):
+        """Test add_many(values) gives the same sketch as add(value) for every value."""
+        first, second = QuantileSketch(), QuantileSketch()
+        for value in RANDOM_VALUES:
+            first.add(value)
+        second.add_many(RANDOM_VALUES)
+
+        assert first == second
+
+    def test_merge_order_independent(self):
+        """Test merged sketches do not depend on split and merge order (with collapsing)."""
+        serial = QuantileSketch(max_buckets=50)
+        serial.add_many(RANDOM_VALUES)
+
+        parts = []
+        for shard in range(7):
+            part = QuantileSketch(max_buckets=50)
+            part.add_many(RANDOM_VALUES[shard::7])
+            parts.append(part)
+        merged = QuantileSketch(max_buckets=50)
+        for part in reversed(parts):
+            merged.merge(part)
+
+        assert merged == serial
+        assert merged.count == len(RANDOM_VALUES)
+
+    def test_merge_raise(self):
+        """Test raise Exception for sketches with different parameters."""
+        with pytest.raises(Exception, match='Can not merge quantile sketches with different parameters.'):
+            QuantileSketch(0.01).merge(QuantileSketch(0.02))
+
+    def test_max_buckets(self):
+        """Test number of buckets is bounded and high quantiles stay accurate."""
+        sketch = QuantileSketch(max_buckets=20)
+        for value in RANDOM_VALUES:
+            sketch.add(value)
+
+        assert len(sketch.buckets) <= 20
+        assert sketch.count == len(RANDOM_VALUES)
+        assert sketch.get_quantile(0.99) == pytest.approx(exact_quantile(RANDOM_VALUES, 0.99), rel=0.01)
+
+    def test_to_bytes_unpack_from(self):
+        """Test serialization round trip and returned offset."""
+        sketch = QuantileSketch()
+        sketch.add_many(RANDOM_VALUES + [0])
+        data = b'prefix' + sketch.to_bytes() + b'suffix'
+
+        restored, offset = QuantileSketch.unpack_from(data, len(b'prefix'))
+
+        assert restored == sketch
+        assert data[offset:] == b'suffix'
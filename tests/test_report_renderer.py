@@ -0,0 +1,116 @@
+"""Module with tests report_renderer.py."""
+
+import io
+import json
+
+import pytest
+from config import BINARY_FORMAT_NAME, CSV_FORMAT_NAME, JSONL_FORMAT_NAME
+from report_renderer import parse_limit, read_binary, write_binary, write_csv, write_jsonl, write_report
+
+HEADERS = ['handler', 'total', 'avg_response_time', 'status']
+ROWS = [
+    ['/api/users/...', 3, 0.024, 200],
+    ['/api/"quoted",юникод', 1, 1e-9, None],
+    ['/api/flags', 2, 0.5, [True, 'GET']],
+]
+
+
+class TestParseLimit:
+    """Tests parse_limit(value)."""
+
+    def test_return_value(self):
+        """Test positive number of rows."""
+        assert parse_limit('10') == 10
+
+    @pytest.mark.parametrize('value', ['0', '-1', 'ten', ''])
+    def test_invalid_value(self, value):
+        """Test exception for not a positive number."""
+        with pytest.raises(ValueError, match='Invalid limit'):
+            parse_limit(value)
+
+
+class TestWriteCsv:
+    """Tests write_csv(headers, rows, output)."""
+
+    def test_working(self):
+        """Test header line and rows with quoted values."""
+        output = io.StringIO()
+        write_csv(HEADERS, ROWS, output)
+
+        assert output.getvalue().splitlines() == [
+            'handler,total,avg_response_time,status',
+            '/api/users/...,3,0.024,200',
+            '"/api/""quoted"",юникод",1,1e-09,',
+            "/api/flags,2,0.5,\"[True, 'GET']\"",
+        ]
+
+
+class TestWriteJsonl:
+    """Tests write_jsonl(headers, rows, output)."""
+
+    def test_working(self):
+        """Test a JSON object of every row."""
+        output = io.StringIO()
+        write_jsonl(HEADERS, ROWS, output)
+
+        assert [json.loads(line) for line in output.getvalue().splitlines()] == [
+            dict(zip(HEADERS, row)) for row in ROWS
+        ]
+
+
+class TestBinary:
+    """Tests write_binary(headers, rows, output) and read_binary(data)."""
+
+    def test_round_trip(self):
+        """Test headers and rows with values of every type are restored."""
+        output = io.BytesIO()
+        write_binary(HEADERS, iter(ROWS), output)
+
+        assert read_binary(output.getvalue()) == (HEADERS, ROWS)
+
+    def test_empty(self):
+        """Test report without rows."""
+        output = io.BytesIO()
+        write_binary(HEADERS, [], output)
+
+        assert read_binary(output.getvalue()) == (HEADERS, [])
+
+    @pytest.mark.parametrize(
+        'data, message',
+        [
+            (b'XXXX\x01\x00\x00', 'Unknown format of binary report.'),
+            (b'LFPR\x01\x00\x00R', 'Unexpected end of binary report.'),
+            (b'LFPR\x01\x01\x00\x00\x00Rx', "Unknown value tag b'x' in binary report."),
+        ],
+    )
+    def test_raise(self, data, message):
+        """Test call exception due to unknown format or broken data."""
+        with pytest.raises(Exception, match=message):
+            read_binary(data)
+
+
+class TestWriteReport:
+    """Tests write_report(headers, rows, output_format, output)."""
+
+    @pytest.mark.parametrize(
+        'output_format, writer',
+        [(CSV_FORMAT_NAME, write_csv), (JSONL_FORMAT_NAME, write_jsonl), (BINARY_FORMAT_NAME, write_binary)],
+    )
+    def test_working(self, output_format, writer):
+        """Test rows are written in the format, the stream stays open."""
+        output = io.BytesIO()
+        write_report(HEADERS, ROWS, output_format, output)
+
+        expected = io.BytesIO() if output_format == BINARY_FORMAT_NAME else io.StringIO()
+        writer(HEADERS, ROWS, expected)
+        assert output.closed is False
+        assert output.getvalue() == (
+            expected.getvalue() if output_format == BINARY_FORMAT_NAME else expected.getvalue().encode()
+        )
+
+    def test_raise(self):
+        """Test call exception due to unknown format."""
+        output = io.BytesIO()
+        with pytest.raises(Exception, match='Unknown output format "xml".'):
+            write_report(HEADERS, ROWS, 'xml', output)
+        assert output.closed is False
@@ -0,0 +1,172 @@
+"""Module with tests run_stats.py."""
+
+import json
+import pstats
+import resource
+import time
+
+import pytest
+from bad_lines import BadLines
+from config import (
+    AGGREGATE_STAGE_NAME,
+    DECODE_STAGE_NAME,
+    INPUT_STAGE_NAME,
+    ON_ERROR_FAIL_NAME,
+    ON_ERROR_SKIP_NAME,
+    READ_STAGE_NAME,
+    RENDER_STAGE_NAME,
+)
+from line_filter import LineFilter
+from log_aggregator import LogAggregator
+from run_stats import RunStats, get_peak_rss_mb, measure_stage, run_profiled
+
+START_TIME = 1704067200  # 2024-01-01T00:00:00+00:00
+LINES = [
+    json.dumps(
+        {
+            '@timestamp': f'2024-01-01T00:00:{i:02d}+00:00',
+            'status': (200, 500)[i % 2],
+            'url': f'/api/{i % 3}/...',
+            'response_time': 0.001 * (i + 1),
+        }
+    ).encode()
+    + b'\n'
+    for i in range(40)
+]
+BAD_LINE = b'{"url": "/api/1/...", "status": 200}\n'  # Missing response_time.
+
+
+class TestGetPeakRssMb:
+    """Tests get_peak_rss_mb(who)."""
+
+    def test_return_value(self):
+        """Test peak memory of this process is positive."""
+        assert get_peak_rss_mb(resource.RUSAGE_SELF) > 0
+
+
+class TestRunStats:
+    """Tests RunStats(batch_size)."""
+
+    def test_measure(self):
+        """Test time of blocks is added to the stage."""
+        stats = RunStats()
+        for _ in range(2):
+            with stats.measure(RENDER_STAGE_NAME):
+                time.sleep(0.01)
+
+        assert stats.seconds[RENDER_STAGE_NAME] >= 0.02
+        assert stats.seconds[INPUT_STAGE_NAME] == 0
+
+    def test_iter_batches(self):
+        """Test lines are returned by batches and counted (bytes are counted by count_bytes())."""
+        stats = RunStats(batch_size=16)
+
+        assert [len(batch) for batch in stats.iter_batches(LINES)] == [16, 16, 8]
+        assert stats.lines == 40
+        assert stats.bytes_read == 0
+        assert stats.seconds[READ_STAGE_NAME] > 0
+
+    @pytest.mark.parametrize(
+        'start, end, expected', [(0, None, 400), (100, 300, 200), (100, 1000, 300), (500, None, 0)]
+    )
+    def test_count_bytes(self, start, end, expected, tmp_path):
+        """Test the size of the byte range limited by the file size is added."""
+        path = tmp_path / 'test.log'
+        path.write_bytes(b'x' * 399 + b'\n')
+        stats = RunStats()
+        with open(path, 'rb') as opened_file:
+            stats.count_bytes(opened_file, start, end)
+            stats.count_bytes(opened_file, start, end)
+
+        assert stats.bytes_read == 2 * expected
+
+    @pytest.mark.parametrize(
+        'settings',
+        [
+            {'backend': 'python'},
+            {'backend': 'numpy', 'url_rules': ['/api/{group}/...']},
+            {'time_bucket': 60},
+            {'group_by': ['url', 'status']},
+            {'top': 2},
+            {'line_filter': LineFilter(START_TIME + 10, statuses=['5xx'])},
+        ],
+    )
+    def test_feed_lines(self, settings):
+        """Test statistics are the same as of feed_lines() for every way of aggregation, stages are timed."""
+        stats = RunStats(batch_size=16)
+        aggregator = LogAggregator(**settings)
+        stats.feed_lines(aggregator, LINES)
+
+        expected = LogAggregator(**settings)
+        expected.feed_lines(LINES)
+        assert aggregator.get_result() == expected.get_result()
+        assert stats.lines == 40
+        assert stats.seconds[DECODE_STAGE_NAME] > 0
+        assert stats.seconds[AGGREGATE_STAGE_NAME] > 0
+
+    @pytest.mark.parametrize('settings', [{'backend': 'python'}, {'backend': 'numpy'}, {'time_bucket': 60}])
+    def test_bad_lines(self, settings):
+        """Test a batch with a bad line is added by bad_lines, the bad line is counted."""
+        stats = RunStats(batch_size=16)
+        aggregator = LogAggregator(**settings)
+        bad_lines = BadLines(ON_ERROR_SKIP_NAME, batch_size=16)
+        stats.feed_lines(aggregator, [*LINES[:20], BAD_LINE, *LINES[20:]], bad_lines, 'test.log')
+
+        expected = LogAggregator(**settings)
+        expected.feed_lines(LINES)
+        assert aggregator.get_result() == expected.get_result()
+        assert bad_lines.counts == {'test.log': 1}
+
+    @pytest.mark.parametrize('bad_lines', [None, BadLines(ON_ERROR_FAIL_NAME)])
+    def test_raise(self, bad_lines):
+        """Test a bad line raises without bad_lines or in ON_ERROR_FAIL_NAME mode."""
+        with pytest.raises(KeyError):
+            RunStats().feed_lines(LogAggregator(), [*LINES, BAD_LINE], bad_lines, 'test.log')
+
+    def test_get_summary(self):
+        """Test stage times, counters and peak memory."""
+        stats = RunStats()
+        stats.feed_lines(LogAggregator(), LINES)
+        stats.bytes_read = 3 * 2**20
+        stats.seconds[INPUT_STAGE_NAME] = 10.0
+
+        summary = stats.get_summary().splitlines()
+        assert summary[0].startswith('stats: total ')
+        assert summary[1].startswith('stats: input 10.000 s (read ')
+        assert summary[2] == 'stats: render 0.000 s'
+        assert summary[3] == f'stats: lines 40, bytes read {3 * 2**20} (3.0 MB)'
+        assert summary[4].endswith(' MB/s of parsing')
+        assert summary[5].startswith('stats: peak RSS ')
+
+
+class TestMeasureStage:
+    """Tests measure_stage(stats, stage)."""
+
+    @pytest.mark.parametrize('stats', [None, RunStats()])
+    def test_working(self, stats):
+        """Test time of the block is added to the stage with stats, nothing is measured without them."""
+        with measure_stage(stats, INPUT_STAGE_NAME):
+            time.sleep(0.01)
+
+        if stats is not None:
+            assert stats.seconds[INPUT_STAGE_NAME] >= 0.01
+
+
+class TestRunProfiled:
+    """Tests run_profiled(function, profile_file)."""
+
+    def test_working(self, tmp_path):
+        """Test the profile of the function is saved."""
+        profile_file = str(tmp_path / 'run.prof')
+        run_profiled(lambda: LogAggregator().feed_lines(LINES), profile_file)
+
+        functions = [function for _, _, function in pstats.Stats(profile_file).stats]  # type: ignore[attr-defined]
+        assert 'feed_lines' in functions
+
+    def test_raise(self, tmp_path):
+        """Test the profile is saved if the function raises."""
+        profile_file = tmp_path / 'run.prof'
+        with pytest.raises(KeyError):
+            run_profiled(lambda: LogAggregator().feed_lines([BAD_LINE]), str(profile_file))
+
+        assert profile_file.exists() is True
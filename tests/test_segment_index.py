@@ -0,0 +1,204 @@
+"""Module with tests segment_index.py."""
+
+import gzip
+import json
+from typing import Any
+
+import pytest
+from bad_lines import BadLines
+from config import ON_ERROR_SKIP_NAME
+from line_decoder import LINE_ERRORS
+from line_filter import LineFilter
+from log_aggregator import LogAggregator
+from segment_index import (
+    MAX_TIME,
+    MIN_TIME,
+    SegmentIndex,
+    can_use_index,
+    get_index_file,
+    load_file_index,
+    scan_lines,
+)
+
+START_TIME = 1704067200  # 2024-01-01T00:00:00+00:00
+TEST_REQUEST_DATA: list[dict[str, Any]] = [
+    {
+        "@timestamp": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}+00:00",
+        "url": f"/api/{i % 3}/{i}",
+        "response_time": round(0.001 * (i + 1), 3),
+    }
+    for i in range(300)
+]
+TEST_LOG = b''.join(json.dumps(data).encode() + b'\n' for data in TEST_REQUEST_DATA)
+
+
+@pytest.fixture
+def log_file(tmp_path):
+    """Create log file with TEST_REQUEST_DATA (lines are sorted by time)."""
+    path = tmp_path / 'test.log'
+    path.write_bytes(TEST_LOG)
+    return str(path)
+
+
+def build_small_index(file: str, workers: int = 1) -> SegmentIndex:
+    """Build index of file with 5 segments of about 4 blocks."""
+    return SegmentIndex.build(file, workers, segment_size=-(-len(TEST_LOG) // 5), block_size=-(-len(TEST_LOG) // 20))
+
+
+class TestScanLines:
+    """Tests scan_lines(lines, aggregator)."""
+
+    @pytest.mark.parametrize(
+        'lines, expected',
+        [
+            (TEST_LOG.splitlines()[10:20], (START_TIME + 10, START_TIME + 19)),
+            ([], (MAX_TIME, MIN_TIME)),
+            ([b'{"url": "/api/1/...", "response_time": 0.1}'], (MIN_TIME, MAX_TIME)),
+        ],
+    )
+    def test_return_value(self, lines, expected):
+        """Test time range of lines, unknown for a line without timestamp, lines are aggregated."""
+        aggregator = LogAggregator()
+        assert scan_lines(lines, aggregator) == expected
+        assert sum(stats.total_requests for stats in aggregator.endpoint_requests.values()) == len(lines)
+
+
+class TestCanUseIndex:
+    """Tests can_use_index(aggregator)."""
+
+    @pytest.mark.parametrize(
+        'aggregator, expected',
+        [
+            (LogAggregator(url_rules=['/api/{id}/{id}']), True),
+            (LogAggregator(time_bucket=60), False),
+            (LogAggregator(group_by=['url']), False),
+            (LogAggregator(top=2), False),
+            (LogAggregator(line_filter=LineFilter(START_TIME)), True),
+            (LogAggregator(line_filter=LineFilter(statuses=['5xx'])), False),
+        ],
+    )
+    def test_return_value(self, aggregator, expected):
+        """Test only endpoint statistics are taken from indexes."""
+        assert can_use_index(aggregator) is expected
+
+
+class TestSegmentIndex:
+    """Tests SegmentIndex()."""
+
+    @pytest.mark.parametrize('workers', [1, 2])
+    def test_build(self, log_file, workers):
+        """Test segments and blocks cover all lines, statistics are the same as of the serial parsing."""
+        index = build_small_index(log_file, workers)
+        aggregator = LogAggregator()
+        aggregator.feed_lines(TEST_LOG.splitlines())
+
+        assert len(index.segments) == 5
+        assert len(index.blocks) >= 20
+        assert index.end == index.file_size == len(TEST_LOG)
+        assert index.blocks[0][0] == 0 and index.blocks[-1][1] == len(TEST_LOG)
+        assert all(block[1] == next_block[0] for block, next_block in zip(index.blocks, index.blocks[1:]))
+        first_blocks = [block for block in index.blocks if block[1] <= index.segments[0][1]]
+        assert index.segments[0][2:] == (START_TIME, first_blocks[-1][3])
+        assert list(index.load_endpoint_requests()) == list(aggregator.endpoint_requests)
+        assert index.load_endpoint_requests() == aggregator.endpoint_requests
+        assert index.load_endpoint_requests(list(range(5))) == aggregator.endpoint_requests
+        assert build_small_index(log_file).to_bytes() == index.to_bytes()
+
+    @pytest.mark.parametrize('compressed', [False, True])
+    def test_build_bad_lines(self, tmp_path, compressed):
+        """Test a malformed line raises, with bad_lines (serial parsing) it is skipped and counted."""
+        lines = TEST_LOG.splitlines(keepends=True)
+        path = tmp_path / 'test.log'
+        data = b''.join(lines[:100] + [b'{"url": "/api/1/...", "response_time": \n'] + lines[100:])
+        path.write_bytes(gzip.compress(data) if compressed else data)
+        with pytest.raises(LINE_ERRORS):
+            SegmentIndex.build(str(path))
+
+        bad_lines = BadLines(ON_ERROR_SKIP_NAME)
+        index = SegmentIndex.build(str(path), 2, -(-len(data) // 5), -(-len(data) // 20), bad_lines)
+        aggregator = LogAggregator()
+        aggregator.feed_lines(lines)
+
+        assert bad_lines.counts == {str(path): 1}
+        assert index.load_endpoint_requests() == aggregator.endpoint_requests
+        assert (MIN_TIME, MAX_TIME) in [block[2:] for block in index.blocks]  # The block of the bad line.
+
+    def test_save_load(self, log_file):
+        """Test the loaded index is the same as the saved one."""
+        index = build_small_index(log_file)
+        index.save(get_index_file(log_file))
+        loaded_index = SegmentIndex.load(log_file + '.idx')
+
+        assert loaded_index.to_bytes() == index.to_bytes()
+        assert loaded_index.segments == index.segments
+        assert loaded_index.blocks == index.blocks
+
+    def test_invalid_format(self):
+        """Test exception for unknown data."""
+        with pytest.raises(Exception, match='Unknown format of index.'):
+            SegmentIndex.from_bytes(b'\0' * 100)
+
+    def test_incomplete_line(self, tmp_path):
+        """Test an incomplete last line is not indexed."""
+        path = tmp_path / 'test.log'
+        path.write_bytes(TEST_LOG + TEST_LOG[:20])
+        index = SegmentIndex.build(str(path))
+
+        assert index.end == len(TEST_LOG)
+        assert index.file_size == len(TEST_LOG) + 20
+
+    def test_select(self, log_file):
+        """Test segments inside time range are taken, only overlapping blocks of other segments are parsed."""
+        index = build_small_index(log_file)
+        since, until = index.segments[1][2] + 1, index.segments[3][3] + 1
+        numbers, ranges = index.select(since, until)
+
+        assert numbers == [2, 3]
+        assert ranges == [(index.segments[1][0], index.segments[1][1])]
+        assert index.select() == ([0, 1, 2, 3, 4], [])
+        assert index.select(START_TIME - 100, START_TIME) == ([], [])
+
+    def test_select_compressed(self, tmp_path):
+        """Test a compressed file is one segment parsed as a whole if it is not inside time range."""
+        path = tmp_path / 'test.log.gz'
+        path.write_bytes(gzip.compress(TEST_LOG))
+        index = SegmentIndex.build(str(path))
+
+        assert index.compressed is True
+        assert index.segments == [(0, index.file_size, START_TIME, START_TIME + 299)]
+        assert index.select(START_TIME + 10) == ([], [(0, None)])
+        assert index.select(START_TIME) == ([0], [])
+
+    def test_normalize_url(self, log_file):
+        """Test statistics of raw urls are merged by handlers."""
+        index = build_small_index(log_file)
+        aggregator = LogAggregator(url_rules=['/api/{group}/{id}'])
+        aggregator.feed_lines(TEST_LOG.splitlines())
+
+        assert index.load_endpoint_requests(normalize_url=aggregator.normalize_url) == aggregator.endpoint_requests
+
+
+class TestLoadFileIndex:
+    """Tests load_file_index(file)."""
+
+    def test_return_value(self, log_file):
+        """Test the index is valid for appended lines and not valid for changed lines."""
+        assert load_file_index(log_file) is None
+        build_small_index(log_file).save(get_index_file(log_file))
+        with open(log_file, 'ab') as opened_file:
+            opened_file.write(TEST_LOG[:100])
+        assert load_file_index(log_file) is not None
+
+        with open(log_file, 'wb') as opened_file:
+            opened_file.write(TEST_LOG.replace(b'/api/0/', b'/api/9/'))
+        assert load_file_index(log_file) is None
+
+    def test_compressed_file(self, tmp_path):
+        """Test the index of a compressed file is not valid after any change."""
+        path = tmp_path / 'test.log.gz'
+        path.write_bytes(gzip.compress(TEST_LOG))
+        SegmentIndex.build(str(path)).save(get_index_file(str(path)))
+        assert load_file_index(str(path)) is not None
+
+        path.write_bytes(path.read_bytes() + gzip.compress(TEST_LOG))
+        assert load_file_index(str(path)) is None
@@ -0,0 +1,142 @@
+"""Module with tests time_series.py."""
+
+import random
+from array import array
+
+import pytest
+from time_series import ZERO_SKETCH_KEY, TimeSeries, format_bucket_start, merge_sorted_columns, parse_bucket_size
+
+# (timestamp, response time), slightly out of order.
+TEST_REQUESTS = [(1750600620 + second + random.Random(second).randint(-90, 5), 0.001 * second) for second in range(600)]
+
+
+def fill(time_series: TimeSeries, requests: list[tuple[int, float]]) -> TimeSeries:
+    """Add requests to time series."""
+    for timestamp, response_time in requests:
+        time_series.add(timestamp, response_time)
+    return time_series
+
+
+class TestParseBucketSize:
+    """Tests parse_bucket_size(bucket)."""
+
+    @pytest.mark.parametrize(
+        'bucket, expected', [('30s', 30), ('1m', 60), ('5m', 300), ('2h', 7200), ('1d', 86400), ('15', 15)]
+    )
+    def test_return_value(self, bucket, expected):
+        """Test size in seconds."""
+        assert parse_bucket_size(bucket) == expected
+
+    @pytest.mark.parametrize('bucket', ['', '0m', '1w', 'm', '-1m', '1.5m'])
+    def test_raise(self, bucket):
+        """Test call exception due to invalid bucket."""
+        with pytest.raises(ValueError, match='Invalid time bucket'):
+            parse_bucket_size(bucket)
+
+
+class TestFormatBucketStart:
+    """Tests format_bucket_start(bucket_start)."""
+
+    def test_return_value(self):
+        """Test format of log timestamps in UTC."""
+        assert format_bucket_start(1750600620) == '2025-06-22T13:57:00+00:00'
+
+
+class TestMergeSortedColumns:
+    """Tests merge_sorted_columns(columns, key_size, entries)."""
+
+    @pytest.mark.parametrize(
+        'entries, expected',
+        [
+            ({}, [[1, 3, 5], [10, 30, 50]]),
+            ({(6,): [60], (7,): [70]}, [[1, 3, 5, 6, 7], [10, 30, 50, 60, 70]]),  # Appended.
+            ({(5,): [1], (4,): [40]}, [[1, 3, 4, 5], [10, 30, 40, 51]]),  # Late buckets.
+            ({(0,): [1], (3,): [1]}, [[0, 1, 3, 5], [1, 10, 31, 50]]),
+        ],
+    )
+    def test_return_value(self, entries, expected):
+        """Test entries are inserted in order of keys, values of existing keys are added."""
+        columns = (array('q', [1, 3, 5]), array('q', [10, 30, 50]))
+        merge_sorted_columns(columns, 1, entries)
+        assert [list(column) for column in columns] == expected
+
+
+class TestTimeSeries:
+    """Tests TimeSeries."""
+
+    def test_init_attributes(self):
+        """Test initialization attributes."""
+        time_series = TimeSeries(60)
+        assert time_series.bucket_size == 60
+        assert time_series.buckets == time_series.counts == time_series.response_time_sums == array('q')
+        assert time_series.sketch_buckets == time_series.sketch_counts == array('q')
+        assert time_series.sketch_keys == array('i')
+
+    def test_add(self):
+        """Test counts and sums by buckets, out of order timestamps included."""
+        time_series = fill(TimeSeries(60), TEST_REQUESTS)
+
+        expected: dict[int, list[int]] = {}
+        for timestamp, response_time in TEST_REQUESTS:
+            bucket = expected.setdefault(timestamp // 60 * 60, [0, 0])
+            bucket[0] += 1
+            bucket[1] += round(response_time * 1_000_000)
+        assert list(time_series.iter_buckets()) == [(start, *expected[start]) for start in sorted(expected)]
+        assert sum(time_series.sketch_counts) == len(TEST_REQUESTS)
+        assert list(time_series.buckets) == sorted(time_series.buckets)
+
+    def test_wide_time_span(self):
+        """Test only not empty buckets are kept for requests years apart in 1s buckets."""
+        requests = [(1750600620, 0.5), (1750600620 - 10 * 365 * 86400, 0.25), (1750600620 + 10 * 365 * 86400, 0.125)]
+        time_series = fill(TimeSeries(1), requests)
+
+        assert list(time_series.iter_buckets()) == [
+            (1435240620, 1, 250000),
+            (1750600620, 1, 500000),
+            (2065960620, 1, 125000),
+        ]
+        assert len(time_series.buckets) == 3
+        assert len(time_series.to_bytes()) < 200
+
+    def test_get_sketches(self):
+        """Test quantiles of every bucket are within 1% of exact values."""
+        time_series = fill(TimeSeries(60), TEST_REQUESTS)
+
+        sketches = time_series.get_sketches()
+        for bucket_start, count, _ in time_series.iter_buckets():
+            values = sorted(rt for timestamp, rt in TEST_REQUESTS if timestamp // 60 * 60 == bucket_start)
+            assert sketches[bucket_start].count == count
+            assert sketches[bucket_start].get_quantile(1) == pytest.approx(values[-1], rel=0.01)
+
+    def test_zero_response_time(self):
+        """Test zero response times are kept apart from sketch keys."""
+        time_series = fill(TimeSeries(60), [(0, 0.0), (1, 0.5)])
+
+        assert time_series.get_sketches()[0].get_quantile(0) == 0.0
+        sketch_entries = zip(time_series.sketch_buckets, time_series.sketch_keys, time_series.sketch_counts)
+        assert next(sketch_entries) == (0, ZERO_SKETCH_KEY, 1)
+
+    def test_merge_order_independent(self):
+        """Test merged parts give the same series as serial adding."""
+        serial = fill(TimeSeries(60), TEST_REQUESTS)
+
+        merged = TimeSeries(60)
+        for shard in reversed(range(7)):
+            merged.merge(fill(TimeSeries(60), TEST_REQUESTS[shard::7]))
+
+        assert merged == serial
+
+    def test_merge_raise(self):
+        """Test call exception due to different bucket sizes."""
+        with pytest.raises(Exception, match='Can not merge time series with different bucket sizes.'):
+            TimeSeries(60).merge(TimeSeries(1))
+
+    def test_to_bytes_unpack_from(self):
+        """Test serialization round trip and returned offset."""
+        time_series = fill(TimeSeries(60), TEST_REQUESTS + [(1750600620, 0.0)])
+        data = b'prefix' + time_series.to_bytes() + b'suffix'
+
+        restored, offset = TimeSeries.unpack_from(data, len(b'prefix'))
+
+        assert restored == time_series
+        assert data[offset:] == b'suffix'
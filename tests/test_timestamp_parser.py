@@ -0,0 +1,85 @@
+"""Module with tests timestamp_parser.py."""
+
+from datetime import datetime, timezone
+from unittest import mock
+
+import pytest
+from timestamp_parser import TimestampParser
+
+
+def expected_seconds(timestamp: str) -> int:
+    """Return epoch seconds of timestamp (UTC if it has no time zone)."""
+    parsed = datetime.fromisoformat(timestamp)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp() // 1)
+
+
+class TestTimestampParser:
+    """Tests TimestampParser."""
+
+    @pytest.mark.parametrize(
+        'timestamp',
+        [
+            '2025-06-22T13:57:32+00:00',
+            '2025-06-22T13:57:32+03:00',
+            '2025-06-22T13:57:59.999-05:30',
+            '2025-06-22T13:57:32Z',
+            '2025-06-22T13:57:32',
+            '2025-06-22 00:00:00+00:00',
+            '2025-06-22T13:57+00:00',
+            '1969-12-31T23:59:59.5+00:00',
+        ],
+    )
+    def test_parse(self, timestamp):
+        """Test epoch seconds (fraction of second dropped)."""
+        parser = TimestampParser()
+        assert parser.parse(timestamp) == expected_seconds(timestamp)
+        assert parser.parse(timestamp) == expected_seconds(timestamp)  # Cached.
+        assert parser.parse(timestamp.encode()) == expected_seconds(timestamp)
+
+    def test_minute_cache(self):
+        """Test datetime.fromisoformat is called once per minute and time zone."""
+        parser = TimestampParser()
+        with mock.patch.object(TimestampParser, '_parse_iso', wraps=TimestampParser._parse_iso) as mock_parse_iso:
+            for second in range(60):
+                assert parser.parse(f'2025-06-22T13:57:{second:02d}+00:00') == 1750600620 + second
+            parser.parse('2025-06-22T13:57:00+01:00')
+
+        assert mock_parse_iso.call_count == 2
+
+    def test_cache_size(self):
+        """Test caches are cleared when full."""
+        parser = TimestampParser(cache_size=3)
+        for second in range(10):
+            parser.parse(f'2025-06-22T13:57:{second:02d}+00:00')
+
+        assert len(parser._seconds) <= 3
+        assert parser.parse('2025-06-22T13:57:05+00:00') == 1750600625
+
+    @pytest.mark.parametrize(
+        'timestamp',
+        [
+            'not a timestamp',
+            '2025-06-22T13:57:99+00:00',
+            '2025-06-22T13:57:60+00:00',
+            '2025-06-22T13:57:60',
+            '2025-06-22T13:61:32+00:00',
+            '2025-06-22T24:57:32+00:00',
+            '2025-06-31T13:57:32+00:00',
+            '2025-13-22T13:57:32+00:00',
+            '2025-06-22T13:57:32.+00:00',
+            '2025-06-22T13:57:32.5.5+00:00',
+            '2025-06-22T13:57:32+25:00',
+            '2025-06-22T13:57:32 UTC',
+            '2025-06-22T13:57:\u0663\u0662+00:00',
+        ],
+    )
+    def test_raise(self, timestamp):
+        """Test call exception due to invalid timestamp or field out of range, also of a cached minute."""
+        parser = TimestampParser()
+        parser.parse('2025-06-22T13:57:00+00:00')
+        with pytest.raises(ValueError):
+            parser.parse(timestamp)
+        with pytest.raises(ValueError):
+            parser.parse(timestamp.encode())
@@ -0,0 +1,84 @@
+"""Module with tests url_normalizer.py."""
+
+from unittest import mock
+
+import pytest
+from config import URL_ID_PLACEHOLDER
+from url_normalizer import UrlNormalizer, load_url_rules, parse_rule
+
+TEST_RULES = [
+    '/api/users/{id}',
+    '/api/users/{id}/posts/{post_id}',
+    r'^/api/v\d+/items/(?P<item>\d+)/?$ => /api/items/{id}',
+    '/api/users/me',  # Never used: '/api/users/{id}' is matched first.
+]
+
+
+class TestParseRule:
+    """Tests parse_rule(rule)."""
+
+    @pytest.mark.parametrize(
+        'rule, expected',
+        [
+            ('/api/users/{id}', (r'/api/users/[^/]+', '/api/users/{id}')),
+            ('/a.b/{x}/{y}', (r'/a\.b/[^/]+/[^/]+', '/a.b/{x}/{y}')),
+            (r' ^/api/v\d+/.*$  =>  /api/v{n} ', (r'^/api/v\d+/.*$', '/api/v{n}')),
+        ],
+    )
+    def test_return_value(self, rule, expected):
+        """Test regular expression and handler of templates and regular expression rules."""
+        assert parse_rule(rule) == expected
+
+
+class TestLoadUrlRules:
+    """Tests load_url_rules(file)."""
+
+    def test_return_value(self, tmp_path):
+        """Test empty lines and comments are skipped."""
+        rules_file = tmp_path / 'rules.txt'
+        rules_file.write_text('# Users.\n/api/users/{id}\n\n  # Items.\n^/items/.*$ => /items/\n')
+
+        assert load_url_rules(str(rules_file)) == ['/api/users/{id}', '^/items/.*$ => /items/']
+
+
+class TestUrlNormalizer:
+    """Tests UrlNormalizer."""
+
+    @pytest.mark.parametrize(
+        'url, expected',
+        [
+            ('/api/users/15', '/api/users/{id}'),
+            ('/api/users/me', '/api/users/{id}'),  # The first matched rule.
+            ('/api/users/15?page=2#top', '/api/users/{id}'),
+            ('/api/users/15/posts/abc', '/api/users/{id}/posts/{post_id}'),
+            ('/api/v2/items/77/', '/api/items/{id}'),
+            ('/api/users/15/extra', f'/api/users/{URL_ID_PLACEHOLDER}/extra'),  # Not matched.
+            (
+                '/orders/9c5b94b1-35ad-49bb-b118-8e8fc24abf80/deadbeefdeadbeef/v2',
+                f'/orders/{URL_ID_PLACEHOLDER}/{URL_ID_PLACEHOLDER}/v2',
+            ),
+            ('/api/context/...?x=1', '/api/context/...'),
+        ],
+    )
+    def test_normalize(self, url, expected):
+        """Test handler names of matched and not matched urls."""
+        assert UrlNormalizer(TEST_RULES).normalize(url) == expected
+
+    def test_no_rules(self):
+        """Test only query strings and ids are removed without rules."""
+        assert UrlNormalizer([]).normalize('/api/users/15?page=2') == f'/api/users/{URL_ID_PLACEHOLDER}'
+
+    def test_cache(self):
+        """Test a raw url is matched once while it stays in the LRU cache."""
+        normalizer = UrlNormalizer(TEST_RULES, cache_size=2)
+        with mock.patch.object(normalizer, 'matcher', wraps=normalizer.matcher) as mock_matcher:
+            for url in ['/api/users/1', '/api/users/1', '/api/users/2', '/api/users/1', '/api/users/3', '/api/users/2']:
+                normalizer.normalize(url)
+
+        assert mock_matcher.fullmatch.call_count == 4  # 1, 2, 3, then 2 evicted by 3.
+        assert normalizer.normalize.cache_info().currsize == 2
+
+    def test_invalid_rule(self):
+        """Test exception for an invalid regular expression."""
+        with pytest.raises(Exception, match='Invalid url rule'):
+            UrlNormalizer(['^/api/(unclosed$ => x'])
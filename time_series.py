@@ -0,0 +1,215 @@
+"""Per-endpoint statistics by time buckets (--report timeseries)."""
+
+import re
+import struct
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from typing import Iterator, Self
+
+from config import RESPONSE_TIMES_BUFFER_SIZE
+from quantile_sketch import MIN_INDEXABLE_VALUE, QuantileSketch
+
+# Binary format of TimeSeries: bucket size, number of not empty buckets, number of sketch entries,
+# then bucket entries (bucket int64, count int64, response time sum in microseconds int64)
+# and sketch entries (bucket int64, key int32, count int64), little-endian.
+TIME_SERIES_HEADER = struct.Struct('<qII')
+TIME_SERIES_BUCKET_ENTRY = struct.Struct('<qqq')
+TIME_SERIES_SKETCH_ENTRY = struct.Struct('<qiq')
+# Sketch key of response times not greater than MIN_INDEXABLE_VALUE in binary form.
+ZERO_SKETCH_KEY = -(2**31)
+BUCKET_SIZE_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_bucket_size(bucket: str) -> int:
+    """Return size of time bucket in seconds: '30s', '1m', '2h', '1d' (a number without unit - seconds)."""
+    match = re.fullmatch(r'(\d+)([smhd]?)', bucket.strip())
+    if match is None or int(match.group(1)) == 0:
+        raise ValueError(f'Invalid time bucket "{bucket}", use e.g. 30s, 1m, 1h, 1d.')
+    return int(match.group(1)) * BUCKET_SIZE_UNITS.get(match.group(2), 1)
+
+
+def format_bucket_start(bucket_start: int) -> str:
+    """Return start of time bucket (epoch seconds) in the format of log timestamps (UTC)."""
+    return time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime(bucket_start))
+
+
+def merge_sorted_columns(
+    columns: tuple['array[int]', ...], key_size: int, entries: dict[tuple[int, ...], list[int]]
+) -> None:
+    """
+    Add entries (key: values) to parallel columns sorted by key (key columns first, then value columns).
+
+    Values of an existing key are added to its values. Only the tail of columns from the first bucket
+    (the first key column) of entries is rebuilt, so mostly ordered timestamps are appended to the columns.
+    """
+    if not entries:
+        return
+    start = bisect_left(columns[0], min(entries)[0])
+    rows = {tuple(row[:key_size]): list(row[key_size:]) for row in zip(*(column[start:] for column in columns))}
+    for key, values in entries.items():
+        old_values = rows.get(key)
+        rows[key] = values if old_values is None else [old + new for old, new in zip(old_values, values)]
+    sorted_rows = sorted((*key, *values) for key, values in rows.items())
+    for index, column in enumerate(columns):
+        column[start:] = array(column.typecode, [row[index] for row in sorted_rows])
+
+
+class TimeSeries:
+    """
+    Request count, average and quantile sketch of response times of one endpoint by time buckets.
+
+    Counts and sums are kept only for not empty buckets in typed arrays sorted by bucket number, so memory
+    does not depend on the time span of the logs (years of 1s buckets) and timestamps may come in any order.
+    Sums are integer microseconds, so merged partial series are equal to a serial one.
+    Sketch counts of all buckets are kept in typed arrays sorted by (bucket, sketch key).
+    Added values are buffered and folded by distinct (bucket, response time) pairs: buckets after the last one
+    are appended, a slightly late timestamp rebuilds only the last buckets.
+    """
+
+    def __init__(self, bucket_size: int):
+        """
+        Set up initial values.
+
+        self.bucket_size - size of time bucket in seconds
+        self.buckets - numbers of not empty buckets (epoch seconds // bucket_size), ascending
+        self.counts, self.response_time_sums - number of requests and sum of response times in microseconds
+        by bucket index
+        self.sketch_buckets, self.sketch_keys - bucket number and sketch key (ZERO_SKETCH_KEY for zero values)
+        of sketch entries, ascending
+        self.sketch_counts - number of response times by sketch entry index
+        """
+        self.bucket_size = bucket_size
+        self.buckets = array('q')
+        self.counts = array('q')
+        self.response_time_sums = array('q')
+        self.sketch_buckets = array('q')
+        self.sketch_keys = array('i')
+        self.sketch_counts = array('q')
+        self._sketch = QuantileSketch()  # Only for keys of response times.
+        self._new_buckets: list[int] = []  # Not compacted yet.
+        self._new_response_times: list[float] = []
+
+    def __eq__(self, other: object) -> bool:
+        """Compare collected statistics."""
+        if not isinstance(other, TimeSeries):
+            return NotImplemented
+        self._compact()
+        other._compact()
+        return (
+            self.bucket_size == other.bucket_size
+            and self.buckets == other.buckets
+            and self.counts == other.counts
+            and self.response_time_sums == other.response_time_sums
+            and self.sketch_buckets == other.sketch_buckets
+            and self.sketch_keys == other.sketch_keys
+            and self.sketch_counts == other.sketch_counts
+        )
+
+    def add(self, timestamp: int, response_time: float) -> None:
+        """Add response time of a request made at timestamp (epoch seconds)."""
+        self._new_buckets.append(timestamp // self.bucket_size)
+        self._new_response_times.append(response_time)
+        if len(self._new_buckets) >= RESPONSE_TIMES_BUFFER_SIZE:
+            self._compact()
+
+    def _compact(self) -> None:
+        """Fold buffered values into counts, sums and sketch counts."""
+        if not self._new_buckets:
+            return
+        get_key = self._sketch.get_key
+        bucket_entries: dict[tuple[int, ...], list[int]] = {}
+        sketch_entries: dict[tuple[int, ...], list[int]] = {}
+        for (bucket, response_time), count in Counter(zip(self._new_buckets, self._new_response_times)).items():
+            response_time_sum = round(response_time * 1_000_000) * count
+            bucket_entry = bucket_entries.get((bucket,))
+            if bucket_entry is None:
+                bucket_entries[bucket,] = [count, response_time_sum]
+            else:
+                bucket_entry[0] += count
+                bucket_entry[1] += response_time_sum
+            sketch_key = get_key(response_time) if response_time > MIN_INDEXABLE_VALUE else ZERO_SKETCH_KEY
+            sketch_entry = sketch_entries.get((bucket, sketch_key))
+            if sketch_entry is None:
+                sketch_entries[bucket, sketch_key] = [count]
+            else:
+                sketch_entry[0] += count
+        self._new_buckets = []
+        self._new_response_times = []
+        self._merge_entries(bucket_entries, sketch_entries)
+
+    def _merge_entries(
+        self, bucket_entries: dict[tuple[int, ...], list[int]], sketch_entries: dict[tuple[int, ...], list[int]]
+    ) -> None:
+        """Add bucket entries ((bucket,): [count, sum]) and sketch entries ((bucket, key): [count]) to the arrays."""
+        merge_sorted_columns((self.buckets, self.counts, self.response_time_sums), 1, bucket_entries)
+        merge_sorted_columns((self.sketch_buckets, self.sketch_keys, self.sketch_counts), 2, sketch_entries)
+
+    def merge(self, other: 'TimeSeries') -> None:
+        """Add statistics of other series (any order of merges gives the same result)."""
+        if other.bucket_size != self.bucket_size:
+            raise Exception('Can not merge time series with different bucket sizes.')
+        self._compact()
+        other._compact()
+        self._merge_entries(
+            {(bucket,): [count, response_time_sum] for bucket, count, response_time_sum in other._iter_bucket_rows()},
+            {(bucket, key): [count] for bucket, key, count in other._iter_sketch_rows()},
+        )
+
+    def _iter_bucket_rows(self) -> Iterator[tuple[int, int, int]]:
+        """Yield (bucket, count, response time sum in microseconds) of not empty buckets in order of buckets."""
+        return zip(self.buckets, self.counts, self.response_time_sums)
+
+    def _iter_sketch_rows(self) -> Iterator[tuple[int, int, int]]:
+        """Yield (bucket, sketch key, count) of sketch entries in order of buckets and keys."""
+        return zip(self.sketch_buckets, self.sketch_keys, self.sketch_counts)
+
+    def iter_buckets(self) -> Iterator[tuple[int, int, int]]:
+        """Yield (bucket start in epoch seconds, count, response time sum in microseconds) of not empty buckets."""
+        self._compact()
+        for bucket, count, response_time_sum in self._iter_bucket_rows():
+            yield bucket * self.bucket_size, count, response_time_sum
+
+    def get_sketches(self) -> dict[int, QuantileSketch]:
+        """Return quantile sketch of response times for every not empty bucket (bucket start: sketch)."""
+        self._compact()
+        sketches: dict[int, QuantileSketch] = {}
+        for bucket, sketch_key, count in self._iter_sketch_rows():
+            sketch = sketches.setdefault(bucket * self.bucket_size, QuantileSketch())
+            if sketch_key == ZERO_SKETCH_KEY:
+                sketch.zero_count += count
+            else:
+                sketch.buckets[sketch_key] = count
+        return sketches
+
+    def to_bytes(self) -> bytes:
+        """Serialize statistics to compact binary form (see TIME_SERIES_HEADER)."""
+        self._compact()
+        return b''.join(
+            (
+                TIME_SERIES_HEADER.pack(self.bucket_size, len(self.buckets), len(self.sketch_buckets)),
+                b''.join(TIME_SERIES_BUCKET_ENTRY.pack(*row) for row in self._iter_bucket_rows()),
+                b''.join(TIME_SERIES_SKETCH_ENTRY.pack(*row) for row in self._iter_sketch_rows()),
+            )
+        )
+
+    @classmethod
+    def unpack_from(cls, data: bytes, offset: int = 0) -> tuple[Self, int]:
+        """Deserialize statistics starting at offset, return them and offset of the next byte."""
+        bucket_size, buckets_count, entries_count = TIME_SERIES_HEADER.unpack_from(data, offset)
+        offset += TIME_SERIES_HEADER.size
+        time_series = cls(bucket_size)
+        buckets_end = offset + buckets_count * TIME_SERIES_BUCKET_ENTRY.size
+        entries_end = buckets_end + entries_count * TIME_SERIES_SKETCH_ENTRY.size
+        time_series._merge_entries(  # Entries are sorted by bucket as any added ones.
+            {
+                (bucket,): [count, response_time_sum]
+                for bucket, count, response_time_sum in TIME_SERIES_BUCKET_ENTRY.iter_unpack(data[offset:buckets_end])
+            },
+            {
+                (bucket, sketch_key): [count]
+                for bucket, sketch_key, count in TIME_SERIES_SKETCH_ENTRY.iter_unpack(data[buckets_end:entries_end])
+            },
+        )
+        return time_series, entries_end
@@ -0,0 +1,74 @@
+"""Module with TimestampParser."""
+
+from datetime import datetime, timezone
+
+from config import TIMESTAMP_CACHE_SIZE
+
+# Positions in 'YYYY-MM-DDTHH:MM:SS...' timestamps: end of minute, seconds.
+MINUTE_END = 16
+SECONDS_START = 17
+SECONDS_END = 19
+MAX_SECOND = 59
+
+
+class TimestampParser:
+    """
+    Convert ISO 8601 timestamps of log lines ('2025-06-22T13:57:32+00:00') to epoch seconds.
+
+    Log timestamps repeat (many lines per second) and share minute prefixes, so datetime.fromisoformat
+    is called only once per new minute and time zone: a whole timestamp is looked up in the first cache,
+    then the timestamp without seconds in the second one. Fractions of seconds are dropped,
+    a timestamp without time zone is UTC. Fields out of range (second 60 and over included) raise ValueError
+    as datetime.fromisoformat does, so such a timestamp is a bad line.
+    """
+
+    def __init__(self, cache_size: int = TIMESTAMP_CACHE_SIZE):
+        """
+        Set up initial values.
+
+        self._seconds - timestamp (str or raw bytes of a log line): epoch seconds
+        self._minutes - timestamp without seconds ('YYYY-MM-DDTHH:MM' + time zone): epoch seconds of the minute
+        """
+        self.cache_size = cache_size
+        self._seconds: dict[str | bytes, int] = {}
+        self._minutes: dict[str, int] = {}
+
+    def parse(self, timestamp: str | bytes) -> int:
+        """Return epoch seconds of timestamp."""
+        seconds = self._seconds.get(timestamp)
+        if seconds is None:
+            seconds = self._parse_uncached(timestamp.decode() if isinstance(timestamp, bytes) else timestamp)
+            if len(self._seconds) >= self.cache_size:
+                self._seconds.clear()
+            self._seconds[timestamp] = seconds
+        return seconds
+
+    def _parse_uncached(self, timestamp: str) -> int:
+        """Return epoch seconds using the cache of minutes (the minute is checked by datetime.fromisoformat)."""
+        seconds = timestamp[SECONDS_START:SECONDS_END]
+        if timestamp[MINUTE_END:SECONDS_START] != ':' or not (seconds.isascii() and seconds.isdigit()):
+            return self._parse_iso(timestamp)
+        if int(seconds) > MAX_SECOND:
+            raise ValueError(f'Second out of range in timestamp: {timestamp!r}')
+
+        time_zone = timestamp[SECONDS_END:]
+        if time_zone[:1] in ('.', ','):  # Fraction of second, dropped.
+            time_zone = time_zone[2:].lstrip('0123456789') if time_zone[1:2].isdigit() else time_zone
+        if time_zone[:1] not in ('', 'Z', '+', '-'):  # The rest is checked by datetime.fromisoformat.
+            raise ValueError(f'Invalid time zone or fraction of second in timestamp: {timestamp!r}')
+        minute = timestamp[:MINUTE_END] + time_zone
+        minute_seconds = self._minutes.get(minute)
+        if minute_seconds is None:
+            minute_seconds = self._parse_iso(f'{timestamp[:MINUTE_END]}:00{time_zone}')
+            if len(self._minutes) >= self.cache_size:
+                self._minutes.clear()
+            self._minutes[minute] = minute_seconds
+        return minute_seconds + int(seconds)
+
+    @staticmethod
+    def _parse_iso(timestamp: str) -> int:
+        """Return epoch seconds of timestamp parsed by datetime.fromisoformat."""
+        parsed = datetime.fromisoformat(timestamp)
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return int(parsed.timestamp() // 1)
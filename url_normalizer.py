@@ -0,0 +1,80 @@
+"""Module with UrlNormalizer."""
+
+import re
+from functools import lru_cache
+from typing import Iterable
+
+from config import URL_CACHE_SIZE, URL_ID_PLACEHOLDER
+
+# Separator of regular expression rules: 'regex => handler'.
+REGEX_RULE_SEPARATOR = ' => '
+# '{name}' placeholder of path template rules, matches one path segment.
+TEMPLATE_PLACEHOLDER = re.compile(r'\{[^/{}]*\}')
+# Path segments of unmatched urls replaced by URL_ID_PLACEHOLDER: numbers, UUIDs, long hex strings.
+ID_SEGMENT = re.compile(
+    r'(?<=/)(?:\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}|[0-9a-fA-F]{16,})(?=/|$)'
+)
+
+
+def parse_rule(rule: str) -> tuple[str, str]:
+    r"""
+    Return (regular expression of path, handler name) of rule.
+
+    Rules are path templates ('/api/users/{id}', the handler is the template itself)
+    or regular expressions with a handler name ('^/api/v\d+/users/\d+$ => /api/users/{id}').
+    """
+    pattern, separator, handler = rule.partition(REGEX_RULE_SEPARATOR)
+    if separator:
+        return pattern.strip(), handler.strip()
+    template = rule.strip()
+    parts = TEMPLATE_PLACEHOLDER.split(template)
+    return '[^/]+'.join(re.escape(part) for part in parts), template
+
+
+def load_url_rules(file: str) -> list[str]:
+    """Return rules of file: one rule per line, empty lines and lines starting with '#' are skipped."""
+    with open(file) as opened_file:
+        return [line.strip() for line in opened_file if line.strip() and not line.lstrip().startswith('#')]
+
+
+class UrlNormalizer:
+    """
+    Map raw urls to handler names before aggregation.
+
+    The query string and fragment are dropped, then the path is matched against rules in their order
+    (the first matched rule gives the handler). All rules are compiled into one regular expression
+    of alternatives, the matched alternative is found by its group name. Id-like segments of unmatched
+    paths are replaced by URL_ID_PLACEHOLDER, so the number of handlers stays bounded on high-cardinality logs.
+    Results are kept in an LRU cache (raw url: handler), hot urls are not matched again.
+    Numbered backreferences can not be used in regular expression rules (groups are renumbered).
+    """
+
+    def __init__(self, rules: Iterable[str], cache_size: int = URL_CACHE_SIZE):
+        """
+        Set up initial values.
+
+        self.handlers - handler name of every rule
+        self.matcher - compiled alternatives of all rules (group '_<rule index>' for every rule)
+        self.normalize - cached normalization of a raw url
+        """
+        self.rules = list(rules)
+        patterns: list[str] = []
+        self.handlers: list[str] = []
+        for rule in self.rules:
+            pattern, handler = parse_rule(rule)
+            patterns.append(f'(?P<_{len(patterns)}>{pattern})')
+            self.handlers.append(handler)
+        try:
+            self.matcher = re.compile('|'.join(patterns)) if patterns else None
+        except re.error as error:
+            raise Exception(f'Invalid url rule: {error}.') from error
+        self.normalize = lru_cache(maxsize=cache_size)(self._normalize_uncached)
+
+    def _normalize_uncached(self, url: str) -> str:
+        """Return handler name of url."""
+        path = url.partition('?')[0].partition('#')[0]
+        if self.matcher is not None:
+            match = self.matcher.fullmatch(path)
+            if match is not None:
+                return self.handlers[int(match.lastgroup[1:])]  # type: ignore[index]
+        return ID_SEGMENT.sub(URL_ID_PLACEHOLDER, path)